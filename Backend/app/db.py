@@ -1,7 +1,370 @@
 """
-Legacy helper (sqlite/psycopg2) — no longer used after migrating to Supabase client.
-Kept as stub to avoid accidental imports; remove when safe.
+Espelho local (SQLite) das tabelas de referência do Supabase.
+
+O antigo `database.db` passa a ser uma cópia de leitura das tabelas usadas no
+cálculo e nos cadastros (configuracoes, gramaturas, impostos, servicos,
+custos_adicionais, sacolas_lote, icms_estados). A sincronização é incremental
+por `id` + coluna de atualização (`updated_at`, ou `atualizado_em` em
+icms_estados): só as linhas alteradas desde a última marca são baixadas e as
+removidas no Supabase saem pela lista de ids. As colunas e os triggers que
+as preenchem estão em Backend/sql/sincronizacao_incremental.sql; tabela sem
+a coluna de atualização é copiada por inteiro (modo 'completo' no
+`_sync_estado`).
+
+`pricing_context` devolve, em uma única consulta, o mesmo JSON da função SQL
+`public.pricing_context` (Backend/sql/pricing_context.sql).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+DB_PATH_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database.db')
+
+SCHEMA_SQLITE = """
+create table if not exists configuracoes (
+    id integer primary key check (id = 1),
+    margem real not null default 0,
+    custo_cordao real not null default 0,
+    tema text default 'Escuro',
+    notificacoes integer default 0,
+    perdas_calibracao_un integer not null default 0,
+    valor_silk real not null default 0,
+    tamanho_alca real not null default 0,
+    ipi_percentual real not null default 0,
+    updated_at text
+);
+create table if not exists gramaturas (
+    id integer primary key,
+    gramatura text not null,
+    preco real not null,
+    altura_cm real,
+    updated_at text
+);
+create table if not exists impostos (
+    id integer primary key,
+    nome text not null,
+    valor real not null,
+    updated_at text
+);
+create table if not exists servicos (
+    id integer primary key,
+    nome text not null,
+    valor real not null default 0,
+    impostos real default 0,
+    updated_at text
+);
+create table if not exists custos_adicionais (
+    id integer primary key,
+    nome text not null,
+    valor real not null,
+    a_cada integer,
+    updated_at text
+);
+create table if not exists sacolas_lote (
+    id integer primary key,
+    nome text,
+    largura_cm real,
+    altura_cm real,
+    lateral_cm real,
+    fundo_cm real,
+    tem_alca integer,
+    updated_at text
+);
+create table if not exists icms_estados (
+    id integer primary key,
+    estado text not null unique,
+    aliquota real not null,
+    atualizado_em text
+);
+create table if not exists _sync_estado (
+    tabela text primary key,
+    sincronizado_em text not null,
+    marca text,
+    modo text not null,
+    linhas integer not null default 0,
+    duracao_ms real,
+    geracao integer
+);
+"""
+
+# Mesma estrutura de public.pricing_context; json() mantém os subselects como JSON (e não texto)
+PRICING_CONTEXT_SQL = """
+select json_object(
+    'configuracoes', json((
+        select json_object(
+            'id', id, 'margem', margem, 'custo_cordao', custo_cordao, 'tema', tema,
+            'notificacoes', notificacoes, 'perdas_calibracao_un', perdas_calibracao_un,
+            'valor_silk', valor_silk, 'tamanho_alca', tamanho_alca, 'ipi_percentual', ipi_percentual
+        )
+        from configuracoes where id = 1
+    )),
+    'gramaturas', json(coalesce((
+        select json_group_array(json_object('id', id, 'gramatura', gramatura, 'preco', preco, 'altura_cm', altura_cm))
+        from (
+            select * from gramaturas
+            where (:gramatura_id is null or id = :gramatura_id)
+              and (:gramatura_nome is null or gramatura = :gramatura_nome)
+            order by id
+        )
+    ), '[]')),
+    'impostos', json(coalesce((
+        select json_group_array(json_object('id', id, 'nome', nome, 'valor', valor))
+        from (select * from impostos order by id)
+    ), '[]')),
+    'custos_adicionais', json(coalesce((
+        select json_group_array(json_object('id', id, 'nome', nome, 'valor', valor, 'a_cada', a_cada))
+        from (select * from custos_adicionais order by id)
+    ), '[]')),
+    'icms_estados', json(coalesce((
+        select json_group_array(json_object('estado', estado, 'aliquota', aliquota))
+        from (select * from icms_estados order by estado)
+    ), '[]'))
+)
 """
 
+TABELAS_REFERENCIA = ('configuracoes', 'gramaturas', 'impostos', 'custos_adicionais', 'icms_estados')
+
+# Tabelas espelhadas e a coluna de atualização usada na sincronização incremental
+TABELAS_ESPELHO: Dict[str, str] = {
+    'configuracoes': 'updated_at',
+    'gramaturas': 'updated_at',
+    'impostos': 'updated_at',
+    'servicos': 'updated_at',
+    'custos_adicionais': 'updated_at',
+    'sacolas_lote': 'updated_at',
+    'icms_estados': 'atualizado_em',
+}
+
+# Colunas booleanas no Supabase guardadas como inteiro no SQLite
+_BOOLEANAS = {'sacolas_lote': ('tem_alca',)}
+
+
+def normalizar_booleanas(tabela: str, linhas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Converte de volta para bool as colunas booleanas guardadas como inteiro (formato do PostgREST)."""
+    for coluna in _BOOLEANAS.get(tabela, ()):
+        for linha in linhas:
+            if linha.get(coluna) is not None:
+                linha[coluna] = bool(linha[coluna])
+    return linhas
+
+
+def caminho_banco() -> str:
+    """Arquivo do espelho (variável DB_PATH; padrão: app/database.db)."""
+    return os.environ.get('DB_PATH') or DB_PATH_PADRAO
+
+
+def _garantir_colunas(conn: sqlite3.Connection) -> None:
+    """
+    Acrescenta colunas que faltem em tabelas criadas por versões antigas do `database.db`.
+
+    O schema esperado é lido de um banco em memória criado com SCHEMA_SQLITE;
+    as colunas novas entram sem NOT NULL (o SQLite não permite em ALTER sem default).
+    """
+    modelo = sqlite3.connect(':memory:')
+    modelo.executescript(SCHEMA_SQLITE)
+    for (tabela,) in modelo.execute("select name from sqlite_master where type = 'table'"):
+        existentes = {r[1] for r in conn.execute(f'pragma table_info({tabela})')}
+        for _, coluna, tipo, *_ in modelo.execute(f'pragma table_info({tabela})'):
+            if coluna not in existentes:
+                conn.execute(f'alter table {tabela} add column {coluna} {tipo}')
+    modelo.close()
+
+
+def conectar_sqlite(caminho: str = ':memory:') -> sqlite3.Connection:
+    """Abre (ou cria) o banco local e garante o schema das tabelas espelhadas."""
+    conn = sqlite3.connect(caminho, check_same_thread=False, timeout=5.0)
+    conn.row_factory = sqlite3.Row
+    if caminho != ':memory:':
+        # WAL: os workers do gunicorn leem o mesmo arquivo enquanto um deles sincroniza
+        conn.execute('pragma journal_mode=wal')
+    conn.executescript(SCHEMA_SQLITE)
+    _garantir_colunas(conn)
+    conn.commit()
+    return conn
+
+
+def inserir_linhas(conn: sqlite3.Connection, tabela: str, linhas: Iterable[Dict[str, Any]], commit: bool = True) -> int:
+    """Insere (ou substitui) linhas vindas do Supabase, ignorando colunas que o schema local não tem."""
+    if tabela not in TABELAS_ESPELHO:
+        raise ValueError(f'Tabela desconhecida: {tabela}')
+    colunas = [r[1] for r in conn.execute(f'pragma table_info({tabela})')]
+    total = 0
+    for linha in linhas:
+        campos = [c for c in colunas if c in linha]
+        conn.execute(
+            f"insert or replace into {tabela} ({', '.join(campos)}) values ({', '.join('?' for _ in campos)})",
+            [linha[c] for c in campos],
+        )
+        total += 1
+    if commit:
+        conn.commit()
+    return total
+
+
+def pricing_context(
+    conn: sqlite3.Connection,
+    gramatura_id: Optional[int] = None,
+    gramatura_nome: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Contexto de precificação em uma consulta (equivalente local de `public.pricing_context`).
+
+    Returns:
+        {'configuracoes': {...} | None, 'gramaturas': [...], 'impostos': [...],
+         'custos_adicionais': [...], 'icms_estados': [...]}
+    """
+    row = conn.execute(
+        PRICING_CONTEXT_SQL,
+        {'gramatura_id': gramatura_id, 'gramatura_nome': gramatura_nome},
+    ).fetchone()
+    return json.loads(row[0])
+
+
+class EspelhoLocal:
+    """
+    Espelho SQLite com sincronização incremental a partir dos repositórios do Supabase.
+
+    Uma conexão por processo, protegida por lock (as leituras levam microssegundos);
+    é reaberta sob demanda após fork.
+    """
+
+    def __init__(self, caminho: Optional[str] = None):
+        self.caminho = caminho or caminho_banco()
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _conexao(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = conectar_sqlite(self.caminho)
+        return self._conn
+
+    def reiniciar_apos_fork(self) -> None:
+        """No filho, descarta a conexão herdada sem fechá-la (o arquivo continua aberto no pai)."""
+        self._lock = threading.RLock()
+        self._conn = None
+
+    # ----- leitura -----
+
+    def sincronizadas(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            rows = self._conexao().execute('select * from _sync_estado').fetchall()
+        return {r['tabela']: dict(r) for r in rows}
+
+    def idade_s(self, tabela: str) -> Optional[float]:
+        """Segundos desde a última sincronização da tabela (None se nunca sincronizada)."""
+        estado = self.sincronizadas().get(tabela)
+        if not estado:
+            return None
+        quando = datetime.fromisoformat(estado['sincronizado_em'])
+        return (datetime.now(timezone.utc) - quando).total_seconds()
+
+    def tem_referencia(self) -> bool:
+        """Todas as tabelas do cálculo já foram sincronizadas ao menos uma vez (dados legados não contam)."""
+        return set(TABELAS_REFERENCIA) <= set(self.sincronizadas())
+
+    def linhas(self, tabela: str) -> List[Dict[str, Any]]:
+        """Linhas da tabela ordenadas por id, no formato do PostgREST."""
+        if tabela not in TABELAS_ESPELHO:
+            raise ValueError(f'Tabela desconhecida: {tabela}')
+        with self._lock:
+            rows = self._conexao().execute(f'select * from {tabela} order by id').fetchall()
+        return normalizar_booleanas(tabela, [dict(r) for r in rows])
+
+    def pricing_context(self) -> Dict[str, Any]:
+        with self._lock:
+            return pricing_context(self._conexao())
+
+    # ----- sincronização -----
+
+    def sincronizar_tabela(self, repositorio, tabela: str, geracao: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Traz as alterações de uma tabela do Supabase para o espelho.
+
+        Com marca anterior, busca só as linhas com `coluna_atualizacao >= marca`
+        e remove localmente os ids que não existem mais; sem marca (ou se a
+        coluna não existir no Supabase), copia a tabela inteira.
+
+        Args:
+            repositorio: Repositório de origem da tabela
+            tabela: Tabela espelhada
+            geracao: Geração da tabela (`app.utils.geracoes`) lida antes de começar; a cópia
+                só é considerada atual enquanto a geração não mudar
+        """
+        inicio = time.perf_counter()
+        coluna = TABELAS_ESPELHO[tabela]
+        marca_anterior = (self.sincronizadas().get(tabela) or {}).get('marca')
+
+        linhas = None
+        ids = None
+        modo = 'completo'
+        if marca_anterior:
+            try:
+                linhas = repositorio.listar(desde=(coluna, marca_anterior))
+                ids = [r.get('id') for r in repositorio.listar('id')]
+                modo = 'incremental'
+            except Exception:
+                linhas = None
+        if linhas is None:
+            linhas = repositorio.listar()
+
+        marcas = [str(r[coluna]) for r in linhas if r.get(coluna)]
+        marca = max(marcas + ([marca_anterior] if marca_anterior else []), default=None)
+        agora = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            conn = self._conexao()
+            with conn:
+                if modo == 'completo':
+                    conn.execute(f'delete from {tabela}')
+                else:
+                    conn.execute(f'delete from {tabela} where id not in (select value from json_each(?))', (json.dumps(ids),))
+                inserir_linhas(conn, tabela, linhas, commit=False)
+                duracao_ms = round((time.perf_counter() - inicio) * 1000, 1)
+                conn.execute(
+                    'insert or replace into _sync_estado (tabela, sincronizado_em, marca, modo, linhas, duracao_ms, geracao) '
+                    'values (?, ?, ?, ?, ?, ?, ?)',
+                    (tabela, agora, marca, modo, len(linhas), duracao_ms, geracao),
+                )
+        return {'tabela': tabela, 'modo': modo, 'linhas': len(linhas), 'marca': marca, 'duracao_ms': duracao_ms}
+
+    def sincronizar(
+        self,
+        repositorio_de: Callable[[str], Any],
+        tabelas: Optional[Iterable[str]] = None,
+        geracoes: Optional[Dict[str, int]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Sincroniza as tabelas pedidas (padrão: todas); falha de uma tabela não impede as demais.
+
+        Args:
+            repositorio_de: Tabela -> repositório de origem (ex.: `app.repositories.get_repositorio`)
+            tabelas: Tabelas a sincronizar
+            geracoes: Geração de cada tabela no início da sincronização (ver `sincronizar_tabela`)
+        """
+        geracoes = geracoes or {}
+        resultado: Dict[str, Any] = {}
+        for tabela in tabelas or TABELAS_ESPELHO:
+            try:
+                resultado[tabela] = self.sincronizar_tabela(repositorio_de(tabela), tabela, geracoes.get(tabela))
+            except Exception as e:
+                resultado[tabela] = {'tabela': tabela, 'erro': str(e)}
+        return resultado
+
+    def stats(self) -> Dict[str, Any]:
+        estados = self.sincronizadas()
+        return {
+            'caminho': self.caminho,
+            'tabelas': {
+                tabela: {k: v for k, v in estados[tabela].items() if k != 'tabela'} if tabela in estados else None
+                for tabela in TABELAS_ESPELHO
+            },
+        }
+
+
 def get_connection():
-    raise RuntimeError("Use app.supabase_client.get_client() instead of get_connection")
+    raise RuntimeError("Use app.repositories.get_repositorio() instead of get_connection")
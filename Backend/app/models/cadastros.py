@@ -0,0 +1,135 @@
+"""
+Listagens dos cadastros no formato da API e o payload de bootstrap do frontend.
+
+As rotas GET de cada cadastro e `/api/bootstrap` usam as mesmas funções, então
+o bootstrap devolve exatamente o que as telas receberiam chamando uma a uma.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+from app.models.configuracoes import get_configuracoes
+from app.models.espelho_local import ao_escrever, ler_tabela, offline
+from app.models.gramatura import Gramatura
+from app.models.imposto_fixo import IMPOSTOS_ORDEM, ensure_impostos_fixos_defaults
+from app.repositories import get_repositorio
+from app.utils.etag import revalidacao_s
+from app.utils.geracoes import atuais
+from app.utils.leituras_paralelas import ler_em_paralelo
+from app.utils.reference_cache import ReferenceCache
+
+
+def listar_gramaturas() -> List[Dict[str, Any]]:
+    return [
+        {
+            'id': g.id,
+            'gramatura': g.gramatura,
+            'preco': g.preco,
+            'altura_cm': g.altura_cm,
+        }
+        for g in Gramatura.get_all()
+    ]
+
+
+def listar_impostos_fixos() -> List[Dict[str, Any]]:
+    repo = get_repositorio('impostos')
+    if not offline():
+        ensure_impostos_fixos_defaults()
+    rows = ler_tabela('impostos', lambda: repo.listar('id, nome, valor'))
+    # Ordena pelo IMPOSTOS_ORDEM; desconhecidos ficam ao final ordenados alfabeticamente
+    ordem_index = {nome: idx for idx, nome in enumerate(IMPOSTOS_ORDEM)}
+    rows.sort(key=lambda r: (ordem_index.get(r.get('nome'), len(IMPOSTOS_ORDEM) + 1), (r.get('nome') or '').lower()))
+    return [
+        {'id': row.get('id'), 'nome': row.get('nome'), 'valor': float(row.get('valor') or 0.0)}
+        for row in rows
+    ]
+
+
+def listar_servicos() -> List[Dict[str, Any]]:
+    repo = get_repositorio('servicos')
+    # Tabela tem colunas: id, nome, valor, impostos (não há imposto_percentual)
+    rows = ler_tabela('servicos', lambda: repo.listar('id, nome, valor, impostos', ordem='id'))
+    return [
+        {
+            'id': row.get('id'),
+            'nome': row.get('nome'),
+            'valor': float(row.get('valor') or 0.0),
+            'imposto_percentual': float(row.get('impostos') or 0.0),
+        }
+        for row in rows
+    ]
+
+
+def listar_custos_adicionais() -> List[Dict[str, Any]]:
+    repo = get_repositorio('custos_adicionais')
+    rows = ler_tabela('custos_adicionais', lambda: repo.listar('id, nome, valor, a_cada', ordem='id'))
+    return [
+        {
+            'id': row.get('id'),
+            'nome': row.get('nome'),
+            'valor': float(row.get('valor') or 0.0),
+            'a_cada': int(row.get('a_cada') or 1),
+        }
+        for row in rows
+    ]
+
+
+def listar_sacolas_lote() -> List[Dict[str, Any]]:
+    repo = get_repositorio('sacolas_lote')
+    return ler_tabela('sacolas_lote', lambda: repo.listar(ordem='id'))
+
+
+def _configuracoes_ou_none() -> Optional[Dict[str, Any]]:
+    try:
+        return get_configuracoes(require_existing=True, usar_espelho=True)
+    except LookupError:
+        return None
+
+
+# Seção do bootstrap -> (tabela de origem, função); mesma forma das rotas GET
+SECOES_BOOTSTRAP = {
+    'configuracoes': ('configuracoes', _configuracoes_ou_none),
+    'gramaturas': ('gramaturas', listar_gramaturas),
+    'impostos_fixos': ('impostos', listar_impostos_fixos),
+    'servicos': ('servicos', listar_servicos),
+    'custos_adicionais': ('custos_adicionais', listar_custos_adicionais),
+    'sacolas_lote': ('sacolas_lote', listar_sacolas_lote),
+}
+TABELAS_BOOTSTRAP = frozenset(tabela for tabela, _ in SECOES_BOOTSTRAP.values())
+
+
+def montar_bootstrap() -> Dict[str, Any]:
+    """
+    Todas as seções, lidas em paralelo (ver `ler_em_paralelo`), mais a versão do conteúdo.
+
+    `versao` é o hash do conteúdo: muda só quando algum cadastro muda e serve de ETag.
+    """
+    secoes, _ = ler_em_paralelo({nome: fn for nome, (_, fn) in SECOES_BOOTSTRAP.items()})
+    versao = hashlib.sha256(json.dumps(secoes, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:32]
+    return {'versao': versao, **secoes}
+
+
+# Escrita em qualquer worker incrementa a geração das tabelas e recarrega o payload no próximo acesso
+_cache = ReferenceCache(
+    montar_bootstrap,
+    ttl_seconds=revalidacao_s(),
+    versao=lambda: atuais(sorted(TABELAS_BOOTSTRAP)),
+)
+
+
+def _invalidar_se_bootstrap(*tabelas: str) -> None:
+    if TABELAS_BOOTSTRAP.intersection(tabelas):
+        _cache.invalidate()
+
+
+ao_escrever(_invalidar_se_bootstrap)
+
+
+def get_bootstrap() -> Dict[str, Any]:
+    """Payload em cache por worker; escritas de qualquer worker invalidam (gerações compartilhadas)."""
+    return _cache.get()
+
+
+def bootstrap_cache_stats() -> Dict[str, Any]:
+    return _cache.stats()
@@ -1,18 +1,13 @@
-from app.supabase_client import get_client
+from app.repositories import get_repositorio
+from app.models.espelho_local import ler_tabela
 
 # Não inicializa nem insere automaticamente para evitar gravação no Supabase.
 def init_configuracoes():
     return True
 
-def get_configuracoes(require_existing: bool = False):
-    client = get_client()
-    resp = client.table('configuracoes').select('*').eq('id', 1).limit(1).execute()
-    rows = resp.data or []
-    row = rows[0] if rows else None
-
+def configuracoes_from_row(row):
+    """Normaliza a linha de `configuracoes` (ou os padrões, sem linha) para o formato usado no cálculo."""
     if not row:
-        if require_existing:
-            raise LookupError('Configurações não encontradas no Supabase.')
         return {
             'margem': 0.0,
             'custo_cordao': 0.0,
@@ -35,6 +30,21 @@ def get_configuracoes(require_existing: bool = False):
         'ipi_percentual': float(row.get('ipi_percentual') or 0.0),
     }
 
+def get_configuracoes(require_existing: bool = False, usar_espelho: bool = False):
+    repo = get_repositorio('configuracoes')
+
+    def consultar():
+        row = repo.buscar(1)
+        return [row] if row else []
+
+    # Com usar_espelho, a leitura pode vir do espelho local (ver app.models.espelho_local)
+    rows = ler_tabela('configuracoes', consultar) if usar_espelho else consultar()
+    row = next((r for r in rows if r.get('id') == 1), None)
+
+    if not row and require_existing:
+        raise LookupError('Configurações não encontradas no Supabase.')
+    return configuracoes_from_row(row)
+
 def update_configuracoes(margem=None, custo_cordao=None, tema=None, notificacoes=None, perdas_calibracao_un=None, valor_silk=None, tamanho_alca=None, ipi_percentual=None):
     updates = {}
     if margem is not None:
@@ -70,6 +80,5 @@ def update_configuracoes(margem=None, custo_cordao=None, tema=None, notificacoes
     if not updates:
         return False
 
-    client = get_client()
-    client.table('configuracoes').update(updates).eq('id', 1).execute()
+    get_repositorio('configuracoes').atualizar(1, updates)
     return True
@@ -0,0 +1,216 @@
+"""
+Escritas em lote nas tabelas de cadastro.
+
+Um lote `{"upsert": [linhas], "delete": [ids]}` é validado por inteiro antes de
+qualquer escrita (erros por linha, nada é gravado se houver erro) e depois
+aplicado com um número fixo de chamadas, independente do tamanho: uma leitura
+dos ids alterados (para completar as linhas parciais), um upsert, um insert e
+um delete. Os caches são invalidados uma vez por lote.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from app.models.espelho_local import marcar_desatualizada
+from app.models.reference_data import invalidar_dados_referencia
+from app.repositories import get_repositorio
+
+
+MAX_LINHAS_LOTE = 1000
+
+
+class LoteInvalido(ValueError):
+    """Lote com erros de validação (mapeado para HTTP 400 com a lista de erros por linha)."""
+
+    def __init__(self, mensagem: str, erros: Optional[List[Dict[str, Any]]] = None):
+        super().__init__(mensagem)
+        self.erros = erros or []
+
+
+def _numero(valor: Any, campo: str, opcional: bool = False) -> Optional[float]:
+    if opcional and valor in (None, ''):
+        return None
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f'{campo} inválido')
+
+
+def _inteiro(valor: Any, campo: str) -> int:
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f'{campo} inválido')
+
+
+def _texto(valor: Any, campo: str, obrigatorio: bool) -> str:
+    texto = str(valor or '').strip()
+    if obrigatorio and not texto:
+        raise ValueError(f'{campo} é obrigatório')
+    return texto
+
+
+def _validar_imposto(linha: Dict[str, Any], criando: bool) -> Dict[str, Any]:
+    if linha.get('valor') is None:
+        raise ValueError('Informe valor para atualizar')
+    return {'valor': _numero(linha.get('valor'), 'valor')}
+
+
+def _validar_gramatura(linha: Dict[str, Any], criando: bool) -> Dict[str, Any]:
+    campos: Dict[str, Any] = {}
+    if criando or 'gramatura' in linha:
+        campos['gramatura'] = _texto(linha.get('gramatura'), 'gramatura', obrigatorio=True)
+    if criando or 'preco' in linha:
+        campos['preco'] = _numero(linha.get('preco'), 'preco')
+    if 'altura_cm' in linha:
+        campos['altura_cm'] = _numero(linha.get('altura_cm'), 'altura_cm', opcional=True)
+    return campos
+
+
+def _validar_servico(linha: Dict[str, Any], criando: bool) -> Dict[str, Any]:
+    campos: Dict[str, Any] = {}
+    if criando or 'nome' in linha:
+        campos['nome'] = _texto(linha.get('nome'), 'nome', obrigatorio=True)
+    if criando or 'valor' in linha:
+        campos['valor'] = _numero(linha.get('valor'), 'valor')
+    imposto = linha.get('imposto_percentual') if 'imposto_percentual' in linha else linha.get('impostos')
+    if criando or imposto is not None:
+        campos['impostos'] = _numero(imposto or 0.0, 'imposto_percentual')
+    return campos
+
+
+def _validar_custo_adicional(linha: Dict[str, Any], criando: bool) -> Dict[str, Any]:
+    campos: Dict[str, Any] = {}
+    if criando or 'nome' in linha:
+        campos['nome'] = _texto(linha.get('nome'), 'nome', obrigatorio=criando)
+    if criando or 'valor' in linha:
+        campos['valor'] = _numero(linha.get('valor'), 'valor')
+    if criando:
+        campos['a_cada'] = _inteiro(linha.get('a_cada') or 1, 'a_cada')
+    elif 'a_cada' in linha:
+        campos['a_cada'] = _inteiro(linha.get('a_cada'), 'a_cada')
+    return campos
+
+
+def _validar_sacola_lote(linha: Dict[str, Any], criando: bool) -> Dict[str, Any]:
+    campos: Dict[str, Any] = {}
+    if criando or 'nome' in linha:
+        campos['nome'] = _texto(linha.get('nome'), 'nome', obrigatorio=False)
+    for campo in ('largura_cm', 'altura_cm'):
+        if criando or campo in linha:
+            campos[campo] = _numero(linha.get(campo), campo)
+    for campo in ('lateral_cm', 'fundo_cm'):
+        if criando or campo in linha:
+            campos[campo] = _numero(linha.get(campo), campo, opcional=True)
+    if criando or 'tem_alca' in linha:
+        campos['tem_alca'] = bool(linha.get('tem_alca'))
+    return campos
+
+
+@dataclass(frozen=True)
+class RecursoLote:
+    """Tabela que aceita escrita em lote e as regras de cada linha (as mesmas das rotas unitárias)."""
+
+    tabela: str
+    validar: Callable[[Dict[str, Any], bool], Dict[str, Any]]
+    permite_criar: bool = True
+    permite_excluir: bool = True
+    # True: a tabela entra no snapshot de precificação (invalidar_dados_referencia)
+    referencia: bool = False
+
+
+# Chave = nome do recurso na URL (/api/<recurso>/batch)
+RECURSOS_LOTE: Dict[str, RecursoLote] = {
+    'impostos_fixos': RecursoLote('impostos', _validar_imposto, permite_criar=False, permite_excluir=False, referencia=True),
+    'gramaturas': RecursoLote('gramaturas', _validar_gramatura, referencia=True),
+    'servicos': RecursoLote('servicos', _validar_servico),
+    'custos_adicionais': RecursoLote('custos_adicionais', _validar_custo_adicional, referencia=True),
+    'sacolas_lote': RecursoLote('sacolas_lote', _validar_sacola_lote),
+}
+
+
+def aplicar_lote(nome_recurso: str, corpo: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Valida e aplica um lote de escritas.
+
+    Args:
+        nome_recurso: Chave de RECURSOS_LOTE
+        corpo: {'upsert': [linhas; com id = atualização parcial, sem id = criação], 'delete': [ids]}
+
+    Returns:
+        {'criados': [...], 'atualizados': [...], 'removidos': [ids]}
+
+    Raises:
+        LoteInvalido: corpo malformado ou linhas inválidas (nada é gravado)
+    """
+    recurso = RECURSOS_LOTE[nome_recurso]
+    upserts = corpo.get('upsert') or []
+    exclusoes = corpo.get('delete') or []
+    if not isinstance(upserts, list) or not isinstance(exclusoes, list):
+        raise LoteInvalido('upsert e delete devem ser listas.')
+    if not upserts and not exclusoes:
+        raise LoteInvalido('Envie upsert e/ou delete.')
+    if len(upserts) + len(exclusoes) > MAX_LINHAS_LOTE:
+        raise LoteInvalido(f'Máximo de {MAX_LINHAS_LOTE} linhas por lote.')
+
+    erros: List[Dict[str, Any]] = []
+    novos: List[Dict[str, Any]] = []
+    alteracoes: Dict[int, Dict[str, Any]] = {}
+    indice_alteracao: Dict[int, int] = {}
+    ids_excluir: List[int] = []
+
+    for indice, item in enumerate(exclusoes):
+        try:
+            if not recurso.permite_excluir:
+                raise ValueError('Exclusão não permitida neste cadastro')
+            id_ = _inteiro(item.get('id') if isinstance(item, dict) else item, 'id')
+            if id_ in ids_excluir:
+                raise ValueError('id repetido no lote')
+            ids_excluir.append(id_)
+        except ValueError as e:
+            erros.append({'operacao': 'delete', 'indice': indice, 'erro': str(e)})
+
+    for indice, linha in enumerate(upserts):
+        id_ = None
+        try:
+            if not isinstance(linha, dict):
+                raise ValueError('Linha deve ser um objeto')
+            if linha.get('id') is None:
+                if not recurso.permite_criar:
+                    raise ValueError('Criação não permitida neste cadastro; informe o id')
+                novos.append(recurso.validar(linha, True))
+                continue
+            id_ = _inteiro(linha.get('id'), 'id')
+            if id_ in alteracoes or id_ in ids_excluir:
+                raise ValueError('id repetido no lote')
+            campos = recurso.validar(linha, False)
+            if not campos:
+                raise ValueError('Nada para atualizar')
+            alteracoes[id_] = campos
+            indice_alteracao[id_] = indice
+        except ValueError as e:
+            erros.append({'operacao': 'upsert', 'indice': indice, 'id': id_, 'erro': str(e)})
+
+    repo = get_repositorio(recurso.tabela)
+    # Atualizações parciais viram linhas completas: upsert sem todas as colunas violaria NOT NULL
+    existentes = {r.get('id'): r for r in repo.listar_por_ids(list(alteracoes))} if alteracoes else {}
+    for id_ in alteracoes:
+        if id_ not in existentes:
+            erros.append({'operacao': 'upsert', 'indice': indice_alteracao[id_], 'id': id_, 'erro': 'id não encontrado'})
+
+    if erros:
+        erros.sort(key=lambda e: (e['operacao'] != 'upsert', e['indice']))
+        raise LoteInvalido(f'{len(erros)} linha(s) inválida(s); nada foi gravado.', erros)
+
+    try:
+        atualizados = repo.upsert([{**existentes[id_], **campos} for id_, campos in alteracoes.items()]) if alteracoes else []
+        criados = repo.inserir(novos) if novos else []
+        if ids_excluir:
+            repo.excluir_por_ids(ids_excluir)
+    finally:
+        # Uma invalidação por lote (também em falha parcial, pois parte pode ter sido gravada)
+        if recurso.referencia:
+            invalidar_dados_referencia()
+        marcar_desatualizada(recurso.tabela)
+
+    return {'criados': criados, 'atualizados': atualizados, 'removidos': ids_excluir}
@@ -0,0 +1,186 @@
+"""
+Espelho local de leitura e modo offline.
+
+- Leitura: tabela sincronizada há menos de ESPELHO_FRESCOR_S segundos é lida
+  do SQLite local; caso contrário vai ao Supabase e agenda uma sincronização
+  em segundo plano. Escritas (em qualquer worker) incrementam a geração da
+  tabela no arquivo compartilhado (`marcar_desatualizada`, ver
+  `app.utils.geracoes`); a cópia só vale enquanto a geração for a mesma do
+  início da sincronização, então a leitura seguinte já vem do banco.
+- Offline: se o Supabase falhar (erro ou prazo estourado), a leitura cai no
+  espelho e, por ESPELHO_OFFLINE_S segundos, as leituras seguintes vão direto
+  ao espelho sem esperar o Supabase de novo.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.db import TABELAS_ESPELHO, EspelhoLocal
+from app.repositories import backend_configurado, get_repositorio
+from app.utils.ambiente import apos_fork, env_float
+from app.utils.etag import invalidar_etags
+from app.utils.geracoes import atual, atuais, incrementar
+
+
+FRESCOR_PADRAO_S = 60.0
+OFFLINE_PADRAO_S = 30.0
+
+
+def espelho_habilitado() -> bool:
+    """ESPELHO_LOCAL=on (padrão) e backend Supabase: com backend sqlite/memory não há o que espelhar."""
+    if backend_configurado() != 'supabase':
+        return False
+    return (os.environ.get('ESPELHO_LOCAL') or 'on').strip().lower() not in ('off', '0', 'false', 'no')
+
+
+_espelho: Optional[EspelhoLocal] = None
+_lock = threading.Lock()
+_sincronizando = threading.Event()
+_offline_ate = 0.0
+# Funções chamadas com as tabelas escritas (ex.: caches derivados delas)
+_ouvintes_escrita: List[Callable[..., None]] = []
+_estado: Dict[str, Any] = {'leituras_locais': 0, 'leituras_remotas': 0, 'fallbacks_offline': 0, 'ultimo_erro': None}
+
+
+def get_espelho() -> EspelhoLocal:
+    global _espelho
+    if _espelho is None:
+        with _lock:
+            if _espelho is None:
+                _espelho = EspelhoLocal()
+    return _espelho
+
+
+def offline() -> bool:
+    """True enquanto o circuito está aberto (falha recente do Supabase)."""
+    return time.monotonic() < _offline_ate
+
+
+def registrar_falha(erro: Exception) -> None:
+    """Abre o circuito: por ESPELHO_OFFLINE_S segundos as leituras vão direto ao espelho."""
+    global _offline_ate
+    _offline_ate = time.monotonic() + env_float('ESPELHO_OFFLINE_S', OFFLINE_PADRAO_S)
+    _estado['fallbacks_offline'] += 1
+    _estado['ultimo_erro'] = f'{type(erro).__name__}: {erro}'
+
+
+def marcar_desatualizada(*tabelas: str) -> None:
+    """
+    Chamar após escrever no Supabase: em todos os workers, a próxima leitura da tabela
+    não usa o espelho nem o ETag memorizado.
+    """
+    tabelas = tabelas or tuple(TABELAS_ESPELHO)
+    incrementar(*tabelas)
+    invalidar_etags(*tabelas)
+    for ouvinte in _ouvintes_escrita:
+        ouvinte(*tabelas)
+
+
+def ao_escrever(ouvinte: Callable[..., None]) -> None:
+    """Registra uma função chamada com as tabelas sempre que `marcar_desatualizada` é chamado."""
+    _ouvintes_escrita.append(ouvinte)
+
+
+def _atualizada(estado: Dict[str, Any], geracao: Optional[int]) -> bool:
+    """Nenhuma escrita na tabela desde o início da sincronização registrada em `estado`."""
+    return geracao is not None and estado.get('geracao') == geracao
+
+
+def _fresca(tabela: str) -> bool:
+    estado = get_espelho().sincronizadas().get(tabela)
+    if not estado or not _atualizada(estado, atual(tabela)):
+        return False
+    idade = get_espelho().idade_s(tabela)
+    return idade is not None and idade < env_float('ESPELHO_FRESCOR_S', FRESCOR_PADRAO_S)
+
+
+def sincronizar_agora(tabelas: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Sincroniza o espelho com o Supabase na thread atual.
+
+    A geração de cada tabela é lida antes das consultas: uma escrita durante a
+    sincronização deixa a cópia desatualizada (a cópia pode ser anterior a ela).
+    """
+    tabelas = list(tabelas or TABELAS_ESPELHO)
+    geracoes = atuais(tabelas)
+    return get_espelho().sincronizar(get_repositorio, tabelas, dict(zip(tabelas, geracoes)) if geracoes else None)
+
+
+def agendar_sincronizacao(tabelas: Optional[List[str]] = None) -> bool:
+    """Sincroniza em uma thread daemon, se o espelho estiver habilitado e não houver outra em andamento."""
+    if not espelho_habilitado() or offline() or _sincronizando.is_set():
+        return False
+    _sincronizando.set()
+
+    def executar():
+        try:
+            sincronizar_agora(tabelas)
+        except Exception as e:
+            _estado['ultimo_erro'] = f'sync: {type(e).__name__}: {e}'
+        finally:
+            _sincronizando.clear()
+
+    threading.Thread(target=executar, name='espelho-sync', daemon=True).start()
+    return True
+
+
+def ler_tabela(tabela: str, consulta_remota: Callable[[], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Leitura read-through de uma tabela inteira.
+
+    Espelho fresco (ou circuito aberto com espelho sincronizado) → SQLite local;
+    senão Supabase, com o espelho como reserva se a consulta falhar.
+    """
+    if not espelho_habilitado():
+        return consulta_remota()
+    espelho = get_espelho()
+    sincronizada = espelho.idade_s(tabela) is not None
+    if sincronizada and (offline() or _fresca(tabela)):
+        _estado['leituras_locais'] += 1
+        return espelho.linhas(tabela)
+    try:
+        linhas = consulta_remota()
+    except Exception as e:
+        if not sincronizada:
+            raise
+        registrar_falha(e)
+        _estado['leituras_locais'] += 1
+        return espelho.linhas(tabela)
+    _estado['leituras_remotas'] += 1
+    agendar_sincronizacao()
+    return linhas
+
+
+def _desatualizadas() -> List[str]:
+    """Tabelas sincronizadas com escrita posterior ao início da sincronização."""
+    estados = get_espelho().sincronizadas()
+    tabelas = sorted(estados)
+    geracoes = atuais(tabelas)
+    if geracoes is None:
+        return tabelas
+    return [t for t, g in zip(tabelas, geracoes) if not _atualizada(estados[t], g)]
+
+
+def espelho_stats() -> Dict[str, Any]:
+    if not espelho_habilitado():
+        return {'habilitado': False}
+    return {
+        'habilitado': True,
+        'offline': offline(),
+        'offline_restante_s': round(max(0.0, _offline_ate - time.monotonic()), 1),
+        'sincronizando': _sincronizando.is_set(),
+        'desatualizadas': _desatualizadas(),
+        **_estado,
+        **get_espelho().stats(),
+    }
+
+
+@apos_fork
+def _reiniciar_apos_fork() -> None:
+    global _lock, _sincronizando
+    _lock = threading.Lock()
+    _sincronizando = threading.Event()
+    if _espelho is not None:
+        _espelho.reiniciar_apos_fork()
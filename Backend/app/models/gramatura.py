@@ -1,4 +1,5 @@
-from app.supabase_client import get_client
+from app.repositories import get_repositorio
+from app.models.espelho_local import ler_tabela
 
 def init_db():
     # Assumimos que a tabela já existe na Supabase
@@ -13,19 +14,17 @@ class Gramatura:
 
     @staticmethod
     def add(gramatura, preco, altura_cm=None):
-        client = get_client()
-        resp = client.table('gramaturas').insert({
+        rows = get_repositorio('gramaturas').inserir({
             'gramatura': gramatura,
             'preco': preco,
             'altura_cm': altura_cm,
-        }).execute()
-        return resp.data[0]['id'] if resp.data else None
+        })
+        return rows[0]['id'] if rows else None
 
     @staticmethod
     def get_all():
-        client = get_client()
-        resp = client.table('gramaturas').select('id, gramatura, preco, altura_cm').order('id').execute()
-        rows = resp.data or []
+        repo = get_repositorio('gramaturas')
+        rows = ler_tabela('gramaturas', lambda: repo.listar('id, gramatura, preco, altura_cm', ordem='id'))
         return [
             Gramatura(
                 id=row.get('id'),
@@ -1,4 +1,5 @@
-from app.supabase_client import get_client
+from app.repositories import get_repositorio
+from app.models.reference_data import invalidar_dados_referencia
 
 
 def init_icms_estado():
@@ -19,18 +20,18 @@ def populate_icms_estados():
     from datetime import date
 
     hoje = date.today().isoformat()
-    client = get_client()
+    repo = get_repositorio('icms_estados')
     try:
-        client.table('icms_estados').upsert(
+        repo.upsert(
             [
                 {'estado': estado, 'aliquota': aliquota, 'atualizado_em': hoje}
                 for estado, aliquota in dados
             ],
-            on_conflict='estado'
-        ).execute()
+            chave='estado'
+        )
     except Exception:
         try:
-            existentes = client.table('icms_estados').select('estado').execute().data or []
+            existentes = repo.listar('estado')
             estados_existentes = {row.get('estado') for row in existentes}
             novos = [
                 {'estado': estado, 'aliquota': aliquota, 'atualizado_em': hoje}
@@ -38,6 +39,7 @@ def populate_icms_estados():
                 if estado not in estados_existentes
             ]
             if novos:
-                client.table('icms_estados').insert(novos).execute()
+                repo.inserir(novos)
         except Exception:
             pass
+    invalidar_dados_referencia()
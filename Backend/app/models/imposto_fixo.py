@@ -1,4 +1,7 @@
-from app.supabase_client import get_client
+import threading
+
+from app.repositories import get_repositorio
+from app.models.reference_data import invalidar_dados_referencia
 
 
 # Ordem de exibição: do mais comum para o menos comum
@@ -21,22 +24,38 @@ def init_imposto_fixo():
     return True
 
 
-def ensure_impostos_fixos_defaults():
-    """Garante que todos os impostos da ordem existam. Se faltar, insere com valor 0."""
-    client = get_client()
-    try:
-        existentes = client.table('impostos').select('nome').execute().data or []
-        nomes_existentes = {row.get('nome') for row in existentes}
-        novos = [
-            {'nome': nome, 'valor': 0.0}
-            for nome in IMPOSTOS_ORDEM
-            if nome not in nomes_existentes
-        ]
-        if novos:
-            client.table('impostos').insert(novos).execute()
-    except Exception:
-        # Não quebra fluxo de inicialização em caso de erro de conexão
-        pass
+# Impostos não podem ser criados nem excluídos pela API: basta conferir uma vez por processo
+_defaults_garantidos = False
+_lock_defaults = threading.Lock()
+
+
+def ensure_impostos_fixos_defaults(forcar: bool = False):
+    """Garante que todos os impostos da ordem existam. Se faltar, insere com valor 0.
+
+    Roda uma vez por processo (até conseguir falar com o banco); `forcar` confere de novo.
+    """
+    global _defaults_garantidos
+    if _defaults_garantidos and not forcar:
+        return
+    with _lock_defaults:
+        if _defaults_garantidos and not forcar:
+            return
+        repo = get_repositorio('impostos')
+        try:
+            existentes = repo.listar('nome')
+            nomes_existentes = {row.get('nome') for row in existentes}
+            novos = [
+                {'nome': nome, 'valor': 0.0}
+                for nome in IMPOSTOS_ORDEM
+                if nome not in nomes_existentes
+            ]
+            if novos:
+                repo.inserir(novos)
+                invalidar_dados_referencia()
+            _defaults_garantidos = True
+        except Exception:
+            # Não quebra fluxo de inicialização em caso de erro de conexão
+            pass
 
 
 def populate_impostos_fixos():
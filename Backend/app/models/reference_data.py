@@ -0,0 +1,203 @@
+import os
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+from flask import g, has_request_context
+
+from app.db import TABELAS_REFERENCIA
+from app.repositories import contexto_precificacao, get_repositorio
+from app.models.configuracoes import configuracoes_from_row, get_configuracoes
+from app.models.espelho_local import (
+    OFFLINE_PADRAO_S,
+    agendar_sincronizacao,
+    espelho_habilitado,
+    get_espelho,
+    marcar_desatualizada,
+    offline,
+    registrar_falha,
+)
+from app.utils.ambiente import env_float
+from app.utils.fiscal import estado_empresa_configurado
+from app.utils.geracoes import atuais
+from app.utils.leituras_paralelas import ler_em_paralelo
+from app.utils.pricing_engine import ReferenceData
+from app.utils.reference_cache import ReferenceCache
+
+
+# Métricas da última carga (tempo de parede × soma das consultas) para /api/status
+_ultima_carga: Optional[Dict[str, Any]] = None
+
+
+# Se a função pricing_context não existir no banco, volta a tentar só depois deste intervalo
+RPC_RETENTATIVA_S = 300.0
+_rpc_indisponivel_ate = 0.0
+
+# Snapshot montado sem alguma tabela opcional (leitura falhou) vale só por este intervalo
+TTL_PARCIAL_PADRAO_S = 15.0
+
+
+def _rpc_habilitada() -> bool:
+    """PRICING_CONTEXT_RPC=auto (padrão) tenta a RPC e cai nas leituras por tabela; 'off' desliga."""
+    modo = (os.environ.get('PRICING_CONTEXT_RPC') or 'auto').strip().lower()
+    return modo not in ('off', '0', 'false', 'no') and time.monotonic() >= _rpc_indisponivel_ate
+
+
+def referencia_de_contexto(contexto: Dict[str, Any]) -> ReferenceData:
+    """Monta o snapshot a partir do JSON de `pricing_context` (RPC do Supabase ou `app.db.pricing_context`)."""
+    return ReferenceData.from_rows(
+        configuracoes_from_row(contexto.get('configuracoes')),
+        contexto.get('gramaturas') or [],
+        contexto.get('impostos') or [],
+        contexto.get('custos_adicionais') or [],
+        contexto.get('icms_estados') or [],
+        estado_empresa_configurado(),
+    )
+
+
+def _carregar_por_rpc() -> Optional[ReferenceData]:
+    """Uma ida e volta: `pricing_context()` sem filtro traz todas as gramaturas para o snapshot do worker."""
+    global _rpc_indisponivel_ate
+    inicio = time.perf_counter()
+    try:
+        contexto = contexto_precificacao()
+    except httpx.TransportError:
+        # Supabase fora do ar (e não função ausente): quem chama decide pelo espelho local
+        raise
+    except Exception:
+        _rpc_indisponivel_ate = time.monotonic() + RPC_RETENTATIVA_S
+        return None
+    ms = round((time.perf_counter() - inicio) * 1000, 1)
+    _registrar_carga({
+        'origem': 'rpc',
+        'consultas': 1,
+        'parede_ms': ms,
+        'sequencial_ms': ms,
+        'sobreposicao': 1.0,
+        'por_consulta_ms': {'pricing_context': ms},
+        'falhas': {},
+    })
+    return referencia_de_contexto(contexto)
+
+
+def _registrar_carga(metricas: Dict[str, Any]) -> None:
+    global _ultima_carga
+    _ultima_carga = metricas
+    if has_request_context():
+        g.leitura_referencia = metricas
+
+
+def _carregar_do_espelho(motivo: str) -> ReferenceData:
+    """Snapshot a partir do espelho SQLite local (modo offline)."""
+    inicio = time.perf_counter()
+    contexto = get_espelho().pricing_context()
+    ms = round((time.perf_counter() - inicio) * 1000, 3)
+    _registrar_carga({
+        'origem': 'espelho',
+        'motivo': motivo,
+        'consultas': 1,
+        'parede_ms': ms,
+        'sequencial_ms': ms,
+        'sobreposicao': 1.0,
+        'por_consulta_ms': {'espelho_local': ms},
+        'falhas': {},
+    })
+    return referencia_de_contexto(contexto)
+
+
+def carregar_dados_referencia() -> ReferenceData:
+    """
+    Lê configuracoes, gramaturas, impostos, custos_adicionais e icms_estados e monta o snapshot do motor de preços.
+
+    Se o Supabase falhar ou estourar o prazo e o espelho local já tiver sido
+    sincronizado, o snapshot vem do espelho (modo offline) e vale só por
+    ESPELHO_OFFLINE_S segundos; depois de uma carga remota bem-sucedida o
+    espelho é atualizado em segundo plano.
+    """
+    espelho_pronto = espelho_habilitado() and get_espelho().tem_referencia()
+    if espelho_pronto and offline():
+        return _carregar_do_espelho('offline')
+    try:
+        ref = _carregar_remoto()
+    except Exception as e:
+        if not espelho_pronto:
+            raise
+        registrar_falha(e)
+        return _carregar_do_espelho(f'{type(e).__name__}: {e}')
+    agendar_sincronizacao()
+    return ref
+
+
+def _carregar_remoto() -> ReferenceData:
+    """
+    Primeiro tenta o `pricing_context` do backend (no Supabase, a RPC de sql/pricing_context.sql:
+    uma ida e volta).
+    Sem ela, as cinco consultas são independentes e saem em paralelo (ver `ler_em_paralelo`);
+    custos_adicionais e icms_estados são opcionais e, se falharem, o cálculo segue
+    sem custos adicionais e com as alíquotas padrão de ICMS.
+    """
+    if _rpc_habilitada():
+        ref = _carregar_por_rpc()
+        if ref is not None:
+            return ref
+
+    dados, metricas = ler_em_paralelo(
+        {
+            'configuracoes': get_configuracoes,
+            'gramaturas': lambda: get_repositorio('gramaturas').listar('id, gramatura, preco, altura_cm', ordem='id'),
+            'impostos': lambda: get_repositorio('impostos').listar('id, nome, valor'),
+            'custos_adicionais': lambda: get_repositorio('custos_adicionais').listar('id, nome, valor, a_cada', ordem='id'),
+            'icms_estados': lambda: get_repositorio('icms_estados').listar('estado, aliquota'),
+        },
+        opcionais={'custos_adicionais': [], 'icms_estados': []},
+    )
+    _registrar_carga({'origem': 'paralelo', **metricas})
+    return ReferenceData.from_rows(
+        dados['configuracoes'],
+        dados['gramaturas'],
+        dados['impostos'],
+        dados['custos_adicionais'],
+        dados['icms_estados'],
+        estado_empresa_configurado(),
+    )
+
+
+def _ttl_snapshot(_ref: ReferenceData) -> Optional[float]:
+    """
+    Snapshot do espelho offline expira junto com o circuito, para voltar logo ao Supabase;
+    snapshot em que uma tabela opcional falhou (montado com []) expira em REFERENCE_CACHE_TTL_PARCIAL.
+    """
+    if _ultima_carga and _ultima_carga.get('origem') == 'espelho':
+        return env_float('ESPELHO_OFFLINE_S', OFFLINE_PADRAO_S)
+    if _ultima_carga and _ultima_carga.get('falhas'):
+        return env_float('REFERENCE_CACHE_TTL_PARCIAL', TTL_PARCIAL_PADRAO_S)
+    return None
+
+
+_cache = ReferenceCache(
+    carregar_dados_referencia,
+    ttl_seconds=env_float('REFERENCE_CACHE_TTL', 300.0),
+    ttl_for=_ttl_snapshot,
+    # Escrita em outro worker (marcar_desatualizada incrementa a geração) recarrega no próximo acerto
+    versao=lambda: atuais(TABELAS_REFERENCIA),
+)
+
+
+def get_dados_referencia() -> ReferenceData:
+    """Snapshot em cache (por worker) dos dados de referência."""
+    return _cache.get()
+
+
+def invalidar_dados_referencia() -> None:
+    """
+    Chamar após qualquer escrita em configuracoes, gramaturas, impostos, custos_adicionais ou icms_estados.
+
+    Descarta o snapshot deste worker e incrementa a geração das tabelas: os demais
+    workers recarregam no próximo acesso.
+    """
+    _cache.invalidate()
+    marcar_desatualizada(*TABELAS_REFERENCIA)
+
+
+def reference_cache_stats():
+    return {**_cache.stats(), 'ultima_carga': _ultima_carga}
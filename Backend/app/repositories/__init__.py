@@ -0,0 +1,37 @@
+"""
+Camada de repositórios: acesso às tabelas independente do armazenamento.
+
+Rotas e modelos chamam `get_repositorio('gramaturas').listar(...)` em vez de
+`get_client().table(...)`; o backend (Supabase, SQLite ou memória) vem de
+REPOSITORY_BACKEND, e todo backend conta as chamadas e aceita latência injetada
+(REPOSITORY_LATENCY_MS), o que permite medir e testar a carga sem Supabase.
+"""
+
+from app.repositories.base import Backend, Repositorio
+from app.repositories.registro import (
+    BACKENDS,
+    RepositorioConfigError,
+    backend_configurado,
+    configurar_repositorios,
+    contexto_precificacao,
+    get_backend,
+    get_repositorio,
+    repositorio_stats,
+    total_chamadas,
+    zerar_contadores,
+)
+
+__all__ = [
+    'BACKENDS',
+    'Backend',
+    'Repositorio',
+    'RepositorioConfigError',
+    'backend_configurado',
+    'configurar_repositorios',
+    'contexto_precificacao',
+    'get_backend',
+    'get_repositorio',
+    'repositorio_stats',
+    'total_chamadas',
+    'zerar_contadores',
+]
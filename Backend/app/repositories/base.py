@@ -0,0 +1,190 @@
+"""
+Interface comum dos repositórios e a instrumentação (contagem de chamadas e latência injetada).
+
+Cada repositório cobre uma tabela e expõe só as operações que as rotas e os
+modelos usam; os parâmetros seguem o vocabulário do PostgREST (`colunas` no
+formato de `select`, ordenação crescente por uma coluna, filtro `>=`).
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+
+Linha = Dict[str, Any]
+Linhas = Union[Linha, List[Linha]]
+
+
+class Repositorio(ABC):
+    """Operações por tabela; cada backend implementa todas."""
+
+    def __init__(self, tabela: str):
+        self.tabela = tabela
+
+    @abstractmethod
+    def listar(
+        self,
+        colunas: str = '*',
+        ordem: Optional[str] = None,
+        limite: Optional[int] = None,
+        desde: Optional[Tuple[str, Any]] = None,
+    ) -> List[Linha]:
+        """
+        Linhas da tabela.
+
+        Args:
+            colunas: '*' ou lista separada por vírgulas ('id, nome, valor')
+            ordem: Coluna de ordenação crescente (None = ordem do backend)
+            limite: Número máximo de linhas
+            desde: (coluna, valor) para filtrar `coluna >= valor` (sincronização incremental)
+        """
+
+    @abstractmethod
+    def buscar(self, id: Any, colunas: str = '*') -> Optional[Linha]:
+        """Linha pelo id, ou None."""
+
+    @abstractmethod
+    def listar_por_ids(self, ids: Iterable[Any], colunas: str = '*') -> List[Linha]:
+        """Linhas cujos ids estão em `ids` (um único select)."""
+
+    @abstractmethod
+    def inserir(self, linhas: Linhas) -> List[Linha]:
+        """Insere uma linha ou uma lista; devolve as linhas gravadas (com id)."""
+
+    @abstractmethod
+    def atualizar(self, id: Any, campos: Linha) -> List[Linha]:
+        """Atualiza a linha do id; devolve as linhas alteradas."""
+
+    @abstractmethod
+    def excluir(self, id: Any) -> None:
+        """Remove a linha do id."""
+
+    @abstractmethod
+    def excluir_por_ids(self, ids: Iterable[Any]) -> None:
+        """Remove as linhas cujos ids estão em `ids` (um único delete)."""
+
+    @abstractmethod
+    def upsert(self, linhas: Linhas, chave: str = 'id') -> List[Linha]:
+        """Insere ou atualiza pelo valor de `chave` (coluna única)."""
+
+
+class Backend(ABC):
+    """Fábrica de repositórios de um tipo de armazenamento."""
+
+    nome = ''
+
+    @abstractmethod
+    def repositorio(self, tabela: str) -> Repositorio:
+        """Repositório da tabela."""
+
+    def pricing_context(self) -> Dict[str, Any]:
+        """
+        Contexto de precificação no formato de `public.pricing_context`.
+
+        Implementação genérica por tabela; Supabase (RPC) e SQLite (`app.db`)
+        sobrescrevem com uma consulta única.
+        """
+        return {
+            'configuracoes': self.repositorio('configuracoes').buscar(1),
+            'gramaturas': self.repositorio('gramaturas').listar('id, gramatura, preco, altura_cm', ordem='id'),
+            'impostos': self.repositorio('impostos').listar('id, nome, valor', ordem='id'),
+            'custos_adicionais': self.repositorio('custos_adicionais').listar('id, nome, valor, a_cada', ordem='id'),
+            'icms_estados': self.repositorio('icms_estados').listar('estado, aliquota', ordem='estado'),
+        }
+
+    def semear(self, dados: Dict[str, List[Linha]]) -> None:
+        """Carrega linhas iniciais ({tabela: [linhas]}), substituindo as de mesmo id."""
+        for tabela, linhas in dados.items():
+            if linhas:
+                self.repositorio(tabela).upsert(list(linhas))
+
+    def reiniciar_apos_fork(self) -> None:
+        """Descarta recursos que não sobrevivem ao fork (conexões); padrão: nada."""
+
+
+def parse_colunas(colunas: str) -> Optional[List[str]]:
+    """'*' -> None (todas); 'id, nome' -> ['id', 'nome']."""
+    nomes = [c.strip() for c in (colunas or '*').split(',') if c.strip()]
+    return None if not nomes or '*' in nomes else nomes
+
+
+def como_lista(linhas: Linhas) -> List[Linha]:
+    return [linhas] if isinstance(linhas, dict) else list(linhas)
+
+
+class ContadorChamadas:
+    """Chamadas e tempo acumulado por `tabela.operacao` (inclui a latência injetada)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chamadas: Dict[str, int] = {}
+        self._tempo_s: Dict[str, float] = {}
+
+    def registrar(self, chave: str, duracao_s: float) -> None:
+        with self._lock:
+            self._chamadas[chave] = self._chamadas.get(chave, 0) + 1
+            self._tempo_s[chave] = self._tempo_s.get(chave, 0.0) + duracao_s
+
+    def zerar(self) -> None:
+        with self._lock:
+            self._chamadas.clear()
+            self._tempo_s.clear()
+
+    def total(self) -> int:
+        with self._lock:
+            return sum(self._chamadas.values())
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'total': sum(self._chamadas.values()),
+                'tempo_ms': round(sum(self._tempo_s.values()) * 1000, 1),
+                'por_operacao': {
+                    chave: {'chamadas': n, 'tempo_ms': round(self._tempo_s[chave] * 1000, 1)}
+                    for chave, n in sorted(self._chamadas.items())
+                },
+            }
+
+
+class RepositorioInstrumentado(Repositorio):
+    """Envolve um repositório: conta cada chamada e dorme `latencia_s` antes dela (simula a rede)."""
+
+    def __init__(self, interno: Repositorio, contador: ContadorChamadas, latencia_s: float = 0.0):
+        super().__init__(interno.tabela)
+        self.interno = interno
+        self.contador = contador
+        self.latencia_s = latencia_s
+
+    def _chamar(self, operacao: str, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            if self.latencia_s > 0:
+                time.sleep(self.latencia_s)
+            return getattr(self.interno, operacao)(*args, **kwargs)
+        finally:
+            self.contador.registrar(f'{self.tabela}.{operacao}', time.perf_counter() - inicio)
+
+    def listar(self, colunas='*', ordem=None, limite=None, desde=None):
+        return self._chamar('listar', colunas, ordem=ordem, limite=limite, desde=desde)
+
+    def buscar(self, id, colunas='*'):
+        return self._chamar('buscar', id, colunas)
+
+    def listar_por_ids(self, ids, colunas='*'):
+        return self._chamar('listar_por_ids', ids, colunas)
+
+    def inserir(self, linhas):
+        return self._chamar('inserir', linhas)
+
+    def atualizar(self, id, campos):
+        return self._chamar('atualizar', id, campos)
+
+    def excluir(self, id):
+        return self._chamar('excluir', id)
+
+    def excluir_por_ids(self, ids):
+        return self._chamar('excluir_por_ids', ids)
+
+    def upsert(self, linhas, chave='id'):
+        return self._chamar('upsert', linhas, chave)
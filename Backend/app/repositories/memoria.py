@@ -0,0 +1,131 @@
+"""
+Backend em memória: listas de dicionários por tabela, para testes de carga e benchmarks sem rede.
+
+Os dados valem por processo; com vários workers do gunicorn cada um tem a sua
+cópia (semeada via REPOSITORY_SEED).
+"""
+
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.repositories.base import Backend, Linha, Linhas, Repositorio, como_lista, parse_colunas
+
+
+def _projetar(linha: Linha, colunas: Optional[List[str]]) -> Linha:
+    if colunas is None:
+        return dict(linha)
+    return {c: linha.get(c) for c in colunas}
+
+
+def _chave_ordem(valor: Any):
+    # Nulos por último, como no Postgres em ordem crescente
+    return (valor is None, valor if valor is not None else 0)
+
+
+class RepositorioMemoria(Repositorio):
+    def __init__(self, tabela: str, backend: 'BackendMemoria'):
+        super().__init__(tabela)
+        self._backend = backend
+        self._linhas = backend._tabelas.setdefault(tabela, [])
+
+    @property
+    def _lock(self) -> threading.RLock:
+        return self._backend._lock
+
+    def _proximo_id(self) -> int:
+        return max([r.get('id') or 0 for r in self._linhas] + [0]) + 1
+
+    def _indice(self, coluna: str, valor: Any) -> Optional[int]:
+        for i, r in enumerate(self._linhas):
+            if r.get(coluna) is not None and str(r.get(coluna)) == str(valor):
+                return i
+        return None
+
+    def listar(self, colunas='*', ordem=None, limite=None, desde=None) -> List[Linha]:
+        nomes = parse_colunas(colunas)
+        with self._lock:
+            rows = list(self._linhas)
+        if desde is not None:
+            coluna, valor = desde
+            rows = [r for r in rows if r.get(coluna) is not None and str(r.get(coluna)) >= str(valor)]
+        if ordem:
+            rows.sort(key=lambda r: _chave_ordem(r.get(ordem)))
+        if limite is not None:
+            rows = rows[:limite]
+        return [_projetar(r, nomes) for r in rows]
+
+    def buscar(self, id, colunas='*') -> Optional[Linha]:
+        with self._lock:
+            i = self._indice('id', id)
+            return _projetar(self._linhas[i], parse_colunas(colunas)) if i is not None else None
+
+    def listar_por_ids(self, ids: Iterable[Any], colunas='*') -> List[Linha]:
+        alvo = {str(i) for i in ids}
+        nomes = parse_colunas(colunas)
+        with self._lock:
+            return [_projetar(r, nomes) for r in self._linhas if str(r.get('id')) in alvo]
+
+    def inserir(self, linhas: Linhas) -> List[Linha]:
+        gravadas = []
+        with self._lock:
+            for linha in como_lista(linhas):
+                nova = dict(linha)
+                if nova.get('id') is None:
+                    nova['id'] = self._proximo_id()
+                elif self._indice('id', nova['id']) is not None:
+                    raise ValueError(f"{self.tabela}: id {nova['id']} já existe.")
+                self._linhas.append(nova)
+                gravadas.append(dict(nova))
+        return gravadas
+
+    def atualizar(self, id, campos: Linha) -> List[Linha]:
+        with self._lock:
+            i = self._indice('id', id)
+            if i is None:
+                return []
+            self._linhas[i].update(campos)
+            return [dict(self._linhas[i])]
+
+    def excluir(self, id) -> None:
+        with self._lock:
+            i = self._indice('id', id)
+            if i is not None:
+                del self._linhas[i]
+
+    def excluir_por_ids(self, ids: Iterable[Any]) -> None:
+        alvo = {str(i) for i in ids}
+        with self._lock:
+            self._linhas[:] = [r for r in self._linhas if str(r.get('id')) not in alvo]
+
+    def upsert(self, linhas: Linhas, chave='id') -> List[Linha]:
+        gravadas = []
+        with self._lock:
+            for linha in como_lista(linhas):
+                i = self._indice(chave, linha.get(chave)) if linha.get(chave) is not None else None
+                if i is None:
+                    nova = dict(linha)
+                    if nova.get('id') is None:
+                        nova['id'] = self._proximo_id()
+                    self._linhas.append(nova)
+                    gravadas.append(dict(nova))
+                else:
+                    self._linhas[i].update(linha)
+                    gravadas.append(dict(self._linhas[i]))
+        return gravadas
+
+
+class BackendMemoria(Backend):
+    nome = 'memory'
+
+    def __init__(self, dados: Optional[Dict[str, List[Linha]]] = None):
+        self._lock = threading.RLock()
+        self._tabelas: Dict[str, List[Linha]] = {}
+        if dados:
+            self.semear(dados)
+
+    def repositorio(self, tabela: str) -> Repositorio:
+        with self._lock:
+            return RepositorioMemoria(tabela, self)
+
+    def reiniciar_apos_fork(self) -> None:
+        self._lock = threading.RLock()
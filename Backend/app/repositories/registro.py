@@ -0,0 +1,168 @@
+"""
+Backend ativo do processo e repositórios instrumentados.
+
+REPOSITORY_BACKEND escolhe o armazenamento (supabase | sqlite | memory),
+REPOSITORY_LATENCY_MS soma uma latência fixa a cada chamada e REPOSITORY_SEED
+aponta um JSON {tabela: [linhas]} carregado nos backends locais. Benchmarks e
+scripts trocam o backend em tempo de execução com `configurar_repositorios`.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from app.repositories.base import Backend, ContadorChamadas, Repositorio, RepositorioInstrumentado
+from app.repositories.memoria import BackendMemoria
+from app.repositories.sqlite import BackendSQLite
+from app.repositories.supabase import BackendSupabase
+from app.utils.ambiente import apos_fork, env_float
+
+
+BACKENDS = ('supabase', 'sqlite', 'memory')
+BACKEND_PADRAO = 'supabase'
+
+
+class RepositorioConfigError(RuntimeError):
+    """Configuração inválida da camada de repositórios (ex.: REPOSITORY_BACKEND desconhecido)."""
+
+
+_lock = threading.Lock()
+_backend: Optional[Backend] = None
+_latencia_s = 0.0
+_contador = ContadorChamadas()
+_repositorios: Dict[str, Repositorio] = {}
+
+
+def backend_configurado() -> str:
+    """Nome do backend ativo (ou o de REPOSITORY_BACKEND, se ainda não foi criado)."""
+    if _backend is not None:
+        return _backend.nome
+    return (os.environ.get('REPOSITORY_BACKEND') or BACKEND_PADRAO).strip().lower()
+
+
+def _latencia_configurada() -> float:
+    return max(0.0, env_float('REPOSITORY_LATENCY_MS', 0.0)) / 1000
+
+
+def _carregar_seed(caminho: str) -> Dict[str, List[Dict[str, Any]]]:
+    try:
+        with open(caminho, encoding='utf-8') as f:
+            dados = json.load(f)
+    except (OSError, ValueError) as e:
+        raise RepositorioConfigError(f'REPOSITORY_SEED inválido ({caminho}): {e}') from e
+    if not isinstance(dados, dict):
+        raise RepositorioConfigError('REPOSITORY_SEED deve conter um objeto {tabela: [linhas]}.')
+    return dados
+
+
+def _criar_backend(nome: str, sqlite_path: Optional[str] = None, dados: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> Backend:
+    if nome not in BACKENDS:
+        raise RepositorioConfigError(f"REPOSITORY_BACKEND deve ser um de: {', '.join(BACKENDS)} (recebido: {nome!r}).")
+    if nome == 'supabase':
+        return BackendSupabase()
+    backend: Backend
+    if nome == 'sqlite':
+        backend = BackendSQLite(sqlite_path or os.environ.get('REPOSITORY_SQLITE_PATH') or None)
+    else:
+        backend = BackendMemoria()
+    if dados is None and os.environ.get('REPOSITORY_SEED'):
+        dados = _carregar_seed(os.environ['REPOSITORY_SEED'])
+    if dados:
+        backend.semear(dados)
+    return backend
+
+
+def get_backend() -> Backend:
+    global _backend, _latencia_s
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                _latencia_s = _latencia_configurada()
+                _backend = _criar_backend(backend_configurado())
+    return _backend
+
+
+def configurar_repositorios(
+    backend: Optional[str] = None,
+    latencia_ms: Optional[float] = None,
+    sqlite_path: Optional[str] = None,
+    dados: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+) -> Backend:
+    """
+    Troca o backend do processo (benchmarks, testes de carga, scripts).
+
+    Args:
+        backend: 'supabase', 'sqlite' ou 'memory' (padrão: REPOSITORY_BACKEND)
+        latencia_ms: Latência injetada por chamada (padrão: REPOSITORY_LATENCY_MS)
+        sqlite_path: Arquivo do backend sqlite (padrão: REPOSITORY_SQLITE_PATH ou DB_PATH)
+        dados: Linhas iniciais {tabela: [linhas]} para sqlite/memory (padrão: REPOSITORY_SEED)
+
+    Returns:
+        O novo backend; os contadores são zerados.
+
+    Raises:
+        RepositorioConfigError: backend desconhecido ou seed inválido
+    """
+    global _backend, _latencia_s
+    nome = (backend or os.environ.get('REPOSITORY_BACKEND') or BACKEND_PADRAO).strip().lower()
+    novo = _criar_backend(nome, sqlite_path, dados)
+    with _lock:
+        _backend = novo
+        _latencia_s = _latencia_configurada() if latencia_ms is None else max(0.0, float(latencia_ms)) / 1000
+        _repositorios.clear()
+        _contador.zerar()
+    return novo
+
+
+def get_repositorio(tabela: str) -> Repositorio:
+    """Repositório instrumentado da tabela no backend ativo."""
+    repo = _repositorios.get(tabela)
+    if repo is None:
+        backend = get_backend()
+        with _lock:
+            repo = _repositorios.get(tabela)
+            if repo is None:
+                repo = RepositorioInstrumentado(backend.repositorio(tabela), _contador, _latencia_s)
+                _repositorios[tabela] = repo
+    return repo
+
+
+def contexto_precificacao() -> Dict[str, Any]:
+    """`pricing_context` do backend ativo, contado como uma chamada ('pricing_context.rpc')."""
+    backend = get_backend()
+    inicio = time.perf_counter()
+    try:
+        if _latencia_s > 0:
+            time.sleep(_latencia_s)
+        return backend.pricing_context()
+    finally:
+        _contador.registrar('pricing_context.rpc', time.perf_counter() - inicio)
+
+
+def total_chamadas() -> int:
+    return _contador.total()
+
+
+def zerar_contadores() -> None:
+    _contador.zerar()
+
+
+def repositorio_stats() -> Dict[str, Any]:
+    return {
+        'backend': backend_configurado(),
+        'latencia_injetada_ms': round(_latencia_s * 1000, 1),
+        **_contador.snapshot(),
+    }
+
+
+@apos_fork
+def _reiniciar_apos_fork() -> None:
+    """Conexões SQLite e locks não atravessam o fork; os repositórios são recriados sob demanda."""
+    global _lock, _contador
+    _lock = threading.Lock()
+    _contador = ContadorChamadas()
+    _repositorios.clear()
+    if _backend is not None:
+        _backend.reiniciar_apos_fork()
@@ -0,0 +1,172 @@
+"""
+Backend SQLite: as mesmas tabelas do schema local (`app.db.SCHEMA_SQLITE`).
+
+Por padrão usa o arquivo do espelho (DB_PATH, app/database.db), o que permite
+rodar a aplicação sem Supabase sobre a última cópia sincronizada;
+REPOSITORY_SQLITE_PATH aponta para outro arquivo (ou ':memory:').
+"""
+
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.db import caminho_banco, conectar_sqlite, normalizar_booleanas, pricing_context
+from app.repositories.base import Backend, Linha, Linhas, Repositorio, como_lista, parse_colunas
+
+
+class RepositorioSQLite(Repositorio):
+    def __init__(self, tabela: str, backend: 'BackendSQLite'):
+        super().__init__(tabela)
+        self._backend = backend
+
+    def _colunas_validas(self, conn, nomes: Iterable[str]) -> List[str]:
+        existentes = self._backend.colunas(conn, self.tabela)
+        desconhecidas = [c for c in nomes if c not in existentes]
+        if desconhecidas:
+            raise ValueError(f"{self.tabela}: colunas desconhecidas: {', '.join(desconhecidas)}")
+        return list(nomes)
+
+    def _select(self, conn, colunas: str) -> str:
+        nomes = parse_colunas(colunas)
+        return '*' if nomes is None else ', '.join(self._colunas_validas(conn, nomes))
+
+    def _linhas(self, cursor) -> List[Linha]:
+        return normalizar_booleanas(self.tabela, [dict(r) for r in cursor.fetchall()])
+
+    def listar(self, colunas='*', ordem=None, limite=None, desde=None) -> List[Linha]:
+        with self._backend.conexao() as conn:
+            sql = f'select {self._select(conn, colunas)} from {self.tabela}'
+            params: List[Any] = []
+            if desde is not None:
+                sql += f' where {self._colunas_validas(conn, [desde[0]])[0]} >= ?'
+                params.append(desde[1])
+            if ordem:
+                # Nulos por último, como no Postgres
+                coluna = self._colunas_validas(conn, [ordem])[0]
+                sql += f' order by {coluna} is null, {coluna}'
+            if limite is not None:
+                sql += ' limit ?'
+                params.append(int(limite))
+            return self._linhas(conn.execute(sql, params))
+
+    def buscar(self, id, colunas='*') -> Optional[Linha]:
+        with self._backend.conexao() as conn:
+            rows = self._linhas(conn.execute(f'select {self._select(conn, colunas)} from {self.tabela} where id = ?', (id,)))
+        return rows[0] if rows else None
+
+    def listar_por_ids(self, ids: Iterable[Any], colunas='*') -> List[Linha]:
+        ids = list(ids)
+        if not ids:
+            return []
+        with self._backend.conexao() as conn:
+            sql = (
+                f'select {self._select(conn, colunas)} from {self.tabela} '
+                f"where id in ({', '.join('?' for _ in ids)})"
+            )
+            return self._linhas(conn.execute(sql, ids))
+
+    def inserir(self, linhas: Linhas) -> List[Linha]:
+        gravadas = []
+        with self._backend.conexao() as conn:
+            with conn:
+                for linha in como_lista(linhas):
+                    campos = self._colunas_validas(conn, list(linha))
+                    cursor = conn.execute(
+                        f"insert into {self.tabela} ({', '.join(campos)}) values ({', '.join('?' for _ in campos)})",
+                        [linha[c] for c in campos],
+                    )
+                    gravadas += self._linhas(conn.execute(f'select * from {self.tabela} where rowid = ?', (cursor.lastrowid,)))
+        return gravadas
+
+    def atualizar(self, id, campos: Linha) -> List[Linha]:
+        if not campos:
+            return []
+        with self._backend.conexao() as conn:
+            with conn:
+                nomes = self._colunas_validas(conn, list(campos))
+                conn.execute(
+                    f"update {self.tabela} set {', '.join(f'{c} = ?' for c in nomes)} where id = ?",
+                    [campos[c] for c in nomes] + [id],
+                )
+            return self._linhas(conn.execute(f'select * from {self.tabela} where id = ?', (id,)))
+
+    def excluir(self, id) -> None:
+        with self._backend.conexao() as conn:
+            with conn:
+                conn.execute(f'delete from {self.tabela} where id = ?', (id,))
+
+    def excluir_por_ids(self, ids: Iterable[Any]) -> None:
+        ids = list(ids)
+        if not ids:
+            return
+        with self._backend.conexao() as conn:
+            with conn:
+                conn.execute(f"delete from {self.tabela} where id in ({', '.join('?' for _ in ids)})", ids)
+
+    def upsert(self, linhas: Linhas, chave='id') -> List[Linha]:
+        gravadas = []
+        with self._backend.conexao() as conn:
+            with conn:
+                self._colunas_validas(conn, [chave])
+                for linha in como_lista(linhas):
+                    campos = self._colunas_validas(conn, list(linha))
+                    atualizar = [c for c in campos if c != chave] or campos
+                    conn.execute(
+                        f"insert into {self.tabela} ({', '.join(campos)}) values ({', '.join('?' for _ in campos)}) "
+                        f"on conflict({chave}) do update set {', '.join(f'{c} = excluded.{c}' for c in atualizar)}",
+                        [linha[c] for c in campos],
+                    )
+                    if linha.get(chave) is not None:
+                        gravadas += self._linhas(conn.execute(f'select * from {self.tabela} where {chave} = ?', (linha[chave],)))
+        return gravadas
+
+
+class _ConexaoTravada:
+    """`with backend.conexao() as conn`: a conexão única do processo, sob o lock do backend."""
+
+    def __init__(self, backend: 'BackendSQLite'):
+        self._backend = backend
+
+    def __enter__(self):
+        self._backend._lock.acquire()
+        return self._backend._conexao()
+
+    def __exit__(self, *exc):
+        self._backend._lock.release()
+        return False
+
+
+class BackendSQLite(Backend):
+    nome = 'sqlite'
+
+    def __init__(self, caminho: Optional[str] = None):
+        self.caminho = caminho or caminho_banco()
+        self._lock = threading.RLock()
+        self._conn = None
+        self._colunas: Dict[str, List[str]] = {}
+
+    def _conexao(self):
+        if self._conn is None:
+            self._conn = conectar_sqlite(self.caminho)
+        return self._conn
+
+    def conexao(self) -> _ConexaoTravada:
+        return _ConexaoTravada(self)
+
+    def colunas(self, conn, tabela: str) -> List[str]:
+        if tabela not in self._colunas:
+            nomes = [r[1] for r in conn.execute(f'pragma table_info({tabela})')]
+            if not nomes:
+                raise ValueError(f'Tabela desconhecida no SQLite: {tabela}')
+            self._colunas[tabela] = nomes
+        return self._colunas[tabela]
+
+    def repositorio(self, tabela: str) -> Repositorio:
+        return RepositorioSQLite(tabela, self)
+
+    def pricing_context(self) -> Dict[str, Any]:
+        with self.conexao() as conn:
+            return pricing_context(conn)
+
+    def reiniciar_apos_fork(self) -> None:
+        self._lock = threading.RLock()
+        self._conn = None
@@ -0,0 +1,71 @@
+"""Backend Supabase (PostgREST): cada operação é uma chamada HTTP pelo cliente compartilhado."""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from app.repositories.base import Backend, Linha, Linhas, Repositorio
+from app import supabase_client
+
+
+class RepositorioSupabase(Repositorio):
+    def __init__(self, tabela: str, cliente: Callable[[], Any]):
+        super().__init__(tabela)
+        # Resolvido a cada chamada: o cliente é criado sob demanda (e recriado após fork)
+        self._cliente = cliente
+
+    def _tabela(self):
+        return self._cliente().table(self.tabela)
+
+    def listar(self, colunas='*', ordem=None, limite=None, desde=None) -> List[Linha]:
+        consulta = self._tabela().select(colunas)
+        if desde is not None:
+            consulta = consulta.gte(*desde)
+        if ordem:
+            consulta = consulta.order(ordem)
+        if limite is not None:
+            consulta = consulta.limit(limite)
+        return consulta.execute().data or []
+
+    def buscar(self, id, colunas='*') -> Optional[Linha]:
+        rows = self._tabela().select(colunas).eq('id', id).limit(1).execute().data or []
+        return rows[0] if rows else None
+
+    def listar_por_ids(self, ids: Iterable[Any], colunas='*') -> List[Linha]:
+        ids = list(ids)
+        if not ids:
+            return []
+        return self._tabela().select(colunas).in_('id', ids).execute().data or []
+
+    def inserir(self, linhas: Linhas) -> List[Linha]:
+        return self._tabela().insert(linhas).execute().data or []
+
+    def atualizar(self, id, campos: Linha) -> List[Linha]:
+        return self._tabela().update(campos).eq('id', id).execute().data or []
+
+    def excluir(self, id) -> None:
+        self._tabela().delete().eq('id', id).execute()
+
+    def excluir_por_ids(self, ids: Iterable[Any]) -> None:
+        ids = list(ids)
+        if ids:
+            self._tabela().delete().in_('id', ids).execute()
+
+    def upsert(self, linhas: Linhas, chave='id') -> List[Linha]:
+        return self._tabela().upsert(linhas, on_conflict=chave).execute().data or []
+
+
+class BackendSupabase(Backend):
+    nome = 'supabase'
+
+    def __init__(self, cliente: Optional[Callable[[], Any]] = None):
+        # Padrão: app.supabase_client.get_client resolvido na hora (permite trocar o cliente em scripts)
+        self._cliente = cliente or (lambda: supabase_client.get_client())
+
+    def repositorio(self, tabela: str) -> Repositorio:
+        return RepositorioSupabase(tabela, self._cliente)
+
+    def pricing_context(self) -> Dict[str, Any]:
+        """RPC `public.pricing_context` (sql/pricing_context.sql); erro se a função não existir."""
+        contexto = self._cliente().rpc('pricing_context', {}).execute().data
+        if not isinstance(contexto, dict):
+            raise ValueError('pricing_context não retornou um objeto JSON.')
+        return contexto
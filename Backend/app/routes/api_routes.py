@@ -1,9 +1,66 @@
-from flask import Blueprint, request, jsonify, send_file, current_app
-from app.supabase_client import get_client, SupabaseConfigError
+from flask import Blueprint, Response, g, request, jsonify, send_file, stream_with_context
+from app.supabase_client import get_client, pool_stats, SupabaseConfigError
 from app.models.gramatura import Gramatura
-from app.models.imposto_fixo import init_imposto_fixo, ensure_impostos_fixos_defaults, IMPOSTOS_ORDEM
+from app.models.imposto_fixo import init_imposto_fixo
 from app.models.configuracoes import get_configuracoes, update_configuracoes
-from app.utils.price_calculator import determinar_icms, calcular_preco_final
+from app.models.escrita_lote import LoteInvalido, aplicar_lote
+from app.models.cadastros import (
+    bootstrap_cache_stats,
+    get_bootstrap,
+    listar_custos_adicionais,
+    listar_gramaturas,
+    listar_impostos_fixos,
+    listar_sacolas_lote,
+    listar_servicos,
+)
+from app.db import TABELAS_ESPELHO
+from app.repositories import get_repositorio, repositorio_stats
+from app.models.espelho_local import espelho_stats, marcar_desatualizada, sincronizar_agora
+from app.models.reference_data import get_dados_referencia, invalidar_dados_referencia, reference_cache_stats
+from app.utils.leituras_paralelas import PrazoLeituraExcedido
+from app.utils.etag import condicional, etag_stats, politica_cache
+from app.utils.pricing_engine import (
+    parse_quote_input,
+    calcular_orcamento,
+    calcular_lote,
+    calcular_orcamento_debug,
+    resolver_campos,
+    ARITMETICAS,
+    MODO_DEBUG,
+    MODOS_LOTE,
+    ARITMETICA_FLOAT,
+    QuoteInputError,
+    GramaturaNaoEncontrada,
+)
+from app.utils.price_matrix import (
+    MAX_CELULAS_MATRIZ,
+    expandir_eixo,
+    validar_dimensoes,
+    quantidades_inteiras,
+    calcular_matriz,
+    verificar_contra_escalar,
+    matriz_para_json,
+)
+from app.utils.price_curve import calcular_curva
+from app.utils.price_solver import QUANTIDADE_MAX_PADRAO, SolverError, resolver_alvo
+from app.utils.corte_bobinas import TEMPO_LIMITE_PADRAO_MS, CorteInputError, altura_unitaria_cm, otimizar_corte
+from app.utils.stream_precos import FORMATO_CSV, FORMATO_NDJSON, FORMATOS, ler_csv, ler_ndjson, precificar_stream
+from app.utils.geracoes import geracoes_stats
+from app.utils.faixas_bobina import MAX_FAIXAS_PADRAO, TOP_PADRAO, FaixasInputError, planejar_faixas
+from app.utils.pdf_cotacao import PedidoPdfInvalido, escrever_pdf_cotacao, nome_arquivo_cotacao, precificar_itens, validar_pedido
+from app.utils.pdf_cache import abrir_pdf_em_cache, chave_cotacao, guardar_pdf_em_cache, pdf_cache_stats, purgar_cache_pdf
+from app.utils.pdf_pacote import escrever_pacote, nome_arquivo_pacote, nomes_arquivos, pdf_pacote_stats, validar_pacote
+from app.utils.pdf_tabela import TabelaEmBlocos, arquivo_saida, ler_em_blocos
+from app.utils.pdf_jobs import (
+    STATUS_CONCLUIDO,
+    STATUS_ERRO,
+    FilaPdfCheia,
+    JobNaoEncontrado,
+    caminho_resultado,
+    consultar_job,
+    enviar_job,
+    pdf_jobs_stats,
+)
 import os
 from urllib import request as urlrequest
 from urllib import parse as urlparse
@@ -12,91 +69,18 @@ import json
 import ssl
 import html
 import math
-import io
 import time
 from datetime import datetime
-from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
-from reportlab.lib.enums import TA_LEFT, TA_RIGHT, TA_CENTER
-from reportlab.lib.units import mm
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, TableStyle
 try:
     import certifi
     _CAFILE = certifi.where()
 except Exception:
     _CAFILE = None
 
-# Alíquotas de ICMS interestadual (DIFAL) — para clientes COM IE em operações interestaduais
-# Regras de alíquota interestadual:
-# - 12%: Origem Sul/Sudeste (exceto ES) → Destino Sul/Sudeste (exceto ES)
-# - 7%: Origem Sul/Sudeste (exceto ES) → Destino Norte/Nordeste/Centro-Oeste/ES
-# - 12%: Origem Norte/Nordeste/Centro-Oeste/ES → Qualquer destino
-
-# Estados do Sul/Sudeste (exceto ES)
-ESTADOS_SUL_SUDESTE = {'SP', 'RJ', 'MG', 'PR', 'SC', 'RS'}
-
-# Estados do Norte/Nordeste/Centro-Oeste + ES
-ESTADOS_NORTE_NE_CO_ES = {
-    'AC', 'AL', 'AP', 'AM', 'BA', 'CE', 'DF', 'ES', 'GO', 'MA',
-    'MT', 'MS', 'PA', 'PB', 'PE', 'PI', 'RN', 'RO', 'RR', 'SE', 'TO'
-}
-
-def get_icms_interestadual(estado_origem: str, estado_destino: str) -> float:
-    """
-    Calcula a alíquota de ICMS interestadual correta baseada nas regras fiscais brasileiras.
-    
-    Regras:
-    - 12%: Sul/Sudeste (exceto ES) → Sul/Sudeste (exceto ES)
-    - 7%: Sul/Sudeste (exceto ES) → Norte/Nordeste/Centro-Oeste ou ES
-    - 12%: Norte/Nordeste/Centro-Oeste ou ES → Qualquer outro estado
-    
-    Args:
-        estado_origem: Sigla do estado de origem (ex: 'SP')
-        estado_destino: Sigla do estado de destino (ex: 'BA')
-    
-    Returns:
-        Alíquota de ICMS interestadual (7.0 ou 12.0)
-    """
-    origem = (estado_origem or '').upper().strip()
-    destino = (estado_destino or '').upper().strip()
-    
-    if not origem or not destino:
-        return 0.0
-    
-    # Se origem é Sul/Sudeste (exceto ES)
-    if origem in ESTADOS_SUL_SUDESTE:
-        # Destino também é Sul/Sudeste (exceto ES) → 12%
-        if destino in ESTADOS_SUL_SUDESTE:
-            return 12.0
-        # Destino é Norte/Nordeste/Centro-Oeste ou ES → 7%
-        else:
-            return 7.0
-    # Se origem é Norte/Nordeste/Centro-Oeste ou ES → sempre 12%
-    else:
-        return 12.0
-
-# Dicionário legado mantido para compatibilidade (usado como fallback)
-ICMS_ESTADO_PADRAO = {
-    "AC": 7.0, "AL": 7.0, "AM": 7.0, "AP": 7.0, "BA": 7.0,
-    "CE": 7.0, "DF": 7.0, "ES": 7.0, "GO": 7.0, "MA": 7.0,
-    "MT": 7.0, "MS": 7.0, "MG": 12.0, "PA": 7.0, "PB": 7.0,
-    "PR": 12.0, "PE": 7.0, "PI": 7.0, "RJ": 12.0, "RN": 7.0,
-    "RS": 12.0, "RO": 7.0, "RR": 7.0, "SC": 12.0, "SP": 12.0,
-    "SE": 7.0, "TO": 7.0,
-}
-
-# Alíquotas completas de ICMS interno por estado — para clientes SEM IE (consumidor final, pessoa física)
-ICMS_CONSUMIDOR_FINAL = {
-    "AC": 19.0, "AL": 19.0, "AM": 20.0, "AP": 18.0, "BA": 20.5,
-    "CE": 20.0, "DF": 20.0, "ES": 17.0, "GO": 19.0, "MA": 23.0,
-    "MT": 17.0, "MS": 17.0, "MG": 18.0, "PA": 19.0, "PB": 20.0,
-    "PR": 19.5, "PE": 20.5, "PI": 22.5, "RJ": 20.0, "RN": 20.0,
-    "RS": 17.0, "RO": 19.5, "RR": 20.0, "SC": 17.0, "SP": 18.0,
-    "SE": 19.0, "TO": 20.0,
-}
-ESTADOS_BR = sorted(ICMS_ESTADO_PADRAO.keys())
-
 def _tls_context():
     try:
         # Se TELEGRAM_SKIP_TLS_VERIFY=1, desativa verificação (uso emergencial)
@@ -110,6 +94,26 @@ def _tls_context():
 api_bp = Blueprint('api', __name__)
 
 
+@api_bp.errorhandler(PrazoLeituraExcedido)
+def prazo_leitura_excedido(e):
+    return jsonify({'error': str(e)}), 504
+
+
+@api_bp.after_request
+def server_timing_leitura_referencia(response):
+    """Se a requisição recarregou os dados de referência, expõe os tempos das leituras paralelas em Server-Timing."""
+    metricas = g.get('leitura_referencia')
+    if metricas:
+        partes = [
+            f"ref-load;dur={metricas['parede_ms']}",
+            f"ref-serial;dur={metricas['sequencial_ms']}",
+            f'ref-overlap;desc="{metricas["sobreposicao"]}x"',
+        ]
+        partes += [f'ref-{nome.replace("_", "-")};dur={ms}' for nome, ms in metricas['por_consulta_ms'].items()]
+        response.headers.add('Server-Timing', ', '.join(partes))
+    return response
+
+
 @api_bp.route('/status', methods=['GET'])
 def status():
     """Health-check da API e conexão com Supabase."""
@@ -120,31 +124,48 @@ def status():
         'timestamp': datetime.utcnow().isoformat() + 'Z',
     }
 
+    # Chave 'supabase' mantida por compatibilidade; com backend sqlite/memory o ping vai ao backend ativo
+    ping_started = time.perf_counter()
     try:
-        client = get_client()
-    except SupabaseConfigError as e:
-        payload['supabase'] = {'ok': False, 'error': str(e)}
+        rows = get_repositorio('gramaturas').listar('id', limite=1)
     except Exception as e:
-        payload['supabase'] = {'ok': False, 'error': f'Erro inesperado ao criar cliente: {e}'}
+        payload['supabase'] = {'ok': False, 'error': str(e)}
     else:
-        ping_started = time.perf_counter()
-        try:
-            resp = client.table('gramaturas').select('id').limit(1).execute()
-            rows = resp.data or []
-            payload['supabase'] = {
-                'ok': True,
-                'latency_ms': round((time.perf_counter() - ping_started) * 1000, 1),
-                'rows_sampled': len(rows),
-            }
-        except Exception as e:
-            payload['supabase'] = {'ok': False, 'error': str(e)}
+        payload['supabase'] = {
+            'ok': True,
+            'latency_ms': round((time.perf_counter() - ping_started) * 1000, 1),
+            'rows_sampled': len(rows),
+        }
 
+    payload['reference_cache'] = reference_cache_stats()
+    payload['supabase_pool'] = pool_stats()
+    payload['espelho_local'] = espelho_stats()
+    payload['geracoes'] = geracoes_stats()
+    payload['repositorios'] = repositorio_stats()
+    payload['etags'] = etag_stats()
+    payload['bootstrap_cache'] = bootstrap_cache_stats()
+    payload['pdf_jobs'] = pdf_jobs_stats()
+    payload['pdf_cache'] = pdf_cache_stats()
+    payload['pdf_pacote'] = pdf_pacote_stats()
     payload['latency_ms'] = round((time.perf_counter() - started) * 1000, 1)
     payload['status'] = 'ok' if payload.get('supabase', {}).get('ok') else 'degraded'
     status_code = 200 if payload['status'] == 'ok' else 503
     return jsonify(payload), status_code
 
 
+# Sincroniza o espelho SQLite local com o Supabase agora (?tabelas=gramaturas,impostos)
+@api_bp.route('/espelho/sincronizar', methods=['POST'])
+def sincronizar_espelho():
+    tabelas = [t.strip() for t in (request.args.get('tabelas') or '').split(',') if t.strip()] or None
+    desconhecidas = sorted(set(tabelas or []) - set(TABELAS_ESPELHO))
+    if desconhecidas:
+        return jsonify({'error': f"Tabelas desconhecidas: {', '.join(desconhecidas)}."}), 400
+    try:
+        resultado = sincronizar_agora(tabelas)
+    except SupabaseConfigError as e:
+        return jsonify({'error': str(e)}), 503
+    return jsonify({'tabelas': resultado, 'espelho': espelho_stats()})
+
 @api_bp.route('/canvas/pastas', methods=['GET'])
 @api_bp.route('/canvas/opinioes', methods=['GET'])
 def listar_pastas_canvas():
@@ -234,6 +255,18 @@ def listar_bases_canvas():
     return jsonify({'folder': folder, 'files': files})
 
 
+def _resposta_pdf(arquivo, nome: str, cache: str = None, mimetype: str = 'application/pdf') -> Response:
+    """Envia o PDF (ou ZIP) gravado em `arquivo` em blocos (sem copiá-lo inteiro para a memória)."""
+    tamanho = arquivo.seek(0, os.SEEK_END)
+    headers = {
+        'Content-Disposition': f'attachment; filename={nome}',
+        'Content-Length': str(tamanho),
+    }
+    if cache:
+        headers['X-PDF-Cache'] = cache
+    return Response(ler_em_blocos(arquivo), mimetype=mimetype, headers=headers)
+
+
 @api_bp.route('/batch/pdf', methods=['POST'])
 def gerar_pdf_batch():
     data = request.get_json() or {}
@@ -241,9 +274,9 @@ def gerar_pdf_batch():
     if not isinstance(itens, list) or len(itens) == 0:
         return jsonify({'error': 'Envie uma lista de itens para gerar o PDF.'}), 400
 
-    # Monta documento em memória
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=30)
+    # Monta documento em memória (acima de PDF_SPOOL_MAX_MB, em arquivo temporário)
+    arquivo = arquivo_saida()
+    doc = SimpleDocTemplate(arquivo, pagesize=A4, rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=30)
     styles = getSampleStyleSheet()
     story = []
 
@@ -254,21 +287,21 @@ def gerar_pdf_batch():
     story.append(Paragraph(f"Total de itens: {len(itens)}", styles['Normal']))
     story.append(Spacer(1, 12))
 
-    # Cabeçalho e linhas
+    # Cabeçalho e linhas (montadas página a página, então as larguras são fixas: 535pt = A4 - margens)
     header = ['Nome', 'Largura (cm)', 'Altura (cm)', 'Lateral (cm)', 'Fundo (cm)', 'Alça?']
-    rows = [header]
-    for it in itens:
-        rows.append([
+    rows = (
+        [
             it.get('nome') or '-',
             str(it.get('largura_cm') or '-'),
             str(it.get('altura_cm') or '-'),
             str(it.get('lateral_cm') or '-'),
             str(it.get('fundo_cm') or '-'),
             'Sim' if it.get('incluir_alca') else 'Não'
-        ])
+        ]
+        for it in itens
+    )
 
-    table = Table(rows, repeatRows=1)
-    table.setStyle(TableStyle([
+    story.append(TabelaEmBlocos(header, rows, [165, 74, 74, 74, 74, 74], TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#00bfff')),
         ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
         ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
@@ -276,14 +309,11 @@ def gerar_pdf_batch():
         ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f5f6fa')),
         ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#d0d7de')),
         ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f7fbff')])
-    ]))
-
-    story.append(table)
+    ])))
     doc.build(story)
-    buffer.seek(0)
 
     filename = f"calculo-lote-{agora.strftime('%Y-%m-%d')}.pdf"
-    return send_file(buffer, mimetype='application/pdf', as_attachment=True, download_name=filename)
+    return _resposta_pdf(arquivo, filename)
 
 
 @api_bp.route('/batch/pdf-precos', methods=['POST'])
@@ -291,379 +321,137 @@ def gerar_pdf_batch_precos():
     payload = request.get_json() or {}
     itens = payload.get('itens') or []
     contexto = payload.get('contexto') or {}
+    try:
+        validar_pedido(itens, contexto)
+    except PedidoPdfInvalido as e:
+        return jsonify({'error': str(e)}), 400
 
-    # Validações básicas para retornar erro claro ao front
-    if not isinstance(itens, list) or len(itens) == 0:
-        return jsonify({'error': 'Envie uma lista de itens para gerar o PDF.'}), 400
-    if not contexto.get('gramatura_id') and not contexto.get('gramatura_nome'):
-        return jsonify({'error': 'Informe gramatura_id ou gramatura_nome no contexto.'}), 400
-
-    resultados = []
     try:
-        with current_app.test_client() as client:
-            for it in itens:
-                base_payload = {**contexto}
-                base_payload['largura_cm'] = it.get('largura_cm')
-                base_payload['altura_cm'] = it.get('altura_cm')
-                base_payload['lateral_cm'] = it.get('lateral_cm')
-                base_payload['fundo_cm'] = it.get('fundo_cm')
-                base_payload['incluir_alca'] = bool(it.get('incluir_alca'))
-                # Respeita a configuração de IE do contexto (não força sempre True)
-                if 'cliente_tem_ie' not in base_payload:
-                    base_payload['cliente_tem_ie'] = False
-                base_payload['incluir_lateral'] = True
-                base_payload['incluir_fundo'] = bool(it.get('fundo_cm'))
-
-                try:
-                    res = client.post('/api/calcular_preco', json=base_payload)
-                    data = res.get_json() if res else None
-                except Exception:
-                    res = None
-                    data = None
-
-                if not res or res.status_code != 200 or not data:
-                    resultados.append({
-                        'nome': it.get('nome') or '-',
-                        'erro': res.status_code if res else 'erro',
-                        'dados': base_payload,
-                        **it,
-                    })
-                    continue
-
-                data['nome'] = it.get('nome') or '-'
-                data['largura_cm'] = it.get('largura_cm') if it.get('largura_cm') not in (None, '') else data.get('largura_cm')
-                data['altura_cm'] = it.get('altura_cm') if it.get('altura_cm') not in (None, '') else (data.get('altura_cm') or data.get('altura_produto_cm'))
-                data['lateral_cm'] = it.get('lateral_cm') if it.get('lateral_cm') not in (None, '') else data.get('lateral_cm')
-                data['fundo_cm'] = it.get('fundo_cm') if it.get('fundo_cm') not in (None, '') else data.get('fundo_cm')
-                data['incluir_alca'] = bool(it.get('incluir_alca'))
-                data['quantidade'] = base_payload.get('quantidade') or data.get('quantidade')
-                resultados.append(data)
+        ref = get_dados_referencia()
     except Exception as e:
         return jsonify({'error': f'Erro ao calcular itens: {str(e)}'}), 500
 
+    # Mesmo pedido, mesmos dados de referência e mesmo dia: o PDF já gerado é servido direto
+    agora = datetime.now()
+    chave = chave_cotacao(itens, contexto, ref, agora)
+    em_cache = abrir_pdf_em_cache(chave)
+    if em_cache is not None:
+        return _resposta_pdf(em_cache, nome_arquivo_cotacao(agora), cache='hit')
+
+    arquivo = arquivo_saida()
     try:
-        # Monta PDF inspirado no layout comercial fornecido
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=landscape(A4), rightMargin=25, leftMargin=25, topMargin=25, bottomMargin=50)
-        styles = getSampleStyleSheet()
-
-        azul = colors.HexColor('#2F80ED')
-        cinza_claro = colors.HexColor('#F2F4F7')
-        cinza_grid = colors.HexColor('#E0E0E0')
-        cinza_texto = colors.HexColor('#111827')
-
-        styles.add(ParagraphStyle(name='Titulo', parent=styles['Heading1'], fontSize=16, textColor=cinza_texto, alignment=TA_RIGHT, leading=18))
-        styles.add(ParagraphStyle(name='Logo', parent=styles['Normal'], fontSize=22, textColor=cinza_texto, leading=24))
-        styles.add(ParagraphStyle(name='SectionTitle', parent=styles['Normal'], fontSize=11.5, textColor=cinza_texto, spaceAfter=6, spaceBefore=4, leading=14))
-        styles.add(ParagraphStyle(name='SectionTitleCenter', parent=styles['SectionTitle'], alignment=TA_CENTER))
-        styles.add(ParagraphStyle(name='Muted', parent=styles['Normal'], textColor=colors.HexColor('#6b7280'), fontSize=9.5, leading=12))
-        styles.add(ParagraphStyle(name='Cell', parent=styles['Normal'], textColor=cinza_texto, fontSize=10, leading=12))
-        styles.add(ParagraphStyle(name='CellBold', parent=styles['Normal'], textColor=cinza_texto, fontSize=10, leading=12, fontName='Helvetica-Bold'))
-        styles.add(ParagraphStyle(name='Footer', parent=styles['Normal'], fontSize=10, textColor=cinza_texto, alignment=TA_CENTER, leading=14))
-
-        # Função para desenhar rodapé fixo no fundo de cada página
-        def add_footer(canvas, doc):
-            canvas.saveState()
-            width, height = landscape(A4)
-            canvas.setFont('Helvetica-Bold', 10)
-            canvas.drawCentredString(width / 2, 25, 'FIBERTNT BRASIL')
-            canvas.setFont('Helvetica', 9)
-            canvas.drawCentredString(width / 2, 13, 'https://fibertnt.com/')
-            canvas.restoreState()
-
-        story = []
-        agora = datetime.now()
-
-        def fmt_money(val):
-            try:
-                num = float(val)
-                return f"R$ {num:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-            except Exception:
-                return '-'
+        # Precificação e diagramação juntas, página a página (memória não cresce com o lote)
+        escrever_pdf_cotacao(arquivo, precificar_itens(itens, contexto, ref), contexto, len(itens), agora=agora)
+        guardar_pdf_em_cache(chave, arquivo)
+    except Exception as e:
+        arquivo.close()
+        return jsonify({'error': f'Erro ao gerar PDF: {str(e)}'}), 500
+    return _resposta_pdf(arquivo, nome_arquivo_cotacao(agora), cache='miss')
 
-        def fmt_money_4(val):
-            try:
-                num = float(val)
-                return f"R$ {num:,.4f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-            except Exception:
-                return '-'
 
-        def fmt_num(val):
-            try:
-                num = float(val)
-                return f"{num:,.0f}".replace(',', '.')
-            except Exception:
-                return '-' if val in (None, '', '-') else str(val)
-
-        # ===== Cabeçalho =====
-        header = Table(
-            [[
-                Paragraph("<b>Eco<span color='#2F80ED'>Fiber</span></b>", styles['Logo']),
-                Paragraph("<b>TABELA DE PREÇOS</b>", styles['Titulo'])
-            ]],
-            colWidths=[95*mm, 75*mm]
-        )
-        header.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-            ('ALIGN', (0, 0), (0, 0), 'LEFT'),
-            ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
-        ]))
-        story.append(header)
-        story.append(Spacer(1, 4))
-        story.append(Table([[""],[" "]], colWidths=[doc.width], style=[('LINEABOVE',(0,0),(-1,0),0.8,cinza_grid)]))
-        story.append(Spacer(1, 10))
-
-        # ===== Dados gerais =====
-        empresa_nome = 'FiberTNT'
-        estado_val = contexto.get('estado') or '—'
-        qtd_val = contexto.get('quantidade') or (resultados[0].get('quantidade') if resultados else None)
-        qtd_txt = (f"{int(qtd_val):,}".replace(',', '.') + ' unidades') if qtd_val else '—'
-        data_txt = agora.strftime('%d/%m/%Y')
-        hora_txt = agora.strftime('%H:%M')
-        validade_txt = '7 dias'
-        cliente_tem_ie_ctx = bool(contexto.get('cliente_tem_ie'))
-        ie_txt = 'Sim' if cliente_tem_ie_ctx else 'Não'
-        
-        # ICMS e IPI: só porcentagem
-        try:
-            raw_icms_pct = resultados[0].get('icms_percentual') if resultados else None
-            icms_pct = float(raw_icms_pct) if raw_icms_pct is not None else None
-        except Exception:
-            icms_pct = None
-        icms_header_txt = f"{icms_pct:.2f}%" if icms_pct is not None else '—'
-        
-        try:
-            raw_ipi_pct = resultados[0].get('ipi_percentual') if resultados else None
-            ipi_pct = float(raw_ipi_pct) if raw_ipi_pct is not None else None
-        except Exception:
-            ipi_pct = None
-        ipi_header_txt = f"{ipi_pct:.2f}%" if ipi_pct is not None else '—'
-
-        # Tabela com 3 colunas iguais
-        col_w = doc.width / 3
-        dados = Table(
-            [
-                ['Empresa:', empresa_nome, 'Data:', data_txt, 'Hora:', hora_txt],
-                ['Estado:', estado_val, 'Quantidade:', qtd_txt, 'Validade:', validade_txt],
-                ['Possui IE?', ie_txt, 'ICMS:', icms_header_txt, 'IPI:', ipi_header_txt],
-            ],
-            colWidths=[22*mm, col_w - 22*mm, 22*mm, col_w - 22*mm, 22*mm, col_w - 22*mm]
-        )
-        dados.setStyle(TableStyle([
-            ('GRID', (0, 0), (-1, -1), 0.5, cinza_grid),
-            ('BACKGROUND', (0, 0), (-1, -1), colors.white),
-            ('FONT', (0, 0), (-1, -1), 'Helvetica', 10),
-            ('FONT', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONT', (2, 0), (2, -1), 'Helvetica-Bold'),
-            ('FONT', (4, 0), (4, -1), 'Helvetica-Bold'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 6),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-            ('TOPPADDING', (0, 0), (-1, -1), 5),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ]))
-        story.append(dados)
-        story.append(Spacer(1, 12))
-
-        # ===== Título da tabela de produto =====
-        story.append(Table(
-            [[Paragraph('<b>DADOS DOS PRODUTOS</b>', styles['SectionTitleCenter'])]],
-            colWidths=[doc.width],
-            style=[
-                ('BACKGROUND', (0, 0), (-1, -1), cinza_claro),
-                ('PADDING', (0, 0), (-1, -1), 7),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ]
-        ))
-
-        # ===== Tabela principal =====
-        header_cols = ['Nº', 'Descrição', 'Largura', 'Altura', 'Lateral', 'Fundo', 'NF Produto', 'NF Serviço', 'Preço Unit.', 'Preço Final']
-        rows = [header_cols]
-
-        for idx, r in enumerate(resultados, start=1):
-            preco_final_val = float(r.get('preco_final') or 0)
-            preco_produto_val = float(r.get('preco_final_produto') or 0)
-            preco_servicos_val = float(r.get('preco_final_servicos') or 0)
-            qtd_item = int(r.get('quantidade') or 1) or 1
-            preco_unitario_val = preco_final_val / qtd_item
-
-            rows.append([
-                str(idx),
-                r.get('nome') or '-',
-                fmt_num(r.get('largura_cm')),
-                fmt_num(r.get('altura_cm')),
-                'Não' if not r.get('lateral_cm') else fmt_num(r.get('lateral_cm')),
-                'Não' if not r.get('fundo_cm') else fmt_num(r.get('fundo_cm')),
-                fmt_money(preco_produto_val),
-                fmt_money(preco_servicos_val) if preco_servicos_val > 0 else '-',
-                fmt_money_4(preco_unitario_val),
-                fmt_money(preco_final_val),
-            ])
-
-        tabela_styles = [
-            ('BACKGROUND', (0, 0), (-1, 0), azul),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('GRID', (0, 0), (-1, -1), 0.5, cinza_grid),
-            ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONT', (0, 1), (-1, -1), 'Helvetica'),
-            ('PADDING', (0, 0), (-1, -1), 6),
-            ('ALIGN', (1, 1), (-1, -1), 'CENTER'),
-            ('ALIGN', (-4, 1), (-1, -1), 'RIGHT'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ]
-        # Largura total landscape A4 ~ 247mm (297 - 50 margens)
-        tabela = Table(rows, repeatRows=1, colWidths=[10*mm, 70*mm, 16*mm, 16*mm, 16*mm, 16*mm, 26*mm, 26*mm, 26*mm, 26*mm])
-        tabela.setStyle(TableStyle(tabela_styles))
-        story.append(tabela)
-        story.append(Spacer(1, 26))
-
-        # ===== Serviços (NF serviço) — opcional =====
-        servicos_ctx = contexto.get('servicos') or []
-        if servicos_ctx:
-            story.append(Table(
-                [[Paragraph('<b>SERVIÇOS</b>', styles['SectionTitleCenter'])]],
-                colWidths=[doc.width],
-                style=[
-                    ('BACKGROUND', (0, 0), (-1, -1), cinza_claro),
-                    ('PADDING', (0, 0), (-1, -1), 7),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ]
-            ))
-
-            qtd_val = contexto.get('quantidade') or (resultados[0].get('quantidade') if resultados else 0) or 0
-            srv_rows = [['Serviço', 'Preço unit.', 'Valor total']]
-            for svc in servicos_ctx:
-                try:
-                    val = float(svc.get('valor') or 0)
-                except Exception:
-                    val = 0.0
-                try:
-                    imp_pct = float(svc.get('imposto_percentual') if 'imposto_percentual' in svc else svc.get('impostos') or 0)
-                except Exception:
-                    imp_pct = 0.0
-                unit_with_tax = val + (val * imp_pct / 100.0)
-                total_val = unit_with_tax * float(qtd_val or 0)
-                srv_rows.append([
-                    svc.get('nome') or 'Serviço',
-                    fmt_money(unit_with_tax),
-                    fmt_money(total_val),
-                ])
-
-            # Usa a mesma largura total da tabela de produtos: 188 mm (64 + 44 + 80)
-            srv_table = Table(srv_rows, repeatRows=1, colWidths=[64*mm, 44*mm, 80*mm])
-            srv_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), azul),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('GRID', (0, 0), (-1, -1), 0.5, cinza_grid),
-                ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONT', (0, 1), (-1, -1), 'Helvetica'),
-                ('ALIGN', (1, 1), (-1, -1), 'RIGHT'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('PADDING', (0, 0), (-1, -1), 6),
-            ]))
-            story.append(srv_table)
-            story.append(Spacer(1, 22))
-
-        # ===== Condições comerciais =====
-        story.append(Paragraph('<b>CONDIÇÕES COMERCIAIS</b>', styles['SectionTitle']))
-        story.append(Spacer(1, 4))
-        condicoes = [
-            '• Valores expressos em reais (R$)',
-            '• Quanto maior a quantidade, melhores as condições de negociação',
-            '• Frete não incluso (a calcular conforme CEP)',
-            '• Produção mediante aprovação da cotação',
-        ]
-        for c in condicoes:
-            story.append(Paragraph(c, styles['Cell']))
-        story.append(Spacer(1, 14))
-
-        # ===== PÁGINA 2: TERMOS E CONDIÇÕES =====
-        story.append(PageBreak())
-
-        # Cabeçalho página 2
-        header2 = Table(
-            [[
-                Paragraph("<b>Eco<span color='#2F80ED'>Fiber</span></b>", styles['Logo']),
-                Paragraph("<b>TERMOS E CONDIÇÕES</b>", styles['Titulo'])
-            ]],
-            colWidths=[120*mm, 120*mm]
-        )
-        header2.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('ALIGN', (0, 0), (0, 0), 'LEFT'),
-            ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
-        ]))
-        story.append(header2)
-        story.append(Spacer(1, 2))
-        story.append(Table([[""],[" "]], colWidths=[doc.width], style=[('LINEABOVE',(0,0),(-1,0),0.8,cinza_grid)]))
-        story.append(Spacer(1, 6))
-
-        # Estilo para os termos - fonte menor para caber em uma página
-        styles.add(ParagraphStyle(name='TermoTitulo', parent=styles['Normal'], fontSize=8, textColor=cinza_texto, fontName='Helvetica-Bold', spaceBefore=3, spaceAfter=1, leading=9))
-        styles.add(ParagraphStyle(name='TermoTexto', parent=styles['Normal'], fontSize=7.5, textColor=cinza_texto, leading=9, spaceAfter=1))
-
-        # Fabricante info
-        story.append(Paragraph('<b>Fabricante:</b> FIBER TNT | ECOFIBER &nbsp;&nbsp;&nbsp; <b>Razão Social:</b> MAT DISTRIBUIDORA LTDA | CNPJ: 29.956.187/0001-83 &nbsp;&nbsp;&nbsp; <b>Endereço:</b> Rua Itaúna, nº 73 – Vila Maria – São Paulo/SP', styles['TermoTexto']))
-        story.append(Spacer(1, 6))
-
-        # Termos em duas colunas para aproveitar melhor o espaço landscape
-        termos = [
-            ('1. ESPECIFICAÇÕES DO PEDIDO', 'O cliente confirma estar ciente das medidas, modelos, gramaturas, cores, quantidades e acabamentos conforme tabela padrão enviada.'),
-            ('2. MATERIAL – INFO. TÉCNICAS', 'TNT produzido com material virgem, 100% reciclável, polipropileno (PP). Podem ocorrer variações naturais de textura, tonalidade e densidade entre lotes.'),
-            ('3. VARIAÇÃO DE TONALIDADE', 'Pode haver variação de até 10%, considerada normal, não caracterizando defeito. Cor validada por imagem ou amostra enviada.'),
-            ('4. APROVAÇÃO DE ARTE', 'Produção inicia somente após aprovação formal da arte. Alterações pós-aprovação podem gerar custos adicionais e novo prazo.'),
-            ('5. PAGAMENTO', 'Pedido confirmado mediante 50% de sinal, não reembolsável. Saldo pago após produção, incluindo variações. Liberação da mercadoria somente após quitação total.'),
-            ('6. VARIAÇÃO DE QUANTIDADE', 'Variação de até 10% para mais ou menos em medidas especiais ou fora do padrão. Pedido mínimo para medidas especiais: 1.000 un. Valor final calculado conforme quantidade produzida.'),
-            ('7. PRAZOS DE PRODUÇÃO', 'Contados após aprovação da arte e pagamento do sinal. Atrasos podem ocorrer por força maior: clima, insumos, greve, logística, pandemias, energia, etc.'),
-            ('8. GARANTIA – DEFEITOS', 'Defeitos devem ser comunicados em até 7 dias após recebimento. Direito a reembolso proporcional ou crédito equivalente. Devolução obrigatória com NF. Garantia não cobre mau uso, excesso de peso, armazenamento incorreto, exposição a sol/umidade ou transporte de terceiros.'),
-            ('9. DESISTÊNCIA', 'Após início de produção, insumos ou impressão, o sinal é perdido e pagamento proporcional ao produzido é devido.'),
-            ('10. USO DE MARCA', 'Cliente autoriza uso de imagens/vídeos para divulgação, portfólio e demonstrações comerciais. Responsabilidade sobre marcas de terceiros é exclusiva do cliente.'),
-            ('11. DECLARAÇÃO FINAL', 'Ao confirmar o pedido, o cliente declara ter lido, entendido e concordado com todas as cláusulas, autorizando a produção.'),
-            ('12. COND. COMERCIAIS E PGTO', 'Orçamento válido apenas na data da emissão. Pagamento antecipado via PIX ou depósito bancário conforme dados fornecidos. Depósitos devem ser do mesmo titular, identificados, não aceitamos cheques ou depósitos de terceiros. Estornos realizados em até 72h úteis.'),
-        ]
+# Mesmo lote para vários clientes (UF/IE próprios): um PDF por cliente, gerados em paralelo, num ZIP
+@api_bp.route('/batch/pdf-precos/pacote', methods=['POST'])
+def gerar_pacote_pdf_precos():
+    payload = request.get_json() or {}
+    itens = payload.get('itens') or []
+    contexto = payload.get('contexto') or {}
+    clientes = payload.get('clientes') or []
+    try:
+        contextos = validar_pacote(itens, contexto, clientes)
+    except PedidoPdfInvalido as e:
+        return jsonify({'error': str(e)}), 400
 
-        # Montar termos em duas colunas
-        col_esq = []
-        col_dir = []
-        for i, (titulo, texto) in enumerate(termos):
-            bloco = f'<b>{titulo}</b><br/>{texto}'
-            if i < 6:
-                col_esq.append(Paragraph(bloco, styles['TermoTexto']))
-            else:
-                col_dir.append(Paragraph(bloco, styles['TermoTexto']))
-        
-        # Equalizar número de elementos
-        while len(col_dir) < len(col_esq):
-            col_dir.append(Paragraph('', styles['TermoTexto']))
-        while len(col_esq) < len(col_dir):
-            col_esq.append(Paragraph('', styles['TermoTexto']))
-        
-        # Criar tabela de duas colunas
-        termos_rows = [[col_esq[i], col_dir[i]] for i in range(len(col_esq))]
-        termos_table = Table(termos_rows, colWidths=[doc.width/2 - 5*mm, doc.width/2 - 5*mm])
-        termos_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 4),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-            ('TOPPADDING', (0, 0), (-1, -1), 2),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-        ]))
-        story.append(termos_table)
-
-        doc.build(story, onFirstPage=add_footer, onLaterPages=add_footer)
-        buffer.seek(0)
-
-        filename = f"FiberTNT-Cotacao-Comercial-{agora.strftime('%d-%m-%Y')}.pdf"
-        return send_file(buffer, mimetype='application/pdf', as_attachment=True, download_name=filename)
+    try:
+        ref = get_dados_referencia()
+    except Exception as e:
+        return jsonify({'error': f'Erro ao calcular itens: {str(e)}'}), 500
+
+    agora = datetime.now()
+    arquivo = arquivo_saida()
+    try:
+        escrever_pacote(arquivo, itens, contextos, nomes_arquivos(clientes, agora), ref, agora)
     except Exception as e:
+        arquivo.close()
         return jsonify({'error': f'Erro ao gerar PDF: {str(e)}'}), 500
+    return _resposta_pdf(arquivo, nome_arquivo_pacote(agora), mimetype='application/zip')
+
+
+# Esvazia o cache de PDFs de cotação (todos os workers compartilham o diretório)
+@api_bp.route('/batch/pdf-precos/cache', methods=['DELETE'])
+def purgar_cache_pdf_precos():
+    removidos = purgar_cache_pdf()
+    return jsonify({'removidos': removidos, 'pdf_cache': pdf_cache_stats()})
+
+
+def _links_job(job_id: str) -> dict:
+    return {
+        'status': f'/api/batch/pdf-precos/jobs/{job_id}',
+        'download': f'/api/batch/pdf-precos/jobs/{job_id}/download',
+    }
+
+
+# Mesma cotação de /batch/pdf-precos, gerada em segundo plano: 202 + id para polling
+@api_bp.route('/batch/pdf-precos/jobs', methods=['POST'])
+def enviar_job_pdf_precos():
+    payload = request.get_json() or {}
+    itens = payload.get('itens') or []
+    contexto = payload.get('contexto') or {}
+    try:
+        validar_pedido(itens, contexto)
+    except PedidoPdfInvalido as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        job = enviar_job(itens, contexto, get_dados_referencia())
+    except FilaPdfCheia as e:
+        resp = jsonify({'error': str(e)})
+        resp.headers['Retry-After'] = '5'
+        return resp, 503
+    links = _links_job(job['id'])
+    resp = jsonify({**job, 'links': links})
+    resp.headers['Location'] = links['status']
+    return resp, 202
+
+
+@api_bp.route('/batch/pdf-precos/jobs/<job_id>', methods=['GET'])
+def consultar_job_pdf_precos(job_id: str):
+    try:
+        job = consultar_job(job_id)
+    except JobNaoEncontrado as e:
+        return jsonify({'error': str(e)}), 404
+    resp = jsonify({**job, 'links': _links_job(job_id)})
+    resp.headers['Cache-Control'] = 'no-store'
+    return resp
+
+
+@api_bp.route('/batch/pdf-precos/jobs/<job_id>/download', methods=['GET'])
+def baixar_job_pdf_precos(job_id: str):
+    try:
+        job = consultar_job(job_id)
+    except JobNaoEncontrado as e:
+        return jsonify({'error': str(e)}), 404
+    if job['status'] == STATUS_ERRO:
+        return jsonify({'error': job.get('erro') or 'Erro ao gerar PDF.'}), 500
+    if job['status'] != STATUS_CONCLUIDO:
+        return jsonify({'error': 'PDF ainda não está pronto.', 'status': job['status'], 'progresso': job['progresso']}), 409
+    return send_file(caminho_resultado(job_id), mimetype='application/pdf', as_attachment=True, download_name=job['arquivo'])
+
+
+# Carga inicial do frontend: todos os cadastros em um payload versionado (ETag = versao)
+@api_bp.route('/bootstrap', methods=['GET'])
+def bootstrap():
+    payload = get_bootstrap()
+    resp = jsonify(payload)
+    resp.set_etag(payload['versao'])
+    resp.headers['Cache-Control'] = politica_cache('bootstrap')
+    return resp.make_conditional(request)
+
 # Configurações (margem/outros/tema/notificações)
 @api_bp.route('/configuracoes', methods=['GET'])
+@condicional('configuracoes', 'configuracoes')
 def get_configs():
     try:
-        return jsonify(get_configuracoes(require_existing=True))
+        return jsonify(get_configuracoes(require_existing=True, usar_espelho=True))
     except LookupError as e:
         return jsonify({'error': str(e)}), 404
 
@@ -682,6 +470,7 @@ def put_configs():
     )
     if not ok:
         return jsonify({'error': 'Nada para atualizar'}), 400
+    invalidar_dados_referencia()
     try:
         return jsonify(get_configuracoes(require_existing=True))
     except LookupError as e:
@@ -690,33 +479,15 @@ def put_configs():
 
 # Consultar todas gramaturas
 @api_bp.route('/gramaturas', methods=['GET'])
+@condicional('gramaturas', 'gramaturas')
 def get_gramaturas():
-    gramaturas = Gramatura.get_all()
-    return jsonify([
-        {
-            'id': g.id,
-            'gramatura': g.gramatura,
-            'preco': g.preco,
-            'altura_cm': g.altura_cm,
-        }
-        for g in gramaturas
-    ])
+    return jsonify(listar_gramaturas())
 
 # Consultar todos impostos fixos
 @api_bp.route('/impostos_fixos', methods=['GET'])
+@condicional('impostos', 'impostos_fixos')
 def get_impostos_fixos():
-    client = get_client()
-    ensure_impostos_fixos_defaults()
-    resp = client.table('impostos').select('id, nome, valor').execute()
-    rows = resp.data or []
-    # Ordena pelo IMPOSTOS_ORDEM; desconhecidos ficam ao final ordenados alfabeticamente
-    ordem_index = {nome: idx for idx, nome in enumerate(IMPOSTOS_ORDEM)}
-    rows.sort(key=lambda r: (ordem_index.get(r.get('nome'), len(IMPOSTOS_ORDEM) + 1), (r.get('nome') or '').lower()))
-    impostos = [
-        {'id': row.get('id'), 'nome': row.get('nome'), 'valor': float(row.get('valor') or 0.0)}
-        for row in rows
-    ]
-    return jsonify(impostos)
+    return jsonify(listar_impostos_fixos())
 
 # Criar imposto fixo
 @api_bp.route('/impostos_fixos', methods=['POST'])
@@ -731,10 +502,10 @@ def update_imposto_fixo(id: int):
     valor = data.get('valor')
     if valor is None:
         return jsonify({'error': 'Informe valor para atualizar'}), 400
-    client = get_client()
     updates = {}
     updates['valor'] = float(valor)
-    client.table('impostos').update(updates).eq('id', id).execute()
+    get_repositorio('impostos').atualizar(id, updates)
+    invalidar_dados_referencia()
     return jsonify({'message': 'Imposto fixo atualizado', 'id': id, 'valor': float(valor)})
 
 # Deletar imposto fixo
@@ -744,20 +515,9 @@ def delete_imposto_fixo(id: int):
 
 # CRUD Serviços (ex.: Silk)
 @api_bp.route('/servicos', methods=['GET'])
+@condicional('servicos', 'servicos')
 def get_servicos():
-    client = get_client()
-    # Tabela tem colunas: id, nome, valor, impostos (não há imposto_percentual)
-    resp = client.table('servicos').select('id, nome, valor, impostos').order('id').execute()
-    servicos = [
-        {
-            'id': row.get('id'),
-            'nome': row.get('nome'),
-            'valor': float(row.get('valor') or 0.0),
-            'imposto_percentual': float(row.get('impostos') or 0.0),
-        }
-        for row in (resp.data or [])
-    ]
-    return jsonify(servicos)
+    return jsonify(listar_servicos())
 
 
 @api_bp.route('/servicos', methods=['POST'])
@@ -773,13 +533,13 @@ def create_servico():
         imposto_f = float(imposto_percentual or 0.0)
     except Exception:
         return jsonify({'error': 'Valor ou imposto inválido'}), 400
-    client = get_client()
-    resp = client.table('servicos').insert({
+    rows = get_repositorio('servicos').inserir({
         'nome': nome,
         'valor': valor_f,
         'impostos': imposto_f,
-    }).execute()
-    new_id = resp.data[0].get('id') if resp.data else None
+    })
+    marcar_desatualizada('servicos')
+    new_id = rows[0].get('id') if rows else None
     return jsonify({'id': new_id, 'nome': nome, 'valor': valor_f, 'imposto_percentual': imposto_f}), 201
 
 
@@ -805,34 +565,24 @@ def update_servico(id: int):
         updates['impostos'] = imposto_f
     if not updates:
         return jsonify({'error': 'Informe nome, valor ou imposto_percentual para atualizar'}), 400
-    client = get_client()
-    client.table('servicos').update(updates).eq('id', id).execute()
+    get_repositorio('servicos').atualizar(id, updates)
+    marcar_desatualizada('servicos')
     return jsonify({'message': 'Serviço atualizado'})
 
 
 @api_bp.route('/servicos/<int:id>', methods=['DELETE'])
 def delete_servico(id: int):
-    client = get_client()
-    client.table('servicos').delete().eq('id', id).execute()
+    get_repositorio('servicos').excluir(id)
+    marcar_desatualizada('servicos')
     return jsonify({'message': 'Serviço removido'})
 
 
 # CRUD custos_adicionais (Supabase)
 @api_bp.route('/custos_adicionais', methods=['GET'])
+@condicional('custos_adicionais', 'custos_adicionais')
 def get_custos_adicionais():
     """Lista todos os custos adicionais cadastrados."""
-    client = get_client()
-    resp = client.table('custos_adicionais').select('id, nome, valor, a_cada').order('id').execute()
-    custos = [
-        {
-            'id': row.get('id'),
-            'nome': row.get('nome'),
-            'valor': float(row.get('valor') or 0.0),
-            'a_cada': int(row.get('a_cada') or 1),
-        }
-        for row in (resp.data or [])
-    ]
-    return jsonify(custos)
+    return jsonify(listar_custos_adicionais())
 
 
 @api_bp.route('/custos_adicionais', methods=['POST'])
@@ -852,14 +602,14 @@ def create_custo_adicional():
     except Exception:
         return jsonify({'error': 'Valor ou a_cada inválido'}), 400
 
-    client = get_client()
-    resp = client.table('custos_adicionais').insert({
+    rows = get_repositorio('custos_adicionais').inserir({
         'nome': nome,
         'valor': valor_f,
         'a_cada': a_cada_i,
-    }).execute()
-    
-    new_row = resp.data[0] if resp.data else {}
+    })
+    invalidar_dados_referencia()
+
+    new_row = rows[0] if rows else {}
     return jsonify({
         'id': new_row.get('id'),
         'nome': nome,
@@ -892,25 +642,24 @@ def update_custo_adicional(id: int):
     if not updates:
         return jsonify({'error': 'Informe ao menos um campo para atualizar'}), 400
 
-    client = get_client()
-    client.table('custos_adicionais').update(updates).eq('id', id).execute()
+    get_repositorio('custos_adicionais').atualizar(id, updates)
+    invalidar_dados_referencia()
     return jsonify({'message': 'Custo adicional atualizado', 'id': id, **updates})
 
 
 @api_bp.route('/custos_adicionais/<int:id>', methods=['DELETE'])
 def delete_custo_adicional(id: int):
     """Remove um custo adicional."""
-    client = get_client()
-    client.table('custos_adicionais').delete().eq('id', id).execute()
+    get_repositorio('custos_adicionais').excluir(id)
+    invalidar_dados_referencia()
     return jsonify({'message': 'Custo adicional removido'})
 
 
 # CRUD sacolas_lote (Supabase)
 @api_bp.route('/sacolas_lote', methods=['GET'])
-def listar_sacolas_lote():
-    client = get_client()
-    resp = client.table('sacolas_lote').select('*').order('id').execute()
-    return jsonify(resp.data or [])
+@condicional('sacolas_lote', 'sacolas_lote')
+def get_sacolas_lote():
+    return jsonify(listar_sacolas_lote())
 
 
 @api_bp.route('/sacolas_lote', methods=['POST'])
@@ -934,9 +683,9 @@ def criar_sacola_lote():
         'fundo_cm': float(fundo_cm) if fundo_cm not in (None, '') else None,
         'tem_alca': tem_alca,
     }
-    client = get_client()
-    resp = client.table('sacolas_lote').insert(payload).execute()
-    created = resp.data[0] if resp.data else payload
+    rows = get_repositorio('sacolas_lote').inserir(payload)
+    marcar_desatualizada('sacolas_lote')
+    created = rows[0] if rows else payload
     return jsonify(created), 201
 
 
@@ -967,15 +716,15 @@ def atualizar_sacola_lote(id: int):
     if not updates:
         return jsonify({'error': 'Nada para atualizar'}), 400
 
-    client = get_client()
-    resp = client.table('sacolas_lote').update(updates).eq('id', id).execute()
-    return jsonify(resp.data[0] if resp.data else {**updates, 'id': id})
+    rows = get_repositorio('sacolas_lote').atualizar(id, updates)
+    marcar_desatualizada('sacolas_lote')
+    return jsonify(rows[0] if rows else {**updates, 'id': id})
 
 
 @api_bp.route('/sacolas_lote/<int:id>', methods=['DELETE'])
 def remover_sacola_lote(id: int):
-    client = get_client()
-    client.table('sacolas_lote').delete().eq('id', id).execute()
+    get_repositorio('sacolas_lote').excluir(id)
+    marcar_desatualizada('sacolas_lote')
     return jsonify({'message': 'Removido'})
 
 # Adicionar gramatura
@@ -986,504 +735,350 @@ def add_gramatura():
     preco = data.get('preco')
     altura = data.get('altura_cm')
     Gramatura.add(gram, preco, altura)
+    invalidar_dados_referencia()
     return jsonify({'message': 'Gramatura adicionada!'}), 201
 
 # Editar gramatura
 @api_bp.route('/gramaturas/<int:id>', methods=['PUT'])
 def edit_gramatura(id):
     data = request.get_json()
-    client = get_client()
     updates = {
         'gramatura': data.get('gramatura'),
         'preco': data.get('preco'),
     }
     if 'altura_cm' in data:
         updates['altura_cm'] = data.get('altura_cm')
-    client.table('gramaturas').update(updates).eq('id', id).execute()
+    get_repositorio('gramaturas').atualizar(id, updates)
+    invalidar_dados_referencia()
     return jsonify({'message': 'Gramatura editada!'})
 
 # Deletar gramatura
 @api_bp.route('/gramaturas/<int:id>', methods=['DELETE'])
 def delete_gramatura(id):
-    client = get_client()
-    client.table('gramaturas').delete().eq('id', id).execute()
+    get_repositorio('gramaturas').excluir(id)
+    invalidar_dados_referencia()
     return jsonify({'message': 'Gramatura deletada!'})
 
-# Substitui calcular_preco_final por uma rota que busca a gramatura pelo id ou nome e retorna todas as etapas do cálculo
+# Escritas em lote: {"upsert": [linhas], "delete": [ids]}; validação por linha e uma chamada por tipo de operação
+@api_bp.route('/impostos_fixos/batch', methods=['POST'], defaults={'recurso': 'impostos_fixos'})
+@api_bp.route('/gramaturas/batch', methods=['POST'], defaults={'recurso': 'gramaturas'})
+@api_bp.route('/servicos/batch', methods=['POST'], defaults={'recurso': 'servicos'})
+@api_bp.route('/custos_adicionais/batch', methods=['POST'], defaults={'recurso': 'custos_adicionais'})
+@api_bp.route('/sacolas_lote/batch', methods=['POST'], defaults={'recurso': 'sacolas_lote'})
+def escrever_lote(recurso: str):
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Envie um objeto com upsert e/ou delete.'}), 400
+    try:
+        resultado = aplicar_lote(recurso, data)
+    except LoteInvalido as e:
+        return jsonify({'error': str(e), 'erros': e.erros}), 400
+    except Exception as e:
+        return jsonify({'error': f'Erro ao gravar lote: {e}'}), 500
+    return jsonify(resultado)
+
+# Calcula o preço buscando a gramatura pelo id ou nome e retorna todas as etapas do cálculo
 @api_bp.route('/calcular_preco', methods=['POST'])
 def calcular_preco():
-    data = request.get_json()
-    gramatura_id = data.get('gramatura_id')
-    gramatura_nome = data.get('gramatura_nome')
-    largura_cm = float(data.get('largura_cm', 0))
-    # Cortar tecido: flag para indicar que o tecido foi cortado ao meio (largura já vem dividida do front)
-    cortar_tecido = bool(data.get('cortar_tecido', False))
-    largura_original_cm = float(data.get('largura_original_cm', 0)) if cortar_tecido else None
-    cfg = get_configuracoes()
-    margem = float(data.get('margem', cfg.get('margem', 0)))
-    comissao = float(data.get('comissao', 0))
-    custo_cordao = float(cfg.get('custo_cordao', 0))
-    quantidade = int(data.get('quantidade', 1))
-    perdas_calibracao_un = int(data.get('perdas_calibracao_un', cfg.get('perdas_calibracao_un', 0) or 0))
-    # Silk legado (mantido para compatibilidade, mas padrão é não incluir)
-    valor_silk_cfg = float(cfg.get('valor_silk', 0) or 0)
-    incluir_valor_silk = bool(data.get('incluir_valor_silk', False))
-    incluir_lateral = bool(data.get('incluir_lateral', False))
-    incluir_alca = bool(data.get('incluir_alca', False))
-    incluir_fundo = bool(data.get('incluir_fundo', False))
-    incluir_cordao = bool(data.get('incluir_cordao', False))
-    # Tamanho da alça (cm) — preferência: payload override, senão configuração (campo salvo: tamanho_alca)
-    tamanho_alca_cfg = float(cfg.get('tamanho_alca', 0) or 0)
-    try:
-        tamanho_alca = float(data.get('tamanho_alca', tamanho_alca_cfg) or 0)
-    except Exception:
-        tamanho_alca = tamanho_alca_cfg
-    
-    # IPI - Imposto sobre Produtos Industrializados (da configuração)
-    ipi_percentual_cfg = float(cfg.get('ipi_percentual', 0) or 0)
+    data = request.get_json(silent=True) or {}
+    aritmetica = data.get('aritmetica') or ARITMETICA_FLOAT
+    if aritmetica not in ARITMETICAS:
+        return jsonify({'error': f"aritmetica inválida. Use uma de: {', '.join(ARITMETICAS)}."}), 400
+    # mode=summary|full|debug e fields=a,b,... (query string ou corpo); seções não pedidas não são calculadas
+    modo = request.args.get('mode') or data.get('mode')
     try:
-        ipi_value = data.get('ipi_percentual')
-        if ipi_value is not None and str(ipi_value).strip() != '' and str(ipi_value).strip() != '0':
-            ipi_percentual = float(ipi_value)
+        campos = resolver_campos(modo, request.args.get('fields') or data.get('fields'))
+        quote = parse_quote_input(data)
+        if modo == MODO_DEBUG and campos is None:
+            resultado = calcular_orcamento_debug(quote, get_dados_referencia(), aritmetica)
         else:
-            ipi_percentual = ipi_percentual_cfg
-    except Exception:
-        ipi_percentual = ipi_percentual_cfg
-    
-    lateral_cm = None
-    fundo_cm = None
+            resultado = calcular_orcamento(quote, get_dados_referencia(), aritmetica, campos)
+    except QuoteInputError as e:
+        return jsonify({'error': str(e)}), 400
+    except GramaturaNaoEncontrada as e:
+        return jsonify({'error': str(e)}), 404
+    return jsonify(resultado)
+
+
+# Precifica vários itens de uma vez com um único carregamento dos dados de referência
+@api_bp.route('/calcular_preco/batch', methods=['POST'])
+def calcular_preco_batch():
+    data = request.get_json(silent=True) or {}
+    itens = data.get('itens') or []
+    contexto = data.get('contexto') or {}
+    if not isinstance(itens, list) or len(itens) == 0:
+        return jsonify({'error': 'Envie uma lista de itens para calcular.'}), 400
+    if not isinstance(contexto, dict):
+        return jsonify({'error': 'contexto deve ser um objeto.'}), 400
+    aritmetica = data.get('aritmetica') or ARITMETICA_FLOAT
+    if aritmetica not in ARITMETICAS:
+        return jsonify({'error': f"aritmetica inválida. Use uma de: {', '.join(ARITMETICAS)}."}), 400
+
     try:
-        if data.get('lateral_cm') is not None and str(data.get('lateral_cm')) != '':
-            lateral_cm = float(data.get('lateral_cm'))
-    except Exception:
-        lateral_cm = None
+        campos = resolver_campos(
+            request.args.get('mode') or data.get('mode'),
+            request.args.get('fields') or data.get('fields'),
+            MODOS_LOTE,
+        )
+    except QuoteInputError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Cada item sobrescreve os campos comuns do contexto
+    payloads = [{**contexto, **it} if isinstance(it, dict) else None for it in itens]
+    calculados = calcular_lote([p for p in payloads if p is not None], get_dados_referencia(), aritmetica, campos)
+
+    resultados = []
+    calc_iter = iter(calculados)
+    for indice, payload in enumerate(payloads):
+        calc = next(calc_iter) if payload is not None else {'ok': False, 'status': 400, 'error': 'Item deve ser um objeto.'}
+        resultados.append({'indice': indice, **calc})
+
+    erros = sum(1 for r in resultados if not r['ok'])
+    return jsonify({'total': len(resultados), 'sucesso': len(resultados) - erros, 'erros': erros, 'resultados': resultados})
+
+
+# Precificação em streaming: corpo NDJSON ou CSV lido linha a linha, uma linha NDJSON por resultado
+@api_bp.route('/calcular_preco/stream', methods=['POST'])
+def calcular_preco_stream():
+    formato = (request.args.get('formato') or '').lower()
+    if not formato:
+        formato = FORMATO_CSV if 'csv' in (request.mimetype or '') else FORMATO_NDJSON
+    if formato not in FORMATOS:
+        return jsonify({'error': f"formato inválido. Use uma de: {', '.join(FORMATOS)}."}), 400
+    aritmetica = request.args.get('aritmetica') or ARITMETICA_FLOAT
+    if aritmetica not in ARITMETICAS:
+        return jsonify({'error': f"aritmetica inválida. Use uma de: {', '.join(ARITMETICAS)}."}), 400
+    # Campos comuns opcionais via query string (?contexto={"gramatura_id": 1, ...})
     try:
-        if data.get('fundo_cm') is not None and str(data.get('fundo_cm')) != '':
-            fundo_cm = float(data.get('fundo_cm'))
-    except Exception:
-        fundo_cm = None
-    # Valor unitário do silk (por unidade). Se não incluir, é 0.
-    valor_silk_unit = float(data.get('valor_silk', valor_silk_cfg)) if incluir_valor_silk else 0.0
-
-    # Serviços (lista) — cada item pode ter valor e imposto_percentual
-    servicos_payload = data.get('servicos') or []
-    servicos_detalhe = []
-    valor_servicos_unit = 0.0
+        contexto = json.loads(request.args.get('contexto') or '{}')
+    except ValueError:
+        return jsonify({'error': 'contexto deve ser um JSON válido.'}), 400
+    if not isinstance(contexto, dict):
+        return jsonify({'error': 'contexto deve ser um objeto.'}), 400
     try:
-        for svc in servicos_payload:
-            try:
-                val = float(svc.get('valor', 0) or 0)
-            except Exception:
-                val = 0.0
-            try:
-                imp_pct = float(svc.get('imposto_percentual', svc.get('impostos', 0)) or 0)
-            except Exception:
-                imp_pct = 0.0
-            val_com_imposto = val + (val * imp_pct / 100.0)
-            valor_servicos_unit += val_com_imposto
-            servicos_detalhe.append({
-                'id': svc.get('id'),
-                'nome': svc.get('nome'),
-                'valor_unitario': round(val, 4),
-                'imposto_percentual': round(imp_pct, 4),
-                'valor_unitario_com_imposto': round(val_com_imposto, 4),
-            })
-    except Exception:
-        servicos_detalhe = []
-        valor_servicos_unit = 0.0
-    estado = (data.get('estado') or '').strip().upper() or None
-    cliente_tem_ie = bool(data.get('cliente_tem_ie', False))
-
-    # Buscar gramatura
-    client = get_client()
-    if gramatura_id:
-        resp_gram = client.table('gramaturas').select('preco, gramatura, altura_cm').eq('id', gramatura_id).limit(1).execute()
-    elif gramatura_nome:
-        resp_gram = client.table('gramaturas').select('preco, gramatura, altura_cm').eq('gramatura', gramatura_nome).limit(1).execute()
+        campos = resolver_campos(request.args.get('mode'), request.args.get('fields'), MODOS_LOTE)
+    except QuoteInputError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Dados de referência carregados antes do primeiro byte: falha de banco ainda vira erro HTTP normal
+    ref = get_dados_referencia()
+    if formato == FORMATO_CSV:
+        registros = ler_csv(request.stream, request.args.get('delimitador') or ',')
     else:
-        return jsonify({'error': 'Informe gramatura_id ou gramatura_nome'}), 400
-    row = resp_gram.data[0] if resp_gram.data else None
-    if not row:
-        return jsonify({'error': 'Gramatura não encontrada'}), 404
-    custo_un = float(row.get('preco') or 0)
-    gramatura_nome = row.get('gramatura')
-    altura_cm_db = float(row.get('altura_cm')) if row.get('altura_cm') is not None else None
-
-    # Determinar ICMS:
-    # - MESMO estado (intraestadual): 18% ICMS COMPLETO, independente de ter IE ou não
-    # - OUTRO estado COM IE: alíquota INTERESTADUAL (7% ou 12% conforme regras)
-    # - OUTRO estado SEM IE: alíquota COMPLETA daquele estado conforme ICMS_CONSUMIDOR_FINAL
-    ESTADO_EMPRESA = 'SP'  # A empresa opera em SP
-    if estado and estado == ESTADO_EMPRESA:
-        # Operação INTRAESTADUAL (mesmo estado): SEMPRE 18% completo, com ou sem IE
-        icms = float(ICMS_CONSUMIDOR_FINAL.get(estado, 0.0)) if estado else 0.0
-        icms_origem = 'icms_completo_intraestadual'
-    elif cliente_tem_ie:
-        # Operação INTERESTADUAL com IE: usa alíquota interestadual (7% ou 12%)
-        icms = get_icms_interestadual(ESTADO_EMPRESA, estado) if estado else 0.0
-        icms_origem = 'icms_interestadual_ie' if estado else 'icms_zero_sem_estado'
-    else:
-        # Operação INTERESTADUAL sem IE (consumidor final): usa alíquota completa do estado destino
-        icms = float(ICMS_CONSUMIDOR_FINAL.get(estado, 0.0)) if estado else 0.0
-        icms_origem = 'icms_completo_consumidor_final' if estado else 'icms_zero_sem_estado'
-    # altura do produto solicitada (pode vir no payload) - em cm
-    # Validação: altura_cm é obrigatória e deve ser um número positivo
-    altura_produto = None
+        registros = ler_ndjson(request.stream)
+    linhas = precificar_stream(registros, ref, aritmetica, contexto, campos)
+    return Response(stream_with_context(linhas), mimetype='application/x-ndjson')
+
+# Tabela de preços vetorizada: todas as combinações largura × altura × quantidade
+@api_bp.route('/calcular_preco/matriz', methods=['POST'])
+def calcular_preco_matriz():
+    data = request.get_json(silent=True) or {}
+    contexto = data.get('contexto') or {}
+    if not isinstance(contexto, dict):
+        return jsonify({'error': 'contexto deve ser um objeto.'}), 400
+    try:
+        larguras = expandir_eixo(data.get('larguras'), 'larguras')
+        alturas = expandir_eixo(data.get('alturas'), 'alturas')
+        validar_dimensoes(larguras, 'larguras')
+        validar_dimensoes(alturas, 'alturas')
+        quantidades = quantidades_inteiras(expandir_eixo(data.get('quantidades'), 'quantidades'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if len(larguras) * len(alturas) * len(quantidades) > MAX_CELULAS_MATRIZ:
+        return jsonify({'error': f'Grade grande demais (máximo {MAX_CELULAS_MATRIZ} células).'}), 400
+
+    try:
+        quote = parse_quote_input({**contexto, 'largura_cm': larguras[0], 'altura_cm': alturas[0], 'quantidade': quantidades[0]})
+        ref = get_dados_referencia()
+        matriz = calcular_matriz(quote, ref, larguras, alturas, quantidades)
+    except QuoteInputError as e:
+        return jsonify({'error': str(e)}), 400
+    except GramaturaNaoEncontrada as e:
+        return jsonify({'error': str(e)}), 404
+
+    resposta = {
+        'eixos': {'larguras': larguras, 'alturas': alturas, 'quantidades': quantidades},
+        'formato': [len(larguras), len(alturas), len(quantidades)],
+        **matriz_para_json(matriz),
+    }
+    if data.get('verificar'):
+        resposta['verificacao'] = verificar_contra_escalar(quote, ref, larguras, alturas, quantidades, matriz=matriz)
+    return jsonify(resposta)
+
+
+# Curva de preço unitário por quantidade, com os degraus dos custos adicionais
+@api_bp.route('/calcular_preco/curva', methods=['POST'])
+def calcular_preco_curva():
+    data = request.get_json(silent=True) or {}
+    contexto = data.get('contexto') or {}
+    if not isinstance(contexto, dict):
+        return jsonify({'error': 'contexto deve ser um objeto.'}), 400
     try:
-        if data.get('altura_cm') is None or str(data.get('altura_cm')) == '':
-            return jsonify({'error': 'Campo altura_cm é obrigatório.'}), 400
-        altura_produto = float(data.get('altura_cm'))
-        if altura_produto <= 0:
-            return jsonify({'error': 'Campo altura_cm deve ser maior que zero.'}), 400
+        quantidade_min = int(data.get('quantidade_min') or 1)
+        quantidade_max = int(data.get('quantidade_max') or 0)
+        amostras = int(data.get('amostras_por_segmento') or 0)
     except Exception:
-        return jsonify({'error': 'Campo altura_cm inválido.'}), 400
-
-    # Buscar impostos fixos
-    resp_impostos = client.table('impostos').select('nome, valor').execute()
-    impostos_fixos_raw = resp_impostos.data or []
-    # Filtra ICMS da lista de impostos fixos para evitar duplicidade (ICMS será tratado separadamente)
-    impostos_fixos = [imp for imp in impostos_fixos_raw if (imp.get('nome') or '').strip().upper() != 'ICMS']
-    total_impostos_fixos_sem_icms = sum([float(imp.get('valor') or 0) for imp in impostos_fixos])
-    
-    # ICMS será calculado separadamente para permitir base diferente (com/sem IPI)
-    # O detalhe dos impostos será preenchido após o cálculo do preço (para incluir valores em R$)
-    impostos_fixos_lista = [{'nome': imp.get('nome'), 'percentual': float(imp.get('valor') or 0)} for imp in impostos_fixos]
-
-    # ===== NOVA LÓGICA DE CÁLCULO (TOP-DOWN) =====
-    # A margem, impostos, comissão, IPI e ICMS são EXTRAÍDOS do preço final (% por dentro)
-    # Sequência:
-    # 1. Calcular Custo Base = Material + Custos Operacionais
-    # 2. Resolver a equação: Preço Final = Custo Base / (1 - Σ%)
-    #    Onde Σ% = Margem + Comissão + Impostos + ICMS + IPI + Outros Custos (como %)
-    # 3. Extrair cada componente do Preço Final
-
-    # Ajustes de dimensão: lateral dobra (2x) e soma à largura; fundo soma à altura (sem dobrar)
-    lateral_effective = (lateral_cm or 0) * 2.0
-    largura_used = float(largura_cm or 0) + lateral_effective
-
-    # Custo por unidade considera a largura efetiva usada
-    custo_material_unit = custo_un * (largura_used / 100)
-    custo_real = round(custo_material_unit, 2)
-
-    # Custo total do produto (sem silk)
-    custo_total = round(custo_real * quantidade, 2)
-    
-    # Perdas de calibração: custo fixo por metro (não por unidade)
-    # perdas_calibracao_un é interpretado como metros de perda
-    perdas_calibracao_valor = round(perdas_calibracao_un * custo_un, 2)
-
-    # Total de silk e serviços (por unidade x quantidade, sem perdas)
-    valor_silk_total = round((valor_silk_unit or 0) * quantidade, 2)
-    valor_servicos_total = round((valor_servicos_unit or 0) * quantidade, 2)
-
-    # ==== CÁLCULO DO CORDÃO ====
-    # Se incluir_cordao estiver marcado, calcula baseado na largura
-    # Largura 50cm = 50% do custo_cordao, Largura 120cm = 120% do custo_cordao
-    # O valor é por unidade, multiplicado pela quantidade
-    valor_cordao_unitario = 0
-    valor_cordao_total = 0
-    if incluir_cordao and custo_cordao > 0:
-        # largura_used já inclui lateral_effective
-        percentual_cordao = largura_used / 100  # ex: 50cm = 0.5, 120cm = 1.2
-        valor_cordao_unitario = round(custo_cordao * percentual_cordao, 4)
-        valor_cordao_total = round(valor_cordao_unitario * quantidade, 2)
-
-    # ==== CÁLCULO DOS CUSTOS ADICIONAIS ====
-    # Busca todos os custos adicionais do banco e calcula automaticamente
-    # Cada custo tem: nome, valor (R$), a_cada (un.) - sempre cobra mínimo 1
-    custos_adicionais_lista = []
-    custos_adicionais_total = 0
+        return jsonify({'error': 'quantidade_min, quantidade_max e amostras_por_segmento devem ser inteiros.'}), 400
+    if quantidade_min < 1 or quantidade_max <= quantidade_min:
+        return jsonify({'error': 'Informe quantidade_max maior que quantidade_min (mínimo 1).'}), 400
+
     try:
-        resp_custos = client.table('custos_adicionais').select('id, nome, valor, a_cada').order('id').execute()
-        for custo in (resp_custos.data or []):
-            nome = custo.get('nome') or ''
-            valor = float(custo.get('valor') or 0)
-            a_cada = int(custo.get('a_cada') or 1)
-            
-            if valor <= 0 or a_cada <= 0:
-                continue
-            
-            # Calcula quantas unidades desse custo são necessárias (sempre mínimo 1)
-            qtd_custos = max(1, math.ceil(quantidade / a_cada))
-            
-            valor_item = round(valor * qtd_custos, 2)
-            custos_adicionais_total += valor_item
-            
-            custos_adicionais_lista.append({
-                'nome': nome,
-                'valor_unitario': valor,
-                'a_cada': a_cada,
-                'quantidade': qtd_custos,
-                'valor_total': valor_item,
-            })
-    except Exception as e:
-        # Se falhar, continua sem custos adicionais
-        pass
-    
-    custos_adicionais_total = round(custos_adicionais_total, 2)
+        quote = parse_quote_input({**contexto, 'quantidade': quantidade_min})
+        curva = calcular_curva(quote, get_dados_referencia(), quantidade_min, quantidade_max, amostras)
+    except QuoteInputError as e:
+        return jsonify({'error': str(e)}), 400
+    except GramaturaNaoEncontrada as e:
+        return jsonify({'error': str(e)}), 404
+    return jsonify(curva)
 
-    # ==== ETAPA 1: Custo Base = Material + Perdas + Cordão + Custos Adicionais ====
-    valor_custos_operacionais = 0  # Removido outros_custos
-    custo_base = round(custo_total + perdas_calibracao_valor + valor_custos_operacionais + valor_cordao_total + custos_adicionais_total, 2)
 
-    # ==== ETAPA 2: Margem aplicada ====
-    margem_aplicada = margem
+# Precificação inversa: valor de margem, comissão, quantidade ou preço da gramatura para um preço-alvo
+@api_bp.route('/calcular_preco/resolver', methods=['POST'])
+def calcular_preco_resolver():
+    data = request.get_json(silent=True) or {}
+    contexto = data.get('contexto') or {}
+    alvo = data.get('alvo') or {}
+    if not isinstance(contexto, dict) or not isinstance(alvo, dict):
+        return jsonify({'error': 'contexto e alvo devem ser objetos.'}), 400
+    try:
+        preco_final = float(alvo['preco_final']) if alvo.get('preco_final') is not None else None
+        preco_unitario = float(alvo['preco_unitario']) if alvo.get('preco_unitario') is not None else None
+        quantidade_max = int(data.get('quantidade_max') or QUANTIDADE_MAX_PADRAO)
+    except Exception:
+        return jsonify({'error': 'alvo.preco_final, alvo.preco_unitario e quantidade_max devem ser numéricos.'}), 400
+    if quantidade_max < 1 or quantidade_max > QUANTIDADE_MAX_PADRAO:
+        return jsonify({'error': f'quantidade_max deve estar entre 1 e {QUANTIDADE_MAX_PADRAO}.'}), 400
 
-    # ==== ETAPA 3: Resolver equação para Preço Final ====
-    # Lógica diferente dependendo se cliente tem IE ou não:
-    # - COM IE: ICMS calculado sobre base SEM IPI (ICMS por dentro, IPI por fora separado)
-    # - SEM IE: ICMS calculado sobre base COM IPI (IPI integra a base do ICMS)
-    
-    # Percentuais em formato decimal
-    margem_dec = margem_aplicada / 100 if margem_aplicada > 0 else 0
-    impostos_sem_icms_dec = total_impostos_fixos_sem_icms / 100 if total_impostos_fixos_sem_icms > 0 else 0
-    icms_dec = icms / 100 if icms > 0 else 0
-    comissao_dec_aplicada = comissao / 100 if comissao > 0 else 0
-    ipi_dec = (ipi_percentual / 100) if ipi_percentual is not None else 0
-
-    # ===== USAR FUNÇÃO UNIFICADA DE CÁLCULO =====
-    resultado_preco = calcular_preco_final(
-        custo_base=custo_base,
-        margem_dec=margem_dec,
-        impostos_sem_icms_dec=impostos_sem_icms_dec,
-        icms_dec=icms_dec,
-        comissao_dec_aplicada=comissao_dec_aplicada,
-        ipi_dec=ipi_dec
-    )
-    
-    preco_final_produto_sem_ipi = resultado_preco['preco_final_produto_sem_ipi']
-    preco_final_produto_com_ipi = resultado_preco['preco_final_produto_com_ipi']
-    valor_ipi = resultado_preco['valor_ipi']
-    base_icms = resultado_preco['base_icms']
-    valor_icms = resultado_preco['valor_icms']
-    base_impostos_nao_icms = resultado_preco['base_impostos_nao_icms']
-    valor_margem = resultado_preco['valor_margem']
-    valor_impostos_sem_icms = resultado_preco['valor_impostos_sem_icms']
-    valor_comissao = resultado_preco['valor_comissao']
-
-    # Total de impostos para exibição (usado no cálculo de formação)
-    total_impostos_fixos = total_impostos_fixos_sem_icms + icms
-
-    # ==== ETAPA 5: Soma com serviços (silk) ====
-    preco_final_com_servicos = round(preco_final_produto_com_ipi + valor_silk_total + valor_servicos_total, 2)
-    preco_final_produto = preco_final_produto_com_ipi  # Produto COM IPI, SEM serviços (NF produto)
-    preco_final_total = round(preco_final_com_servicos, 2)  # Valor final completo (produto + IPI + serviços)
-    
-    valor_custos_operacionais_final = 0  # Removido - será substituído por custos adicionais
-    
-    # ==== ETAPA 6: Calcular valor de cada imposto individualmente ====
-    # Impostos (exceto ICMS): calculados sobre base_impostos_nao_icms (preço de venda sem IPI)
-    # ICMS: calculado sobre base_icms (preço sem IPI para intraestadual e IE)
-    impostos_detalhe = []
-    for imp in impostos_fixos_lista:
-        pct = float(imp.get('percentual') or 0)
-        # Impostos fixos (PIS, COFINS, INSS, etc.) são calculados sobre o faturamento (preço sem IPI)
-        valor_imp = round(base_impostos_nao_icms * (pct / 100), 2)
-        impostos_detalhe.append({
-            'nome': imp.get('nome'),
-            'percentual': pct,
-            'valor': valor_imp,
-            'base': 'preco_sem_ipi'
-        })
-    # Adiciona ICMS com sua base específica
-    impostos_detalhe.append({
-        'nome': 'ICMS',
-        'percentual': icms,
-        'valor': valor_icms,
-        'base': 'preco_sem_ipi',
-        'origem': icms_origem
-    })
-    
-    # Total de impostos (ICMS + demais impostos)
-    valor_impostos = round(valor_impostos_sem_icms + valor_icms, 2)
-    
-    # Detalhamento da comissão
-    valor_comissao_produto = round(preco_final_produto_sem_ipi * comissao_dec_aplicada, 2)
-    valor_comissao_servicos = round((valor_silk_total + valor_servicos_total) * comissao_dec_aplicada, 2)
-
-    # ==== Verificação: soma dos componentes deve fechar o preço ====
-    check = round(
-        custo_base + 
-        valor_margem + 
-        valor_impostos + 
-        valor_comissao + 
-        valor_ipi + 
-        valor_custos_operacionais_final, 
-        2
-    )
+    variavel = data.get('variavel')
+    try:
+        if variavel == 'quantidade' and not contexto.get('quantidade'):
+            contexto = {**contexto, 'quantidade': 1}
+        quote = parse_quote_input(contexto)
+        resultado = resolver_alvo(quote, get_dados_referencia(), variavel, preco_final, preco_unitario, quantidade_max)
+    except (QuoteInputError, SolverError) as e:
+        return jsonify({'error': str(e)}), 400
+    except GramaturaNaoEncontrada as e:
+        return jsonify({'error': str(e)}), 404
+    return jsonify(resultado)
 
-    # Para compatibilidade, manter alguns campos
-    valor_outros = valor_custos_operacionais
 
-    # Cálculo de aproveitamento da altura da bobina (percentual da bobina que será usado
-    # ao encaixar o maior número inteiro de unidades por bobina)
-    aproveitamento_percentual = None
-    unidades_por_bobina = None
-    aproveitamento_detalhe = None
-    if altura_produto and altura_cm_db:
+# Otimização de corte: combina vários modelos de sacola (mesma gramatura) na mesma bobina
+@api_bp.route('/otimizar_corte', methods=['POST'])
+def otimizar_corte_bobinas():
+    data = request.get_json(silent=True) or {}
+    itens = data.get('itens') or []
+    if not isinstance(itens, list) or len(itens) == 0 or not all(isinstance(it, dict) for it in itens):
+        return jsonify({'error': 'Envie uma lista de itens (objetos) para otimizar.'}), 400
+    try:
+        tempo_limite_ms = float(data.get('tempo_limite_ms') or TEMPO_LIMITE_PADRAO_MS)
+    except Exception:
+        return jsonify({'error': 'tempo_limite_ms inválido.'}), 400
+
+    ref = get_dados_referencia()
+    gramatura = ref.buscar_gramatura(data.get('gramatura_id'), data.get('gramatura'))
+    if not gramatura:
+        return jsonify({'error': 'Gramatura não encontrada'}), 404
+    tamanho_alca_padrao = float(ref.configuracoes.get('tamanho_alca', 0) or 0)
+
+    # Itens podem referenciar um modelo cadastrado em sacolas_lote (um único select para todos)
+    ids_lote = {it.get('sacola_lote_id') for it in itens if it.get('sacola_lote_id') is not None}
+    modelos = {}
+    if ids_lote:
+        rows = get_repositorio('sacolas_lote').listar_por_ids(ids_lote)
+        modelos = {str(r.get('id')): r for r in rows}
+
+    entrada = []
+    for indice, it in enumerate(itens):
+        modelo = {}
+        if it.get('sacola_lote_id') is not None:
+            modelo = modelos.get(str(it.get('sacola_lote_id')))
+            if not modelo:
+                return jsonify({'error': f"Item {indice}: sacola_lote_id {it.get('sacola_lote_id')} não encontrado."}), 404
         try:
-            if altura_cm_db > 0 and altura_produto > 0:
-                # Cada sacola usa frente e verso -> dobra a altura do produto, e soma o fundo (se houver)
-                # Se incluir_alca, soma o valor da alça (em cm) UMA vez (não dobra)
-                altura_effective = (altura_produto * 2.0) + (fundo_cm or 0)
-                if incluir_alca:
-                    # use tamanho_alca (saved size) when including alça in effective height
-                    altura_effective += float(tamanho_alca or 0)
-                unidades_por_bobina = int(altura_cm_db // altura_effective)
-                # Altura efetivamente utilizada por bobina ao cortar unidades inteiras (considerando frente+verso e fundo)
-                utilizada_por_bobina = unidades_por_bobina * altura_effective
-                aproveitamento_percentual = round((utilizada_por_bobina / altura_cm_db) * 100.0, 2)
-                # Monta detalhe completo do aproveitamento
-                aproveitamento_detalhe = {
-                    'bobina_altura_cm': float(altura_cm_db),
-                    'altura_produto_cm': float(altura_produto),
-                    'fundo_cm_unit': float(fundo_cm or 0),
-                    'altura_unit_effective_cm': float(altura_effective),
-                    'unidades_por_bobina': int(unidades_por_bobina),
-                    'utilizada_por_bobina_cm': float(utilizada_por_bobina),
-                    'sobra_por_bobina_cm': float(max(0, altura_cm_db - utilizada_por_bobina)),
-                    'bobina_largura_utilizada_cm': float(largura_used),
-                    'largura_input_cm': float(largura_cm),
-                    'lateral_total_cm': float(lateral_effective),
-                }
+            altura_cm = float(it.get('altura_cm', modelo.get('altura_cm')))
+            fundo_cm = float(it.get('fundo_cm', modelo.get('fundo_cm')) or 0)
+            incluir_alca = bool(it.get('incluir_alca', modelo.get('tem_alca', False)))
+            tamanho_alca = float(it.get('tamanho_alca') or tamanho_alca_padrao)
+            quantidade = int(it.get('quantidade'))
         except Exception:
-            aproveitamento_percentual = None
-            unidades_por_bobina = None
+            return jsonify({'error': f'Item {indice}: altura_cm e quantidade são obrigatórios e devem ser numéricos.'}), 400
+        entrada.append({
+            'nome': it.get('nome') or modelo.get('nome'),
+            'altura_unitaria_cm': altura_unitaria_cm(altura_cm, fundo_cm, incluir_alca, tamanho_alca),
+            'quantidade': quantidade,
+        })
 
-    # Recompute effective unit height (including alça if applicable) for response fields
-    altura_unit_effective_value = None
     try:
-        if altura_produto is not None:
-            altura_unit_effective_value = (altura_produto * 2.0) + (fundo_cm or 0)
-            if incluir_alca:
-                altura_unit_effective_value += float(tamanho_alca or 0)
-    except Exception:
-        altura_unit_effective_value = None
-
-    # unidades_por_bobina (fallback) and totals
-    unidades_por_bobina_calc = None
-    utilizada_por_bobina_value = None
-    sobra_por_bobina = None
-    bobinas_necessarias = None
-    total_altura_needed = None
-    total_bobinas = None
-    sobra_total = None
+        resultado = otimizar_corte(entrada, gramatura.get('altura_cm'), tempo_limite_ms)
+    except CorteInputError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'gramatura': gramatura.get('gramatura'), 'itens': entrada, **resultado})
+
+
+# Planejamento de faixas na largura da bobina (generaliza cortar_tecido) com preço do melhor padrão
+@api_bp.route('/planejar_faixas', methods=['POST'])
+def planejar_faixas_bobina():
+    data = request.get_json(silent=True) or {}
+    larguras = data.get('larguras') or []
+    contexto = data.get('contexto') or {}
+    if not isinstance(larguras, list) or len(larguras) == 0:
+        return jsonify({'error': 'Informe larguras como lista de números ou de {largura_cm, lateral_cm}.'}), 400
+    if not isinstance(contexto, dict):
+        return jsonify({'error': 'contexto deve ser um objeto.'}), 400
     try:
-        if altura_unit_effective_value and altura_cm_db:
-            unidades_por_bobina_calc = int(altura_cm_db // altura_unit_effective_value)
-            unidades_use = unidades_por_bobina if unidades_por_bobina is not None else unidades_por_bobina_calc
-            utilizada_por_bobina_value = (unidades_use or 0) * (altura_unit_effective_value or 0)
-            sobra_por_bobina = max(0, altura_cm_db - (utilizada_por_bobina_value or 0))
-            if unidades_use and unidades_use > 0:
-                bobinas_necessarias = math.ceil(quantidade / unidades_use)
-            if altura_cm_db and altura_cm_db > 0 and altura_unit_effective_value is not None:
-                total_altura_needed = quantidade * altura_unit_effective_value
-                total_bobinas = math.ceil(total_altura_needed / altura_cm_db) if altura_cm_db > 0 else None
-                if total_bobinas is not None:
-                    sobra_total = (total_bobinas * altura_cm_db) - total_altura_needed
+        largura_bobina_cm = float(data.get('largura_bobina_cm'))
+        max_faixas = int(data.get('max_faixas') or MAX_FAIXAS_PADRAO)
+        top = int(data.get('top') or TOP_PADRAO)
+        itens = []
+        for it in larguras:
+            if isinstance(it, dict):
+                itens.append({'nome': it.get('nome'), 'largura_cm': float(it.get('largura_cm')), 'lateral_cm': float(it.get('lateral_cm') or 0)})
+            else:
+                itens.append({'nome': None, 'largura_cm': float(it), 'lateral_cm': 0.0})
     except Exception:
-        pass
+        return jsonify({'error': 'largura_bobina_cm, larguras, max_faixas e top devem ser numéricos.'}), 400
 
-    return jsonify({
-        # ===== INFORMAÇÕES BÁSICAS =====
-        'gramatura_nome': gramatura_nome,
-        'gramatura_altura_cm': altura_cm_db,
-        'largura_cm': largura_cm,
-        'cortar_tecido': cortar_tecido,
-        'largura_original_cm': largura_original_cm,
-        'altura_produto_cm': altura_produto,
-        'quantidade': quantidade,
-        'perdas_calibracao_un': perdas_calibracao_un,
-        'perdas_calibracao_valor': round(perdas_calibracao_valor, 2),
-        
-        # ===== BASE DE DADOS (CUSTO) =====
-        'custo_unitario_metro': round(custo_un, 2),
-        'custo_un': round((custo_total / max(1, quantidade)), 2),
-        'custo_real': round(custo_real, 2),
-        'custo_material_total': round(custo_total, 2),
-        'custo_operacional_percentual': 0,
-        'custo_operacional_valor': round(valor_custos_operacionais, 2),
-        
-        # ===== CORDÃO =====
-        'incluir_cordao': incluir_cordao,
-        'custo_cordao_config': round(custo_cordao, 2),
-        'valor_cordao_unitario': round(valor_cordao_unitario, 4),
-        'valor_cordao_total': round(valor_cordao_total, 2),
-        
-        # ===== CUSTOS ADICIONAIS =====
-        'custos_adicionais_lista': custos_adicionais_lista,
-        'custos_adicionais_total': round(custos_adicionais_total, 2),
-        
-        'custo_base': round(custo_base, 2),
-        
-        # ===== COMPOSIÇÃO DO PREÇO FINAL (extraído de cima para baixo) =====
-        'margem_percentual': round(margem_aplicada, 2),
-        'valor_margem': round(valor_margem, 2),
-        
-        'comissao_percentual': round(comissao, 2),
-        'valor_comissao': round(valor_comissao, 2),
-        
-        'comissao_percentual': round(comissao, 2),
-        'valor_comissao': round(valor_comissao, 2),
-        'valor_comissao_produto': round(valor_comissao_produto, 2),
-        'valor_comissao_servicos': round(valor_comissao_servicos, 2),
-        
-        'ipi_percentual': round(ipi_percentual, 2),
-        'valor_ipi': round(valor_ipi, 2),
-        
-        'impostos_fixos_percentual': round(total_impostos_fixos, 2),
-        'impostos_fixos_detalhe': impostos_detalhe,
-        'valor_impostos_fixos': round(valor_impostos, 2),
-        
-        'icms_percentual': round(icms, 2),
-        'icms_origem': icms_origem,
-        'icms_base': round(base_icms, 2),
-        'icms_inclui_ipi': not cliente_tem_ie,
-        'valor_icms': round(valor_icms, 2),
-        
-        # ===== PREÇOS FINAIS =====
-        'preco_final_produto': round(preco_final_produto, 2),
-        'preco_final_produto_com_ipi': round(preco_final_produto_com_ipi, 2),
-        'preco_final_produto_sem_ipi': round(preco_final_produto_sem_ipi, 2),
-        'preco_unitario_sem_ipi': round(preco_final_produto_sem_ipi / max(1, quantidade), 4),
-        'preco_final_servicos': round(valor_silk_total + valor_servicos_total, 2),
-        'preco_final': round(preco_final_total, 2),
-        
-        # ===== SERVIÇOS (SILK) =====
-        'incluir_valor_silk': incluir_valor_silk,
-        'valor_silk_unitario': round(valor_silk_unit, 2),
-        'valor_silk_total': round(valor_silk_total, 2),
-        'valor_servicos_unitario': round(valor_servicos_unit, 2),
-        'valor_servicos_total': round(valor_servicos_total, 2),
-        'servicos_detalhe': servicos_detalhe,
-        
-        # ===== DIMENSÕES EFETIVAS =====
-        'incluir_lateral': incluir_lateral,
-        'incluir_alca': incluir_alca,
-        'incluir_fundo': incluir_fundo,
-        'lateral_cm': lateral_cm,
-        'fundo_cm': fundo_cm,
-        'largura_utilizada_cm': round(largura_used, 2),
-        'altura_utilizada_cm': round(altura_unit_effective_value, 2) if altura_unit_effective_value is not None else None,
-        'tamanho_alca': float(tamanho_alca or 0),
-        'valor_alca': float(tamanho_alca or 0),
-        'altura_unit_effective_cm': round(altura_unit_effective_value, 2) if altura_unit_effective_value is not None else None,
-        
-        # ===== APROVEITAMENTO =====
-        'aproveitamento_altura_percentual': aproveitamento_percentual,
-        'unidades_por_bobina': unidades_por_bobina if unidades_por_bobina is not None else (unidades_por_bobina_calc or 0),
-        'aproveitamento_detalhe': aproveitamento_detalhe,
-        'utilizada_por_bobina_cm': round(utilizada_por_bobina_value, 2) if utilizada_por_bobina_value is not None else None,
-        'sobra_por_bobina_cm': round(sobra_por_bobina, 2) if sobra_por_bobina is not None else None,
-        'bobinas_necessarias': bobinas_necessarias,
-        'total_altura_necessaria_cm': round(total_altura_needed, 2) if total_altura_needed is not None else None,
-        'total_bobinas_necessarias': total_bobinas,
-        'sobra_total_cm': round(sobra_total, 2) if sobra_total is not None else None,
-        
-        # ===== VALIDAÇÃO =====
-        'check': round(check, 2),
-    })
+    ref = get_dados_referencia()
+    gramatura = None
+    if contexto.get('gramatura_id') or contexto.get('gramatura_nome'):
+        gramatura = ref.buscar_gramatura(contexto.get('gramatura_id'), contexto.get('gramatura_nome'))
+        if not gramatura:
+            return jsonify({'error': 'Gramatura não encontrada'}), 404
 
+    # Largura ocupada na bobina: largura + 2 × lateral
+    for it in itens:
+        it['largura_faixa_cm'] = it['largura_cm'] + 2 * it['lateral_cm']
+    try:
+        plano = planejar_faixas(
+            largura_bobina_cm,
+            [it['largura_faixa_cm'] for it in itens],
+            max_faixas=max_faixas,
+            top=top,
+            custo_metro=gramatura['preco'] if gramatura else None,
+        )
+    except FaixasInputError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Com contexto de cotação, precifica cada largura do melhor padrão pela largura efetiva da faixa
+    if gramatura and plano['padroes']:
+        contexto_base = {k: v for k, v in contexto.items() if k != 'largura_bobina_cm'}
+        for faixa in plano['padroes'][0]['faixas']:
+            # Faixa discretizada em mm (arredondada para cima): volta ao primeiro item com essa largura
+            item = next(it for it in itens
+                        if math.ceil(it['largura_faixa_cm'] * 10 - 1e-9) == round(faixa['largura_cm'] * 10))
+            faixa['nome'] = item['nome']
+            try:
+                quote = parse_quote_input({
+                    **contexto_base,
+                    'largura_cm': faixa['largura_efetiva_cm'] - 2 * item['lateral_cm'],
+                    'lateral_cm': item['lateral_cm'],
+                    'cortar_tecido': True,
+                    'largura_original_cm': largura_bobina_cm,
+                })
+                faixa['orcamento'] = calcular_orcamento(quote, ref)
+            except QuoteInputError as e:
+                return jsonify({'error': str(e)}), 400
+    return jsonify({'itens': itens, **plano})
 
 # Enviar cotação para aprovação via Telegram
 @api_bp.route('/aprovacao/enviar', methods=['POST', 'OPTIONS'])
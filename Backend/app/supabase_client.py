@@ -1,12 +1,208 @@
 import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from functools import lru_cache
+from typing import Any, Dict, Optional
+
+import httpx
 from supabase import create_client, Client
+from supabase.lib.client_options import SyncClientOptions
+
+from app.utils.ambiente import apos_fork, env_float
 
 
 class SupabaseConfigError(RuntimeError):
     pass
 
 
+# Pool HTTP por processo: cada worker do gunicorn (2 threads) reaproveita as conexões
+# TLS com keep-alive em vez de abrir um handshake por chamada ao PostgREST/Storage.
+POOL_MAX_CONEXOES_PADRAO = 10
+POOL_KEEPALIVE_PADRAO = 10
+KEEPALIVE_EXPIRA_S_PADRAO = 60.0
+TIMEOUT_CONEXAO_S_PADRAO = 5.0
+TIMEOUT_LEITURA_S_PADRAO = 20.0
+TIMEOUT_POOL_S_PADRAO = 5.0
+
+# Timeout sobreposto por `timeout_supabase` (vale só para as chamadas dentro do bloco)
+_timeout_chamada: ContextVar[Optional[httpx.Timeout]] = ContextVar('timeout_supabase', default=None)
+
+# Eventos do trace do httpcore que indicam que a requisição já tem uma conexão do pool
+_EVENTOS_CONEXAO = frozenset({
+    'connection.connect_tcp.started',
+    'http11.send_request_headers.started',
+    'http2.send_request_headers.started',
+})
+
+
+
+class _MetricasPool:
+    """Contadores do pool (por processo), protegidos por lock: as 2 threads do worker atualizam juntos."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.em_uso = 0
+        self.pico_em_uso = 0
+        self.em_espera = 0
+        self.requisicoes = 0
+        self.erros = 0
+        self.timeouts = 0
+        self.conexoes_novas = 0
+        self.handshakes_tls = 0
+        self.espera_pool_total_s = 0.0
+        self.espera_pool_max_s = 0.0
+        self.duracao_total_s = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            n = max(1, self.requisicoes)
+            return {
+                'em_uso': self.em_uso,
+                'pico_em_uso': self.pico_em_uso,
+                'em_espera': self.em_espera,
+                'requisicoes': self.requisicoes,
+                'erros': self.erros,
+                'timeouts': self.timeouts,
+                'conexoes_novas': self.conexoes_novas,
+                'handshakes_tls': self.handshakes_tls,
+                'conexoes_reaproveitadas': max(0, self.requisicoes - self.conexoes_novas),
+                'espera_pool_media_ms': round(self.espera_pool_total_s / n * 1000, 3),
+                'espera_pool_max_ms': round(self.espera_pool_max_s * 1000, 3),
+                'duracao_media_ms': round(self.duracao_total_s / n * 1000, 3),
+            }
+
+
+_metricas = _MetricasPool()
+
+
+class _CorpoMedido(httpx.SyncByteStream):
+    """Corpo da resposta que libera a vaga de `em_uso` quando o httpx fecha a resposta."""
+
+    def __init__(self, stream: httpx.SyncByteStream, inicio: float):
+        self._stream = stream
+        self._inicio = inicio
+        self._fechado = False
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self):
+        if self._fechado:
+            return
+        self._fechado = True
+        try:
+            self._stream.close()
+        finally:
+            with _metricas.lock:
+                _metricas.em_uso -= 1
+                _metricas.duracao_total_s += time.perf_counter() - self._inicio
+
+
+class TransporteSupabase(httpx.BaseTransport):
+    """
+    Transporte HTTP com pool limitado, keep-alive e métricas.
+
+    Usa o `trace` do httpcore para separar, em cada requisição, o tempo de
+    espera por uma conexão livre no pool do tempo de abrir TCP/TLS (só quando
+    nenhuma conexão ociosa pôde ser reaproveitada).
+    """
+
+    def __init__(self, limits: httpx.Limits, http2: bool = True, retries: int = 1):
+        self._transporte = httpx.HTTPTransport(limits=limits, http2=http2, retries=retries)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        timeout = _timeout_chamada.get()
+        if timeout is not None:
+            request.extensions['timeout'] = timeout.as_dict()
+
+        inicio = time.perf_counter()
+        marcas: Dict[str, float] = {}
+
+        def trace(evento: str, info: Dict[str, Any]) -> None:
+            if evento not in marcas and evento in _EVENTOS_CONEXAO and not _EVENTOS_CONEXAO.intersection(marcas):
+                # Primeira conexão obtida do pool (nova ou ociosa): sai da fila e passa a ocupar a conexão
+                with _metricas.lock:
+                    _metricas.em_espera -= 1
+                    _metricas.em_uso += 1
+                    _metricas.pico_em_uso = max(_metricas.pico_em_uso, _metricas.em_uso)
+            marcas.setdefault(evento, time.perf_counter())
+
+        request.extensions['trace'] = trace
+        with _metricas.lock:
+            _metricas.em_espera += 1
+            _metricas.requisicoes += 1
+        try:
+            response = self._transporte.handle_request(request)
+        except Exception as e:
+            with _metricas.lock:
+                if _EVENTOS_CONEXAO.intersection(marcas):
+                    _metricas.em_uso -= 1
+                else:
+                    _metricas.em_espera -= 1
+                _metricas.erros += 1
+                if isinstance(e, httpx.TimeoutException):
+                    _metricas.timeouts += 1
+            raise
+
+        # Espera no pool: do início até começar a conectar (conexão nova) ou a enviar (conexão reaproveitada)
+        conectou = marcas.get('connection.connect_tcp.started')
+        enviou = marcas.get('http11.send_request_headers.started') or marcas.get('http2.send_request_headers.started')
+        fim_espera = conectou or enviou or time.perf_counter()
+        espera = max(0.0, fim_espera - inicio)
+        with _metricas.lock:
+            _metricas.espera_pool_total_s += espera
+            _metricas.espera_pool_max_s = max(_metricas.espera_pool_max_s, espera)
+            if conectou:
+                _metricas.conexoes_novas += 1
+            if 'connection.start_tls.started' in marcas:
+                _metricas.handshakes_tls += 1
+
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_CorpoMedido(response.stream, inicio),
+            extensions=response.extensions,
+        )
+
+    def close(self) -> None:
+        self._transporte.close()
+
+
+def configuracao_pool() -> Dict[str, Any]:
+    """Limites e timeouts do pool lidos do ambiente (SUPABASE_POOL_*, SUPABASE_TIMEOUT_*, SUPABASE_HTTP2)."""
+    return {
+        'max_conexoes': int(env_float('SUPABASE_POOL_MAX', POOL_MAX_CONEXOES_PADRAO)),
+        'max_keepalive': int(env_float('SUPABASE_POOL_KEEPALIVE', POOL_KEEPALIVE_PADRAO)),
+        'keepalive_expira_s': env_float('SUPABASE_KEEPALIVE_EXPIRY', KEEPALIVE_EXPIRA_S_PADRAO),
+        'timeout_conexao_s': env_float('SUPABASE_TIMEOUT_CONNECT', TIMEOUT_CONEXAO_S_PADRAO),
+        'timeout_leitura_s': env_float('SUPABASE_TIMEOUT_READ', TIMEOUT_LEITURA_S_PADRAO),
+        'timeout_pool_s': env_float('SUPABASE_TIMEOUT_POOL', TIMEOUT_POOL_S_PADRAO),
+        'http2': (os.environ.get('SUPABASE_HTTP2') or 'true').lower() in ('1', 'true', 'yes', 'on'),
+    }
+
+
+def _criar_http_client() -> httpx.Client:
+    cfg = configuracao_pool()
+    limits = httpx.Limits(
+        max_connections=cfg['max_conexoes'],
+        max_keepalive_connections=cfg['max_keepalive'],
+        keepalive_expiry=cfg['keepalive_expira_s'],
+    )
+    timeout = httpx.Timeout(
+        connect=cfg['timeout_conexao_s'],
+        read=cfg['timeout_leitura_s'],
+        write=cfg['timeout_leitura_s'],
+        pool=cfg['timeout_pool_s'],
+    )
+    return httpx.Client(
+        transport=TransporteSupabase(limits, http2=cfg['http2']),
+        timeout=timeout,
+        follow_redirects=True,
+    )
+
+
 @lru_cache(maxsize=1)
 def get_client() -> Client:
     url = os.environ.get("SUPABASE_URL")
@@ -21,4 +217,44 @@ def get_client() -> Client:
         )
     # A SDK do storage espera barra final; normalizamos para evitar warning
     normalized_url = url if url.endswith('/') else url + '/'
-    return create_client(normalized_url, key)
+    # PostgREST, Storage e Functions compartilham o mesmo pool HTTP
+    return create_client(normalized_url, key, options=SyncClientOptions(httpx_client=_criar_http_client()))
+
+
+@contextmanager
+def timeout_supabase(leitura: float, conexao: Optional[float] = None, pool: Optional[float] = None):
+    """
+    Timeout próprio para as chamadas ao Supabase feitas dentro do bloco (na thread/contexto atual).
+
+    Ex.: `with timeout_supabase(2.0): client.table('gramaturas').select('*').execute()`
+    """
+    cfg = configuracao_pool()
+    token = _timeout_chamada.set(httpx.Timeout(
+        connect=conexao if conexao is not None else cfg['timeout_conexao_s'],
+        read=leitura,
+        write=leitura,
+        pool=pool if pool is not None else cfg['timeout_pool_s'],
+    ))
+    try:
+        yield
+    finally:
+        _timeout_chamada.reset(token)
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Métricas do pool HTTP deste processo (em uso, espera por conexão, conexões novas e handshakes TLS)."""
+    return {'pid': os.getpid(), **configuracao_pool(), **_metricas.snapshot()}
+
+
+@apos_fork
+def _reiniciar_apos_fork() -> None:
+    """
+    No processo filho, descarta o cliente herdado sem fechá-lo.
+
+    Os sockets do pool são compartilhados com o pai; fechar a conexão TLS aqui
+    enviaria close_notify no meio do tráfego do pai. O lock e os contadores
+    também são recriados (o fork pode ter ocorrido com o lock adquirido).
+    """
+    global _metricas
+    get_client.cache_clear()
+    _metricas = _MetricasPool()
@@ -0,0 +1,42 @@
+"""
+Configuração por variável de ambiente e estado por processo.
+
+Os parâmetros de desempenho são lidos a cada uso (não na importação), para
+que testes e benchmarks possam alterá-los em tempo de execução; um valor
+inválido cai no padrão em vez de derrubar a requisição.
+
+Os módulos com estado global (locks, pools, clientes HTTP, conexões SQLite)
+registram com `apos_fork` a função que recria esse estado no processo filho
+(workers do gunicorn com --preload): um lock herdado adquirido ou threads que
+não existem no filho travariam o worker.
+"""
+
+import os
+from typing import Callable
+
+
+def env_float(nome: str, padrao: float) -> float:
+    """Variável de ambiente como float; ausente, vazia ou inválida devolve `padrao`."""
+    try:
+        return float(os.environ.get(nome) or padrao)
+    except ValueError:
+        return padrao
+
+
+def env_int(nome: str, padrao: int) -> int:
+    """Variável de ambiente como int; ausente, vazia ou inválida devolve `padrao`."""
+    try:
+        return int(os.environ.get(nome) or padrao)
+    except ValueError:
+        return padrao
+
+
+def apos_fork(reiniciar: Callable[[], None]) -> Callable[[], None]:
+    """
+    Registra `reiniciar` para rodar no processo filho após um fork (decorador).
+
+    Sem `os.register_at_fork` (Windows), não registra nada: lá não há fork.
+    """
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=reiniciar)
+    return reiniciar
@@ -0,0 +1,443 @@
+"""
+Aritmética monetária em centavos inteiros para o motor de preços.
+
+Política de arredondamento (única para todo o cálculo):
+
+- Entradas em ponto flutuante são convertidas pelo seu valor decimal mais curto
+  (`repr`), nunca pelo binário: 0.1 vira exatamente 1 décimo. Preços por metro
+  e valores unitários usam 6 casas, percentuais 4 casas e medidas em cm 2 casas.
+- Toda divisão arredonda meio para cima (ROUND_HALF_UP, simétrico para
+  negativos) em inteiros; não há `round()` de float em nenhuma etapa.
+- Os mesmos pontos de arredondamento do caminho float são mantidos: custo por
+  unidade ao centavo, cordão unitário a 4 casas, cada custo adicional ao centavo.
+- A cadeia `÷ (1 − p)` (margem, impostos, comissão, ICMS) é feita em milésimos
+  de centavo (10⁻⁵ R$), com arredondamento em cada divisor, e o preço sem IPI
+  é então arredondado ao centavo. IPI e parcelas (margem, impostos...) saem do
+  preço sem IPI já em centavos.
+
+`valores_centavos` calcula uma cotação em inteiros do Python (sem limite de
+magnitude); `valores_monetarios_centavos_lote` (usado por `calcular_lote`) e
+`precos_centavos_lote` fazem o mesmo em arrays int64 para muitas cotações de
+uma vez e dão resultado idêntico enquanto os valores couberem em int64 (fora
+dessa faixa o lote cai para inteiros do Python).
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+CASAS_VALOR = 6          # preços por metro, cordão, custos adicionais, silk e serviços
+CASAS_PERCENTUAL = 4     # percentuais (ex.: 27,5% -> 275000)
+CASAS_MEDIDA = 2         # larguras e laterais em cm
+ESCALA_PERCENTUAL = 10 ** (CASAS_PERCENTUAL + 2)   # fração 1,0 = 100% = 10**6
+MILICENTAVOS = 1000
+# Maior valor intermediário (em milésimos de centavo) que ainda pode ser multiplicado por ESCALA_PERCENTUAL em int64
+LIMITE_MILICENTAVOS_INT64 = (2 ** 63 - 1) // ESCALA_PERCENTUAL
+
+
+def inteiro_escalado(valor: Any, casas: int) -> int:
+    """Converte um número para inteiro em 10**-casas pelo seu valor decimal (ROUND_HALF_UP)."""
+    if type(valor) is float:
+        return _float_escalado(valor, casas)
+    if valor is None:
+        return 0
+    if isinstance(valor, int):
+        return valor * 10 ** casas
+    if isinstance(valor, Decimal):
+        return int(valor.scaleb(casas).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    return _float_escalado(float(valor), casas)
+
+
+@lru_cache(maxsize=8192)
+def _float_escalado(valor: float, casas: int) -> int:
+    # Os mesmos poucos valores (preços, percentuais, larguras) se repetem em quase todas as cotações
+    texto = repr(valor)
+    if 'e' in texto or 'n' in texto:
+        return int(Decimal(texto).scaleb(casas).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    negativo = texto.startswith('-')
+    inteiro, _, frac = texto.lstrip('-').partition('.')
+    n = int(inteiro + frac[:casas].ljust(casas, '0'))
+    if len(frac) > casas and frac[casas] >= '5':
+        n += 1
+    return -n if negativo else n
+
+
+def dividir(numerador: int, denominador: int) -> int:
+    """Divisão inteira com ROUND_HALF_UP (metade afasta do zero); denominador > 0."""
+    # Resto r arredonda para cima quando 2r >= d, isto é, quando r + d // 2 >= d
+    if numerador >= 0:
+        return (numerador + denominador // 2) // denominador
+    return -((denominador // 2 - numerador) // denominador)
+
+
+def _percentual_ativo(p4: int) -> bool:
+    """A cadeia só aplica divisores com 0 < p < 100%, como `calcular_preco_final`."""
+    return 0 < p4 < ESCALA_PERCENTUAL
+
+
+def _servicos_escalados(servicos: Sequence[Dict[str, Any]]) -> int:
+    """Soma de valor × (1 + imposto) por unidade, em 10**-(CASAS_VALOR + 6) R$ (mesmas leituras de `processar_servicos`)."""
+    total = 0
+    for svc in servicos or []:
+        try:
+            val = inteiro_escalado(svc.get('valor', 0) or 0, CASAS_VALOR)
+        except Exception:
+            val = 0
+        try:
+            imp = inteiro_escalado(svc.get('imposto_percentual', svc.get('impostos', 0)) or 0, CASAS_PERCENTUAL)
+        except Exception:
+            imp = 0
+        total += val * (ESCALA_PERCENTUAL + imp)
+    return total
+
+
+def _cadeia_divisores(custo_base_c: int, percentuais: Sequence[int]) -> int:
+    """Aplica `÷ (1 − p)` em milésimos de centavo e devolve o preço sem IPI em centavos."""
+    x = custo_base_c * MILICENTAVOS
+    for p4 in percentuais:
+        if _percentual_ativo(p4):
+            x = dividir(x * ESCALA_PERCENTUAL, ESCALA_PERCENTUAL - p4)
+    return dividir(x, MILICENTAVOS)
+
+
+def _preparar_custos(custos_db: Sequence[Dict[str, Any]]) -> List[Tuple[str, float, int, int]]:
+    """Regras de custo adicional válidas como (nome, valor, a_cada, valor em 10**-CASAS_VALOR R$)."""
+    custos = []
+    for custo in custos_db or []:
+        valor = float(custo.get('valor') or 0)
+        a_cada = int(custo.get('a_cada') or 1)
+        if valor <= 0 or a_cada <= 0:
+            continue
+        custos.append((custo.get('nome') or '', valor, a_cada, inteiro_escalado(valor, CASAS_VALOR)))
+    return custos
+
+
+# Último snapshot visto e suas constantes escaladas (o snapshot é imutável e trocado inteiro)
+_constantes_cache: Tuple[Any, Dict[str, Any]] = (None, {})
+
+
+def _constantes(ref) -> Dict[str, Any]:
+    """Impostos e custos adicionais do snapshot já escalados; iguais para todas as cotações do mesmo `ref`."""
+    global _constantes_cache
+    ultimo, constantes = _constantes_cache
+    if ultimo is ref:
+        return constantes
+    impostos = [inteiro_escalado(imp['percentual'], CASAS_PERCENTUAL) for imp in ref.impostos_sem_icms]
+    constantes = {
+        'impostos': impostos,
+        'impostos_total': max(0, sum(impostos)),
+        'custos': _preparar_custos(ref.custos_adicionais),
+    }
+    _constantes_cache = (ref, constantes)
+    return constantes
+
+
+def _entradas(quote, p, ref) -> Dict[str, Any]:
+    """Converte uma cotação resolvida para inteiros escalados."""
+    largura = inteiro_escalado(quote.largura_cm or 0, CASAS_MEDIDA) + inteiro_escalado(p.lateral_effective, CASAS_MEDIDA)
+    constantes = _constantes(ref)
+    return {
+        'quantidade': int(quote.quantidade),
+        'largura': largura,
+        'custo_un': inteiro_escalado(p.custo_un, CASAS_VALOR),
+        'perdas_un': int(p.perdas_calibracao_un or 0),
+        'cordao': inteiro_escalado(p.custo_cordao, CASAS_VALOR) if quote.incluir_cordao and p.custo_cordao > 0 else 0,
+        'silk': inteiro_escalado(p.valor_silk_unit or 0, CASAS_VALOR),
+        'servicos': _servicos_escalados(quote.servicos),
+        'margem': inteiro_escalado(p.margem, CASAS_PERCENTUAL) if p.margem > 0 else 0,
+        'impostos': constantes['impostos'],
+        'impostos_total': constantes['impostos_total'],
+        'comissao': inteiro_escalado(p.comissao, CASAS_PERCENTUAL) if p.comissao > 0 else 0,
+        'icms': inteiro_escalado(p.icms, CASAS_PERCENTUAL) if p.icms > 0 else 0,
+        'ipi': inteiro_escalado(p.ipi_percentual, CASAS_PERCENTUAL),
+    }
+
+
+def _custos_adicionais(quantidade: int, custos: Sequence[Tuple[str, float, int, int]]) -> Tuple[List[Dict[str, Any]], List[int]]:
+    lista, valores = [], []
+    for nome, valor, a_cada, valor_escalado in custos:
+        vezes = max(1, -(-quantidade // a_cada))
+        item_c = dividir(valor_escalado * vezes, 10 ** (CASAS_VALOR - 2))
+        valores.append(item_c)
+        lista.append({
+            'nome': nome,
+            'valor_unitario': valor,
+            'a_cada': a_cada,
+            'quantidade': vezes,
+            'valor_total': item_c / 100,
+        })
+    return lista, valores
+
+
+def custos_adicionais_centavos(quantidade: int, custos_db: Sequence[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """Mesmas regras de `calcular_custos_adicionais`, com o valor de cada item em centavos."""
+    return _custos_adicionais(quantidade, _preparar_custos(custos_db))
+
+
+def valores_centavos(quote, p, ref) -> Dict[str, Any]:
+    """
+    Calcula os valores monetários de uma cotação em centavos inteiros.
+
+    Args:
+        quote: QuoteInput da cotação
+        p: ParametrosCalculo já resolvidos (`resolver_parametros`)
+        ref: ReferenceData usado na resolução
+
+    Returns:
+        Dicionário de inteiros em centavos (cordão unitário em 10⁻⁴ R$) e a
+        lista de custos adicionais no formato do motor
+    """
+    e = _entradas(quote, p, ref)
+    q = e['quantidade']
+    escala_valor = 10 ** CASAS_VALOR
+    escala_medida = 10 ** (CASAS_MEDIDA + 2)   # cm com 2 casas -> metros
+
+    # custo_un (R$/m, 6 casas) × largura (m) -> centavos
+    custo_real = dividir(e['custo_un'] * e['largura'], escala_valor * escala_medida // 100)
+    custo_total = custo_real * q
+    perdas = dividir(e['perdas_un'] * e['custo_un'], escala_valor // 100)
+
+    cordao_unit = dividir(e['cordao'] * e['largura'], escala_valor * escala_medida // 10 ** 4)   # 10⁻⁴ R$
+    cordao_total = dividir(cordao_unit * q, 100)
+
+    custos_lista, custos_itens = _custos_adicionais(q, _constantes(ref)['custos'])
+    custos_total = sum(custos_itens)
+
+    custo_base = custo_total + perdas + cordao_total + custos_total
+    sem_ipi = _cadeia_divisores(custo_base, (e['margem'], e['impostos_total'], e['comissao'], e['icms']))
+    valor_ipi = dividir(sem_ipi * e['ipi'], ESCALA_PERCENTUAL) if e['ipi'] > 0 else 0
+    com_ipi = sem_ipi + valor_ipi
+
+    silk_total = dividir(e['silk'] * q, escala_valor // 100)
+    servicos_total = dividir(e['servicos'] * q, escala_valor * ESCALA_PERCENTUAL // 100)
+    preco_final = com_ipi + silk_total + servicos_total
+
+    valor_margem = dividir(sem_ipi * e['margem'], ESCALA_PERCENTUAL)
+    valor_impostos_sem_icms = dividir(sem_ipi * e['impostos_total'], ESCALA_PERCENTUAL)
+    valor_icms = dividir(sem_ipi * e['icms'], ESCALA_PERCENTUAL)
+    valor_comissao = dividir(sem_ipi * e['comissao'], ESCALA_PERCENTUAL)
+    return {
+        'custo_real': custo_real,
+        'custo_total': custo_total,
+        'perdas_calibracao_valor': perdas,
+        'valor_silk_total': silk_total,
+        'valor_servicos_total': servicos_total,
+        'valor_cordao_unitario': cordao_unit,
+        'valor_cordao_total': cordao_total,
+        'custos_adicionais_lista': custos_lista,
+        'custos_adicionais_total': custos_total,
+        'custo_base': custo_base,
+        'preco_final_produto_sem_ipi': sem_ipi,
+        'preco_final_produto_com_ipi': com_ipi,
+        'valor_ipi': valor_ipi,
+        'valor_margem': valor_margem,
+        'valor_impostos_sem_icms': valor_impostos_sem_icms,
+        'valor_icms': valor_icms,
+        'valor_comissao': valor_comissao,
+        'impostos_valores': [dividir(sem_ipi * p4, ESCALA_PERCENTUAL) for p4 in e['impostos']],
+        'valor_impostos': valor_impostos_sem_icms + valor_icms,
+        'valor_comissao_produto': valor_comissao,
+        'valor_comissao_servicos': dividir((silk_total + servicos_total) * e['comissao'], ESCALA_PERCENTUAL),
+        'preco_final': preco_final,
+        'check': custo_base + valor_margem + valor_impostos_sem_icms + valor_icms + valor_comissao + valor_ipi,
+    }
+
+
+# Campos de `valores_centavos` em centavos (os demais: cordão unitário em 10⁻⁴ R$, listas)
+_CAMPOS_CENTAVOS = (
+    'custo_real', 'custo_total', 'perdas_calibracao_valor', 'valor_silk_total', 'valor_servicos_total',
+    'valor_cordao_total', 'custos_adicionais_total', 'custo_base', 'preco_final_produto_sem_ipi',
+    'preco_final_produto_com_ipi', 'valor_ipi', 'valor_margem', 'valor_impostos_sem_icms', 'valor_icms',
+    'valor_comissao', 'valor_impostos', 'valor_comissao_produto', 'valor_comissao_servicos', 'preco_final', 'check',
+)
+
+
+def valores_monetarios_centavos(quote, p, ref) -> Dict[str, Any]:
+    """`valores_centavos` convertido para reais (float com 2 casas exatas), no formato usado pelo motor."""
+    v = valores_centavos(quote, p, ref)
+    reais = {k: v[k] / 100 for k in _CAMPOS_CENTAVOS}
+    reais['valor_cordao_unitario'] = v['valor_cordao_unitario'] / 10 ** 4
+    reais['custos_adicionais_lista'] = v['custos_adicionais_lista']
+    reais['impostos_valores'] = [c / 100 for c in v['impostos_valores']]
+    return reais
+
+
+def _dividir_array(numerador: np.ndarray, denominador: Any) -> np.ndarray:
+    """`dividir` vetorizado para arrays int64 (denominador escalar ou array positivo)."""
+    q, r = np.divmod(np.abs(numerador), denominador)
+    q = q + (2 * r >= denominador)
+    return np.where(numerador >= 0, q, -q)
+
+
+_MAX_INT64 = 2 ** 63 - 1
+# Acima disso a conversão int64 -> float64 deixa de ser exata (e `/ 100` deixaria de bater com o escalar)
+_MAX_EXATO_FLOAT = 2 ** 53
+
+
+def _maior(valores: Any) -> int:
+    return int(np.abs(np.asarray(valores)).max())
+
+
+def _cabe(*fatores: Any) -> bool:
+    """O produto dos maiores valores absolutos cabe em int64 (logo, o produto elemento a elemento também)."""
+    total = 1
+    for fator in fatores:
+        total *= _maior(fator)
+    return total <= _MAX_INT64
+
+
+def _valores_lote_int64(ent: List[Dict[str, Any]], constantes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Todos os valores de `valores_centavos` para um lote, em arrays int64.
+
+    Devolve None quando algum produto intermediário pode passar de int64 (o
+    chamador refaz o lote com inteiros do Python).
+    """
+    n = len(ent)
+
+    def col(nome):
+        return np.fromiter((x[nome] for x in ent), dtype=np.int64, count=n)
+
+    try:
+        q = col('quantidade')
+        largura = col('largura')
+        custo_un = col('custo_un')
+        perdas_un = col('perdas_un')
+        cordao = col('cordao')
+        silk = col('silk')
+        percentuais = {nome: col(nome) for nome in ('margem', 'impostos_total', 'comissao', 'icms', 'ipi')}
+        # Serviços já vêm em 10⁻¹² R$; a multiplicação por q pode passar de int64, então fica em inteiros do Python
+        servicos_total = np.fromiter(
+            (dividir(x['servicos'] * x['quantidade'], 10 ** CASAS_VALOR * ESCALA_PERCENTUAL // 100) for x in ent),
+            dtype=np.int64, count=n,
+        )
+    except OverflowError:
+        return None
+
+    escala_valor = 10 ** CASAS_VALOR
+    escala_medida = 10 ** (CASAS_MEDIDA + 2)
+    if not (_cabe(custo_un, largura) and _cabe(perdas_un, custo_un) and _cabe(cordao, largura) and _cabe(silk, q)):
+        return None
+    custo_real = _dividir_array(custo_un * largura, escala_valor * escala_medida // 100)
+    cordao_unit = _dividir_array(cordao * largura, escala_valor * escala_medida // 10 ** 4)
+    if not (_cabe(custo_real, q) and _cabe(cordao_unit, q)):
+        return None
+    custo_total = custo_real * q
+    perdas = _dividir_array(perdas_un * custo_un, escala_valor // 100)
+    cordao_total = _dividir_array(cordao_unit * q, 100)
+
+    # Custos adicionais dependem só da quantidade: calculados uma vez por quantidade distinta
+    por_quantidade = {qi: _custos_adicionais(qi, constantes['custos']) for qi in set(q.tolist())}
+    listas = [por_quantidade[qi][0] for qi in q.tolist()]
+    totais = {qi: sum(valores) for qi, (_, valores) in por_quantidade.items()}
+    custos_total = np.fromiter((totais[qi] for qi in q.tolist()), dtype=np.int64, count=n)
+
+    custo_base = custo_total + perdas + cordao_total + custos_total
+
+    # Cadeia de divisores em milésimos de centavo; cada coluna só divide onde o percentual está ativo
+    x = custo_base * MILICENTAVOS
+    for nome in ('margem', 'impostos_total', 'comissao', 'icms'):
+        p4 = percentuais[nome]
+        ativo = (p4 > 0) & (p4 < ESCALA_PERCENTUAL)
+        if not ativo.any():
+            continue
+        if _maior(x) > LIMITE_MILICENTAVOS_INT64:
+            return None
+        x = np.where(ativo, _dividir_array(x * ESCALA_PERCENTUAL, np.where(ativo, ESCALA_PERCENTUAL - p4, 1)), x)
+    sem_ipi = _dividir_array(x, MILICENTAVOS)
+
+    fatores = [percentuais[nome] for nome in ('margem', 'impostos_total', 'comissao', 'icms', 'ipi')] + constantes['impostos']
+    if not all(_cabe(sem_ipi, f) for f in fatores):
+        return None
+    silk_total = _dividir_array(silk * q, escala_valor // 100)
+    servicos_fora = silk_total + servicos_total
+    if not _cabe(servicos_fora, percentuais['comissao']):
+        return None
+
+    def parcela(base, p4):
+        return _dividir_array(base * p4, ESCALA_PERCENTUAL)
+
+    ipi = percentuais['ipi']
+    valor_ipi = np.where(ipi > 0, parcela(sem_ipi, ipi), 0)
+    com_ipi = sem_ipi + valor_ipi
+    valor_margem = parcela(sem_ipi, percentuais['margem'])
+    valor_impostos_sem_icms = parcela(sem_ipi, percentuais['impostos_total'])
+    valor_icms = parcela(sem_ipi, percentuais['icms'])
+    valor_comissao = parcela(sem_ipi, percentuais['comissao'])
+    colunas = {
+        'custo_real': custo_real,
+        'custo_total': custo_total,
+        'perdas_calibracao_valor': perdas,
+        'valor_silk_total': silk_total,
+        'valor_servicos_total': servicos_total,
+        'valor_cordao_unitario': cordao_unit,
+        'valor_cordao_total': cordao_total,
+        'custos_adicionais_total': custos_total,
+        'custo_base': custo_base,
+        'preco_final_produto_sem_ipi': sem_ipi,
+        'preco_final_produto_com_ipi': com_ipi,
+        'valor_ipi': valor_ipi,
+        'valor_margem': valor_margem,
+        'valor_impostos_sem_icms': valor_impostos_sem_icms,
+        'valor_icms': valor_icms,
+        'valor_comissao': valor_comissao,
+        'valor_impostos': valor_impostos_sem_icms + valor_icms,
+        'valor_comissao_produto': valor_comissao,
+        'valor_comissao_servicos': parcela(servicos_fora, percentuais['comissao']),
+        'preco_final': com_ipi + servicos_fora,
+        'check': custo_base + valor_margem + valor_impostos_sem_icms + valor_icms + valor_comissao + valor_ipi,
+    }
+    colunas['impostos_valores'] = [parcela(sem_ipi, p4) for p4 in constantes['impostos']]
+    colunas['custos_adicionais_lista'] = listas
+    return colunas
+
+
+def precos_centavos_lote(quotes: Sequence[Any], parametros: Sequence[Any], ref) -> Dict[str, np.ndarray]:
+    """
+    Preço sem IPI, IPI e preço final (centavos) de várias cotações em arrays int64.
+
+    Mesma política de `valores_centavos`; só a conversão das entradas é feita
+    item a item, o cálculo é vetorizado.
+
+    Returns:
+        Dicionário com arrays int64 custo_base, preco_final_produto_sem_ipi, valor_ipi e preco_final
+    """
+    ent = [_entradas(qt, p, ref) for qt, p in zip(quotes, parametros)]
+    nomes = ('custo_base', 'preco_final_produto_sem_ipi', 'valor_ipi', 'preco_final')
+    colunas = _valores_lote_int64(ent, _constantes(ref)) if ent else None
+    if colunas is None:
+        # Fora da faixa segura de int64 (ou lote vazio): inteiros do Python
+        valores = [valores_centavos(qt, p, ref) for qt, p in zip(quotes, parametros)]
+        return {nome: np.array([v[nome] for v in valores], dtype=object) for nome in nomes}
+    return {nome: colunas[nome] for nome in nomes}
+
+
+def valores_monetarios_centavos_lote(quotes: Sequence[Any], parametros: Sequence[Any], ref) -> List[Dict[str, Any]]:
+    """
+    `valores_monetarios_centavos` de várias cotações, calculado em arrays int64.
+
+    Resultado idêntico ao escalar item a item; lotes fora da faixa segura de
+    int64 são calculados pelo caminho escalar.
+    """
+    ent = [_entradas(qt, p, ref) for qt, p in zip(quotes, parametros)]
+    colunas = _valores_lote_int64(ent, _constantes(ref)) if ent else None
+    if colunas is None or _maior(colunas['custo_base']) >= _MAX_EXATO_FLOAT or _maior(colunas['preco_final']) >= _MAX_EXATO_FLOAT:
+        return [valores_monetarios_centavos(qt, p, ref) for qt, p in zip(quotes, parametros)]
+
+    nomes = _CAMPOS_CENTAVOS + ('valor_cordao_unitario',)
+    linhas = zip(
+        *[(colunas[k] / 100).tolist() for k in _CAMPOS_CENTAVOS],
+        (colunas['valor_cordao_unitario'] / 10 ** 4).tolist(),
+    )
+    impostos = list(zip(*[(c / 100).tolist() for c in colunas['impostos_valores']])) or [()] * len(ent)
+    resultado = []
+    for linha, lista, imp in zip(linhas, colunas['custos_adicionais_lista'], impostos):
+        reais = dict(zip(nomes, linha))
+        # As listas são compartilhadas entre itens de mesma quantidade: cada resultado recebe a sua
+        reais['custos_adicionais_lista'] = [dict(c) for c in lista]
+        reais['impostos_valores'] = list(imp)
+        resultado.append(reais)
+    return resultado
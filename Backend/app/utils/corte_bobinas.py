@@ -0,0 +1,235 @@
+"""
+Otimizador de corte de bobinas para lotes com vários modelos de sacola.
+
+`calcular_aproveitamento` encaixa um único modelo por bobina
+(`altura_bobina // altura_unitaria`) e a sobra de cada bobina se perde. Aqui
+os modelos de um mesmo pedido (mesma gramatura) são combinados na mesma
+bobina: é o problema clássico de corte unidimensional (cutting stock).
+
+Heurística sequencial (SHP): a cada passo escolhe o padrão de corte que mais
+aproveita a altura da bobina com a demanda restante (subset-sum limitado,
+exato, em bitset de inteiros do Python com divisão binária das quantidades),
+e repete esse padrão o máximo possível sem produzir a mais. Ao estourar o
+tempo limite, o restante é resolvido por padrões homogêneos + first-fit
+decreasing. As alturas são discretizadas em milímetros (arredondando a peça
+para cima e a bobina para baixo), então todo padrão cabe de fato na bobina.
+"""
+
+import math
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+RESOLUCAO_POR_CM = 10          # milímetros
+TEMPO_LIMITE_PADRAO_MS = 500
+MAX_TIPOS = 1000
+
+
+class CorteInputError(ValueError):
+    """Itens ou bobina inválidos para o otimizador (mapeado para HTTP 400 nas rotas)."""
+
+
+def altura_unitaria_cm(altura_cm: float, fundo_cm: Optional[float], incluir_alca: bool, tamanho_alca: float) -> float:
+    """Altura consumida por unidade na bobina: frente + verso + fundo + alça (mesma regra de `calcular_aproveitamento`)."""
+    altura = float(altura_cm) * 2.0 + float(fundo_cm or 0)
+    if incluir_alca:
+        altura += float(tamanho_alca or 0)
+    return altura
+
+
+def _melhor_padrao(pesos: Sequence[int], restantes: Sequence[int], capacidade: int) -> List[int]:
+    """
+    Padrão que mais preenche `capacidade` sem ultrapassar a demanda restante.
+
+    Subset-sum limitado: cada tipo entra em peças de 1, 2, 4... unidades e o
+    conjunto de alturas alcançáveis é um bitset (int). A reconstrução volta
+    pelos bitsets intermediários.
+    """
+    pecas: List[Tuple[int, int, int]] = []
+    for i, (peso, resto) in enumerate(zip(pesos, restantes)):
+        m = min(resto, capacidade // peso)
+        k = 1
+        while m > 0:
+            t = min(k, m)
+            pecas.append((i, t, t * peso))
+            m -= t
+            k *= 2
+
+    mascara = (1 << (capacidade + 1)) - 1
+    alcance = 1
+    historico = []
+    for _, _, peso in pecas:
+        historico.append(alcance)
+        alcance = (alcance | (alcance << peso)) & mascara
+        if alcance >> capacidade:
+            break   # bobina preenchida por completo
+
+    alvo = alcance.bit_length() - 1
+    contagem = [0] * len(pesos)
+    for k in range(len(historico) - 1, -1, -1):
+        if not (historico[k] >> alvo) & 1:
+            i, t, peso = pecas[k]
+            contagem[i] += t
+            alvo -= peso
+    return contagem
+
+
+def _completar_guloso(pesos: Sequence[int], restantes: List[int], capacidade: int) -> List[Tuple[Tuple[int, ...], int]]:
+    """Padrões homogêneos para o grosso da demanda e first-fit decreasing para o resíduo."""
+    padroes = []
+    n = len(pesos)
+    for i, peso in enumerate(pesos):
+        por_bobina = capacidade // peso
+        vezes = restantes[i] // por_bobina
+        if vezes:
+            padrao = [0] * n
+            padrao[i] = por_bobina
+            padroes.append((tuple(padrao), vezes))
+            restantes[i] -= vezes * por_bobina
+
+    bobinas: List[List[int]] = []   # [livre, contagens...]
+    for i in sorted(range(n), key=lambda j: -pesos[j]):
+        for _ in range(restantes[i]):
+            for b in bobinas:
+                if b[0] >= pesos[i]:
+                    b[0] -= pesos[i]
+                    b[1 + i] += 1
+                    break
+            else:
+                nova = [capacidade - pesos[i]] + [0] * n
+                nova[1 + i] = 1
+                bobinas.append(nova)
+        restantes[i] = 0
+    padroes.extend((tuple(b[1:]), 1) for b in bobinas)
+    return padroes
+
+
+def otimizar_corte(
+    itens: Sequence[Dict[str, Any]],
+    altura_bobina_cm: float,
+    tempo_limite_ms: float = TEMPO_LIMITE_PADRAO_MS,
+) -> Dict[str, Any]:
+    """
+    Monta os padrões de corte que atendem a demanda com o mínimo de bobinas.
+
+    Args:
+        itens: Lista de {'altura_unitaria_cm', 'quantidade', 'nome'?} (altura já com verso, fundo e alça)
+        altura_bobina_cm: Altura útil da bobina da gramatura
+        tempo_limite_ms: Tempo máximo da busca; o restante é completado de forma gulosa
+
+    Returns:
+        Dicionário com padrões (repetições e peças por item), total de bobinas,
+        limite inferior, comparação com um modelo por bobina e métricas
+
+    Raises:
+        CorteInputError: bobina sem altura, item sem quantidade ou que não cabe na bobina
+    """
+    inicio = time.perf_counter()
+    if not altura_bobina_cm or altura_bobina_cm <= 0:
+        raise CorteInputError('Gramatura sem altura de bobina cadastrada.')
+    if not itens:
+        raise CorteInputError('Informe ao menos um item.')
+    if len(itens) > MAX_TIPOS:
+        raise CorteInputError(f'Máximo de {MAX_TIPOS} itens por otimização.')
+    capacidade = int(math.floor(altura_bobina_cm * RESOLUCAO_POR_CM + 1e-9))
+
+    # Itens com a mesma altura são intercambiáveis no corte: agrupa por altura discretizada
+    grupos: Dict[int, List[int]] = {}
+    for idx, item in enumerate(itens):
+        altura = float(item['altura_unitaria_cm'])
+        quantidade = int(item['quantidade'])
+        if altura <= 0 or quantidade <= 0:
+            raise CorteInputError(f'Item {idx}: altura e quantidade devem ser maiores que zero.')
+        peso = int(math.ceil(altura * RESOLUCAO_POR_CM - 1e-9))
+        if peso > capacidade:
+            raise CorteInputError(f'Item {idx}: altura unitária {altura:.1f} cm maior que a bobina ({altura_bobina_cm:.1f} cm).')
+        grupos.setdefault(peso, []).append(idx)
+
+    pesos = sorted(grupos, reverse=True)
+    demanda = [sum(int(itens[i]['quantidade']) for i in grupos[p]) for p in pesos]
+    restantes = list(demanda)
+    # Teto inteiro: com quantidades grandes a divisão em float perde precisão e erra o limite
+    limite_inferior = -(-sum(p * d for p, d in zip(pesos, demanda)) // capacidade)
+
+    prazo = inicio + max(0.0, float(tempo_limite_ms)) / 1000.0
+    padroes: List[Tuple[Tuple[int, ...], int]] = []
+    iteracoes = 0
+    guloso = False
+    while any(restantes):
+        if time.perf_counter() > prazo:
+            padroes.extend(_completar_guloso(pesos, restantes, capacidade))
+            guloso = True
+            break
+        padrao = _melhor_padrao(pesos, restantes, capacidade)
+        vezes = min(restantes[i] // c for i, c in enumerate(padrao) if c)
+        padroes.append((tuple(padrao), vezes))
+        for i, c in enumerate(padrao):
+            restantes[i] -= c * vezes
+        iteracoes += 1
+
+    # Padrões repetidos (mesmas contagens) viram uma linha só
+    agregados: Dict[Tuple[int, ...], int] = {}
+    for padrao, vezes in padroes:
+        agregados[padrao] = agregados.get(padrao, 0) + vezes
+
+    # Distribui as peças de cada grupo entre os itens originais, na ordem do pedido
+    pendentes = {p: [[i, int(itens[i]['quantidade'])] for i in grupos[p]] for p in pesos}
+    saida_padroes = []
+    total_bobinas = 0
+    for padrao, vezes in sorted(agregados.items(), key=lambda kv: -kv[1]):
+        utilizado = sum(c * p for c, p in zip(padrao, pesos))
+        pecas = []
+        for g, c in enumerate(padrao):
+            if not c:
+                continue
+            pecas.append({
+                'altura_unitaria_cm': pesos[g] / RESOLUCAO_POR_CM,
+                'quantidade_por_bobina': c,
+                'itens': _consumir(pendentes[pesos[g]], c * vezes),
+            })
+        saida_padroes.append({
+            'repeticoes': vezes,
+            'pecas': pecas,
+            'utilizado_cm': utilizado / RESOLUCAO_POR_CM,
+            'sobra_cm': (capacidade - utilizado) / RESOLUCAO_POR_CM,
+            'aproveitamento_percentual': round(utilizado / capacidade * 100, 2),
+        })
+        total_bobinas += vezes
+
+    # Referência: cada modelo cortado sozinho (como o cálculo por item faz hoje)
+    bobinas_um_modelo = sum(
+        -(-int(item['quantidade']) // (capacidade // int(math.ceil(float(item['altura_unitaria_cm']) * RESOLUCAO_POR_CM - 1e-9))))
+        for item in itens
+    )
+    usado_total = sum(p * d for p, d in zip(pesos, demanda))
+    return {
+        'altura_bobina_cm': float(altura_bobina_cm),
+        'total_bobinas': total_bobinas,
+        'limite_inferior_bobinas': limite_inferior,
+        'bobinas_um_modelo_por_bobina': bobinas_um_modelo,
+        'economia_bobinas': bobinas_um_modelo - total_bobinas,
+        'aproveitamento_percentual': round(usado_total / (total_bobinas * capacidade) * 100, 2) if total_bobinas else None,
+        'sobra_total_cm': (total_bobinas * capacidade - usado_total) / RESOLUCAO_POR_CM,
+        'padroes': saida_padroes,
+        'metricas': {
+            'tipos_de_altura': len(pesos),
+            'iteracoes': iteracoes,
+            'completado_guloso': guloso,
+            'tempo_ms': round((time.perf_counter() - inicio) * 1000, 2),
+        },
+    }
+
+
+def _consumir(pendentes: List[List[int]], quantidade: int) -> List[Dict[str, int]]:
+    """Retira `quantidade` peças dos itens pendentes de um grupo, em ordem, e diz quantas saíram de cada item."""
+    usados = []
+    while quantidade > 0 and pendentes:
+        idx, resto = pendentes[0]
+        tirar = min(resto, quantidade)
+        usados.append({'indice': idx, 'quantidade': tirar})
+        quantidade -= tirar
+        if tirar == resto:
+            pendentes.pop(0)
+        else:
+            pendentes[0][1] -= tirar
+    return usados
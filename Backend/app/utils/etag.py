@@ -0,0 +1,120 @@
+"""
+ETag forte e GET condicional para as rotas de cadastro.
+
+O ETag é o hash do corpo JSON (jsonify ordena as chaves, então o mesmo
+conteúdo gera o mesmo ETag em qualquer worker). Cada worker memoriza o último
+ETag por tabela e URL junto com a geração da tabela (`app.utils.geracoes`,
+compartilhada entre os workers): um `If-None-Match` igual ao memorizado
+recebe 304 sem consultar o banco enquanto a geração for a mesma. Uma escrita
+em qualquer worker incrementa a geração (`marcar_desatualizada`), então a
+próxima requisição em todos eles lê o banco. ETAG_REVALIDACAO_S limita a
+memória para escritas feitas fora da aplicação.
+"""
+
+import functools
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple
+
+from flask import make_response, request
+
+from app.utils.ambiente import apos_fork, env_float
+from app.utils.geracoes import atual
+
+
+REVALIDACAO_PADRAO_S = 60.0
+
+# Cache-Control por recurso; no-cache = o cliente sempre revalida (304 barato), então
+# uma edição aparece na próxima tela. Sobrescrever com CACHE_CONTROL_<RECURSO>.
+POLITICAS_CACHE: Dict[str, str] = {
+    'gramaturas': 'public, no-cache',
+    'impostos_fixos': 'public, no-cache',
+    'servicos': 'public, no-cache',
+    'custos_adicionais': 'public, no-cache',
+    'sacolas_lote': 'public, no-cache',
+    'configuracoes': 'private, no-cache',
+    'bootstrap': 'private, no-cache',
+}
+
+_lock = threading.Lock()
+# (tabela, URL) -> (etag, válido até [monotonic], geração da tabela quando o corpo foi lido)
+_memo: Dict[Tuple[str, str], Tuple[str, float, int]] = {}
+_estado = {'respostas_200': 0, 'respostas_304': 0, 'respostas_304_sem_consulta': 0}
+
+
+def revalidacao_s() -> float:
+    return env_float('ETAG_REVALIDACAO_S', REVALIDACAO_PADRAO_S)
+
+
+def politica_cache(recurso: str) -> str:
+    return os.environ.get(f'CACHE_CONTROL_{recurso.upper()}') or POLITICAS_CACHE.get(recurso, 'no-cache')
+
+
+def etag_conteudo(corpo: bytes) -> str:
+    return hashlib.sha256(corpo).hexdigest()[:32]
+
+
+def invalidar_etags(*tabelas: str) -> None:
+    """Esquece os ETags memorizados das tabelas (chamar após escrever nelas)."""
+    with _lock:
+        for chave in [k for k in _memo if k[0] in tabelas]:
+            del _memo[chave]
+
+
+def condicional(tabela: str, recurso: str) -> Callable:
+    """
+    Decorator de rota GET: ETag forte, Cache-Control do recurso e 304 para If-None-Match.
+
+    Args:
+        tabela: Tabela de origem do corpo (a que as escritas invalidam)
+        recurso: Nome da política em POLITICAS_CACHE
+    """
+    def decorador(view: Callable) -> Callable:
+        @functools.wraps(view)
+        def wrapper(*args: Any, **kwargs: Any):
+            politica = politica_cache(recurso)
+            chave = (tabela, request.full_path)
+            # Sem a geração (arquivo inacessível) não há 304 sem consulta
+            geracao = atual(tabela)
+            with _lock:
+                memo = _memo.get(chave)
+            if (
+                memo and geracao is not None and memo[2] == geracao and memo[1] > time.monotonic()
+                and request.if_none_match.contains(memo[0])
+            ):
+                resp = make_response('', 304)
+                resp.set_etag(memo[0])
+                resp.headers['Cache-Control'] = politica
+                _estado['respostas_304'] += 1
+                _estado['respostas_304_sem_consulta'] += 1
+                return resp
+
+            resp = make_response(view(*args, **kwargs))
+            if resp.status_code != 200:
+                return resp
+            etag = etag_conteudo(resp.get_data())
+            resp.set_etag(etag)
+            resp.headers['Cache-Control'] = politica
+            # Escrita durante a leitura (em qualquer worker): o corpo pode ser anterior a ela, não memoriza
+            if geracao is not None and atual(tabela) == geracao:
+                with _lock:
+                    _memo[chave] = (etag, time.monotonic() + revalidacao_s(), geracao)
+            resp.make_conditional(request)
+            _estado['respostas_304' if resp.status_code == 304 else 'respostas_200'] += 1
+            return resp
+        return wrapper
+    return decorador
+
+
+def etag_stats() -> Dict[str, Any]:
+    with _lock:
+        memorizados = len(_memo)
+    return {**_estado, 'memorizados': memorizados, 'revalidacao_s': revalidacao_s()}
+
+
+@apos_fork
+def _reiniciar_apos_fork() -> None:
+    global _lock
+    _lock = threading.Lock()
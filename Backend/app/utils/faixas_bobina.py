@@ -0,0 +1,250 @@
+"""
+Planejamento de faixas (slitting) na largura da bobina.
+
+Generaliza o `cortar_tecido` (bobina cortada ao meio): a largura útil da bobina
+é dividida em N faixas, de larguras iguais ou mistas, cada uma com a largura
+de uma sacola (`largura_cm + 2·lateral`). O refilo (sobra lateral) é rateado
+entre as faixas na proporção da largura, então a largura efetivamente paga
+por unidade é `largura × largura_bobina / largura_utilizada`; menos refilo
+significa menor custo por unidade para todas as faixas ao mesmo tempo.
+
+A busca enumera as combinações maximais (em que não cabe mais nenhuma faixa)
+em profundidade, da maior largura para a menor, e poda um ramo quando nem o
+melhor encaixe possível com as larguras restantes (subset-sum ilimitado, em
+bitset) alcança o pior refilo já guardado entre os `top` melhores padrões.
+As larguras são discretizadas em milímetros (faixa arredondada para cima,
+bobina para baixo).
+"""
+
+import bisect
+import heapq
+import math
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+
+RESOLUCAO_POR_CM = 10
+MAX_FAIXAS_PADRAO = 20
+TOP_PADRAO = 10
+MAX_LARGURAS = 500
+MAX_NOS = 2_000_000
+# Limites de entrada: os bitsets têm um bit por mm da bobina e a pilha da busca uma entrada por faixa
+MAX_LARGURA_BOBINA_CM = 1000
+MAX_FAIXAS = 200
+
+
+class FaixasInputError(ValueError):
+    """Larguras ou bobina inválidas para o planejamento (mapeado para HTTP 400 nas rotas)."""
+
+
+def _mm(largura_cm: float, para_cima: bool) -> int:
+    if not math.isfinite(float(largura_cm)):
+        raise FaixasInputError('Larguras devem ser números finitos.')
+    escalado = float(largura_cm) * RESOLUCAO_POR_CM
+    return int(math.ceil(escalado - 1e-9)) if para_cima else int(math.floor(escalado + 1e-9))
+
+
+def _alcance_com(alcance: int, peso: int, mascara: int) -> int:
+    """Fecha o bitset `alcance` sob a soma de quantidades livres de `peso`."""
+    while True:
+        novo = (alcance | (alcance << peso)) & mascara
+        if novo == alcance:
+            return alcance
+        alcance = novo
+
+
+def faixa_unica(largura_bobina_cm: float, largura_faixa_cm: float, max_faixas: int = MAX_FAIXAS_PADRAO) -> Dict[str, Any]:
+    """
+    Quantas faixas de uma mesma largura cabem na bobina e a largura efetiva por unidade.
+
+    Raises:
+        FaixasInputError: largura da faixa maior que a bobina ou valores não positivos ou não finitos
+    """
+    capacidade = _mm(largura_bobina_cm, False)
+    peso = _mm(largura_faixa_cm, True)
+    if capacidade <= 0 or peso <= 0:
+        raise FaixasInputError('Largura da bobina e da sacola devem ser maiores que zero.')
+    faixas = min(capacidade // peso, max_faixas)
+    if faixas == 0:
+        raise FaixasInputError(
+            f'Largura da sacola ({largura_faixa_cm:.1f} cm) maior que a largura da bobina ({largura_bobina_cm:.1f} cm).'
+        )
+    utilizado = faixas * peso
+    return {
+        'largura_bobina_cm': float(largura_bobina_cm),
+        'largura_faixa_cm': peso / RESOLUCAO_POR_CM,
+        'faixas': faixas,
+        'utilizado_cm': utilizado / RESOLUCAO_POR_CM,
+        'refilo_cm': (capacidade - utilizado) / RESOLUCAO_POR_CM,
+        'largura_efetiva_cm': round(float(largura_bobina_cm) / faixas, 4),
+    }
+
+
+def planejar_faixas(
+    largura_bobina_cm: float,
+    larguras_cm: Sequence[float],
+    max_faixas: int = MAX_FAIXAS_PADRAO,
+    top: int = TOP_PADRAO,
+    custo_metro: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Lista os melhores padrões de faixas (menor refilo) para um catálogo de larguras.
+
+    Args:
+        largura_bobina_cm: Largura útil da bobina
+        larguras_cm: Larguras das sacolas (já com 2 × lateral)
+        max_faixas: Máximo de faixas por padrão
+        top: Quantos padrões devolver
+        custo_metro: Preço por metro da gramatura (opcional) para o custo de material por unidade
+
+    Returns:
+        Dicionário com os padrões ordenados por refilo e métricas da busca
+
+    Raises:
+        FaixasInputError: bobina sem largura, larga demais ou não finita, catálogo vazio,
+            max_faixas acima do limite ou nenhuma largura cabe na bobina
+    """
+    inicio = time.perf_counter()
+    capacidade = _mm(largura_bobina_cm or 0, False)
+    if capacidade <= 0:
+        raise FaixasInputError('Informe largura_bobina_cm maior que zero.')
+    if capacidade > MAX_LARGURA_BOBINA_CM * RESOLUCAO_POR_CM:
+        raise FaixasInputError(f'largura_bobina_cm deve ser no máximo {MAX_LARGURA_BOBINA_CM} cm.')
+    if int(max_faixas) > MAX_FAIXAS:
+        raise FaixasInputError(f'max_faixas deve ser no máximo {MAX_FAIXAS}.')
+    if not larguras_cm:
+        raise FaixasInputError('Informe ao menos uma largura.')
+    if len(larguras_cm) > MAX_LARGURAS:
+        raise FaixasInputError(f'Máximo de {MAX_LARGURAS} larguras por planejamento.')
+    if any(float(l) <= 0 for l in larguras_cm):
+        raise FaixasInputError('Larguras devem ser maiores que zero.')
+
+    pesos = sorted({_mm(l, True) for l in larguras_cm if _mm(l, True) <= capacidade}, reverse=True)
+    if not pesos:
+        raise FaixasInputError('Nenhuma largura cabe na bobina.')
+    top = max(1, int(top))
+    max_faixas = max(1, int(max_faixas))
+    menor = pesos[-1]
+    k = len(pesos)
+    # sufixo[i]: somas alcançáveis só com as larguras de i em diante (menores ou iguais a pesos[i])
+    mascara = (1 << (capacidade + 1)) - 1
+    sufixo = [1] * (k + 1)
+    for i in range(k - 1, -1, -1):
+        sufixo[i] = _alcance_com(sufixo[i + 1], pesos[i], mascara)
+
+    melhores: List = []     # heap de (-refilo, distintas*-1, faixas, contagens)
+    contagem = [0] * k
+    estat = {'nos': 0, 'podas': 0, 'padroes_avaliados': 0, 'truncado': False}
+
+    def pior():
+        """(refilo, larguras distintas) do pior padrão guardado, quando o top já está cheio."""
+        return (-melhores[0][0], -melhores[0][1]) if len(melhores) >= top else None
+
+    def avaliar(resto: int, faixas: int):
+        estat['padroes_avaliados'] += 1
+        distintas = sum(1 for c in contagem if c)
+        chave = (-resto, -distintas, faixas, tuple(contagem))
+        if len(melhores) < top:
+            heapq.heappush(melhores, chave)
+        elif chave > melhores[0]:
+            heapq.heapreplace(melhores, chave)
+
+    negativos = [-p for p in pesos]
+    # Busca em profundidade com pilha explícita (a profundidade chega a max_faixas).
+    # Cada quadro é [resto, faixas, distintas, j]: j é a próxima largura a tentar ou,
+    # enquanto há um filho na pilha, a largura que o filho acrescentou.
+    pilha: List[List[int]] = []
+
+    def entrar(i: int, resto: int, faixas: int, distintas: int):
+        """Visita o nó; se ainda couber faixa de largura pesos[j], j >= i, empilha o quadro."""
+        estat['nos'] += 1
+        if estat['nos'] > MAX_NOS:
+            estat['truncado'] = True
+            return
+        # Só padrões maximais: se ainda coubesse uma faixa, o padrão seria dominado
+        if faixas == max_faixas or resto < menor:
+            avaliar(resto, faixas)
+            return
+        j = bisect.bisect_left(negativos, -resto, lo=i)
+        if j == k:
+            # Nenhuma das larguras restantes cabe (as anteriores são ainda maiores)
+            avaliar(resto, faixas)
+            return
+        pilha.append([resto, faixas, distintas, j])
+
+    def desempilhar():
+        pilha.pop()
+        if pilha:
+            # Volta ao pai: desfaz a faixa do filho e segue para a próxima largura
+            contagem[pilha[-1][3]] -= 1
+            pilha[-1][3] += 1
+
+    entrar(0, capacidade, 0, 0)
+    while pilha and not estat['truncado']:
+        quadro = pilha[-1]
+        resto, faixas, distintas, j = quadro
+        if j == k:
+            desempilhar()
+            continue
+        # Limite inferior do refilo com as larguras de j em diante (ignora o limite de faixas);
+        # no empate de refilo, o ramo só interessa se ainda puder usar menos larguras distintas
+        limite = pior()
+        novas = distintas + (0 if contagem[j] else 1)
+        if limite is not None:
+            refilo_min = resto - ((sufixo[j] & ((1 << (resto + 1)) - 1)).bit_length() - 1)
+            if (refilo_min, novas) >= limite and (refilo_min > limite[0] or contagem[j] == 0):
+                # sufixo[j] só encolhe com j e toda largura seguinte ainda não foi usada
+                # (soma uma distinta): nenhuma delas melhora o pior padrão guardado
+                estat['podas'] += k - j
+                desempilhar()
+                continue
+            if (refilo_min, novas) >= limite:
+                estat['podas'] += 1
+                quadro[3] = j + 1
+                continue
+        contagem[j] += 1
+        profundidade = len(pilha)
+        entrar(j, resto - pesos[j], faixas + 1, novas)
+        if len(pilha) == profundidade:
+            # Folha (ou busca truncada): o filho não ficou na pilha
+            contagem[j] -= 1
+            quadro[3] = j + 1
+
+    padroes = []
+    for neg_refilo, _, faixas, cont in sorted(melhores, reverse=True):
+        utilizado = capacidade + neg_refilo
+        fator = capacidade / utilizado
+        itens = []
+        for peso, c in zip(pesos, cont):
+            if not c:
+                continue
+            largura = peso / RESOLUCAO_POR_CM
+            efetiva = largura * fator
+            item = {
+                'largura_cm': largura,
+                'faixas': c,
+                'largura_efetiva_cm': round(efetiva, 4),
+            }
+            if custo_metro is not None:
+                item['custo_material_unitario'] = round(float(custo_metro) * efetiva / 100, 4)
+            itens.append(item)
+        padroes.append({
+            'faixas': itens,
+            'total_faixas': faixas,
+            'utilizado_cm': utilizado / RESOLUCAO_POR_CM,
+            'refilo_cm': -neg_refilo / RESOLUCAO_POR_CM,
+            'aproveitamento_percentual': round(utilizado / capacidade * 100, 2),
+        })
+
+    return {
+        'largura_bobina_cm': float(largura_bobina_cm),
+        'padroes': padroes,
+        'metricas': {
+            'larguras_distintas': k,
+            'nos_visitados': estat['nos'],
+            'podas': estat['podas'],
+            'padroes_avaliados': estat['padroes_avaliados'],
+            'truncado': estat['truncado'],
+            'tempo_ms': round((time.perf_counter() - inicio) * 1000, 2),
+        },
+    }
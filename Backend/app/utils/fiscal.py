@@ -0,0 +1,79 @@
+"""
+Tabela fiscal de ICMS compilada a partir da tabela `icms_estados`.
+
+As alíquotas internas por UF são lidas uma vez (junto com os demais dados de
+referência) e a matriz origem × destino × IE é pré-calculada com as regras de
+`determinar_icms`, de modo que cada cotação faz apenas uma consulta a dicionário.
+Sem linhas no banco (ou para UFs ausentes), valem as alíquotas padrão de
+`ICMS_CONSUMIDOR_FINAL`.
+"""
+
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from app.utils.price_calculator import ICMS_CONSUMIDOR_FINAL, determinar_icms
+
+
+ESTADO_EMPRESA_PADRAO = 'SP'
+
+
+def estado_empresa_configurado() -> str:
+    """UF de origem das vendas (variável ESTADO_EMPRESA, padrão 'SP')."""
+    return (os.environ.get('ESTADO_EMPRESA') or ESTADO_EMPRESA_PADRAO).strip().upper()
+
+
+@dataclass(frozen=True)
+class TabelaFiscal:
+    """
+    Alíquotas de ICMS por UF e matriz pré-calculada origem × destino × IE.
+
+    Use `TabelaFiscal.from_rows` para montar a partir das linhas de `icms_estados`.
+    """
+    aliquotas: Dict[str, float]
+    estado_empresa: str = ESTADO_EMPRESA_PADRAO
+    _matriz: Dict[Tuple[str, Optional[str], bool], Tuple[float, str]] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        ufs = sorted(self.aliquotas)
+        matriz = {}
+        for origem in ufs:
+            for destino in ufs + [None]:
+                for tem_ie in (False, True):
+                    matriz[(origem, destino, tem_ie)] = determinar_icms(tem_ie, destino, origem, self.aliquotas)
+        object.__setattr__(self, '_matriz', matriz)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]], estado_empresa: Optional[str] = None) -> 'TabelaFiscal':
+        """Sobrepõe as alíquotas de `icms_estados` às padrão; linhas inválidas são ignoradas."""
+        aliquotas = dict(ICMS_CONSUMIDOR_FINAL)
+        for row in rows or []:
+            uf = (row.get('estado') or '').strip().upper()
+            try:
+                aliquota = float(row.get('aliquota'))
+            except (TypeError, ValueError):
+                continue
+            if uf:
+                aliquotas[uf] = aliquota
+        return cls(aliquotas=aliquotas, estado_empresa=(estado_empresa or ESTADO_EMPRESA_PADRAO).strip().upper())
+
+    def icms(self, estado: Optional[str], cliente_tem_ie: bool, estado_origem: Optional[str] = None) -> Tuple[float, str]:
+        """
+        Alíquota de ICMS e sua origem para uma venda.
+
+        Args:
+            estado: UF do cliente (None quando não informada)
+            cliente_tem_ie: Se o cliente tem Inscrição Estadual
+            estado_origem: UF de origem (padrão: estado da empresa)
+
+        Returns:
+            Tupla (aliquota_icms, icms_origem), igual a `determinar_icms`
+        """
+        origem = estado_origem or self.estado_empresa
+        chave = (origem, estado or None, bool(cliente_tem_ie))
+        resultado = self._matriz.get(chave)
+        if resultado is None:
+            # UF fora da tabela: aplica as regras diretamente
+            resultado = determinar_icms(bool(cliente_tem_ie), estado or None, origem, self.aliquotas)
+        return resultado
+
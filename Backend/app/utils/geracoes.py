@@ -0,0 +1,108 @@
+"""
+Gerações por tabela compartilhadas entre os workers do gunicorn.
+
+Cada worker guarda caches derivados das tabelas (snapshot de referência,
+ETags memorizados, frescor do espelho local). Toda escrita feita pela
+aplicação incrementa a geração das tabelas afetadas na tabela `_geracoes` do
+arquivo SQLite local (DB_PATH, o mesmo do espelho), que todos os workers da
+máquina abrem. Antes de responder sem consultar o banco, cada cache compara a
+geração que guardou com a atual. A tabela inteira fica memorizada e só é
+relida quando `pragma data_version` indica que outra conexão gravou no
+arquivo, então a conferência custa poucos microssegundos.
+
+Sem acesso ao arquivo (disco somente leitura, por exemplo) `atuais` devolve
+None; os caches continuam invalidados pelas escritas do próprio worker e, para
+os demais, voltam a depender do próprio TTL.
+"""
+
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from app.db import caminho_banco
+from app.utils.ambiente import apos_fork
+
+
+SCHEMA = 'create table if not exists _geracoes (tabela text primary key, geracao integer not null)'
+
+_lock = threading.Lock()
+_conn: Optional[sqlite3.Connection] = None
+# Cópia de _geracoes e o data_version em que foi lida (None = reler)
+_memo: Optional[Dict[str, int]] = None
+_versao_arquivo: Optional[int] = None
+_estado: Dict[str, Any] = {'incrementos': 0, 'consultas': 0, 'erros': 0, 'ultimo_erro': None}
+
+
+def _conexao() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        conn = sqlite3.connect(caminho_banco(), check_same_thread=False, timeout=5.0)
+        conn.execute('pragma journal_mode=wal')
+        conn.execute(SCHEMA)
+        conn.commit()
+        _conn = conn
+    return _conn
+
+
+def _falha(erro: sqlite3.Error) -> None:
+    global _conn, _memo
+    _estado['erros'] += 1
+    _estado['ultimo_erro'] = f'{type(erro).__name__}: {erro}'
+    _conn = None
+    _memo = None
+
+
+def incrementar(*tabelas: str) -> None:
+    """Incrementa a geração das tabelas (chamar após escrever nelas)."""
+    global _memo
+    with _lock:
+        # Escritas desta conexão não mudam o data_version visto por ela mesma
+        _memo = None
+        try:
+            conn = _conexao()
+            with conn:
+                conn.executemany(
+                    'insert into _geracoes (tabela, geracao) values (?, 1) '
+                    'on conflict (tabela) do update set geracao = geracao + 1',
+                    [(tabela,) for tabela in tabelas],
+                )
+            _estado['incrementos'] += len(tabelas)
+        except sqlite3.Error as e:
+            _falha(e)
+
+
+def atuais(tabelas: Iterable[str]) -> Optional[Tuple[int, ...]]:
+    """Gerações atuais das tabelas, na ordem pedida (0 = nunca escrita); None se o arquivo não abrir."""
+    global _memo, _versao_arquivo
+    with _lock:
+        try:
+            conn = _conexao()
+            versao_arquivo = conn.execute('pragma data_version').fetchone()[0]
+            if _memo is None or versao_arquivo != _versao_arquivo:
+                _memo = dict(conn.execute('select tabela, geracao from _geracoes').fetchall())
+                _versao_arquivo = versao_arquivo
+                _estado['consultas'] += 1
+        except sqlite3.Error as e:
+            _falha(e)
+            return None
+        por_tabela = _memo
+    return tuple(por_tabela.get(tabela, 0) for tabela in tabelas)
+
+
+def atual(tabela: str) -> Optional[int]:
+    geracoes = atuais((tabela,))
+    return None if geracoes is None else geracoes[0]
+
+
+def geracoes_stats() -> Dict[str, Any]:
+    with _lock:
+        return dict(_estado)
+
+
+@apos_fork
+def _reiniciar_apos_fork() -> None:
+    # A conexão SQLite não atravessa o fork; o filho abre a sua sob demanda
+    global _lock, _conn, _memo
+    _lock = threading.Lock()
+    _conn = None
+    _memo = None
@@ -0,0 +1,135 @@
+"""
+Leituras independentes ao Supabase disparadas em paralelo.
+
+As consultas de referência (configuracoes, gramaturas, impostos, custos
+adicionais, ICMS) não dependem umas das outras; em vez de quatro ou cinco
+idas e voltas em sequência, são submetidas juntas a um pool de threads por
+processo e o tempo total fica próximo ao da consulta mais lenta. As métricas
+devolvidas comparam a soma dos tempos individuais (equivalente sequencial)
+com o tempo de parede, o que dá a sobreposição obtida.
+"""
+
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+from app.supabase_client import timeout_supabase
+from app.utils.ambiente import apos_fork, env_float, env_int
+
+
+MAX_THREADS_PADRAO = 5
+PRAZO_PADRAO_S = 10.0
+
+
+class PrazoLeituraExcedido(TimeoutError):
+    """Leituras obrigatórias não terminaram dentro do prazo da requisição (mapeado para HTTP 504 nas rotas)."""
+
+
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Pool compartilhado pelas threads do worker; criado sob demanda (e de novo após fork)."""
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                max_threads = env_int('REFERENCE_LOAD_THREADS', MAX_THREADS_PADRAO)
+                _executor = ThreadPoolExecutor(max_workers=max(1, max_threads), thread_name_prefix='leitura-ref')
+    return _executor
+
+
+def prazo_configurado() -> float:
+    """Prazo total das leituras de referência por requisição (REFERENCE_LOAD_DEADLINE, segundos)."""
+    return env_float('REFERENCE_LOAD_DEADLINE', PRAZO_PADRAO_S)
+
+
+def ler_em_paralelo(
+    tarefas: Mapping[str, Callable[[], Any]],
+    prazo_s: Optional[float] = None,
+    opcionais: Optional[Mapping[str, Any]] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Executa as leituras ao mesmo tempo e espera todas até o prazo.
+
+    Args:
+        tarefas: Nome -> função sem argumentos que faz a consulta
+        prazo_s: Prazo total (padrão: REFERENCE_LOAD_DEADLINE); cada chamada HTTP também usa esse timeout
+        opcionais: Nome -> valor padrão para tarefas cuja falha (ou atraso) não impede o cálculo
+
+    Returns:
+        Tupla (resultados por nome, métricas de tempo e sobreposição)
+
+    Raises:
+        PrazoLeituraExcedido: tarefa obrigatória não terminou no prazo
+        Exception: a primeira exceção de uma tarefa obrigatória é repassada
+    """
+    prazo_s = prazo_configurado() if prazo_s is None else float(prazo_s)
+    opcionais = opcionais or {}
+    duracoes: Dict[str, float] = {}
+
+    def medir(nome: str, fn: Callable[[], Any]) -> Any:
+        inicio = time.perf_counter()
+        try:
+            with timeout_supabase(prazo_s):
+                return fn()
+        finally:
+            duracoes[nome] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    executor = _get_executor()
+    # copy_context: a thread do pool herda os ContextVars da requisição (ex.: timeout_supabase)
+    futuros: Dict[str, Future] = {
+        nome: executor.submit(contextvars.copy_context().run, medir, nome, fn)
+        for nome, fn in tarefas.items()
+    }
+    obrigatorios = [f for nome, f in futuros.items() if nome not in opcionais]
+    wait(obrigatorios, timeout=prazo_s, return_when=FIRST_EXCEPTION)
+    restante = max(0.0, prazo_s - (time.perf_counter() - inicio))
+    wait([f for nome, f in futuros.items() if nome in opcionais], timeout=restante)
+
+    resultados: Dict[str, Any] = {}
+    falhas: Dict[str, str] = {}
+    for nome, futuro in futuros.items():
+        if not futuro.done():
+            futuro.cancel()
+            if nome not in opcionais:
+                raise PrazoLeituraExcedido(f'Leitura de {nome} excedeu o prazo de {prazo_s:g} s.')
+            falhas[nome] = 'prazo excedido'
+            resultados[nome] = opcionais[nome]
+            continue
+        erro = futuro.exception()
+        if erro is not None:
+            if nome not in opcionais:
+                raise erro
+            falhas[nome] = str(erro)
+            resultados[nome] = opcionais[nome]
+            continue
+        resultados[nome] = futuro.result()
+
+    parede = time.perf_counter() - inicio
+    # Uma leitura opcional que estourou o prazo segue rodando e ainda grava em `duracoes`:
+    # as métricas usam só as leituras que já terminaram, sem iterar o dict compartilhado
+    terminadas = {nome: duracoes[nome] for nome, futuro in futuros.items() if futuro.done() and nome in duracoes}
+    sequencial = sum(terminadas.values())
+    metricas = {
+        'consultas': len(tarefas),
+        'parede_ms': round(parede * 1000, 1),
+        'sequencial_ms': round(sequencial * 1000, 1),
+        # 1.0 = nenhuma sobreposição; N = as N consultas custaram o tempo de uma
+        'sobreposicao': round(sequencial / parede, 2) if parede > 0 else None,
+        'por_consulta_ms': {nome: round(d * 1000, 1) for nome, d in sorted(terminadas.items())},
+        'falhas': falhas,
+    }
+    return resultados, metricas
+
+
+@apos_fork
+def _reiniciar_apos_fork() -> None:
+    """As threads do pool não existem no filho: descarta o executor herdado (e o lock)."""
+    global _executor, _lock
+    _executor = None
+    _lock = threading.Lock()
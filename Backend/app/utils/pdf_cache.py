@@ -0,0 +1,208 @@
+"""
+Cache em disco das cotações em PDF, endereçado pelo conteúdo.
+
+A chave é o hash canônico do que determina o documento: itens normalizados
+(só os campos usados no cálculo e na tabela; "20", 20 e 20.0 são o mesmo
+valor), contexto, versão dos dados de referência (`ReferenceData.versao`) e a
+data de emissão impressa no PDF. Um pedido repetido no mesmo dia, com os
+mesmos preços de referência, é respondido com o arquivo pronto, sem
+precificar nem diagramar. A hora impressa é a da primeira geração.
+
+Os arquivos ficam em PDF_CACHE_DIR (compartilhado entre os workers) com
+limite de PDF_CACHE_MAX_MB: acima dele saem os menos usados (LRU pelo mtime,
+atualizado a cada acerto). PDF_CACHE=off desliga o cache.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, List, Optional
+
+from app.utils.ambiente import apos_fork, env_float
+from app.utils.pricing_engine import ReferenceData
+
+
+# Incrementar ao mudar o layout da cotação: PDFs antigos deixam de ser servidos
+VERSAO_LAYOUT = 1
+
+MAX_MB_PADRAO = 256.0
+
+_CAMPOS_NUMERICOS = ('largura_cm', 'altura_cm', 'lateral_cm', 'fundo_cm')
+
+_lock = threading.Lock()
+_estado = {'acertos': 0, 'faltas': 0, 'gravados': 0, 'falhas_gravacao': 0, 'removidos_lru': 0, 'purgados': 0}
+
+
+def cache_habilitado() -> bool:
+    return (os.environ.get('PDF_CACHE') or 'on').strip().lower() not in ('off', '0', 'false', 'no')
+
+
+def max_bytes() -> int:
+    return int(env_float('PDF_CACHE_MAX_MB', MAX_MB_PADRAO) * 1024 * 1024)
+
+
+def diretorio_cache() -> str:
+    caminho = os.environ.get('PDF_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'cost-sacolas-pdf-cache')
+    os.makedirs(caminho, exist_ok=True)
+    return caminho
+
+
+def _numero(valor: Any) -> Any:
+    if valor in (None, ''):
+        return None
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return str(valor)
+
+
+def _normalizar_item(it: Dict[str, Any]) -> Dict[str, Any]:
+    item = {campo: _numero(it.get(campo)) for campo in _CAMPOS_NUMERICOS}
+    item['nome'] = it.get('nome') or '-'
+    item['incluir_alca'] = bool(it.get('incluir_alca'))
+    return item
+
+
+def chave_cotacao(itens: List[Dict[str, Any]], contexto: Dict[str, Any], ref: ReferenceData, agora: datetime) -> str:
+    """Hash canônico das entradas da cotação (ver docstring do módulo)."""
+    conteudo = {
+        'layout': VERSAO_LAYOUT,
+        'referencia': ref.versao,
+        'data': agora.strftime('%Y-%m-%d'),
+        'contexto': contexto,
+        'itens': [_normalizar_item(it) for it in itens],
+    }
+    corpo = json.dumps(conteudo, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(corpo.encode('utf-8')).hexdigest()
+
+
+def _caminho(chave: str) -> str:
+    return os.path.join(diretorio_cache(), f'{chave}.pdf')
+
+
+def abrir_pdf_em_cache(chave: str) -> Optional[BinaryIO]:
+    """
+    PDF em cache aberto para leitura (quem chama fecha), ou None.
+
+    Um acerto atualiza o mtime do arquivo, que é a ordem do LRU.
+    """
+    if not cache_habilitado():
+        return None
+    caminho = _caminho(chave)
+    try:
+        arquivo = open(caminho, 'rb')
+    except OSError:
+        with _lock:
+            _estado['faltas'] += 1
+        return None
+    try:
+        os.utime(caminho)
+    except OSError:
+        pass
+    with _lock:
+        _estado['acertos'] += 1
+    return arquivo
+
+
+def guardar_pdf_em_cache(chave: str, origem: BinaryIO) -> None:
+    """
+    Copia o PDF de `origem` (do início) para o cache e aplica o limite de tamanho.
+
+    Falha de disco não interrompe a cotação: o PDF só deixa de ficar em cache.
+    """
+    if not cache_habilitado():
+        return
+    destino = _caminho(chave)
+    temporario = f'{destino}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        origem.seek(0)
+        with open(temporario, 'wb') as f:
+            shutil.copyfileobj(origem, f)
+        os.replace(temporario, destino)
+    except OSError:
+        try:
+            os.remove(temporario)
+        except OSError:
+            pass
+        with _lock:
+            _estado['falhas_gravacao'] += 1
+        return
+    with _lock:
+        _estado['gravados'] += 1
+    _aplicar_limite()
+
+
+def _entradas() -> List[os.DirEntry]:
+    with os.scandir(diretorio_cache()) as it:
+        return [e for e in it if e.is_file() and e.name.endswith('.pdf')]
+
+
+def _aplicar_limite() -> None:
+    limite = max_bytes()
+    entradas = []
+    total = 0
+    for entrada in _entradas():
+        try:
+            info = entrada.stat()
+        except OSError:
+            continue
+        entradas.append((info.st_mtime, info.st_size, entrada.path))
+        total += info.st_size
+    if total <= limite:
+        return
+    removidos = 0
+    for _, tamanho, caminho in sorted(entradas):
+        if total <= limite:
+            break
+        try:
+            os.remove(caminho)
+        except OSError:
+            continue
+        total -= tamanho
+        removidos += 1
+    with _lock:
+        _estado['removidos_lru'] += removidos
+
+
+def purgar_cache_pdf() -> int:
+    """Remove todos os PDFs do cache; devolve quantos."""
+    removidos = 0
+    for entrada in _entradas():
+        try:
+            os.remove(entrada.path)
+        except OSError:
+            continue
+        removidos += 1
+    with _lock:
+        _estado['purgados'] += removidos
+    return removidos
+
+
+def pdf_cache_stats() -> Dict[str, Any]:
+    tamanhos = []
+    for entrada in _entradas():
+        try:
+            tamanhos.append(entrada.stat().st_size)
+        except OSError:
+            continue
+    with _lock:
+        estado = dict(_estado)
+    consultas = estado['acertos'] + estado['faltas']
+    return {
+        **estado,
+        'taxa_acerto': round(estado['acertos'] / consultas, 3) if consultas else None,
+        'entradas': len(tamanhos),
+        'bytes': sum(tamanhos),
+        'max_bytes': max_bytes(),
+        'habilitado': cache_habilitado(),
+    }
+
+
+@apos_fork
+def _reiniciar_apos_fork() -> None:
+    global _lock
+    _lock = threading.Lock()
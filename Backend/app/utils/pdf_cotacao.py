@@ -0,0 +1,531 @@
+"""
+Cotação comercial em PDF (tabela de preços + termos e condições).
+
+Usado pela rota síncrona /api/batch/pdf-precos e pelos jobs assíncronos
+(`app.utils.pdf_jobs`): as duas validam com `validar_pedido` e gravam com
+`escrever_pdf_cotacao` as linhas de `precificar_itens`. A precificação e a
+diagramação andam juntas, uma página por vez (`TabelaEmBlocos`): a memória
+não cresce com o número de itens. O callback `progresso(etapa, feitos, total)`
+recebe as linhas já diagramadas.
+
+O que não depende da cotação é montado uma vez por processo: folha de
+estilos, TableStyles e a página de TERMOS E CONDIÇÕES, renderizada para PDF e
+anexada com pypdf (opcional; sem ele a página é diagramada a cada chamada).
+"""
+
+import io
+from datetime import datetime
+from functools import lru_cache
+from itertools import chain
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_RIGHT
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.styles import ParagraphStyle, StyleSheet1, getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.platypus import Flowable, PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from app.utils.pdf_tabela import TabelaEmBlocos
+from app.utils.pricing_engine import ReferenceData, calcular_lote
+
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:
+    PdfReader = PdfWriter = None
+
+
+ETAPA_RENDERIZACAO = 'renderizando'
+
+# Itens precificados de uma vez (a tabela do PDF pede os próximos conforme diagrama as páginas)
+TAMANHO_BLOCO_PRECIFICACAO = 50
+
+# Acima disso anexar a página pronta custa mais (pypdf percorre todas as páginas) do que diagramá-la
+MAX_ITENS_TERMOS_PRONTOS = 500
+
+Progresso = Callable[[str, int, int], None]
+
+
+class PedidoPdfInvalido(ValueError):
+    """Itens ou contexto inválidos para gerar a cotação (mapeado para HTTP 400)."""
+
+
+def validar_pedido(itens: Any, contexto: Dict[str, Any]) -> None:
+    """
+    Raises:
+        PedidoPdfInvalido: lista de itens vazia ou contexto sem gramatura
+    """
+    # Validações básicas para retornar erro claro ao front
+    if not isinstance(itens, list) or len(itens) == 0:
+        raise PedidoPdfInvalido('Envie uma lista de itens para gerar o PDF.')
+    if not contexto.get('gramatura_id') and not contexto.get('gramatura_nome'):
+        raise PedidoPdfInvalido('Informe gramatura_id ou gramatura_nome no contexto.')
+
+
+def payload_item(contexto: Dict[str, Any], it: Dict[str, Any]) -> Dict[str, Any]:
+    """Payload de precificação do item: contexto comum + medidas do item."""
+    base_payload = {**contexto}
+    base_payload['largura_cm'] = it.get('largura_cm')
+    base_payload['altura_cm'] = it.get('altura_cm')
+    base_payload['lateral_cm'] = it.get('lateral_cm')
+    base_payload['fundo_cm'] = it.get('fundo_cm')
+    base_payload['incluir_alca'] = bool(it.get('incluir_alca'))
+    # Respeita a configuração de IE do contexto (não força sempre True)
+    if 'cliente_tem_ie' not in base_payload:
+        base_payload['cliente_tem_ie'] = False
+    base_payload['incluir_lateral'] = True
+    base_payload['incluir_fundo'] = bool(it.get('fundo_cm'))
+    return base_payload
+
+
+def precificar_itens(itens: List[Dict[str, Any]], contexto: Dict[str, Any], ref: ReferenceData) -> Iterator[Dict[str, Any]]:
+    """
+    Linhas da cotação (medidas do item sobre o resultado), precificadas sob demanda.
+
+    Os itens são precificados em blocos de TAMANHO_BLOCO_PRECIFICACAO à medida
+    que a tabela do PDF os consome, então só um bloco de resultados fica em
+    memória. Itens com erro de cálculo viram uma linha com `erro` e entram na
+    tabela com preço zero.
+    """
+    for inicio in range(0, len(itens), TAMANHO_BLOCO_PRECIFICACAO):
+        bloco = itens[inicio:inicio + TAMANHO_BLOCO_PRECIFICACAO]
+        payloads = [payload_item(contexto, it) for it in bloco]
+        for it, base_payload, calc in zip(bloco, payloads, calcular_lote(payloads, ref)):
+            if not calc['ok']:
+                yield {
+                    'nome': it.get('nome') or '-',
+                    'erro': calc['status'],
+                    'dados': base_payload,
+                    **it,
+                }
+                continue
+
+            data = calc['resultado']
+            data['nome'] = it.get('nome') or '-'
+            data['largura_cm'] = it.get('largura_cm') if it.get('largura_cm') not in (None, '') else data.get('largura_cm')
+            data['altura_cm'] = it.get('altura_cm') if it.get('altura_cm') not in (None, '') else (data.get('altura_cm') or data.get('altura_produto_cm'))
+            data['lateral_cm'] = it.get('lateral_cm') if it.get('lateral_cm') not in (None, '') else data.get('lateral_cm')
+            data['fundo_cm'] = it.get('fundo_cm') if it.get('fundo_cm') not in (None, '') else data.get('fundo_cm')
+            data['incluir_alca'] = bool(it.get('incluir_alca'))
+            data['quantidade'] = base_payload.get('quantidade') or data.get('quantidade')
+            yield data
+
+
+def nome_arquivo_cotacao(agora: datetime) -> str:
+    return f"FiberTNT-Cotacao-Comercial-{agora.strftime('%d-%m-%Y')}.pdf"
+
+
+def _fmt_money(val):
+    try:
+        num = float(val)
+        return f"R$ {num:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+    except Exception:
+        return '-'
+
+
+def _fmt_money_4(val):
+    try:
+        num = float(val)
+        return f"R$ {num:,.4f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+    except Exception:
+        return '-'
+
+
+def _fmt_num(val):
+    try:
+        num = float(val)
+        return f"{num:,.0f}".replace(',', '.')
+    except Exception:
+        return '-' if val in (None, '', '-') else str(val)
+
+
+PAGINA = landscape(A4)
+MARGENS = {'rightMargin': 25, 'leftMargin': 25, 'topMargin': 25, 'bottomMargin': 50}
+
+AZUL = colors.HexColor('#2F80ED')
+CINZA_CLARO = colors.HexColor('#F2F4F7')
+CINZA_GRID = colors.HexColor('#E0E0E0')
+CINZA_TEXTO = colors.HexColor('#111827')
+
+# Estilos de tabela fixos: montados uma vez por processo e só lidos por `Table.setStyle`
+_ESTILO_CABECALHO = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+    ('ALIGN', (0, 0), (0, 0), 'LEFT'),
+    ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
+])
+_ESTILO_CABECALHO_TERMOS = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ('ALIGN', (0, 0), (0, 0), 'LEFT'),
+    ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
+])
+_ESTILO_SEPARADOR = TableStyle([('LINEABOVE', (0, 0), (-1, 0), 0.8, CINZA_GRID)])
+_ESTILO_TITULO_SECAO = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, -1), CINZA_CLARO),
+    ('PADDING', (0, 0), (-1, -1), 7),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+])
+_ESTILO_DADOS = TableStyle([
+    ('GRID', (0, 0), (-1, -1), 0.5, CINZA_GRID),
+    ('BACKGROUND', (0, 0), (-1, -1), colors.white),
+    ('FONT', (0, 0), (-1, -1), 'Helvetica', 10),
+    ('FONT', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONT', (2, 0), (2, -1), 'Helvetica-Bold'),
+    ('FONT', (4, 0), (4, -1), 'Helvetica-Bold'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 6),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+    ('TOPPADDING', (0, 0), (-1, -1), 5),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+])
+_ESTILO_PRODUTOS = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), AZUL),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('GRID', (0, 0), (-1, -1), 0.5, CINZA_GRID),
+    ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONT', (0, 1), (-1, -1), 'Helvetica'),
+    ('PADDING', (0, 0), (-1, -1), 6),
+    ('ALIGN', (1, 1), (-1, -1), 'CENTER'),
+    ('ALIGN', (-4, 1), (-1, -1), 'RIGHT'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+])
+_ESTILO_SERVICOS = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), AZUL),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('GRID', (0, 0), (-1, -1), 0.5, CINZA_GRID),
+    ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONT', (0, 1), (-1, -1), 'Helvetica'),
+    ('ALIGN', (1, 1), (-1, -1), 'RIGHT'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('PADDING', (0, 0), (-1, -1), 6),
+])
+_ESTILO_TERMOS = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 4),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+    ('TOPPADDING', (0, 0), (-1, -1), 2),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+])
+
+CONDICOES_COMERCIAIS = [
+    '• Valores expressos em reais (R$)',
+    '• Quanto maior a quantidade, melhores as condições de negociação',
+    '• Frete não incluso (a calcular conforme CEP)',
+    '• Produção mediante aprovação da cotação',
+]
+
+FABRICANTE = '<b>Fabricante:</b> FIBER TNT | ECOFIBER &nbsp;&nbsp;&nbsp; <b>Razão Social:</b> MAT DISTRIBUIDORA LTDA | CNPJ: 29.956.187/0001-83 &nbsp;&nbsp;&nbsp; <b>Endereço:</b> Rua Itaúna, nº 73 – Vila Maria – São Paulo/SP'
+
+TERMOS = [
+    ('1. ESPECIFICAÇÕES DO PEDIDO', 'O cliente confirma estar ciente das medidas, modelos, gramaturas, cores, quantidades e acabamentos conforme tabela padrão enviada.'),
+    ('2. MATERIAL – INFO. TÉCNICAS', 'TNT produzido com material virgem, 100% reciclável, polipropileno (PP). Podem ocorrer variações naturais de textura, tonalidade e densidade entre lotes.'),
+    ('3. VARIAÇÃO DE TONALIDADE', 'Pode haver variação de até 10%, considerada normal, não caracterizando defeito. Cor validada por imagem ou amostra enviada.'),
+    ('4. APROVAÇÃO DE ARTE', 'Produção inicia somente após aprovação formal da arte. Alterações pós-aprovação podem gerar custos adicionais e novo prazo.'),
+    ('5. PAGAMENTO', 'Pedido confirmado mediante 50% de sinal, não reembolsável. Saldo pago após produção, incluindo variações. Liberação da mercadoria somente após quitação total.'),
+    ('6. VARIAÇÃO DE QUANTIDADE', 'Variação de até 10% para mais ou menos em medidas especiais ou fora do padrão. Pedido mínimo para medidas especiais: 1.000 un. Valor final calculado conforme quantidade produzida.'),
+    ('7. PRAZOS DE PRODUÇÃO', 'Contados após aprovação da arte e pagamento do sinal. Atrasos podem ocorrer por força maior: clima, insumos, greve, logística, pandemias, energia, etc.'),
+    ('8. GARANTIA – DEFEITOS', 'Defeitos devem ser comunicados em até 7 dias após recebimento. Direito a reembolso proporcional ou crédito equivalente. Devolução obrigatória com NF. Garantia não cobre mau uso, excesso de peso, armazenamento incorreto, exposição a sol/umidade ou transporte de terceiros.'),
+    ('9. DESISTÊNCIA', 'Após início de produção, insumos ou impressão, o sinal é perdido e pagamento proporcional ao produzido é devido.'),
+    ('10. USO DE MARCA', 'Cliente autoriza uso de imagens/vídeos para divulgação, portfólio e demonstrações comerciais. Responsabilidade sobre marcas de terceiros é exclusiva do cliente.'),
+    ('11. DECLARAÇÃO FINAL', 'Ao confirmar o pedido, o cliente declara ter lido, entendido e concordado com todas as cláusulas, autorizando a produção.'),
+    ('12. COND. COMERCIAIS E PGTO', 'Orçamento válido apenas na data da emissão. Pagamento antecipado via PIX ou depósito bancário conforme dados fornecidos. Depósitos devem ser do mesmo titular, identificados, não aceitamos cheques ou depósitos de terceiros. Estornos realizados em até 72h úteis.'),
+]
+
+
+@lru_cache(maxsize=1)
+def _estilos() -> StyleSheet1:
+    """Folha de estilos da cotação, montada uma vez por processo (só leitura depois)."""
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(name='Titulo', parent=styles['Heading1'], fontSize=16, textColor=CINZA_TEXTO, alignment=TA_RIGHT, leading=18))
+    styles.add(ParagraphStyle(name='Logo', parent=styles['Normal'], fontSize=22, textColor=CINZA_TEXTO, leading=24))
+    styles.add(ParagraphStyle(name='SectionTitle', parent=styles['Normal'], fontSize=11.5, textColor=CINZA_TEXTO, spaceAfter=6, spaceBefore=4, leading=14))
+    styles.add(ParagraphStyle(name='SectionTitleCenter', parent=styles['SectionTitle'], alignment=TA_CENTER))
+    styles.add(ParagraphStyle(name='Muted', parent=styles['Normal'], textColor=colors.HexColor('#6b7280'), fontSize=9.5, leading=12))
+    styles.add(ParagraphStyle(name='Cell', parent=styles['Normal'], textColor=CINZA_TEXTO, fontSize=10, leading=12))
+    styles.add(ParagraphStyle(name='CellBold', parent=styles['Normal'], textColor=CINZA_TEXTO, fontSize=10, leading=12, fontName='Helvetica-Bold'))
+    styles.add(ParagraphStyle(name='Footer', parent=styles['Normal'], fontSize=10, textColor=CINZA_TEXTO, alignment=TA_CENTER, leading=14))
+    # Estilo para os termos - fonte menor para caber em uma página
+    styles.add(ParagraphStyle(name='TermoTitulo', parent=styles['Normal'], fontSize=8, textColor=CINZA_TEXTO, fontName='Helvetica-Bold', spaceBefore=3, spaceAfter=1, leading=9))
+    styles.add(ParagraphStyle(name='TermoTexto', parent=styles['Normal'], fontSize=7.5, textColor=CINZA_TEXTO, leading=9, spaceAfter=1))
+    return styles
+
+
+def _novo_documento(destino) -> SimpleDocTemplate:
+    return SimpleDocTemplate(destino, pagesize=PAGINA, **MARGENS)
+
+
+# Função para desenhar rodapé fixo no fundo de cada página
+def _add_footer(canvas, doc):
+    canvas.saveState()
+    width, height = PAGINA
+    canvas.setFont('Helvetica-Bold', 10)
+    canvas.drawCentredString(width / 2, 25, 'FIBERTNT BRASIL')
+    canvas.setFont('Helvetica', 9)
+    canvas.drawCentredString(width / 2, 13, 'https://fibertnt.com/')
+    canvas.restoreState()
+
+
+def _cabecalho(titulo: str, col_widths: List[float], estilo: TableStyle) -> Table:
+    styles = _estilos()
+    header = Table(
+        [[
+            Paragraph("<b>Eco<span color='#2F80ED'>Fiber</span></b>", styles['Logo']),
+            Paragraph(f"<b>{titulo}</b>", styles['Titulo'])
+        ]],
+        colWidths=col_widths
+    )
+    header.setStyle(estilo)
+    return header
+
+
+def _separador(largura: float) -> Table:
+    return Table([[""], [" "]], colWidths=[largura], style=_ESTILO_SEPARADOR)
+
+
+def _titulo_secao(titulo: str, largura: float) -> Table:
+    return Table(
+        [[Paragraph(f'<b>{titulo}</b>', _estilos()['SectionTitleCenter'])]],
+        colWidths=[largura],
+        style=_ESTILO_TITULO_SECAO,
+    )
+
+
+def _historia_termos(largura: float) -> List[Flowable]:
+    """Página de TERMOS E CONDIÇÕES (fixa: não depende da cotação)."""
+    styles = _estilos()
+    story: List[Flowable] = [
+        _cabecalho('TERMOS E CONDIÇÕES', [120*mm, 120*mm], _ESTILO_CABECALHO_TERMOS),
+        Spacer(1, 2),
+        _separador(largura),
+        Spacer(1, 6),
+        Paragraph(FABRICANTE, styles['TermoTexto']),
+        Spacer(1, 6),
+    ]
+
+    # Termos em duas colunas para aproveitar melhor o espaço landscape
+    col_esq = []
+    col_dir = []
+    for i, (titulo, texto) in enumerate(TERMOS):
+        bloco = f'<b>{titulo}</b><br/>{texto}'
+        if i < 6:
+            col_esq.append(Paragraph(bloco, styles['TermoTexto']))
+        else:
+            col_dir.append(Paragraph(bloco, styles['TermoTexto']))
+
+    # Equalizar número de elementos
+    while len(col_dir) < len(col_esq):
+        col_dir.append(Paragraph('', styles['TermoTexto']))
+    while len(col_esq) < len(col_dir):
+        col_esq.append(Paragraph('', styles['TermoTexto']))
+
+    termos_rows = [[col_esq[i], col_dir[i]] for i in range(len(col_esq))]
+    termos_table = Table(termos_rows, colWidths=[largura/2 - 5*mm, largura/2 - 5*mm])
+    termos_table.setStyle(_ESTILO_TERMOS)
+    story.append(termos_table)
+    return story
+
+
+@lru_cache(maxsize=1)
+def _pagina_termos_pdf() -> bytes:
+    """Página de termos renderizada uma vez por processo (anexada a cada cotação com pypdf)."""
+    buffer = io.BytesIO()
+    doc = _novo_documento(buffer)
+    doc.build(_historia_termos(doc.width), onFirstPage=_add_footer, onLaterPages=_add_footer)
+    return buffer.getvalue()
+
+
+def _anexar_pagina_termos(pdf: bytes) -> bytes:
+    # Atualização incremental: grava só a página nova, sem reescrever os objetos do documento
+    writer = PdfWriter(io.BytesIO(pdf), incremental=True)
+    writer.append(PdfReader(io.BytesIO(_pagina_termos_pdf())))
+    saida = io.BytesIO()
+    writer.write(saida)
+    return saida.getvalue()
+
+
+def _linha_produto(idx: int, r: Dict[str, Any]) -> List[str]:
+    preco_final_val = float(r.get('preco_final') or 0)
+    preco_produto_val = float(r.get('preco_final_produto') or 0)
+    preco_servicos_val = float(r.get('preco_final_servicos') or 0)
+    qtd_item = int(r.get('quantidade') or 1) or 1
+    preco_unitario_val = preco_final_val / qtd_item
+
+    return [
+        str(idx),
+        r.get('nome') or '-',
+        _fmt_num(r.get('largura_cm')),
+        _fmt_num(r.get('altura_cm')),
+        'Não' if not r.get('lateral_cm') else _fmt_num(r.get('lateral_cm')),
+        'Não' if not r.get('fundo_cm') else _fmt_num(r.get('fundo_cm')),
+        _fmt_money(preco_produto_val),
+        _fmt_money(preco_servicos_val) if preco_servicos_val > 0 else '-',
+        _fmt_money_4(preco_unitario_val),
+        _fmt_money(preco_final_val),
+    ]
+
+
+def gerar_pdf_cotacao(
+    resultados: List[Dict[str, Any]],
+    contexto: Dict[str, Any],
+    agora: Optional[datetime] = None,
+    progresso: Optional[Progresso] = None,
+) -> bytes:
+    """Cotação em memória (ver `escrever_pdf_cotacao`), para lotes pequenos e testes."""
+    buffer = io.BytesIO()
+    escrever_pdf_cotacao(buffer, resultados, contexto, len(resultados), agora=agora, progresso=progresso)
+    return buffer.getvalue()
+
+
+def escrever_pdf_cotacao(
+    destino: BinaryIO,
+    resultados: Iterable[Dict[str, Any]],
+    contexto: Dict[str, Any],
+    total: int,
+    agora: Optional[datetime] = None,
+    progresso: Optional[Progresso] = None,
+) -> None:
+    """
+    Renderiza a cotação (layout comercial em A4 paisagem) e grava o PDF em `destino`.
+
+    Só a parte dinâmica (dados gerais, produtos e serviços) é diagramada a cada
+    chamada; com pypdf instalado e até MAX_ITENS_TERMOS_PRONTOS itens a página de
+    termos vem pronta de `_pagina_termos_pdf`. As linhas são lidas de
+    `resultados` uma página por vez, então um iterador (`precificar_itens`)
+    mantém a memória limitada em lotes de dezenas de milhares de itens.
+
+    Args:
+        destino: Arquivo binário aberto para escrita (ex.: `arquivo_saida()`)
+        resultados: Linhas da cotação, em lista ou iterador
+        contexto: Contexto da cotação (estado, quantidade, IE, serviços)
+        total: Número de linhas em `resultados`
+        agora: Data/hora impressa no documento (padrão: agora)
+        progresso: Callback (ETAPA_RENDERIZACAO, linhas diagramadas, total)
+    """
+    agora = agora or datetime.now()
+    # Primeira linha antecipada: o cabeçalho usa a quantidade e o ICMS/IPI dela
+    linhas = iter(resultados)
+    primeiro = next(linhas, None)
+    if primeiro is not None:
+        linhas = chain([primeiro], linhas)
+
+    # Sem pypdf (ou em tabelas longas) a página de termos é diagramada junto com o documento
+    anexar_termos = PdfWriter is not None and total <= MAX_ITENS_TERMOS_PRONTOS
+    # Monta PDF inspirado no layout comercial fornecido
+    buffer = io.BytesIO() if anexar_termos else destino
+    doc = _novo_documento(buffer)
+    styles = _estilos()
+
+    story = []
+
+    # ===== Cabeçalho =====
+    story.append(_cabecalho('TABELA DE PREÇOS', [95*mm, 75*mm], _ESTILO_CABECALHO))
+    story.append(Spacer(1, 4))
+    story.append(_separador(doc.width))
+    story.append(Spacer(1, 10))
+
+    # ===== Dados gerais =====
+    empresa_nome = 'FiberTNT'
+    estado_val = contexto.get('estado') or '—'
+    qtd_val = contexto.get('quantidade') or (primeiro.get('quantidade') if primeiro else None)
+    qtd_txt = (f"{int(qtd_val):,}".replace(',', '.') + ' unidades') if qtd_val else '—'
+    data_txt = agora.strftime('%d/%m/%Y')
+    hora_txt = agora.strftime('%H:%M')
+    validade_txt = '7 dias'
+    cliente_tem_ie_ctx = bool(contexto.get('cliente_tem_ie'))
+    ie_txt = 'Sim' if cliente_tem_ie_ctx else 'Não'
+
+    # ICMS e IPI: só porcentagem
+    try:
+        raw_icms_pct = primeiro.get('icms_percentual') if primeiro else None
+        icms_pct = float(raw_icms_pct) if raw_icms_pct is not None else None
+    except Exception:
+        icms_pct = None
+    icms_header_txt = f"{icms_pct:.2f}%" if icms_pct is not None else '—'
+
+    try:
+        raw_ipi_pct = primeiro.get('ipi_percentual') if primeiro else None
+        ipi_pct = float(raw_ipi_pct) if raw_ipi_pct is not None else None
+    except Exception:
+        ipi_pct = None
+    ipi_header_txt = f"{ipi_pct:.2f}%" if ipi_pct is not None else '—'
+
+    # Tabela com 3 colunas iguais
+    col_w = doc.width / 3
+    dados = Table(
+        [
+            ['Empresa:', empresa_nome, 'Data:', data_txt, 'Hora:', hora_txt],
+            ['Estado:', estado_val, 'Quantidade:', qtd_txt, 'Validade:', validade_txt],
+            ['Possui IE?', ie_txt, 'ICMS:', icms_header_txt, 'IPI:', ipi_header_txt],
+        ],
+        colWidths=[22*mm, col_w - 22*mm, 22*mm, col_w - 22*mm, 22*mm, col_w - 22*mm]
+    )
+    dados.setStyle(_ESTILO_DADOS)
+    story.append(dados)
+    story.append(Spacer(1, 12))
+
+    # ===== Título da tabela de produto =====
+    story.append(_titulo_secao('DADOS DOS PRODUTOS', doc.width))
+
+    # ===== Tabela principal =====
+    header_cols = ['Nº', 'Descrição', 'Largura', 'Altura', 'Lateral', 'Fundo', 'NF Produto', 'NF Serviço', 'Preço Unit.', 'Preço Final']
+    rows = (_linha_produto(idx, r) for idx, r in enumerate(linhas, start=1))
+
+    def _ao_diagramar(feitas: int) -> None:
+        progresso(ETAPA_RENDERIZACAO, feitas, total)
+
+    # Largura total landscape A4 ~ 247mm (297 - 50 margens)
+    story.append(TabelaEmBlocos(
+        header_cols,
+        rows,
+        [10*mm, 70*mm, 16*mm, 16*mm, 16*mm, 16*mm, 26*mm, 26*mm, 26*mm, 26*mm],
+        _ESTILO_PRODUTOS,
+        progresso=_ao_diagramar if progresso else None,
+    ))
+    story.append(Spacer(1, 26))
+
+    # ===== Serviços (NF serviço) — opcional =====
+    servicos_ctx = contexto.get('servicos') or []
+    if servicos_ctx:
+        story.append(_titulo_secao('SERVIÇOS', doc.width))
+
+        qtd_val = contexto.get('quantidade') or (primeiro.get('quantidade') if primeiro else 0) or 0
+        srv_rows = [['Serviço', 'Preço unit.', 'Valor total']]
+        for svc in servicos_ctx:
+            try:
+                val = float(svc.get('valor') or 0)
+            except Exception:
+                val = 0.0
+            try:
+                imp_pct = float(svc.get('imposto_percentual') if 'imposto_percentual' in svc else svc.get('impostos') or 0)
+            except Exception:
+                imp_pct = 0.0
+            unit_with_tax = val + (val * imp_pct / 100.0)
+            total_val = unit_with_tax * float(qtd_val or 0)
+            srv_rows.append([
+                svc.get('nome') or 'Serviço',
+                _fmt_money(unit_with_tax),
+                _fmt_money(total_val),
+            ])
+
+        # Usa a mesma largura total da tabela de produtos: 188 mm (64 + 44 + 80)
+        srv_table = Table(srv_rows, repeatRows=1, colWidths=[64*mm, 44*mm, 80*mm])
+        srv_table.setStyle(_ESTILO_SERVICOS)
+        story.append(srv_table)
+        story.append(Spacer(1, 22))
+
+    # ===== Condições comerciais =====
+    story.append(Paragraph('<b>CONDIÇÕES COMERCIAIS</b>', styles['SectionTitle']))
+    story.append(Spacer(1, 4))
+    for c in CONDICOES_COMERCIAIS:
+        story.append(Paragraph(c, styles['Cell']))
+    story.append(Spacer(1, 14))
+
+    # ===== PÁGINA 2: TERMOS E CONDIÇÕES =====
+    if not anexar_termos:
+        story.append(PageBreak())
+        story.extend(_historia_termos(doc.width))
+
+    doc.build(story, onFirstPage=_add_footer, onLaterPages=_add_footer)
+    if anexar_termos:
+        destino.write(_anexar_pagina_termos(buffer.getvalue()))
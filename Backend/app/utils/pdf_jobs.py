@@ -0,0 +1,304 @@
+"""
+Fila de jobs de PDF: enviar, acompanhar o progresso e baixar o resultado.
+
+A cotação de um lote grande (precificação de cada item + renderização) pode
+passar do `--timeout 30` do gunicorn e prende uma das threads de requisição
+o tempo todo. Aqui o POST só valida, tira o snapshot de referência e enfileira;
+o trabalho roda em um pool limitado de threads por processo (PDF_JOBS_WORKERS)
+com no máximo PDF_JOBS_MAX_PENDENTES jobs aguardando.
+
+Estado e resultado ficam em disco (PDF_JOBS_DIR): `<id>.json` com status e
+progresso, `<id>.pdf` com o documento. Assim qualquer worker do gunicorn
+responde ao polling e ao download, não só o que recebeu o POST. Jobs são
+removidos PDF_JOBS_TTL_S segundos após a última atualização (inclusive os
+órfãos de um processo que morreu no meio do trabalho). Cotações idênticas vêm
+do cache de PDFs (`pdf_cache`) e o status indica `cache: hit|miss`.
+"""
+
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.utils.ambiente import apos_fork, env_float
+from app.utils.pdf_cache import abrir_pdf_em_cache, chave_cotacao, guardar_pdf_em_cache
+from app.utils.pdf_cotacao import escrever_pdf_cotacao, nome_arquivo_cotacao, precificar_itens
+from app.utils.pricing_engine import ReferenceData
+
+
+STATUS_NA_FILA = 'na_fila'
+STATUS_EXECUTANDO = 'executando'
+STATUS_CONCLUIDO = 'concluido'
+STATUS_ERRO = 'erro'
+
+WORKERS_PADRAO = 2
+MAX_PENDENTES_PADRAO = 20
+TTL_PADRAO_S = 3600.0
+
+# Fração do progresso dada pelas linhas diagramadas; o restante é gravar o arquivo final
+_FRACAO_DIAGRAMACAO = 0.95
+# Intervalo mínimo entre duas gravações de progresso no disco
+_INTERVALO_PROGRESSO_S = 0.5
+
+_ID_VALIDO = re.compile(r'^[0-9a-f]{32}$')
+
+
+class JobNaoEncontrado(LookupError):
+    """Job inexistente ou já expirado (HTTP 404)."""
+
+
+class FilaPdfCheia(RuntimeError):
+    """Já há PDF_JOBS_MAX_PENDENTES jobs aguardando neste processo (HTTP 503)."""
+
+
+def workers() -> int:
+    return max(1, int(env_float('PDF_JOBS_WORKERS', WORKERS_PADRAO)))
+
+
+def max_pendentes() -> int:
+    return max(1, int(env_float('PDF_JOBS_MAX_PENDENTES', MAX_PENDENTES_PADRAO)))
+
+
+def ttl_s() -> float:
+    return env_float('PDF_JOBS_TTL_S', TTL_PADRAO_S)
+
+
+def diretorio_jobs() -> str:
+    caminho = os.environ.get('PDF_JOBS_DIR') or os.path.join(tempfile.gettempdir(), 'cost-sacolas-pdf-jobs')
+    os.makedirs(caminho, exist_ok=True)
+    return caminho
+
+
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_pendentes = 0
+_estado = {'enviados': 0, 'concluidos': 0, 'falhas': 0, 'recusados': 0, 'expirados': 0}
+
+
+def _caminho(job_id: str, extensao: str) -> str:
+    if not _ID_VALIDO.match(job_id or ''):
+        raise JobNaoEncontrado('Job não encontrado.')
+    return os.path.join(diretorio_jobs(), f'{job_id}.{extensao}')
+
+
+def _gravar_status(status: Dict[str, Any]) -> None:
+    """Grava o status de forma atômica (arquivo temporário + rename): leitores nunca veem JSON pela metade."""
+    status['atualizado_em'] = time.time()
+    destino = _caminho(status['id'], 'json')
+    temporario = f'{destino}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(status, f, ensure_ascii=False)
+    os.replace(temporario, destino)
+
+
+def _ler_status(job_id: str) -> Dict[str, Any]:
+    try:
+        with open(_caminho(job_id, 'json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        raise JobNaoEncontrado('Job não encontrado.')
+
+
+def _remover(job_id: str) -> None:
+    for extensao in ('json', 'pdf'):
+        try:
+            os.remove(_caminho(job_id, extensao))
+        except OSError:
+            pass
+
+
+def _expirado(status: Dict[str, Any], agora: float) -> bool:
+    return agora - float(status.get('atualizado_em') or 0) > ttl_s()
+
+
+def limpar_expirados() -> int:
+    """Remove do disco os jobs sem atualização há mais de PDF_JOBS_TTL_S; devolve quantos."""
+    agora = time.time()
+    removidos = 0
+    for nome in os.listdir(diretorio_jobs()):
+        job_id, extensao = os.path.splitext(nome)
+        if extensao != '.json' or not _ID_VALIDO.match(job_id):
+            continue
+        try:
+            status = _ler_status(job_id)
+        except JobNaoEncontrado:
+            continue
+        if _expirado(status, agora):
+            _remover(job_id)
+            removidos += 1
+    if removidos:
+        with _lock:
+            _estado['expirados'] += removidos
+    return removidos
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers(), thread_name_prefix='pdf-job')
+        return _executor
+
+
+class _Publicador:
+    """Callback de progresso do job: converte (etapa, linhas, total) em fração e grava no disco com intervalo mínimo."""
+
+    def __init__(self, status: Dict[str, Any]):
+        self.status = status
+        self._ultima_gravacao = 0.0
+
+    def __call__(self, etapa: str, feitos: int, total: int) -> None:
+        self.status['etapa'] = etapa
+        self.status['progresso'] = round(_FRACAO_DIAGRAMACAO * (feitos / total if total else 1.0), 3)
+        agora = time.monotonic()
+        if agora - self._ultima_gravacao >= _INTERVALO_PROGRESSO_S:
+            self._ultima_gravacao = agora
+            _gravar_status(self.status)
+
+
+def _executar(status: Dict[str, Any], itens: List[Dict[str, Any]], contexto: Dict[str, Any], ref: ReferenceData, chave: str) -> None:
+    global _pendentes
+    with _lock:
+        _pendentes -= 1
+    status['status'] = STATUS_EXECUTANDO
+    status['iniciado_em'] = time.time()
+    _gravar_status(status)
+    publicar = _Publicador(status)
+    com_erro = 0
+
+    def _contar_erros(linhas):
+        nonlocal com_erro
+        for linha in linhas:
+            if linha.get('erro'):
+                com_erro += 1
+            yield linha
+
+    destino = _caminho(status['id'], 'pdf')
+    temporario = f'{destino}.{os.getpid()}.tmp'
+    try:
+        em_cache = abrir_pdf_em_cache(chave)
+        if em_cache is not None:
+            # Cotação idêntica já gerada: só copia (itens_com_erro não é recontado)
+            status['cache'] = 'hit'
+            with em_cache, open(temporario, 'wb') as f:
+                shutil.copyfileobj(em_cache, f)
+        else:
+            status['cache'] = 'miss'
+            # Direto para o arquivo: as linhas são precificadas e descartadas página a página
+            with open(temporario, 'w+b') as f:
+                escrever_pdf_cotacao(
+                    f,
+                    _contar_erros(precificar_itens(itens, contexto, ref)),
+                    contexto,
+                    len(itens),
+                    agora=datetime.fromtimestamp(status['criado_em']),
+                    progresso=publicar,
+                )
+                guardar_pdf_em_cache(chave, f)
+        os.replace(temporario, destino)
+    except Exception as e:
+        try:
+            os.remove(temporario)
+        except OSError:
+            pass
+        status.update(status=STATUS_ERRO, erro=f'Erro ao gerar PDF: {str(e)}')
+        with _lock:
+            _estado['falhas'] += 1
+    else:
+        status.update(status=STATUS_CONCLUIDO, progresso=1.0, tamanho_bytes=os.path.getsize(destino))
+        if status['cache'] == 'miss':
+            status['itens_com_erro'] = com_erro
+        with _lock:
+            _estado['concluidos'] += 1
+    status['concluido_em'] = time.time()
+    status['duracao_ms'] = round((status['concluido_em'] - status['iniciado_em']) * 1000, 1)
+    _gravar_status(status)
+
+
+def enviar_job(itens: List[Dict[str, Any]], contexto: Dict[str, Any], ref: ReferenceData) -> Dict[str, Any]:
+    """
+    Enfileira a cotação em PDF e devolve o status inicial do job.
+
+    Args:
+        itens: Itens do pedido (nome e medidas), já validados por `validar_pedido`
+        contexto: Contexto da cotação
+        ref: Snapshot de referência do momento do envio (o PDF usa os preços dessa hora)
+
+    Raises:
+        FilaPdfCheia: PDF_JOBS_MAX_PENDENTES jobs já aguardando neste processo
+    """
+    global _pendentes
+    limpar_expirados()
+    with _lock:
+        if _pendentes >= max_pendentes():
+            _estado['recusados'] += 1
+            raise FilaPdfCheia('Fila de PDFs cheia; tente novamente em instantes.')
+        _pendentes += 1
+        _estado['enviados'] += 1
+
+    agora = time.time()
+    chave = chave_cotacao(itens, contexto, ref, datetime.fromtimestamp(agora))
+    status = {
+        'id': uuid.uuid4().hex,
+        'status': STATUS_NA_FILA,
+        'etapa': None,
+        'progresso': 0.0,
+        'itens': len(itens),
+        'criado_em': agora,
+        'arquivo': nome_arquivo_cotacao(datetime.fromtimestamp(agora)),
+    }
+    try:
+        _gravar_status(status)
+        _get_executor().submit(_executar, dict(status), itens, contexto, ref, chave)
+    except Exception:
+        with _lock:
+            _pendentes -= 1
+        _remover(status['id'])
+        raise
+    return status
+
+
+def consultar_job(job_id: str) -> Dict[str, Any]:
+    """
+    Status atual do job (gravado por qualquer processo).
+
+    Raises:
+        JobNaoEncontrado: id desconhecido ou expirado
+    """
+    status = _ler_status(job_id)
+    if _expirado(status, time.time()):
+        _remover(job_id)
+        raise JobNaoEncontrado('Job não encontrado.')
+    return status
+
+
+def caminho_resultado(job_id: str) -> str:
+    """Arquivo do PDF de um job concluído (consultar o status antes)."""
+    return _caminho(job_id, 'pdf')
+
+
+def pdf_jobs_stats() -> Dict[str, Any]:
+    with _lock:
+        return {
+            **_estado,
+            'pendentes': _pendentes,
+            'workers': workers(),
+            'max_pendentes': max_pendentes(),
+            'ttl_s': ttl_s(),
+        }
+
+
+@apos_fork
+def _reiniciar_apos_fork() -> None:
+    # Threads do pool não sobrevivem ao fork; o filho cria o seu sob demanda
+    global _lock, _executor, _pendentes
+    _lock = threading.Lock()
+    _executor = None
+    _pendentes = 0
@@ -0,0 +1,276 @@
+"""
+Pacote de cotações: o mesmo lote para vários clientes, um PDF por cliente num ZIP.
+
+Cada cliente (UF, IE, e o que mais quiser sobrepor no contexto) tem o próprio
+ICMS e o próprio PDF. O reportlab é CPU puro e segura o GIL, então threads não
+ajudam: os PDFs que não estão no cache (`pdf_cache`) são precificados e
+renderizados em paralelo num pool de processos (PDF_PACOTE_WORKERS por worker
+do gunicorn; com 1, roda no próprio processo). Sem a variável, os núcleos são
+divididos entre os workers do gunicorn (WEB_CONCURRENCY), até
+MAX_WORKERS_PADRAO: com 1 CPU não há pool. O pool usa `spawn` (o processo do
+Flask tem threads e locks que não devem ser herdados por fork), é criado na
+primeira chamada, reaproveitado pelos pacotes seguintes e encerrado depois de
+PDF_PACOTE_OCIOSO_S segundos sem uso.
+
+O ZIP é montado na ordem dos clientes em `arquivo_saida()` e enviado em blocos.
+"""
+
+import io
+import os
+import re
+import threading
+import time
+import unicodedata
+import zipfile
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from multiprocessing import get_context
+from typing import Any, BinaryIO, Dict, List, Optional
+
+from app.utils.ambiente import apos_fork, env_float, env_int
+from app.utils.pdf_cache import abrir_pdf_em_cache, chave_cotacao, guardar_pdf_em_cache
+from app.utils.pdf_cotacao import PedidoPdfInvalido, escrever_pdf_cotacao, precificar_itens, validar_pedido
+from app.utils.pricing_engine import ReferenceData
+
+
+MAX_CLIENTES_PADRAO = 50
+MAX_WORKERS_PADRAO = 4
+OCIOSO_PADRAO_S = 300.0
+
+_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+# Pacotes usando o pool agora, quando o último o liberou e o timer que o encerra quando fica ocioso
+_em_uso = 0
+_liberado_em = 0.0
+_timer: Optional[threading.Timer] = None
+_estado = {'pacotes': 0, 'pdfs': 0, 'pdfs_do_cache': 0, 'falhas': 0, 'pools_reiniciados': 0, 'pools_ociosos_encerrados': 0}
+
+
+def workers() -> int:
+    """Processos de renderização por worker do gunicorn (PDF_PACOTE_WORKERS; padrão: CPUs / WEB_CONCURRENCY, até 4)."""
+    por_worker = (os.cpu_count() or 1) // max(1, env_int('WEB_CONCURRENCY', 1))
+    return max(1, env_int('PDF_PACOTE_WORKERS', min(MAX_WORKERS_PADRAO, por_worker)))
+
+
+def ocioso_s() -> float:
+    return env_float('PDF_PACOTE_OCIOSO_S', OCIOSO_PADRAO_S)
+
+
+def max_clientes() -> int:
+    return max(1, env_int('PDF_PACOTE_MAX_CLIENTES', MAX_CLIENTES_PADRAO))
+
+
+def _slug(texto: str) -> str:
+    ascii_ = unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^A-Za-z0-9]+', '-', ascii_).strip('-')[:60]
+
+
+def validar_pacote(
+    itens: List[Dict[str, Any]],
+    contexto: Dict[str, Any],
+    clientes: List[Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    """
+    Valida o pacote e devolve o contexto de cada cliente (contexto base + campos do cliente).
+
+    Args:
+        itens: Itens do lote (iguais para todos os clientes)
+        contexto: Contexto base da cotação
+        clientes: Um dict por cliente; `nome` identifica o arquivo, os demais campos
+            (estado, cliente_tem_ie, quantidade...) sobrepõem o contexto base
+
+    Raises:
+        PedidoPdfInvalido: Lista de clientes vazia/grande demais ou pedido inválido
+    """
+    if not isinstance(clientes, list) or len(clientes) == 0:
+        raise PedidoPdfInvalido('Envie uma lista de clientes para gerar o pacote.')
+    if len(clientes) > max_clientes():
+        raise PedidoPdfInvalido(f'Máximo de {max_clientes()} clientes por pacote.')
+    contextos = []
+    for cliente in clientes:
+        if not isinstance(cliente, dict):
+            raise PedidoPdfInvalido('Cada cliente deve ser um objeto.')
+        contexto_cliente = {**contexto, **{k: v for k, v in cliente.items() if k != 'nome'}}
+        validar_pedido(itens, contexto_cliente)
+        contextos.append(contexto_cliente)
+    return contextos
+
+
+def nomes_arquivos(clientes: List[Dict[str, Any]], agora: datetime) -> List[str]:
+    """Nome do PDF de cada cliente dentro do ZIP (sem repetição)."""
+    nomes = []
+    usados = set()
+    for i, cliente in enumerate(clientes, start=1):
+        base = _slug(str(cliente.get('nome') or '')) or f'cliente-{i}'
+        nome = f"FiberTNT-Cotacao-{base}-{agora.strftime('%d-%m-%Y')}.pdf"
+        n = 2
+        while nome in usados:
+            nome = f"FiberTNT-Cotacao-{base}-{n}-{agora.strftime('%d-%m-%Y')}.pdf"
+            n += 1
+        usados.add(nome)
+        nomes.append(nome)
+    return nomes
+
+
+def nome_arquivo_pacote(agora: datetime) -> str:
+    return f"FiberTNT-Cotacoes-{agora.strftime('%d-%m-%Y')}.zip"
+
+
+def renderizar_pdf(itens: List[Dict[str, Any]], contexto: Dict[str, Any], ref: ReferenceData, agora: datetime) -> bytes:
+    """Precifica e renderiza a cotação de um cliente (executada nos processos do pool)."""
+    buffer = io.BytesIO()
+    escrever_pdf_cotacao(buffer, precificar_itens(itens, contexto, ref), contexto, len(itens), agora=agora)
+    return buffer.getvalue()
+
+
+def _reservar_pool() -> ProcessPoolExecutor:
+    """Pool para um pacote (criado sob demanda); cada chamada deve ter seu `_liberar_pool`."""
+    global _pool, _em_uso, _timer
+    with _lock:
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers(), mp_context=get_context('spawn'))
+        _em_uso += 1
+        return _pool
+
+
+def _liberar_pool() -> None:
+    """Fim do uso do pool por um pacote; o último agenda o encerramento por ociosidade."""
+    global _em_uso, _liberado_em, _timer
+    with _lock:
+        _em_uso -= 1
+        if _em_uso > 0 or _pool is None or ocioso_s() <= 0:
+            return
+        _liberado_em = time.monotonic()
+        _timer = threading.Timer(ocioso_s(), _encerrar_se_ocioso, args=(_pool, _liberado_em))
+        _timer.daemon = True
+        _timer.start()
+
+
+def _encerrar_se_ocioso(pool: ProcessPoolExecutor, liberado_em: float) -> None:
+    # Os processos ocupam memória mesmo parados: sem pacotes desde que este timer foi agendado, o pool é desfeito
+    global _pool, _timer
+    with _lock:
+        if _pool is not pool or _em_uso > 0 or _liberado_em != liberado_em:
+            return
+        _pool = None
+        _timer = None
+        _estado['pools_ociosos_encerrados'] += 1
+    pool.shutdown(wait=True)
+
+
+def encerrar_pool() -> None:
+    """Encerra o pool (se houver) esperando os processos; o próximo pacote cria outro com PDF_PACOTE_WORKERS atual."""
+    global _pool, _timer
+    with _lock:
+        pool, _pool = _pool, None
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+def _descartar_pool() -> None:
+    # Um processo do pool morreu (OOM, sinal): o executor fica inutilizável, o próximo pacote cria outro
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+        _estado['pools_reiniciados'] += 1
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def escrever_pacote(
+    destino: BinaryIO,
+    itens: List[Dict[str, Any]],
+    contextos: List[Dict[str, Any]],
+    nomes: List[str],
+    ref: ReferenceData,
+    agora: datetime,
+) -> None:
+    """
+    Grava em `destino` o ZIP com um PDF por contexto, na ordem recebida.
+
+    PDFs já em cache são copiados; os demais são gerados em paralelo no pool
+    (ou no próprio processo com PDF_PACOTE_WORKERS=1 ou um só PDF a gerar) e
+    guardados no cache.
+
+    Raises:
+        RuntimeError: Falha ao gerar algum PDF (a mensagem indica o arquivo)
+    """
+    chaves = [chave_cotacao(itens, contexto, ref, agora) for contexto in contextos]
+    prontos: Dict[int, bytes] = {}
+    faltando = []
+    for i, chave in enumerate(chaves):
+        em_cache = abrir_pdf_em_cache(chave)
+        if em_cache is None:
+            faltando.append(i)
+            continue
+        with em_cache:
+            prontos[i] = em_cache.read()
+
+    futuros: Dict[int, Future] = {}
+    paralelo = workers() > 1 and len(faltando) > 1
+    if paralelo:
+        pool = _reservar_pool()
+        try:
+            futuros = {i: pool.submit(renderizar_pdf, itens, contextos[i], ref, agora) for i in faltando}
+        except Exception:
+            _liberar_pool()
+            raise
+
+    try:
+        # PDFs já são comprimidos: ZIP_STORED evita gastar CPU sem ganho de tamanho
+        with zipfile.ZipFile(destino, 'w', compression=zipfile.ZIP_STORED) as zf:
+            for i, nome in enumerate(nomes):
+                if i in prontos:
+                    pdf = prontos.pop(i)
+                else:
+                    try:
+                        pdf = futuros[i].result() if paralelo else renderizar_pdf(itens, contextos[i], ref, agora)
+                    except BrokenProcessPool:
+                        _descartar_pool()
+                        raise RuntimeError(f'{nome}: processo de renderização interrompido')
+                    except Exception as e:
+                        raise RuntimeError(f'{nome}: {str(e)}')
+                    guardar_pdf_em_cache(chaves[i], io.BytesIO(pdf))
+                zf.writestr(nome, pdf)
+    except Exception:
+        for futuro in futuros.values():
+            futuro.cancel()
+        with _lock:
+            _estado['falhas'] += 1
+        raise
+    finally:
+        if paralelo:
+            _liberar_pool()
+
+    with _lock:
+        _estado['pacotes'] += 1
+        _estado['pdfs'] += len(nomes)
+        _estado['pdfs_do_cache'] += len(nomes) - len(faltando)
+
+
+def pdf_pacote_stats() -> Dict[str, Any]:
+    with _lock:
+        return {
+            **_estado,
+            'workers': workers(),
+            'pool_ativo': _pool is not None,
+            'ocioso_s': ocioso_s(),
+            'max_clientes': max_clientes(),
+        }
+
+
+@apos_fork
+def _reiniciar_apos_fork() -> None:
+    # Os processos do pool e a thread do timer pertencem ao pai; o filho cria os seus sob demanda
+    global _lock, _pool, _em_uso, _timer
+    _lock = threading.Lock()
+    _pool = None
+    _em_uso = 0
+    _timer = None
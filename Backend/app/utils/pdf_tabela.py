@@ -0,0 +1,127 @@
+"""
+Tabelas de PDF com memória limitada para lotes muito grandes.
+
+Um `Table` do reportlab guarda todas as linhas (e o layout de cada célula)
+até o documento terminar. `TabelaEmBlocos` recebe as linhas de um iterador e
+monta, a cada página, um `Table` só com as linhas que cabem nela: as linhas
+já desenhadas são descartadas e as próximas só são lidas (e, na cotação,
+precificadas) quando a página seguinte é diagramada. As quebras de página e o
+cabeçalho repetido saem iguais aos de um `Table` único com `repeatRows=1`.
+
+O PDF final é gravado em `arquivo_saida()`: memória até PDF_SPOOL_MAX_MB e
+arquivo temporário acima disso, lido em blocos na resposta.
+"""
+
+import tempfile
+from itertools import islice
+from typing import Any, Callable, Iterable, List, Optional
+
+from reportlab.platypus import Flowable, Table, TableStyle
+
+from app.utils.ambiente import env_float
+
+
+LINHAS_POR_BLOCO_INICIAL = 40
+SPOOL_MAX_MB_PADRAO = 8.0
+TAMANHO_BLOCO_LEITURA = 64 * 1024
+
+
+def arquivo_saida() -> tempfile.SpooledTemporaryFile:
+    """Destino do PDF: em memória até PDF_SPOOL_MAX_MB, depois em arquivo temporário."""
+    max_mb = env_float('PDF_SPOOL_MAX_MB', SPOOL_MAX_MB_PADRAO)
+    return tempfile.SpooledTemporaryFile(max_size=int(max_mb * 1024 * 1024), mode='w+b')
+
+
+def ler_em_blocos(arquivo, fechar: bool = True):
+    """Conteúdo do arquivo (do início) em blocos de TAMANHO_BLOCO_LEITURA; fecha ao terminar."""
+    try:
+        arquivo.seek(0)
+        while True:
+            bloco = arquivo.read(TAMANHO_BLOCO_LEITURA)
+            if not bloco:
+                break
+            yield bloco
+    finally:
+        if fechar:
+            arquivo.close()
+
+
+class TabelaEmBlocos(Flowable):
+    """
+    Tabela com cabeçalho repetido cujas linhas vêm de um iterador, uma página por vez.
+
+    Args:
+        cabecalho: Primeira linha (repetida em cada página)
+        linhas: Iterador das demais linhas (lido sob demanda)
+        col_widths: Larguras fixas das colunas
+        estilo: TableStyle aplicado a cada página (mesmos índices de um Table único)
+        progresso: Chamado com o número de linhas já diagramadas após cada página
+    """
+
+    def __init__(
+        self,
+        cabecalho: List[Any],
+        linhas: Iterable[List[Any]],
+        col_widths: List[float],
+        estilo: TableStyle,
+        progresso: Optional[Callable[[int], None]] = None,
+    ):
+        super().__init__()
+        self._cabecalho = cabecalho
+        self._linhas = iter(linhas)
+        self._col_widths = col_widths
+        self._estilo = estilo
+        self._progresso = progresso
+        self._pendentes: List[List[Any]] = []
+        self._esgotado = False
+        self._por_bloco = LINHAS_POR_BLOCO_INICIAL
+        self._diagramadas = 0
+
+    def _completar(self) -> None:
+        falta = self._por_bloco - len(self._pendentes)
+        if falta > 0 and not self._esgotado:
+            novas = list(islice(self._linhas, falta))
+            self._esgotado = len(novas) < falta
+            self._pendentes += novas
+
+    def _tabela(self) -> Table:
+        return Table([self._cabecalho] + self._pendentes, repeatRows=1, colWidths=self._col_widths, style=self._estilo)
+
+    def wrap(self, availWidth, availHeight):
+        # Sempre "não cabe" enquanto houver linhas: o frame chama split, que entrega a próxima página
+        self._completar()
+        if not self._pendentes:
+            return 0, 0
+        return availWidth, availHeight + 1
+
+    def split(self, availWidth, availHeight):
+        while True:
+            self._completar()
+            if not self._pendentes:
+                return []
+            partes = self._tabela().split(availWidth, availHeight)
+            if not partes:
+                return []
+            if len(partes) == 2 or self._esgotado:
+                break
+            # O bloco inteiro coube com linhas ainda por vir: lê mais antes de fechar a página
+            self._por_bloco *= 2
+
+        pagina = partes[0]
+        usadas = len(pagina._cellvalues) - 1
+        self._pendentes = self._pendentes[usadas:]
+        self._diagramadas += usadas
+        # Próximo bloco: o que coube nesta página com folga (linhas de alturas diferentes)
+        self._por_bloco = max(LINHAS_POR_BLOCO_INICIAL, usadas + usadas // 4 + 4)
+        if self._progresso:
+            self._progresso(self._diagramadas)
+        # O doc marca _postponed quando nada coube no fim de uma página e aborta se a marca
+        # se repetir; aqui o restante é "outra" tabela (como o R1 de Table.split), então limpa
+        self.__dict__.pop('_postponed', None)
+        if len(partes) == 1:
+            return [pagina]
+        return [pagina, self]
+
+    def draw(self):
+        # Só é desenhada vazia (iterador esgotado); as linhas saem nos Tables devolvidos por split
+        pass
@@ -50,7 +50,8 @@ def calcular_icms_interestadual(estado_origem: str, estado_destino: str) -> floa
 def determinar_icms(
     cliente_tem_ie: bool,
     estado: Optional[str],
-    estado_empresa: str = 'SP'
+    estado_empresa: str = 'SP',
+    aliquotas: Optional[Dict[str, float]] = None,
 ) -> Tuple[float, str]:
     """
     Determina alíquota ICMS e sua origem.
@@ -64,13 +65,16 @@ def determinar_icms(
         cliente_tem_ie: Se cliente tem Inscrição Estadual
         estado: UF do cliente
         estado_empresa: UF da empresa (padrão 'SP')
+        aliquotas: Alíquotas internas por UF (padrão ICMS_CONSUMIDOR_FINAL)
     
     Returns:
         Tupla (aliquota_icms, icms_origem)
     """
+    if aliquotas is None:
+        aliquotas = ICMS_CONSUMIDOR_FINAL
     if estado and estado == estado_empresa:
         # Operação INTRAESTADUAL: sempre alíquota completa, com ou sem IE
-        icms = float(ICMS_CONSUMIDOR_FINAL.get(estado, 0.0)) if estado else 0.0
+        icms = float(aliquotas.get(estado, 0.0)) if estado else 0.0
         origem = 'icms_completo_intraestadual'
     elif cliente_tem_ie:
         # Operação INTERESTADUAL com IE: usa interestadual
@@ -78,7 +82,7 @@ def determinar_icms(
         origem = 'icms_interestadual_ie' if estado else 'icms_zero_sem_estado'
     else:
         # Operação INTERESTADUAL sem IE: alíquota completa do estado
-        icms = float(ICMS_CONSUMIDOR_FINAL.get(estado, 0.0)) if estado else 0.0
+        icms = float(aliquotas.get(estado, 0.0)) if estado else 0.0
         origem = 'icms_completo_consumidor_final' if estado else 'icms_zero_sem_estado'
     
     return icms, origem
@@ -262,7 +266,12 @@ def calcular_aproveitamento(
 ) -> Dict[str, Any]:
     """
     Calcula aproveitamento da bobina (unidades por bobina, sobra, etc).
-    
+
+    A altura efetiva da unidade é calculada sempre que houver altura do produto;
+    os demais campos só são preenchidos quando a gramatura tem altura de bobina.
+    Se a unidade não couber na bobina, unidades_por_bobina fica 0 e a sobra é
+    a bobina inteira.
+
     Returns:
         Dicionário com informações de aproveitamento
     """
@@ -278,28 +287,25 @@ def calcular_aproveitamento(
         'total_bobinas': None,
         'sobra_total': None,
     }
-    
-    if not altura_produto or not altura_cm_db:
+
+    if not altura_produto or altura_produto <= 0:
         return resultado
-    
+
+    # Altura efetiva: frente (produto) + verso (produto) + fundo + alça
+    altura_effective = (altura_produto * 2.0) + (fundo_cm or 0)
+    if incluir_alca:
+        altura_effective += float(tamanho_alca or 0)
+    resultado['altura_unit_effective_value'] = altura_effective
+
+    if not altura_cm_db or altura_cm_db <= 0 or altura_effective <= 0:
+        return resultado
+
     try:
-        if altura_cm_db <= 0 or altura_produto <= 0:
-            return resultado
-        
-        # Altura efetiva: frente (produto) + verso (produto) + fundo + alça
-        altura_effective = (altura_produto * 2.0) + (fundo_cm or 0)
-        if incluir_alca:
-            altura_effective += float(tamanho_alca or 0)
-        
         unidades_por_bobina = int(altura_cm_db // altura_effective)
-        if unidades_por_bobina <= 0:
-            return resultado
-        
         utilizada_por_bobina = unidades_por_bobina * altura_effective
         aproveitamento_percentual = round((utilizada_por_bobina / altura_cm_db) * 100.0, 2)
         
         resultado.update({
-            'altura_unit_effective_value': altura_effective,
             'unidades_por_bobina': unidades_por_bobina,
             'aproveitamento_percentual': aproveitamento_percentual,
             'aproveitamento_detalhe': {
@@ -324,11 +330,10 @@ def calcular_aproveitamento(
         
         total_altura_needed = quantidade * altura_effective
         resultado['total_altura_needed'] = total_altura_needed
-        
-        if altura_cm_db > 0:
-            total_bobinas = math.ceil(total_altura_needed / altura_cm_db)
-            resultado['total_bobinas'] = total_bobinas
-            resultado['sobra_total'] = (total_bobinas * altura_cm_db) - total_altura_needed
+
+        total_bobinas = math.ceil(total_altura_needed / altura_cm_db)
+        resultado['total_bobinas'] = total_bobinas
+        resultado['sobra_total'] = (total_bobinas * altura_cm_db) - total_altura_needed
     
     except Exception:
         pass
@@ -0,0 +1,137 @@
+"""
+Curva de preço unitário por quantidade com degraus analíticos.
+
+Os custos adicionais cobram `max(1, ceil(q / a_cada))` vezes, então o custo
+total só muda de patamar logo após cada múltiplo de `a_cada`. Entre dois
+degraus o preço total é linear em q e o unitário cai continuamente
+(custo fixo diluído). Por isso basta avaliar o início e o fim de cada
+segmento, sem percorrer todas as quantidades inteiras; o fim de cada segmento
+é o "ponto ideal": a maior quantidade antes de um novo degrau de custo.
+"""
+
+import math
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from app.utils.pricing_engine import QuoteInput, ReferenceData
+from app.utils.price_matrix import calcular_matriz
+
+
+MAX_DEGRAUS = 2000
+MAX_AMOSTRAS_SEGMENTO = 20
+
+
+def degraus_custos(
+    custos_adicionais,
+    quantidade_min: int,
+    quantidade_max: int,
+    limite: int = MAX_DEGRAUS,
+) -> Tuple[List[int], Dict[int, List[str]]]:
+    """
+    Lista as quantidades q em [min, max) após as quais algum custo sobe de patamar.
+
+    Regras com a_cada = 1 crescem de forma linear (sem salto no unitário) e
+    não geram degraus.
+
+    Returns:
+        Tupla (fins_de_segmento ordenados, nomes dos custos que sobem em q + 1)
+    """
+    nomes: Dict[int, List[str]] = {}
+    for custo in custos_adicionais or []:
+        valor = float(custo.get('valor') or 0)
+        a_cada = int(custo.get('a_cada') or 1)
+        if valor <= 0 or a_cada <= 1:
+            continue
+        primeiro = max(1, math.ceil(quantidade_min / a_cada))
+        k = primeiro
+        while k * a_cada < quantidade_max and k - primeiro <= limite:
+            nomes.setdefault(k * a_cada, []).append(custo.get('nome') or '')
+            k += 1
+    fins = sorted(nomes)[:limite]
+    return fins, {q: nomes[q] for q in fins}
+
+
+def calcular_curva(
+    quote: QuoteInput,
+    ref: ReferenceData,
+    quantidade_min: int,
+    quantidade_max: int,
+    amostras_por_segmento: int = 0,
+) -> Dict[str, Any]:
+    """
+    Monta a curva de preço unitário entre quantidade_min e quantidade_max.
+
+    Returns:
+        Dicionário com segmentos, degraus (saltos), pontos ideais e a curva
+        para desenho (início/fim de cada segmento e amostras intermediárias)
+
+    Raises:
+        GramaturaNaoEncontrada: gramatura da cotação não existe no snapshot
+    """
+    fins, nomes = degraus_custos(ref.custos_adicionais, quantidade_min, quantidade_max)
+    truncado = len(fins) >= MAX_DEGRAUS
+    if truncado:
+        quantidade_max = fins[-1]
+        fins = fins[:-1]
+
+    inicios = [quantidade_min] + [q + 1 for q in fins]
+    fins_seg = fins + [quantidade_max]
+    amostras = max(0, min(int(amostras_por_segmento or 0), MAX_AMOSTRAS_SEGMENTO))
+
+    # Quantidades avaliadas: extremos de cada segmento + amostras geométricas no meio
+    pontos = set(inicios) | set(fins_seg)
+    if amostras:
+        for de, ate in zip(inicios, fins_seg):
+            if ate - de > 1:
+                meio = np.unique(np.round(np.geomspace(de, ate, amostras + 2)[1:-1]).astype(np.int64))
+                pontos.update(int(q) for q in meio)
+    quantidades = sorted(pontos)
+
+    matriz = calcular_matriz(quote, ref, [quote.largura_cm], [quote.altura_cm], quantidades)
+    precos = matriz['preco_final'][0, 0, :]
+    total = {q: float(precos[i]) for i, q in enumerate(quantidades)}
+
+    def unit(q):
+        return round(total[q] / q, 4)
+
+    segmentos = [
+        {
+            'de': de,
+            'ate': ate,
+            'preco_final_de': total[de],
+            'preco_final_ate': total[ate],
+            'preco_unitario_de': unit(de),
+            'preco_unitario_ate': unit(ate),
+        }
+        for de, ate in zip(inicios, fins_seg)
+    ]
+    degraus = [
+        {
+            'quantidade': q + 1,
+            'custos': nomes[q],
+            'preco_unitario_antes': unit(q),
+            'preco_unitario_depois': unit(q + 1),
+            'salto_unitario': round(unit(q + 1) - unit(q), 4),
+        }
+        for q in fins
+    ]
+    # Pontos ideais: fim de segmento cujo unitário é menor que o do início do próximo
+    pontos_ideais = [
+        {
+            'quantidade': d['quantidade'] - 1,
+            'preco_unitario': d['preco_unitario_antes'],
+            'economia_unitaria_vs_proximo': d['salto_unitario'],
+        }
+        for d in degraus
+        if d['salto_unitario'] > 0
+    ]
+    return {
+        'quantidade_min': quantidade_min,
+        'quantidade_max': quantidade_max,
+        'truncado': truncado,
+        'segmentos': segmentos,
+        'degraus': degraus,
+        'pontos_ideais': pontos_ideais,
+        'curva': [{'quantidade': q, 'preco_unitario': unit(q), 'preco_final': total[q]} for q in quantidades],
+    }
@@ -0,0 +1,253 @@
+"""
+Matriz de preços vetorizada (NumPy) sobre grades largura × altura × quantidade.
+
+Reproduz, em arrays, a mesma sequência de operações e arredondamentos do motor
+escalar (`pricing_engine.calcular_orcamento`): material pela largura efetiva,
+cordão, custos adicionais em degraus `max(1, ceil(q / a_cada))`, divisores
+multiplicativos de `calcular_preco_final`, IPI e serviços por fora. A altura
+não entra no preço; ela define apenas o aproveitamento da bobina
+(unidades por bobina e bobinas necessárias).
+"""
+
+import math
+from dataclasses import replace
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.utils.pricing_engine import (
+    QuoteInput,
+    ReferenceData,
+    calcular_orcamento,
+    largura_com_faixas,
+    resolver_parametros,
+)
+
+
+MAX_CELULAS_MATRIZ = 250_000
+# Mesmo limite de quantidade do solver (QUANTIDADE_MAX_PADRAO); a grade é calculada em int64
+MAX_QUANTIDADE_MATRIZ = 1_000_000
+
+
+def expandir_eixo(valor: Any, nome: str) -> List[float]:
+    """
+    Aceita lista de valores ou faixa {"de", "ate", "passo"} e devolve a lista de pontos.
+
+    Raises:
+        ValueError: faixa inválida, lista vazia ou valor não finito
+    """
+    if isinstance(valor, dict):
+        try:
+            de = float(valor.get('de'))
+            ate = float(valor.get('ate'))
+            passo = float(valor.get('passo') or 1)
+        except Exception:
+            raise ValueError(f'Faixa de {nome} inválida: informe de, ate e passo.')
+        if not all(math.isfinite(v) for v in (de, ate, passo)):
+            raise ValueError(f'Faixa de {nome} inválida: de, ate e passo devem ser números finitos.')
+        if passo <= 0 or ate < de:
+            raise ValueError(f'Faixa de {nome} inválida: passo deve ser positivo e ate >= de.')
+        n = int(math.floor((ate - de) / passo + 1e-9)) + 1
+        if n > MAX_CELULAS_MATRIZ:
+            raise ValueError(f'Faixa de {nome} grande demais.')
+        return [round(de + i * passo, 6) for i in range(n)]
+    if isinstance(valor, (list, tuple)) and len(valor) > 0:
+        try:
+            pontos = [float(v) for v in valor]
+        except Exception:
+            raise ValueError(f'Lista de {nome} contém valores inválidos.')
+        if not all(math.isfinite(v) for v in pontos):
+            raise ValueError(f'Lista de {nome} contém valores não finitos.')
+        return pontos
+    raise ValueError(f'Informe {nome} como lista ou faixa {{de, ate, passo}}.')
+
+
+def validar_dimensoes(valores: Sequence[float], nome: str) -> None:
+    """
+    Todas as larguras/alturas da grade precisam ser positivas (o parse da cotação só vê a primeira).
+
+    Raises:
+        ValueError: algum valor <= 0
+    """
+    if any(v <= 0 for v in valores):
+        raise ValueError(f'Todos os valores de {nome} devem ser maiores que zero.')
+
+
+def quantidades_inteiras(valores: Sequence[float]) -> List[int]:
+    """
+    Quantidades da grade como inteiros entre 1 e MAX_QUANTIDADE_MATRIZ.
+
+    Raises:
+        ValueError: quantidade fracionária ou fora da faixa
+    """
+    if any(not float(q).is_integer() for q in valores):
+        raise ValueError('Quantidades devem ser números inteiros.')
+    if any(q < 1 or q > MAX_QUANTIDADE_MATRIZ for q in valores):
+        raise ValueError(f'Quantidades devem estar entre 1 e {MAX_QUANTIDADE_MATRIZ}.')
+    return [int(q) for q in valores]
+
+
+def _r(arr: np.ndarray, casas: int) -> np.ndarray:
+    """
+    Arredonda como o `round()` do Python.
+
+    `np.round` escala por 10**casas antes de arredondar e pode divergir do
+    `round()` nos valores muito próximos de meio centavo; só esses poucos
+    elementos são refeitos no caminho escalar.
+    """
+    arr = np.asarray(arr, dtype=np.float64)
+    out = np.round(arr, casas)
+    escalado = arr * (10 ** casas)
+    duvida = np.abs(escalado - np.floor(escalado) - 0.5) < 1e-6
+    if duvida.any():
+        out[duvida] = [round(float(v), casas) for v in arr[duvida]]
+    return out
+
+
+def calcular_matriz(
+    quote: QuoteInput,
+    ref: ReferenceData,
+    larguras: Sequence[float],
+    alturas: Sequence[float],
+    quantidades: Sequence[int],
+) -> Dict[str, np.ndarray]:
+    """
+    Avalia o preço para todas as combinações largura × altura × quantidade.
+
+    `quote` fornece os demais parâmetros (gramatura, lateral, fundo, alça,
+    cordão, margem, comissão, estado/IE, IPI, serviços, largura da bobina);
+    seus campos largura_cm, altura_cm e quantidade são ignorados.
+
+    Returns:
+        Dicionário de arrays com formato (L, A, Q) para preços e bobinas e (A,) para unidades por bobina
+
+    Raises:
+        GramaturaNaoEncontrada: gramatura da cotação não existe no snapshot
+    """
+    p = resolver_parametros(quote, ref)
+    if quote.largura_bobina_cm and quote.largura_bobina_cm > 0:
+        # Faixas na bobina: cada largura paga a largura efetiva da sua faixa
+        larguras = [largura_com_faixas(l, p.lateral_effective, quote.largura_bobina_cm)[0] for l in larguras]
+    larg = np.asarray(larguras, dtype=np.float64)[:, None]      # (L, 1)
+    alt = np.asarray(alturas, dtype=np.float64)                 # (A,)
+    qtd = np.asarray(quantidades, dtype=np.int64)[None, :]      # (1, Q)
+    qf = qtd.astype(np.float64)
+
+    largura_used = larg + p.lateral_effective
+    custo_real = _r(p.custo_un * (largura_used / 100), 2)
+    custo_total = _r(custo_real * qf, 2)
+    perdas_valor = round(p.perdas_calibracao_un * p.custo_un, 2)
+
+    if quote.incluir_cordao and p.custo_cordao > 0:
+        cordao_unit = _r(p.custo_cordao * (largura_used / 100), 4)
+        cordao_total = _r(cordao_unit * qf, 2)
+    else:
+        cordao_total = np.zeros_like(largura_used)
+
+    # Custos adicionais: soma dos itens já arredondados, na ordem do cadastro
+    adicionais = np.zeros_like(qf)
+    for custo in ref.custos_adicionais:
+        valor = float(custo.get('valor') or 0)
+        a_cada = int(custo.get('a_cada') or 1)
+        if valor <= 0 or a_cada <= 0:
+            continue
+        vezes = np.maximum(1, -(-qtd // a_cada))
+        adicionais = adicionais + _r(valor * vezes, 2)
+    adicionais = _r(adicionais, 2)
+
+    custo_base = _r(custo_total + perdas_valor + cordao_total + adicionais, 2)
+
+    preco = custo_base
+    for dec in (p.margem_dec, p.impostos_sem_icms_dec, p.comissao_dec, p.icms_dec):
+        if 0 < dec < 1.0:
+            preco = preco / (1 - dec)
+    preco_sem_ipi = _r(preco, 2)
+    valor_ipi = _r(preco_sem_ipi * p.ipi_dec, 2) if p.ipi_dec > 0 else np.zeros_like(preco_sem_ipi)
+    preco_com_ipi = _r(preco_sem_ipi + valor_ipi, 2)
+
+    silk_total = _r((p.valor_silk_unit or 0) * qf, 2)
+    servicos_total = _r((p.valor_servicos_unit or 0) * qf, 2)
+    preco_final = _r(preco_com_ipi + silk_total + servicos_total, 2)      # (L, Q)
+
+    # Aproveitamento: depende só da altura (frente + verso + fundo + alça)
+    altura_eff = alt * 2.0 + (quote.fundo_cm or 0)
+    if quote.incluir_alca:
+        altura_eff = altura_eff + float(p.tamanho_alca or 0)
+    if p.altura_cm_db and p.altura_cm_db > 0:
+        unidades = np.floor(p.altura_cm_db / altura_eff)
+        unidades = np.where(altura_eff > 0, unidades, 0)
+    else:
+        unidades = np.full(alt.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bobinas = np.where(unidades[:, None] > 0, np.ceil(qf / unidades[:, None]), np.nan)   # (A, Q)
+
+    forma = (larg.shape[0], alt.shape[0], qtd.shape[1])
+    preco_final_3d = np.broadcast_to(preco_final[:, None, :], forma)
+    return {
+        'preco_final': preco_final_3d,
+        'preco_unitario': preco_final_3d / qf[:, None, :],
+        'preco_final_produto_sem_ipi': np.broadcast_to(preco_sem_ipi[:, None, :], forma),
+        'bobinas_necessarias': np.broadcast_to(bobinas[None, :, :], forma),
+        'unidades_por_bobina': unidades,
+    }
+
+
+def verificar_contra_escalar(
+    quote: QuoteInput,
+    ref: ReferenceData,
+    larguras: Sequence[float],
+    alturas: Sequence[float],
+    quantidades: Sequence[int],
+    matriz: Optional[Dict[str, np.ndarray]] = None,
+    max_pontos: int = 2000,
+) -> Dict[str, Any]:
+    """
+    Recalcula pontos da grade com o motor escalar e compara `preco_final` ao centavo.
+
+    Como o preço não depende da altura, cada par largura × quantidade é
+    conferido uma vez (na primeira altura). Com mais de `max_pontos` pares,
+    confere uma amostra uniforme.
+    """
+    if matriz is None:
+        matriz = calcular_matriz(quote, ref, larguras, alturas, quantidades)
+    pares = [(i, k) for i in range(len(larguras)) for k in range(len(quantidades))]
+    if len(pares) > max_pontos:
+        passo = len(pares) / max_pontos
+        pares = [pares[int(j * passo)] for j in range(max_pontos)]
+
+    divergencias = []
+    max_dif = 0.0
+    for i, k in pares:
+        ponto = replace(quote, largura_cm=float(larguras[i]), altura_cm=float(alturas[0]), quantidade=int(quantidades[k]))
+        escalar = calcular_orcamento(ponto, ref, campos=frozenset({'preco_final'}))['preco_final']
+        vetorial = float(matriz['preco_final'][i, 0, k])
+        dif = abs(escalar - vetorial)
+        max_dif = max(max_dif, dif)
+        if dif >= 0.005:
+            divergencias.append({'largura_cm': float(larguras[i]), 'quantidade': int(quantidades[k]), 'escalar': escalar, 'vetorial': vetorial})
+    return {
+        'pontos_verificados': len(pares),
+        'divergencias': len(divergencias),
+        'max_diferenca': round(max_dif, 6),
+        'exemplos': divergencias[:10],
+    }
+
+
+def matriz_para_json(matriz: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    """Converte os arrays em listas aninhadas (NaN vira None)."""
+    def conv(arr, casas=None, inteiro=False):
+        arr = np.asarray(arr, dtype=np.float64)
+        if casas is not None:
+            arr = np.round(arr, casas)
+        vazio = np.isnan(arr)
+        obj = np.where(vazio, 0, arr).astype(np.int64 if inteiro else np.float64).astype(object)
+        obj[vazio] = None
+        return obj.tolist()
+
+    return {
+        'preco_final': conv(matriz['preco_final'], 2),
+        'preco_unitario': conv(matriz['preco_unitario'], 4),
+        'preco_final_produto_sem_ipi': conv(matriz['preco_final_produto_sem_ipi'], 2),
+        'bobinas_necessarias': conv(matriz['bobinas_necessarias'], inteiro=True),
+        'unidades_por_bobina': conv(matriz['unidades_por_bobina'], inteiro=True),
+    }
@@ -0,0 +1,232 @@
+"""
+Precificação inversa: dado um preço-alvo, encontra o valor de uma variável livre.
+
+O preço sem IPI é `custo_base ÷ Π(1 − p)` (margem, impostos, comissão e ICMS),
+então margem e comissão têm forma fechada; o resultado é conferido no motor
+escalar e ajustado nas vizinhanças por causa dos arredondamentos ao centavo.
+Para o preço da gramatura (custo máximo por metro) e para a quantidade o
+preço é monotônico dentro de cada faixa, e a busca é binária.
+"""
+
+from dataclasses import replace
+from typing import Any, Callable, Dict, Optional
+
+from app.utils.pricing_engine import (
+    QuoteInput,
+    ReferenceData,
+    calcular_com_parametros,
+    calcular_orcamento,
+    resolver_parametros,
+)
+from app.utils.price_curve import degraus_custos
+from app.utils.price_matrix import calcular_matriz
+
+
+VARIAVEIS = ('margem', 'comissao', 'quantidade', 'gramatura_preco')
+QUANTIDADE_MAX_PADRAO = 1_000_000
+PASSO_PERCENTUAL = 0.0001
+PASSO_PRECO_GRAMATURA = 0.0001
+# Nas buscas só o preço final interessa: o motor pula as demais seções da resposta
+SO_PRECO = frozenset({'preco_final'})
+
+
+class SolverError(ValueError):
+    """Parâmetros do solver inválidos (mapeado para HTTP 400 nas rotas)."""
+
+
+def _produto_divisores(*decimais: float) -> float:
+    prod = 1.0
+    for dec in decimais:
+        if 0 < dec < 1.0:
+            prod *= (1 - dec)
+    return prod
+
+
+def _resultado(variavel, valor, alvo_total, alvo_unit, orcamento, viavel=True, mensagem=None) -> Dict[str, Any]:
+    qtd = max(1, int(orcamento.get('quantidade') or 1))
+    preco_final = orcamento['preco_final']
+    return {
+        'variavel': variavel,
+        'valor': valor,
+        'viavel': viavel,
+        'mensagem': mensagem,
+        'alvo': {'preco_final': alvo_total, 'preco_unitario': alvo_unit},
+        'obtido': {'preco_final': preco_final, 'preco_unitario': round(preco_final / qtd, 4)},
+        'diferenca': round(preco_final - alvo_total, 2) if alvo_total is not None else None,
+        'orcamento': orcamento,
+    }
+
+
+def _resolver_percentual(quote: QuoteInput, ref: ReferenceData, campo: str, alvo_total: float, alvo_unit: Optional[float]):
+    """Margem ou comissão por forma fechada + ajuste fino nos vizinhos."""
+    base = calcular_orcamento(replace(quote, **{campo: 0.0}), ref)
+    p = resolver_parametros(quote, ref)
+    servicos = base['preco_final_servicos']
+    custo_base = base['custo_base']
+
+    preco_sem_ipi = (alvo_total - servicos) / (1 + p.ipi_dec)
+    outros = (
+        _produto_divisores(p.impostos_sem_icms_dec, p.comissao_dec, p.icms_dec) if campo == 'margem'
+        else _produto_divisores(p.margem_dec, p.impostos_sem_icms_dec, p.icms_dec)
+    )
+    if preco_sem_ipi <= 0 or custo_base <= 0:
+        return _resultado(campo, None, alvo_total, alvo_unit, base, False, 'Preço-alvo não cobre os serviços ou custo base zerado.')
+
+    x = 1 - custo_base / (preco_sem_ipi * outros)
+    if x < 0:
+        return _resultado(campo, 0.0, alvo_total, alvo_unit, base, False,
+                          f'Preço-alvo abaixo do mínimo com {campo} zero.')
+
+    # Ajuste fino: o arredondamento ao centavo pode deslocar o valor ótimo em alguns passos
+    centro = round(x * 100, 4)
+    melhor = None
+    for k in range(-3, 4):
+        pct = round(centro + k * PASSO_PERCENTUAL, 4)
+        if pct < 0 or pct >= 100:
+            continue
+        orc = calcular_orcamento(replace(quote, **{campo: pct}), ref)
+        chave = (abs(orc['preco_final'] - alvo_total), abs(k))
+        if melhor is None or chave < melhor[0]:
+            melhor = (chave, pct, orc)
+    _, pct, orc = melhor
+    return _resultado(campo, pct, alvo_total, alvo_unit, orc)
+
+
+def _maior_valido(avaliar: Callable[[int], float], alvo: float, hi: int) -> Optional[int]:
+    """Maior inteiro n em [0, hi] com avaliar(n) <= alvo, para avaliar não decrescente."""
+    if avaliar(0) > alvo:
+        return None
+    lo = 0
+    while avaliar(hi) <= alvo:
+        lo, hi = hi, hi * 2
+        if hi > 10 ** 12:
+            return lo
+    while hi - lo > 1:
+        meio = (lo + hi) // 2
+        if avaliar(meio) <= alvo:
+            lo = meio
+        else:
+            hi = meio
+    return lo
+
+
+def _resolver_preco_gramatura(quote: QuoteInput, ref: ReferenceData, alvo_total: float, alvo_unit: Optional[float]):
+    """Maior preço por metro da gramatura que mantém o preço final dentro do alvo."""
+    p = resolver_parametros(quote, ref)
+
+    def preco(ticks: int) -> float:
+        custo = ticks * PASSO_PRECO_GRAMATURA
+        return calcular_com_parametros(quote, replace(p, custo_un=custo), ref, campos=SO_PRECO)['preco_final']
+
+    # Estimativa linear (sem arredondamentos) para iniciar a busca perto da resposta
+    base = calcular_com_parametros(quote, replace(p, custo_un=0.0), ref)
+    divisores = _produto_divisores(p.margem_dec, p.impostos_sem_icms_dec, p.comissao_dec, p.icms_dec)
+    preco_sem_ipi = (alvo_total - base['preco_final_servicos']) / (1 + p.ipi_dec)
+    fixo = base['valor_cordao_total'] + base['custos_adicionais_total']
+    metros = (float(quote.largura_cm or 0) + p.lateral_effective) / 100 * quote.quantidade + p.perdas_calibracao_un
+    estimativa = (preco_sem_ipi * divisores - fixo) / metros if metros > 0 else 0
+    hi = max(1, int(max(estimativa, 0) / PASSO_PRECO_GRAMATURA * 1.01) + 10)
+
+    ticks = _maior_valido(preco, alvo_total, hi)
+    if ticks is None:
+        return _resultado('gramatura_preco', None, alvo_total, alvo_unit, base, False,
+                          'Preço-alvo abaixo do custo fixo (cordão, custos adicionais e serviços).')
+    custo = round(ticks * PASSO_PRECO_GRAMATURA, 4)
+    orc = calcular_com_parametros(quote, replace(p, custo_un=custo), ref)
+    return _resultado('gramatura_preco', custo, alvo_total, alvo_unit, orc)
+
+
+def _resolver_quantidade_orcamento(quote: QuoteInput, ref: ReferenceData, alvo_total: float, quantidade_max: int):
+    """Maior quantidade cujo preço final cabe no orçamento (preço total é não decrescente em q)."""
+    def total(q: int) -> float:
+        return calcular_orcamento(replace(quote, quantidade=q), ref, campos=SO_PRECO)['preco_final']
+
+    if total(1) > alvo_total:
+        orc = calcular_orcamento(replace(quote, quantidade=1), ref)
+        return _resultado('quantidade', None, alvo_total, None, orc, False, 'Orçamento não cobre nem 1 unidade.')
+    lo, hi = 1, 2
+    while hi <= quantidade_max and total(hi) <= alvo_total:
+        lo, hi = hi, hi * 2
+    hi = min(hi, quantidade_max + 1)
+    while hi - lo > 1:
+        meio = (lo + hi) // 2
+        if total(meio) <= alvo_total:
+            lo = meio
+        else:
+            hi = meio
+    orc = calcular_orcamento(replace(quote, quantidade=lo), ref)
+    msg = 'Limitado por quantidade_max.' if lo == quantidade_max else None
+    return _resultado('quantidade', lo, alvo_total, None, orc, True, msg)
+
+
+def _resolver_quantidade_unitario(quote: QuoteInput, ref: ReferenceData, alvo_unit: float, quantidade_max: int):
+    """
+    Menor quantidade com preço unitário <= alvo.
+
+    Entre degraus de custos adicionais o unitário só cai; o primeiro segmento
+    cujo fim atinge o alvo é localizado pelos extremos (avaliação vetorizada)
+    e a quantidade exata sai de uma busca binária dentro dele.
+    """
+    fins, _ = degraus_custos(ref.custos_adicionais, 1, quantidade_max)
+    inicios = [1] + [q + 1 for q in fins]
+    fins_seg = fins + [quantidade_max]
+    matriz = calcular_matriz(quote, ref, [quote.largura_cm], [quote.altura_cm], fins_seg)
+    totais_fim = matriz['preco_final'][0, 0, :]
+
+    for de, ate, total_fim in zip(inicios, fins_seg, totais_fim):
+        if total_fim / ate > alvo_unit:
+            continue
+        lo, hi = de - 1, ate
+        while hi - lo > 1:
+            meio = (lo + hi) // 2
+            if calcular_orcamento(replace(quote, quantidade=meio), ref, campos=SO_PRECO)['preco_final'] / meio <= alvo_unit:
+                hi = meio
+            else:
+                lo = meio
+        orc = calcular_orcamento(replace(quote, quantidade=hi), ref)
+        return _resultado('quantidade', hi, round(alvo_unit * hi, 2), alvo_unit, orc)
+
+    melhor = min(range(len(fins_seg)), key=lambda i: totais_fim[i] / fins_seg[i])
+    orc = calcular_orcamento(replace(quote, quantidade=fins_seg[melhor]), ref)
+    return _resultado('quantidade', None, None, alvo_unit, orc, False,
+                      f'Preço unitário alvo não é atingido até {quantidade_max} unidades; menor unitário em {fins_seg[melhor]}.')
+
+
+def resolver_alvo(
+    quote: QuoteInput,
+    ref: ReferenceData,
+    variavel: str,
+    preco_final: Optional[float] = None,
+    preco_unitario: Optional[float] = None,
+    quantidade_max: int = QUANTIDADE_MAX_PADRAO,
+) -> Dict[str, Any]:
+    """
+    Encontra o valor de `variavel` que leva a cotação ao preço-alvo.
+
+    Informe `preco_final` (total) ou `preco_unitario`. Para quantidade, um alvo
+    total devolve a maior quantidade dentro do orçamento e um alvo unitário a
+    menor quantidade que atinge aquele unitário.
+
+    Raises:
+        SolverError: variável desconhecida ou alvo ausente/inválido
+        GramaturaNaoEncontrada: gramatura da cotação não existe no snapshot
+    """
+    if variavel not in VARIAVEIS:
+        raise SolverError(f"Variável inválida. Use uma de: {', '.join(VARIAVEIS)}.")
+    if (preco_final is None) == (preco_unitario is None):
+        raise SolverError('Informe apenas um alvo: preco_final ou preco_unitario.')
+    alvo = preco_final if preco_final is not None else preco_unitario
+    if alvo <= 0:
+        raise SolverError('O preço-alvo deve ser maior que zero.')
+    resolver_parametros(quote, ref)  # valida a gramatura antes de qualquer busca
+
+    if variavel == 'quantidade':
+        if preco_final is not None:
+            return _resolver_quantidade_orcamento(quote, ref, preco_final, quantidade_max)
+        return _resolver_quantidade_unitario(quote, ref, preco_unitario, quantidade_max)
+
+    qtd = max(1, quote.quantidade)
+    alvo_total = preco_final if preco_final is not None else round(preco_unitario * qtd, 2)
+    if variavel in ('margem', 'comissao'):
+        return _resolver_percentual(quote, ref, variavel, alvo_total, preco_unitario)
+    return _resolver_preco_gramatura(quote, ref, alvo_total, preco_unitario)
@@ -0,0 +1,907 @@
+"""
+Motor de precificação puro (sem I/O) usado por /api/calcular_preco.
+
+Recebe uma cotação já validada (QuoteInput) e um snapshot imutável dos dados
+de referência (ReferenceData: configurações, gramaturas, impostos e custos
+adicionais) e devolve o detalhamento completo do cálculo. Nenhuma função deste
+módulo acessa o Supabase, então o cálculo pode ser repetido em lote ou em
+benchmarks sem tocar na rede.
+"""
+
+import hashlib
+import json
+import time
+from dataclasses import asdict, dataclass, field, replace
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from app.utils.price_calculator import (
+    calcular_aproveitamento,
+    calcular_custo_base,
+    calcular_custos_adicionais,
+    calcular_preco_final,
+    processar_servicos,
+)
+from app.utils.fiscal import TabelaFiscal, estado_empresa_configurado
+from app.utils.centavos import valores_monetarios_centavos, valores_monetarios_centavos_lote
+from app.utils.faixas_bobina import FaixasInputError, faixa_unica
+
+
+# Aritmética dos valores monetários: float com round() em cada etapa (padrão) ou centavos inteiros
+ARITMETICA_FLOAT = 'float'
+ARITMETICA_CENTAVOS = 'centavos'
+ARITMETICAS = (ARITMETICA_FLOAT, ARITMETICA_CENTAVOS)
+
+# Modos de resposta de /api/calcular_preco: resumo para prévias, completo (padrão) e com parâmetros internos
+MODO_RESUMO = 'summary'
+MODO_COMPLETO = 'full'
+MODO_DEBUG = 'debug'
+MODOS = (MODO_RESUMO, MODO_COMPLETO, MODO_DEBUG)
+# Lote e stream não têm a resposta de depuração (parâmetros internos por item)
+MODOS_LOTE = (MODO_RESUMO, MODO_COMPLETO)
+
+# Seções da resposta; uma seção só é calculada se algum de seus campos for pedido
+SECOES_RESPOSTA: Dict[str, Tuple[str, ...]] = {
+    'basico': (
+        'gramatura_nome', 'gramatura_altura_cm', 'largura_cm', 'cortar_tecido', 'largura_original_cm',
+        'altura_produto_cm', 'quantidade', 'perdas_calibracao_un', 'perdas_calibracao_valor',
+    ),
+    'custo': (
+        'custo_unitario_metro', 'custo_un', 'custo_real', 'custo_material_total', 'custo_operacional_percentual',
+        'custo_operacional_valor', 'incluir_cordao', 'custo_cordao_config', 'valor_cordao_unitario',
+        'valor_cordao_total', 'custos_adicionais_lista', 'custos_adicionais_total', 'custo_base',
+    ),
+    'composicao': (
+        'margem_percentual', 'valor_margem', 'comissao_percentual', 'valor_comissao', 'valor_comissao_produto',
+        'valor_comissao_servicos', 'ipi_percentual', 'valor_ipi',
+    ),
+    'impostos': (
+        'impostos_fixos_percentual', 'impostos_fixos_detalhe', 'valor_impostos_fixos', 'icms_percentual',
+        'icms_origem', 'icms_base', 'icms_inclui_ipi', 'valor_icms',
+    ),
+    'precos': (
+        'preco_final_produto', 'preco_final_produto_com_ipi', 'preco_final_produto_sem_ipi',
+        'preco_unitario_sem_ipi', 'preco_unitario', 'preco_final_servicos', 'preco_final',
+    ),
+    'servicos': (
+        'incluir_valor_silk', 'valor_silk_unitario', 'valor_silk_total', 'valor_servicos_unitario',
+        'valor_servicos_total', 'servicos_detalhe',
+    ),
+    'aproveitamento': (
+        'incluir_lateral', 'incluir_alca', 'incluir_fundo', 'lateral_cm', 'fundo_cm', 'largura_utilizada_cm',
+        'altura_utilizada_cm', 'tamanho_alca', 'valor_alca', 'altura_unit_effective_cm',
+        'aproveitamento_altura_percentual', 'unidades_por_bobina', 'aproveitamento_detalhe',
+        'utilizada_por_bobina_cm', 'sobra_por_bobina_cm', 'bobinas_necessarias', 'total_altura_necessaria_cm',
+        'total_bobinas_necessarias', 'sobra_total_cm',
+    ),
+    'validacao': ('check',),
+    'faixas': ('faixas',),
+}
+CAMPOS_RESPOSTA = frozenset(c for campos in SECOES_RESPOSTA.values() for c in campos)
+CAMPOS_RESUMO = frozenset({'preco_final', 'preco_unitario', 'preco_unitario_sem_ipi', 'quantidade'})
+
+
+class QuoteInputError(ValueError):
+    """Payload de cotação inválido (mapeado para HTTP 400 nas rotas)."""
+
+
+class GramaturaNaoEncontrada(LookupError):
+    """Gramatura inexistente no snapshot (mapeado para HTTP 404 nas rotas)."""
+
+
+@dataclass(frozen=True)
+class QuoteInput:
+    """
+    Parâmetros de uma cotação.
+
+    Campos opcionais com valor None usam o padrão de `configuracoes`
+    (margem, perdas, valor do silk, tamanho da alça e IPI).
+
+    Com `largura_bobina_cm`, a bobina é dividida no máximo de faixas da
+    largura da sacola (generaliza o `cortar_tecido` ao meio) e o custo usa a
+    largura efetiva por faixa, com o refilo rateado.
+    """
+    altura_cm: float
+    gramatura_id: Any = None
+    gramatura_nome: Optional[str] = None
+    largura_cm: float = 0.0
+    cortar_tecido: bool = False
+    largura_original_cm: Optional[float] = None
+    quantidade: int = 1
+    margem: Optional[float] = None
+    comissao: float = 0.0
+    perdas_calibracao_un: Optional[int] = None
+    incluir_valor_silk: bool = False
+    valor_silk: Optional[float] = None
+    incluir_lateral: bool = False
+    incluir_alca: bool = False
+    incluir_fundo: bool = False
+    incluir_cordao: bool = False
+    tamanho_alca: Optional[float] = None
+    ipi_percentual: Optional[float] = None
+    lateral_cm: Optional[float] = None
+    fundo_cm: Optional[float] = None
+    servicos: Tuple[Dict[str, Any], ...] = ()
+    estado: Optional[str] = None
+    cliente_tem_ie: bool = False
+    largura_bobina_cm: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class ReferenceData:
+    """
+    Snapshot imutável das tabelas de referência usadas no cálculo.
+
+    Use `ReferenceData.from_rows` para montar a partir das linhas do banco;
+    os índices por id/nome e o total de impostos sem ICMS são pré-calculados.
+    Sem `fiscal`, usa as alíquotas padrão de ICMS e o estado da empresa configurado.
+    `versao` é um hash do conteúdo: muda sempre que algum valor de referência muda.
+    """
+    configuracoes: Dict[str, Any]
+    gramaturas: Tuple[Dict[str, Any], ...] = ()
+    impostos: Tuple[Dict[str, Any], ...] = ()
+    custos_adicionais: Tuple[Dict[str, Any], ...] = ()
+    fiscal: Optional[TabelaFiscal] = None
+    _gramaturas_por_id: Dict[str, Dict[str, Any]] = field(init=False, repr=False, compare=False)
+    _gramaturas_por_nome: Dict[str, Dict[str, Any]] = field(init=False, repr=False, compare=False)
+    impostos_sem_icms: Tuple[Dict[str, Any], ...] = field(init=False, repr=False, compare=False)
+    total_impostos_sem_icms: float = field(init=False, repr=False, compare=False)
+    versao: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        por_id = {}
+        por_nome = {}
+        for row in self.gramaturas:
+            por_id.setdefault(str(row.get('id')), row)
+            por_nome.setdefault(row.get('gramatura'), row)
+        # ICMS é tratado separadamente (alíquota por estado), então sai da lista de impostos fixos
+        impostos_sem_icms = tuple(
+            {'nome': imp.get('nome'), 'percentual': float(imp.get('valor') or 0)}
+            for imp in self.impostos
+            if (imp.get('nome') or '').strip().upper() != 'ICMS'
+        )
+        if self.fiscal is None:
+            object.__setattr__(self, 'fiscal', TabelaFiscal.from_rows([], estado_empresa_configurado()))
+        object.__setattr__(self, '_gramaturas_por_id', por_id)
+        object.__setattr__(self, '_gramaturas_por_nome', por_nome)
+        object.__setattr__(self, 'impostos_sem_icms', impostos_sem_icms)
+        object.__setattr__(self, 'total_impostos_sem_icms', sum([imp['percentual'] for imp in impostos_sem_icms]))
+        conteudo = {
+            'configuracoes': self.configuracoes,
+            'gramaturas': self.gramaturas,
+            'impostos': self.impostos,
+            'custos_adicionais': self.custos_adicionais,
+            'icms': self.fiscal.aliquotas,
+            'estado_empresa': self.fiscal.estado_empresa,
+        }
+        corpo = json.dumps(conteudo, sort_keys=True, separators=(',', ':'), default=str)
+        object.__setattr__(self, 'versao', hashlib.sha256(corpo.encode('utf-8')).hexdigest()[:16])
+
+    @classmethod
+    def from_rows(
+        cls,
+        configuracoes: Dict[str, Any],
+        gramaturas: List[Dict[str, Any]],
+        impostos: List[Dict[str, Any]],
+        custos_adicionais: List[Dict[str, Any]],
+        icms_estados: Optional[List[Dict[str, Any]]] = None,
+        estado_empresa: Optional[str] = None,
+    ) -> 'ReferenceData':
+        """Normaliza as linhas vindas do banco e monta o snapshot."""
+        return cls(
+            fiscal=TabelaFiscal.from_rows(icms_estados or [], estado_empresa or estado_empresa_configurado()),
+            configuracoes=dict(configuracoes or {}),
+            gramaturas=tuple(
+                {
+                    'id': row.get('id'),
+                    'gramatura': row.get('gramatura'),
+                    'preco': float(row.get('preco') or 0),
+                    'altura_cm': float(row.get('altura_cm')) if row.get('altura_cm') is not None else None,
+                }
+                for row in (gramaturas or [])
+            ),
+            impostos=tuple(
+                {'id': row.get('id'), 'nome': row.get('nome'), 'valor': float(row.get('valor') or 0)}
+                for row in (impostos or [])
+            ),
+            custos_adicionais=tuple(
+                {
+                    'id': row.get('id'),
+                    'nome': row.get('nome'),
+                    'valor': float(row.get('valor') or 0),
+                    'a_cada': int(row.get('a_cada') or 1),
+                }
+                for row in (custos_adicionais or [])
+            ),
+        )
+
+    def buscar_gramatura(self, gramatura_id: Any = None, gramatura_nome: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Procura a gramatura por id (prioritário) ou pelo nome."""
+        if gramatura_id:
+            return self._gramaturas_por_id.get(str(gramatura_id))
+        if gramatura_nome:
+            return self._gramaturas_por_nome.get(gramatura_nome)
+        return None
+
+
+def _opcional(data: Dict[str, Any], campo: str) -> Optional[float]:
+    """Converte campo numérico opcional; vazio ou inválido vira None."""
+    try:
+        if data.get(campo) is not None and str(data.get(campo)) != '':
+            return float(data.get(campo))
+    except Exception:
+        pass
+    return None
+
+
+def parse_quote_input(data: Dict[str, Any]) -> QuoteInput:
+    """
+    Valida o payload de /api/calcular_preco e monta um QuoteInput.
+
+    Raises:
+        QuoteInputError: gramatura ausente, altura ausente/inválida ou campo numérico inválido
+    """
+    data = data or {}
+    gramatura_id = data.get('gramatura_id')
+    gramatura_nome = data.get('gramatura_nome')
+    if not gramatura_id and not gramatura_nome:
+        raise QuoteInputError('Informe gramatura_id ou gramatura_nome')
+
+    # Validação: altura_cm é obrigatória e deve ser um número positivo
+    if data.get('altura_cm') is None or str(data.get('altura_cm')) == '':
+        raise QuoteInputError('Campo altura_cm é obrigatório.')
+    try:
+        altura_cm = float(data.get('altura_cm'))
+    except Exception:
+        raise QuoteInputError('Campo altura_cm inválido.')
+    if altura_cm <= 0:
+        raise QuoteInputError('Campo altura_cm deve ser maior que zero.')
+
+    def numero(campo, conv, padrao=None):
+        if campo not in data:
+            return padrao
+        try:
+            return conv(data.get(campo))
+        except Exception:
+            raise QuoteInputError(f'Campo {campo} inválido.')
+
+    cortar_tecido = bool(data.get('cortar_tecido', False))
+    incluir_valor_silk = bool(data.get('incluir_valor_silk', False))
+
+    # Alça: chave presente sobrescreve a configuração (vazio = 0); valor inválido volta para a configuração
+    tamanho_alca = None
+    if 'tamanho_alca' in data:
+        try:
+            tamanho_alca = float(data.get('tamanho_alca') or 0)
+        except Exception:
+            tamanho_alca = None
+
+    # IPI: vazio ou '0' no payload usa o percentual da configuração
+    ipi_percentual = None
+    ipi_value = data.get('ipi_percentual')
+    if ipi_value is not None and str(ipi_value).strip() not in ('', '0'):
+        try:
+            ipi_percentual = float(ipi_value)
+        except Exception:
+            ipi_percentual = None
+
+    return QuoteInput(
+        altura_cm=altura_cm,
+        gramatura_id=gramatura_id,
+        gramatura_nome=gramatura_nome,
+        largura_cm=numero('largura_cm', float, 0.0),
+        cortar_tecido=cortar_tecido,
+        largura_original_cm=numero('largura_original_cm', float, 0.0) if cortar_tecido else None,
+        quantidade=numero('quantidade', int, 1),
+        margem=numero('margem', float),
+        comissao=numero('comissao', float, 0.0),
+        perdas_calibracao_un=numero('perdas_calibracao_un', int),
+        incluir_valor_silk=incluir_valor_silk,
+        valor_silk=numero('valor_silk', float) if incluir_valor_silk else None,
+        incluir_lateral=bool(data.get('incluir_lateral', False)),
+        incluir_alca=bool(data.get('incluir_alca', False)),
+        incluir_fundo=bool(data.get('incluir_fundo', False)),
+        incluir_cordao=bool(data.get('incluir_cordao', False)),
+        tamanho_alca=tamanho_alca,
+        ipi_percentual=ipi_percentual,
+        lateral_cm=_opcional(data, 'lateral_cm'),
+        fundo_cm=_opcional(data, 'fundo_cm'),
+        servicos=tuple(data.get('servicos') or []),
+        estado=(data.get('estado') or '').strip().upper() or None,
+        cliente_tem_ie=bool(data.get('cliente_tem_ie', False)),
+        largura_bobina_cm=_opcional(data, 'largura_bobina_cm'),
+    )
+
+
+@dataclass(frozen=True)
+class ParametrosCalculo:
+    """Parâmetros de uma cotação já resolvidos contra o snapshot (padrões da configuração, ICMS, decimais)."""
+    custo_un: float
+    gramatura_nome: Optional[str]
+    altura_cm_db: Optional[float]
+    margem: float
+    comissao: float
+    custo_cordao: float
+    perdas_calibracao_un: int
+    tamanho_alca: float
+    ipi_percentual: float
+    valor_silk_unit: float
+    servicos_detalhe: List[Dict[str, Any]]
+    valor_servicos_unit: float
+    icms: float
+    icms_origem: str
+    lateral_effective: float
+    margem_dec: float
+    impostos_sem_icms_dec: float
+    icms_dec: float
+    comissao_dec: float
+    ipi_dec: float
+
+
+def resolver_parametros(quote: QuoteInput, ref: ReferenceData) -> ParametrosCalculo:
+    """
+    Resolve gramatura, padrões da configuração, ICMS e percentuais decimais de uma cotação.
+
+    Raises:
+        GramaturaNaoEncontrada: gramatura do payload não existe no snapshot
+    """
+    row = ref.buscar_gramatura(quote.gramatura_id, quote.gramatura_nome)
+    if not row:
+        raise GramaturaNaoEncontrada('Gramatura não encontrada')
+
+    cfg = ref.configuracoes
+    margem = quote.margem if quote.margem is not None else float(cfg.get('margem', 0))
+    perdas_calibracao_un = (
+        quote.perdas_calibracao_un if quote.perdas_calibracao_un is not None
+        else int(cfg.get('perdas_calibracao_un', 0) or 0)
+    )
+    tamanho_alca = quote.tamanho_alca if quote.tamanho_alca is not None else float(cfg.get('tamanho_alca', 0) or 0)
+    ipi_percentual = quote.ipi_percentual if quote.ipi_percentual is not None else float(cfg.get('ipi_percentual', 0) or 0)
+    valor_silk_unit = 0.0
+    if quote.incluir_valor_silk:
+        valor_silk_unit = quote.valor_silk if quote.valor_silk is not None else float(cfg.get('valor_silk', 0) or 0)
+
+    servicos_detalhe, valor_servicos_unit = processar_servicos(list(quote.servicos))
+    icms, icms_origem = ref.fiscal.icms(quote.estado, quote.cliente_tem_ie)
+    total_impostos = ref.total_impostos_sem_icms
+    comissao = quote.comissao
+
+    return ParametrosCalculo(
+        comissao=comissao,
+        custo_un=row['preco'],
+        gramatura_nome=row['gramatura'],
+        altura_cm_db=row['altura_cm'],
+        margem=margem,
+        custo_cordao=float(cfg.get('custo_cordao', 0)),
+        perdas_calibracao_un=perdas_calibracao_un,
+        tamanho_alca=tamanho_alca,
+        ipi_percentual=ipi_percentual,
+        valor_silk_unit=valor_silk_unit,
+        servicos_detalhe=servicos_detalhe,
+        valor_servicos_unit=valor_servicos_unit,
+        icms=icms,
+        icms_origem=icms_origem,
+        # Ajustes de dimensão: lateral dobra (2x) e soma à largura; fundo soma à altura (sem dobrar)
+        lateral_effective=(quote.lateral_cm or 0) * 2.0,
+        # Percentuais em formato decimal
+        margem_dec=margem / 100 if margem > 0 else 0,
+        impostos_sem_icms_dec=total_impostos / 100 if total_impostos > 0 else 0,
+        icms_dec=icms / 100 if icms > 0 else 0,
+        comissao_dec=comissao / 100 if comissao > 0 else 0,
+        ipi_dec=ipi_percentual / 100,
+    )
+
+
+def resolver_campos(
+    modo: Optional[str] = None,
+    fields: Any = None,
+    modos: Tuple[str, ...] = MODOS,
+) -> Optional[FrozenSet[str]]:
+    """
+    Campos pedidos na resposta a partir de `mode` e `fields`.
+
+    Args:
+        modo: 'summary' (preço final e unitário), 'full' (padrão) ou 'debug' (completo)
+        fields: Lista ou texto separado por vírgulas com os campos desejados; tem prioridade sobre o modo
+        modos: Modos aceitos pela rota (MODOS_LOTE nas rotas de lote)
+
+    Returns:
+        Conjunto de campos, ou None para a resposta completa
+
+    Raises:
+        QuoteInputError: modo desconhecido ou campo inexistente na resposta
+    """
+    modo = modo or MODO_COMPLETO
+    if modo not in modos:
+        raise QuoteInputError(f"mode inválido. Use um de: {', '.join(modos)}.")
+    if fields:
+        if isinstance(fields, str):
+            fields = fields.split(',')
+        if not isinstance(fields, (list, tuple)):
+            raise QuoteInputError('fields deve ser uma lista ou texto separado por vírgulas.')
+        campos = frozenset(str(f).strip() for f in fields if str(f).strip())
+        desconhecidos = sorted(campos - CAMPOS_RESPOSTA)
+        if desconhecidos:
+            raise QuoteInputError(f"Campos desconhecidos em fields: {', '.join(desconhecidos)}.")
+        return campos
+    return CAMPOS_RESUMO if modo == MODO_RESUMO else None
+
+
+def largura_com_faixas(largura_cm: float, lateral_effective: float, largura_bobina_cm: float) -> Tuple[float, Dict[str, Any]]:
+    """
+    Largura (sem lateral) a precificar quando a bobina é dividida em faixas da largura da sacola.
+
+    A sacola paga a largura efetiva da faixa (faixa + refilo rateado).
+
+    Raises:
+        QuoteInputError: sacola mais larga que a bobina
+    """
+    try:
+        faixas = faixa_unica(largura_bobina_cm, float(largura_cm or 0) + lateral_effective)
+    except FaixasInputError as e:
+        raise QuoteInputError(str(e))
+    return faixas['largura_efetiva_cm'] - lateral_effective, faixas
+
+
+def calcular_orcamento(
+    quote: QuoteInput,
+    ref: ReferenceData,
+    aritmetica: str = ARITMETICA_FLOAT,
+    campos: Optional[FrozenSet[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Calcula o preço de uma cotação e devolve o detalhamento completo.
+
+    Lógica TOP-DOWN: margem, impostos, comissão e ICMS são extraídos do preço
+    final (% por dentro) a partir do custo base (material + perdas + cordão +
+    custos adicionais); IPI e serviços são somados por fora.
+
+    Com `aritmetica='centavos'` os valores monetários são calculados em
+    centavos inteiros (ver `app.utils.centavos` para a política de arredondamento).
+    Com `campos`, só as seções que contêm algum dos campos são montadas e a
+    resposta traz apenas esses campos (ver `resolver_campos`).
+
+    Raises:
+        GramaturaNaoEncontrada: gramatura do payload não existe no snapshot
+    """
+    return calcular_com_parametros(quote, resolver_parametros(quote, ref), ref, aritmetica, campos)
+
+
+def calcular_orcamento_debug(quote: QuoteInput, ref: ReferenceData, aritmetica: str = ARITMETICA_FLOAT) -> Dict[str, Any]:
+    """
+    Resposta completa mais a seção `debug`: cotação normalizada, parâmetros resolvidos e tempo do cálculo.
+
+    Raises:
+        GramaturaNaoEncontrada: gramatura do payload não existe no snapshot
+    """
+    inicio = time.perf_counter()
+    p = resolver_parametros(quote, ref)
+    resultado = calcular_com_parametros(quote, p, ref, aritmetica)
+    resultado['debug'] = {
+        'aritmetica': aritmetica,
+        'cotacao': asdict(quote),
+        'parametros': asdict(p),
+        'estado_empresa': ref.fiscal.estado_empresa,
+        'tempo_calculo_ms': round((time.perf_counter() - inicio) * 1000, 3),
+    }
+    return resultado
+
+
+def _valores_monetarios_float(quote: QuoteInput, p: ParametrosCalculo, ref: ReferenceData, largura_used: float) -> Dict[str, Any]:
+    """Valores monetários em float, com `round(x, 2)` em cada etapa (aritmética padrão do motor)."""
+    custo_un = p.custo_un
+    quantidade = quote.quantidade
+
+    # Custo por unidade considera a largura efetiva usada
+    custo_real = round(custo_un * (largura_used / 100), 2)
+    custo_total = round(custo_real * quantidade, 2)
+
+    # Perdas de calibração: custo fixo por metro (não por unidade)
+    perdas_calibracao_valor = round(p.perdas_calibracao_un * custo_un, 2)
+
+    # Total de silk e serviços (por unidade x quantidade, sem perdas)
+    valor_silk_total = round((p.valor_silk_unit or 0) * quantidade, 2)
+    valor_servicos_total = round((p.valor_servicos_unit or 0) * quantidade, 2)
+
+    # Cordão proporcional à largura: 50cm = 50% do custo_cordao, 120cm = 120%
+    valor_cordao_unitario = 0
+    valor_cordao_total = 0
+    if quote.incluir_cordao and p.custo_cordao > 0:
+        valor_cordao_unitario = round(p.custo_cordao * (largura_used / 100), 4)
+        valor_cordao_total = round(valor_cordao_unitario * quantidade, 2)
+
+    # Custos adicionais: cada regra cobra max(1, ceil(quantidade / a_cada)) vezes
+    custos_adicionais_lista, custos_adicionais_total = calcular_custos_adicionais(quantidade, ref.custos_adicionais)
+
+    custo_base = calcular_custo_base(custo_total, perdas_calibracao_valor, valor_cordao_total, custos_adicionais_total)
+
+    comissao_dec_aplicada = p.comissao_dec
+    resultado_preco = calcular_preco_final(
+        custo_base=custo_base,
+        margem_dec=p.margem_dec,
+        impostos_sem_icms_dec=p.impostos_sem_icms_dec,
+        icms_dec=p.icms_dec,
+        comissao_dec_aplicada=comissao_dec_aplicada,
+        ipi_dec=p.ipi_dec
+    )
+    preco_final_produto_sem_ipi = resultado_preco['preco_final_produto_sem_ipi']
+    preco_final_produto_com_ipi = resultado_preco['preco_final_produto_com_ipi']
+    base_impostos_nao_icms = resultado_preco['base_impostos_nao_icms']
+    valor_margem = resultado_preco['valor_margem']
+    valor_impostos_sem_icms = resultado_preco['valor_impostos_sem_icms']
+    valor_icms = resultado_preco['valor_icms']
+    valor_comissao = resultado_preco['valor_comissao']
+    valor_ipi = resultado_preco['valor_ipi']
+    valor_impostos = round(valor_impostos_sem_icms + valor_icms, 2)
+
+    return {
+        'custo_real': custo_real,
+        'custo_total': custo_total,
+        'perdas_calibracao_valor': perdas_calibracao_valor,
+        'valor_silk_total': valor_silk_total,
+        'valor_servicos_total': valor_servicos_total,
+        'valor_cordao_unitario': valor_cordao_unitario,
+        'valor_cordao_total': valor_cordao_total,
+        'custos_adicionais_lista': custos_adicionais_lista,
+        'custos_adicionais_total': custos_adicionais_total,
+        'custo_base': custo_base,
+        'preco_final_produto_sem_ipi': preco_final_produto_sem_ipi,
+        'preco_final_produto_com_ipi': preco_final_produto_com_ipi,
+        'valor_ipi': valor_ipi,
+        'valor_margem': valor_margem,
+        'valor_impostos_sem_icms': valor_impostos_sem_icms,
+        'valor_icms': valor_icms,
+        'valor_comissao': valor_comissao,
+        'impostos_valores': [
+            round(base_impostos_nao_icms * (imp['percentual'] / 100), 2) for imp in ref.impostos_sem_icms
+        ],
+        'valor_impostos': valor_impostos,
+        'valor_comissao_produto': round(preco_final_produto_sem_ipi * comissao_dec_aplicada, 2),
+        'valor_comissao_servicos': round((valor_silk_total + valor_servicos_total) * comissao_dec_aplicada, 2),
+        # Serviços (silk) entram por fora do produto
+        'preco_final': round(preco_final_produto_com_ipi + valor_silk_total + valor_servicos_total, 2),
+        # Verificação: soma dos componentes deve fechar o preço
+        'check': round(custo_base + valor_margem + valor_impostos + valor_comissao + valor_ipi, 2),
+    }
+
+
+def calcular_com_parametros(
+    quote: QuoteInput,
+    p: ParametrosCalculo,
+    ref: ReferenceData,
+    aritmetica: str = ARITMETICA_FLOAT,
+    campos: Optional[FrozenSet[str]] = None,
+) -> Dict[str, Any]:
+    """Mesmo cálculo de `calcular_orcamento`, com os parâmetros já resolvidos (permite simular variações)."""
+    quote, faixas = _aplicar_faixas(quote, p)
+    if aritmetica == ARITMETICA_CENTAVOS:
+        valores = valores_monetarios_centavos(quote, p, ref)
+    else:
+        valores = _valores_monetarios_float(quote, p, ref, float(quote.largura_cm or 0) + p.lateral_effective)
+    return _montar_resposta(quote, p, ref, valores, faixas, campos, exatos=aritmetica == ARITMETICA_CENTAVOS)
+
+
+def _aplicar_faixas(quote: QuoteInput, p: ParametrosCalculo) -> Tuple[QuoteInput, Optional[Dict[str, Any]]]:
+    """Com `largura_bobina_cm`, troca a largura pela efetiva do corte em faixas (ver `largura_com_faixas`)."""
+    if not (quote.largura_bobina_cm and quote.largura_bobina_cm > 0):
+        return quote, None
+    largura_efetiva, faixas = largura_com_faixas(quote.largura_cm, p.lateral_effective, quote.largura_bobina_cm)
+    quote = replace(
+        quote,
+        largura_cm=largura_efetiva,
+        cortar_tecido=True,
+        largura_original_cm=quote.largura_bobina_cm,
+    )
+    return quote, faixas
+
+
+# Casas decimais dos valores monetários na resposta
+_CASAS_VALORES = {
+    'custo_real': 2, 'custo_total': 2, 'perdas_calibracao_valor': 2, 'valor_silk_total': 2,
+    'valor_servicos_total': 2, 'valor_cordao_unitario': 4, 'valor_cordao_total': 2, 'custos_adicionais_total': 2,
+    'custo_base': 2, 'preco_final_produto_sem_ipi': 2, 'preco_final_produto_com_ipi': 2, 'valor_ipi': 2,
+    'valor_icms': 2, 'valor_margem': 2, 'valor_comissao': 2, 'preco_final': 2, 'valor_impostos': 2,
+    'valor_comissao_produto': 2, 'valor_comissao_servicos': 2,
+}
+
+
+def _arredondar_valores(valores: Dict[str, Any]) -> Dict[str, Any]:
+    """Valores monetários em float arredondados nas casas da resposta (`_CASAS_VALORES`)."""
+    arredondados = dict(valores)
+    for nome, casas in _CASAS_VALORES.items():
+        arredondados[nome] = round(valores[nome], casas)
+    return arredondados
+
+
+def _montar_resposta(
+    quote: QuoteInput,
+    p: ParametrosCalculo,
+    ref: ReferenceData,
+    valores: Dict[str, Any],
+    faixas: Optional[Dict[str, Any]],
+    campos: Optional[FrozenSet[str]],
+    exatos: bool = False,
+) -> Dict[str, Any]:
+    """
+    Resposta do motor a partir dos valores monetários já calculados (float ou centavos).
+
+    Com `exatos` (valores vindos de centavos, já com as casas da resposta) os
+    valores monetários entram sem passar de novo por `round`.
+    """
+    custo_un = p.custo_un
+    gramatura_nome = p.gramatura_nome
+    altura_cm_db = p.altura_cm_db
+    quantidade = quote.quantidade
+    largura_cm = quote.largura_cm
+    margem = p.margem
+    comissao = p.comissao
+    custo_cordao = p.custo_cordao
+    perdas_calibracao_un = p.perdas_calibracao_un
+    tamanho_alca = p.tamanho_alca
+    ipi_percentual = p.ipi_percentual
+    valor_silk_unit = p.valor_silk_unit
+    servicos_detalhe = p.servicos_detalhe
+    valor_servicos_unit = p.valor_servicos_unit
+    icms = p.icms
+    icms_origem = p.icms_origem
+    total_impostos_fixos_sem_icms = ref.total_impostos_sem_icms
+
+    lateral_effective = p.lateral_effective
+    largura_used = float(largura_cm or 0) + lateral_effective
+
+    if not exatos:
+        valores = _arredondar_valores(valores)
+    custo_real = valores['custo_real']
+    custo_total = valores['custo_total']
+    perdas_calibracao_valor = valores['perdas_calibracao_valor']
+    valor_silk_total = valores['valor_silk_total']
+    valor_servicos_total = valores['valor_servicos_total']
+    valor_cordao_unitario = valores['valor_cordao_unitario']
+    valor_cordao_total = valores['valor_cordao_total']
+    custos_adicionais_lista = valores['custos_adicionais_lista']
+    custos_adicionais_total = valores['custos_adicionais_total']
+    custo_base = valores['custo_base']
+    preco_final_produto_sem_ipi = valores['preco_final_produto_sem_ipi']
+    preco_final_produto_com_ipi = valores['preco_final_produto_com_ipi']
+    valor_ipi = valores['valor_ipi']
+    base_icms = preco_final_produto_sem_ipi
+    valor_icms = valores['valor_icms']
+    valor_margem = valores['valor_margem']
+    valor_comissao = valores['valor_comissao']
+    preco_final_total = valores['preco_final']
+    valor_impostos = valores['valor_impostos']
+    valor_comissao_produto = valores['valor_comissao_produto']
+    valor_comissao_servicos = valores['valor_comissao_servicos']
+    check = valores['check']
+
+    def quer(secao: str) -> bool:
+        return campos is None or not campos.isdisjoint(SECOES_RESPOSTA[secao])
+
+    resultado: Dict[str, Any] = {}
+    if quer('basico'):
+        resultado.update({
+            # ===== INFORMAÇÕES BÁSICAS =====
+            'gramatura_nome': gramatura_nome,
+            'gramatura_altura_cm': altura_cm_db,
+            'largura_cm': largura_cm,
+            'cortar_tecido': quote.cortar_tecido,
+            'largura_original_cm': quote.largura_original_cm,
+            'altura_produto_cm': quote.altura_cm,
+            'quantidade': quantidade,
+            'perdas_calibracao_un': perdas_calibracao_un,
+            'perdas_calibracao_valor': perdas_calibracao_valor,
+        })
+
+    if quer('custo'):
+        resultado.update({
+            # ===== BASE DE DADOS (CUSTO) =====
+            'custo_unitario_metro': round(custo_un, 2),
+            'custo_un': round((custo_total / max(1, quantidade)), 2),
+            'custo_real': custo_real,
+            'custo_material_total': custo_total,
+            'custo_operacional_percentual': 0,
+            'custo_operacional_valor': 0,
+
+            # ===== CORDÃO =====
+            'incluir_cordao': quote.incluir_cordao,
+            'custo_cordao_config': round(custo_cordao, 2),
+            'valor_cordao_unitario': valor_cordao_unitario,
+            'valor_cordao_total': valor_cordao_total,
+
+            # ===== CUSTOS ADICIONAIS =====
+            'custos_adicionais_lista': custos_adicionais_lista,
+            'custos_adicionais_total': custos_adicionais_total,
+
+            'custo_base': custo_base,
+        })
+
+    if quer('composicao'):
+        resultado.update({
+            # ===== COMPOSIÇÃO DO PREÇO FINAL (extraído de cima para baixo) =====
+            'margem_percentual': round(margem, 2),
+            'valor_margem': valor_margem,
+
+            'comissao_percentual': round(comissao, 2),
+            'valor_comissao': valor_comissao,
+            'valor_comissao_produto': valor_comissao_produto,
+            'valor_comissao_servicos': valor_comissao_servicos,
+
+            'ipi_percentual': round(ipi_percentual, 2),
+            'valor_ipi': valor_ipi,
+        })
+
+    if quer('impostos'):
+        # Impostos fixos sobre o faturamento (preço sem IPI); ICMS com sua origem
+        impostos_detalhe = [
+            {
+                'nome': imp['nome'],
+                'percentual': imp['percentual'],
+                'valor': valor_imp,
+                'base': 'preco_sem_ipi',
+            }
+            for imp, valor_imp in zip(ref.impostos_sem_icms, valores['impostos_valores'])
+        ]
+        impostos_detalhe.append({
+            'nome': 'ICMS',
+            'percentual': icms,
+            'valor': valor_icms,
+            'base': 'preco_sem_ipi',
+            'origem': icms_origem,
+        })
+        resultado.update({
+            'impostos_fixos_percentual': round(total_impostos_fixos_sem_icms + icms, 2),
+            'impostos_fixos_detalhe': impostos_detalhe,
+            'valor_impostos_fixos': valor_impostos,
+
+            'icms_percentual': round(icms, 2),
+            'icms_origem': icms_origem,
+            'icms_base': base_icms,
+            'icms_inclui_ipi': not quote.cliente_tem_ie,
+            'valor_icms': valor_icms,
+        })
+
+    if quer('precos'):
+        resultado.update({
+            # ===== PREÇOS FINAIS =====
+            'preco_final_produto': preco_final_produto_com_ipi,
+            'preco_final_produto_com_ipi': preco_final_produto_com_ipi,
+            'preco_final_produto_sem_ipi': preco_final_produto_sem_ipi,
+            'preco_unitario_sem_ipi': round(preco_final_produto_sem_ipi / max(1, quantidade), 4),
+            'preco_unitario': round(preco_final_total / max(1, quantidade), 4),
+            'preco_final_servicos': round(valor_silk_total + valor_servicos_total, 2),
+            'preco_final': preco_final_total,
+        })
+
+    if quer('servicos'):
+        resultado.update({
+            # ===== SERVIÇOS (SILK) =====
+            'incluir_valor_silk': quote.incluir_valor_silk,
+            'valor_silk_unitario': round(valor_silk_unit, 2),
+            'valor_silk_total': valor_silk_total,
+            'valor_servicos_unitario': round(valor_servicos_unit, 2),
+            'valor_servicos_total': valor_servicos_total,
+            'servicos_detalhe': servicos_detalhe,
+        })
+
+    if quer('aproveitamento'):
+        aprov = calcular_aproveitamento(
+            altura_produto=quote.altura_cm,
+            altura_cm_db=altura_cm_db,
+            fundo_cm=quote.fundo_cm,
+            tamanho_alca=tamanho_alca,
+            incluir_alca=quote.incluir_alca,
+            largura_used=largura_used,
+            largura_cm=largura_cm,
+            lateral_effective=lateral_effective,
+            quantidade=quantidade,
+        )
+        altura_unit_effective_value = aprov['altura_unit_effective_value']
+        utilizada_por_bobina_value = aprov['utilizada_por_bobina_value']
+        sobra_por_bobina = aprov['sobra_por_bobina']
+        total_altura_needed = aprov['total_altura_needed']
+        sobra_total = aprov['sobra_total']
+        resultado.update({
+            # ===== DIMENSÕES EFETIVAS =====
+            'incluir_lateral': quote.incluir_lateral,
+            'incluir_alca': quote.incluir_alca,
+            'incluir_fundo': quote.incluir_fundo,
+            'lateral_cm': quote.lateral_cm,
+            'fundo_cm': quote.fundo_cm,
+            'largura_utilizada_cm': round(largura_used, 2),
+            'altura_utilizada_cm': round(altura_unit_effective_value, 2) if altura_unit_effective_value is not None else None,
+            'tamanho_alca': float(tamanho_alca or 0),
+            'valor_alca': float(tamanho_alca or 0),
+            'altura_unit_effective_cm': round(altura_unit_effective_value, 2) if altura_unit_effective_value is not None else None,
+
+            # ===== APROVEITAMENTO =====
+            'aproveitamento_altura_percentual': aprov['aproveitamento_percentual'],
+            'unidades_por_bobina': aprov['unidades_por_bobina'] or 0,
+            'aproveitamento_detalhe': aprov['aproveitamento_detalhe'],
+            'utilizada_por_bobina_cm': round(utilizada_por_bobina_value, 2) if utilizada_por_bobina_value is not None else None,
+            'sobra_por_bobina_cm': round(sobra_por_bobina, 2) if sobra_por_bobina is not None else None,
+            'bobinas_necessarias': aprov['bobinas_necessarias'],
+            'total_altura_necessaria_cm': round(total_altura_needed, 2) if total_altura_needed is not None else None,
+            'total_bobinas_necessarias': aprov['total_bobinas'],
+            'sobra_total_cm': round(sobra_total, 2) if sobra_total is not None else None,
+        })
+
+    # ===== VALIDAÇÃO =====
+    if quer('validacao'):
+        resultado['check'] = round(check, 2)
+    if faixas and quer('faixas'):
+        resultado['faixas'] = faixas
+    if campos is not None:
+        resultado = {k: v for k, v in resultado.items() if k in campos}
+    return resultado
+
+
+def calcular_item(
+    payload: Dict[str, Any],
+    ref: ReferenceData,
+    aritmetica: str = ARITMETICA_FLOAT,
+    campos: Optional[FrozenSet[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Precifica um payload sem lançar exceção: devolve `ok` e `resultado` ou `status`/`error`.
+
+    Base de `calcular_lote` e do modo streaming, em que um item inválido não pode
+    interromper os demais.
+    """
+    try:
+        resultado = calcular_orcamento(parse_quote_input(payload), ref, aritmetica, campos)
+    except Exception as e:
+        return _erro_item(e)
+    return {'ok': True, 'resultado': resultado}
+
+
+def _erro_item(e: Exception) -> Dict[str, Any]:
+    if isinstance(e, QuoteInputError):
+        return {'ok': False, 'status': 400, 'error': str(e)}
+    if isinstance(e, GramaturaNaoEncontrada):
+        return {'ok': False, 'status': 404, 'error': str(e)}
+    return {'ok': False, 'status': 500, 'error': f'Erro ao calcular item: {e}'}
+
+
+def calcular_lote(
+    payloads: List[Dict[str, Any]],
+    ref: ReferenceData,
+    aritmetica: str = ARITMETICA_FLOAT,
+    campos: Optional[FrozenSet[str]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Precifica vários payloads com o mesmo snapshot de referência.
+
+    Erros de um item não interrompem o lote: cada posição da lista devolvida
+    traz `ok` e, conforme o caso, `resultado` ou `status`/`error`.
+
+    Em centavos, os valores monetários de todos os itens válidos são
+    calculados de uma vez em arrays int64 (`valores_monetarios_centavos_lote`);
+    o resultado é idêntico ao de `calcular_item` item a item.
+    """
+    if aritmetica != ARITMETICA_CENTAVOS:
+        return [calcular_item(payload, ref, aritmetica, campos) for payload in payloads]
+
+    saida: List[Optional[Dict[str, Any]]] = [None] * len(payloads)
+    preparados = []
+    for i, payload in enumerate(payloads):
+        try:
+            quote = parse_quote_input(payload)
+            p = resolver_parametros(quote, ref)
+            quote, faixas = _aplicar_faixas(quote, p)
+        except Exception as e:
+            saida[i] = _erro_item(e)
+        else:
+            preparados.append((i, quote, p, faixas))
+
+    try:
+        valores = valores_monetarios_centavos_lote([x[1] for x in preparados], [x[2] for x in preparados], ref)
+    except Exception:
+        # Algum item não converte (ex.: valor não finito): cada um segue pelo caminho escalar com seu próprio erro
+        valores = [None] * len(preparados)
+    for (i, quote, p, faixas), v in zip(preparados, valores):
+        try:
+            if v is None:
+                v = valores_monetarios_centavos(quote, p, ref)
+            saida[i] = {'ok': True, 'resultado': _montar_resposta(quote, p, ref, v, faixas, campos, exatos=True)}
+        except Exception as e:
+            saida[i] = _erro_item(e)
+    return saida
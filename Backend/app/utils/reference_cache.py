@@ -0,0 +1,114 @@
+"""
+Cache em processo (por worker) para os dados de referência do cálculo.
+
+Cada worker do gunicorn guarda o último snapshot carregado por até `ttl`
+segundos. As rotas de escrita chamam `invalidate()` para que a próxima leitura
+no mesmo worker já venha do banco. Com `versao` (ex.: gerações das tabelas
+compartilhadas entre os workers, `app.utils.geracoes`), cada acerto confere a
+versão e recarrega se outro worker escreveu; o TTL fica só para escritas
+feitas fora da aplicação.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class ReferenceCache:
+    """Cache com TTL, contador de versão e contadores de acerto/falha."""
+
+    def __init__(
+        self,
+        loader: Callable[[], Any],
+        ttl_seconds: float = 300.0,
+        ttl_for: Optional[Callable[[Any], Optional[float]]] = None,
+        versao: Optional[Callable[[], Any]] = None,
+    ):
+        self._loader = loader
+        # Versão externa do conteúdo, lida antes de cada carga e conferida a cada acerto
+        self._versao = versao
+        self._versao_carregada: Any = None
+        self._ttl = float(ttl_seconds)
+        # TTL específico por valor carregado (ex.: snapshot do espelho offline expira antes); None = ttl padrão
+        self._ttl_for = ttl_for
+        self._ttl_atual = self._ttl
+        # _lock serializa as recargas; _lock_estado protege valor/geração, para que invalidate()
+        # chamado de dentro do loader (ex.: escrita durante a carga) não espere a própria recarga
+        self._lock = threading.Lock()
+        self._lock_estado = threading.Lock()
+        self._value: Optional[Any] = None
+        self._loaded_at = 0.0
+        # Incrementa a cada invalidação; um carregamento iniciado antes dela é descartado
+        self._generation = 0
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.stale_version = 0
+        self.last_load_ms: Optional[float] = None
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def _fresh(self, now: float) -> bool:
+        if self._value is None or (now - self._loaded_at) >= self._ttl_atual:
+            return False
+        return self._versao is None or self._versao() == self._versao_carregada
+
+    def get(self) -> Any:
+        """Retorna o snapshot atual, recarregando se expirou ou foi invalidado."""
+        # Lê o valor uma vez: invalidate() pode zerá-lo entre a checagem e o retorno
+        value = self._value
+        if value is not None and self._fresh(time.monotonic()):
+            # Contador sem lock: perder um incremento sob concorrência é aceitável
+            self.hits += 1
+            return value
+
+        with self._lock:
+            value = self._value
+            now = time.monotonic()
+            if value is not None and self._fresh(now):
+                self.hits += 1
+                return value
+            self.misses += 1
+            if value is not None and (now - self._loaded_at) < self._ttl_atual:
+                # Dentro do TTL, mas outro worker escreveu (versão externa mudou)
+                self.stale_version += 1
+            generation = self._generation
+            # Lida antes da carga: uma escrita durante ela deixa o snapshot já desatualizado
+            versao = self._versao() if self._versao is not None else None
+            started = time.perf_counter()
+            value = self._loader()
+            self.last_load_ms = round((time.perf_counter() - started) * 1000, 1)
+            ttl = self._ttl_for(value) if self._ttl_for else None
+            with self._lock_estado:
+                if generation == self._generation:
+                    self._value = value
+                    self._loaded_at = time.monotonic()
+                    self._versao_carregada = versao
+                    self._ttl_atual = self._ttl if ttl is None else min(self._ttl, float(ttl))
+                    self._version += 1
+            return value
+
+    def invalidate(self) -> None:
+        """Descarta o snapshot; a próxima chamada a get() lê do banco."""
+        with self._lock_estado:
+            self._generation += 1
+            self._value = None
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        age = time.monotonic() - self._loaded_at if self._value is not None else None
+        return {
+            'version': self._version,
+            'ttl_seconds': self._ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else None,
+            'invalidations': self.invalidations,
+            'stale_version': self.stale_version,
+            'age_seconds': round(age, 1) if age is not None else None,
+            'last_load_ms': self.last_load_ms,
+        }
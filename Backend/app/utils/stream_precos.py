@@ -0,0 +1,166 @@
+"""
+Precificação em streaming para catálogos grandes (NDJSON ou CSV).
+
+As linhas de entrada são lidas do corpo da requisição uma a uma, precificadas
+com o mesmo motor de /api/calcular_preco (`calcular_item`) e devolvidas como
+uma linha NDJSON cada, à medida que ficam prontas. Nada é acumulado: a memória
+usada não depende do número de linhas. Erros de uma linha (JSON inválido,
+campo inválido, gramatura inexistente) viram uma linha de erro na saída e o
+stream continua.
+"""
+
+import csv
+import json
+from typing import Any, BinaryIO, Dict, FrozenSet, Iterator, Optional, Tuple
+
+from app.utils.pricing_engine import ARITMETICA_FLOAT, ReferenceData, calcular_item
+
+
+FORMATO_NDJSON = 'ndjson'
+FORMATO_CSV = 'csv'
+FORMATOS = (FORMATO_NDJSON, FORMATO_CSV)
+
+TAMANHO_BLOCO = 64 * 1024
+MAX_BYTES_LINHA = 1024 * 1024
+
+_VERDADEIROS = {'true', 'sim', 's', 'yes', 'y'}
+_FALSOS = {'false', 'nao', 'não', 'n', 'no'}
+
+
+def _decodificar(linha: bytes, primeira: bool) -> str:
+    # O BOM só pode aparecer no início do corpo; bytes inválidos viram U+FFFD em vez de derrubar o stream
+    return linha.decode('utf-8-sig' if primeira else 'utf-8', errors='replace').rstrip('\r')
+
+
+def _linhas_brutas(stream: BinaryIO) -> Iterator[Tuple[int, str]]:
+    """
+    Linhas de texto do corpo, lidas em blocos (numeradas a partir de 1).
+
+    Linhas com mais de MAX_BYTES_LINHA bytes (contados antes de decodificar)
+    são descartadas até o próximo '\\n' e sinalizadas com None, para que um
+    registro gigante não estoure a memória. O corte é feito nos bytes: '\\n'
+    nunca aparece dentro de um caractere UTF-8 de vários bytes.
+    """
+    pendente = b''
+    numero = 0
+    descartando = False
+    while True:
+        bloco = stream.read(TAMANHO_BLOCO)
+        partes = (pendente + bloco).split(b'\n')
+        pendente = partes.pop()
+        for parte in partes:
+            numero += 1
+            # A parte inclui o resto do bloco anterior: pode passar do limite mesmo completa
+            if descartando or len(parte) > MAX_BYTES_LINHA:
+                descartando = False
+                yield numero, None
+                continue
+            yield numero, _decodificar(parte, numero == 1)
+        if len(pendente) > MAX_BYTES_LINHA:
+            pendente = b''
+            descartando = True
+        if not bloco:
+            break
+    ultima = _decodificar(pendente, numero == 0)
+    if ultima.strip() or descartando:
+        numero += 1
+        yield numero, None if descartando else ultima
+
+
+def ler_ndjson(stream: BinaryIO) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """Gera (linha, payload, erro) para cada linha não vazia de um corpo NDJSON."""
+    for numero, texto in _linhas_brutas(stream):
+        if texto is None:
+            yield numero, None, f'Linha maior que {MAX_BYTES_LINHA} bytes.'
+            continue
+        if not texto.strip():
+            continue
+        try:
+            payload = json.loads(texto)
+        except ValueError as e:
+            yield numero, None, f'JSON inválido: {e}'
+            continue
+        if not isinstance(payload, dict):
+            yield numero, None, 'Linha deve ser um objeto JSON.'
+            continue
+        yield numero, payload, None
+
+
+def _valor_csv(valor: str) -> Any:
+    """Célula CSV para o tipo do payload JSON: booleanos por extenso, listas/objetos em JSON, resto como texto."""
+    texto = valor.strip()
+    minusculo = texto.lower()
+    if minusculo in _VERDADEIROS:
+        return True
+    if minusculo in _FALSOS:
+        return False
+    if texto[:1] in ('[', '{'):
+        try:
+            return json.loads(texto)
+        except ValueError:
+            return texto
+    return texto
+
+
+def ler_csv(stream: BinaryIO, delimitador: str = ',') -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Gera (linha, payload, erro) para cada registro de um CSV com cabeçalho.
+
+    Células vazias são omitidas (o campo fica com o padrão da rota); '1'/'0'
+    continuam numéricos, e `true`/`false`/`sim`/`não` viram booleanos.
+    """
+    linhas = _linhas_brutas(stream)
+    cabecalho = None
+    for numero, texto in linhas:
+        if texto is None:
+            yield numero, None, f'Linha maior que {MAX_BYTES_LINHA} bytes.'
+            continue
+        if not texto.strip():
+            continue
+        try:
+            campos = next(csv.reader([texto], delimiter=delimitador))
+        except csv.Error as e:
+            yield numero, None, f'CSV inválido: {e}'
+            continue
+        if cabecalho is None:
+            cabecalho = [c.strip() for c in campos]
+            continue
+        if len(campos) > len(cabecalho):
+            yield numero, None, f'Linha com {len(campos)} colunas; cabeçalho tem {len(cabecalho)}.'
+            continue
+        payload = {col: _valor_csv(v) for col, v in zip(cabecalho, campos) if col and v.strip() != ''}
+        yield numero, payload, None
+
+
+def precificar_stream(
+    registros: Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]],
+    ref: ReferenceData,
+    aritmetica: str = ARITMETICA_FLOAT,
+    contexto: Optional[Dict[str, Any]] = None,
+    campos: Optional[FrozenSet[str]] = None,
+) -> Iterator[str]:
+    """
+    Precifica cada registro e gera uma linha NDJSON por resultado, mais um resumo final.
+
+    Args:
+        registros: Saída de `ler_ndjson` ou `ler_csv`
+        ref: Snapshot dos dados de referência (carregado uma vez antes do stream)
+        aritmetica: 'float' (padrão) ou 'centavos'
+        contexto: Campos comuns aplicados a todas as linhas (cada linha sobrescreve)
+        campos: Projeção da resposta de cada linha (ver `resolver_campos`)
+
+    Returns:
+        Iterador de linhas NDJSON ('{"linha": n, "ok": ..., ...}\\n'), terminando em '{"resumo": {...}}\\n'
+    """
+    contexto = contexto or {}
+    total = erros = 0
+    for numero, payload, erro in registros:
+        total += 1
+        if erro is not None:
+            item = {'ok': False, 'status': 400, 'error': erro}
+        else:
+            item = calcular_item({**contexto, **payload}, ref, aritmetica, campos)
+        if not item['ok']:
+            erros += 1
+        yield json.dumps({'linha': numero, **item}, ensure_ascii=False) + '\n'
+    yield json.dumps({'resumo': {'total': total, 'sucesso': total - erros, 'erros': erros}}, ensure_ascii=False) + '\n'
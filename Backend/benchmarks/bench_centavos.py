@@ -0,0 +1,151 @@
+"""
+Benchmark: aritmética float (padrão) x centavos inteiros no motor de preços.
+
+Gera um corpus determinístico de cotações sobre um snapshot sintético de
+dados de referência (sem Supabase), mede o tempo de cada caminho e lista todos
+os casos em que `preco_final` difere entre eles.
+
+Uso (a partir de Backend/):
+    python -m benchmarks.bench_centavos [--casos 20000] [--seed 42] [--mostrar 20]
+"""
+
+import argparse
+import gc
+import random
+from dataclasses import asdict
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.utils.centavos import precos_centavos_lote, valores_centavos  # noqa: E402
+from app.utils.pricing_engine import (  # noqa: E402
+    ARITMETICA_CENTAVOS,
+    QuoteInput,
+    ReferenceData,
+    _valores_monetarios_float,
+    calcular_lote,
+    calcular_orcamento,
+    resolver_parametros,
+)
+
+
+def snapshot_sintetico() -> ReferenceData:
+    return ReferenceData.from_rows(
+        {'margem': 30.0, 'custo_cordao': 0.8, 'perdas_calibracao_un': 5, 'valor_silk': 0.2,
+         'tamanho_alca': 6.0, 'ipi_percentual': 3.25},
+        [
+            {'id': 1, 'gramatura': '40g', 'preco': 1.37, 'altura_cm': 5000.0},
+            {'id': 2, 'gramatura': '60g', 'preco': 2.115, 'altura_cm': 3000.0},
+            {'id': 3, 'gramatura': '80g', 'preco': 2.93, 'altura_cm': None},
+        ],
+        [
+            {'id': 1, 'nome': 'PIS', 'valor': 0.65}, {'id': 2, 'nome': 'COFINS', 'valor': 3.0},
+            {'id': 3, 'nome': 'IRPJ', 'valor': 1.2}, {'id': 4, 'nome': 'ICMS', 'valor': 18.0},
+        ],
+        [
+            {'id': 1, 'nome': 'Clichê', 'valor': 45.0, 'a_cada': 1000},
+            {'id': 2, 'nome': 'Setup', 'valor': 80.0, 'a_cada': 5000},
+        ],
+    )
+
+
+def corpus(n: int, seed: int):
+    rnd = random.Random(seed)
+    estados = ['SP', 'RJ', 'MG', 'BA', 'PE', 'RS', None]
+    for _ in range(n):
+        yield QuoteInput(
+            altura_cm=rnd.choice([30, 35.5, 40, 42, 50]),
+            gramatura_id=rnd.choice([1, 2, 3]),
+            largura_cm=round(rnd.uniform(15, 60), rnd.choice([0, 1, 2])),
+            quantidade=rnd.choice([1, 50, 100, 500, 1000, 2500, 10000, 50000, rnd.randint(1, 200000)]),
+            margem=rnd.choice([None, 0.0, 25.0, 27.5, 33.3333, round(rnd.uniform(5, 60), 2)]),
+            comissao=rnd.choice([0.0, 2.5, 5.0, round(rnd.uniform(0, 10), 2)]),
+            incluir_valor_silk=rnd.random() < 0.3,
+            incluir_cordao=rnd.random() < 0.4,
+            incluir_lateral=True,
+            lateral_cm=rnd.choice([0, 4, 5.5, 8]),
+            servicos=tuple(
+                {'id': 1, 'nome': 'Silk 1 cor', 'valor': 0.15, 'impostos': 5.0} for _ in range(rnd.choice([0, 0, 1]))
+            ),
+            estado=rnd.choice(estados),
+            cliente_tem_ie=rnd.random() < 0.5,
+        )
+
+
+def cronometrar(fn, repeticoes=5):
+    # Sem o coletor de lixo durante a medição (como o timeit): as pausas dele caem em qualquer caminho
+    melhor = float('inf')
+    resultado = None
+    for _ in range(repeticoes):
+        gc.collect()
+        gc.disable()
+        try:
+            t0 = time.perf_counter()
+            resultado = fn()
+            melhor = min(melhor, time.perf_counter() - t0)
+        finally:
+            gc.enable()
+    return melhor, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--casos', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--mostrar', type=int, default=20, help='quantas divergências detalhar (0 = todas)')
+    args = parser.parse_args()
+
+    ref = snapshot_sintetico()
+    quotes = list(corpus(args.casos, args.seed))
+    params = [resolver_parametros(q, ref) for q in quotes]
+    n = len(quotes)
+
+    def largura(q, p):
+        return float(q.largura_cm or 0) + p.lateral_effective
+
+    t_float, floats = cronometrar(lambda: [_valores_monetarios_float(q, p, ref, largura(q, p))['preco_final'] for q, p in zip(quotes, params)])
+    t_cent, cents = cronometrar(lambda: [valores_centavos(q, p, ref)['preco_final'] for q, p in zip(quotes, params)])
+    t_lote, lote = cronometrar(lambda: precos_centavos_lote(quotes, params, ref)['preco_final'])
+    t_full_f, _ = cronometrar(lambda: [calcular_orcamento(q, ref) for q in quotes])
+    t_full_c, _ = cronometrar(lambda: [calcular_orcamento(q, ref, ARITMETICA_CENTAVOS) for q in quotes])
+    payloads = [{k: v for k, v in asdict(q).items() if v is not None} for q in quotes]
+    t_lote_f, _ = cronometrar(lambda: calcular_lote(payloads, ref))
+    t_lote_c, lote_c = cronometrar(lambda: calcular_lote(payloads, ref, ARITMETICA_CENTAVOS))
+    print(f'Casos: {n} (seed {args.seed})')
+    print(f'{"caminho":42} {"total (ms)":>11} {"µs/cotação":>11}')
+    for nome, t in [
+        ('float: valores monetários (escalar)', t_float),
+        ('centavos: valores monetários (escalar)', t_cent),
+        ('centavos: lote int64 (vetorizado)', t_lote),
+        ('float: calcular_orcamento completo', t_full_f),
+        ('centavos: calcular_orcamento completo', t_full_c),
+        ('float: calcular_lote (/batch)', t_lote_f),
+        ('centavos: calcular_lote (/batch, int64)', t_lote_c),
+    ]:
+        print(f'{nome:42} {t * 1000:11.1f} {t / n * 1e6:11.2f}')
+
+    inconsistentes = [i for i in range(n) if int(lote[i]) != cents[i]]
+    print(f'\nLote int64 x escalar em centavos: {len(inconsistentes)} diferenças (esperado 0)')
+    falhas = sum(1 for r in lote_c if not r['ok'])
+    inconsistentes = [i for i, r in enumerate(lote_c) if r['ok'] and round(r['resultado']['preco_final'] * 100) != cents[i]]
+    print(f'calcular_lote em centavos x escalar: {len(inconsistentes)} diferenças, {falhas} itens com erro (esperado 0 e 0)')
+
+    divergentes = [i for i in range(n) if round(floats[i] * 100) != cents[i]]
+    print(f'Float x centavos (preco_final): {len(divergentes)} divergências em {n} casos '
+          f'({len(divergentes) / n:.3%})')
+    limite = len(divergentes) if args.mostrar == 0 else args.mostrar
+    for i in divergentes[:limite]:
+        q, p = quotes[i], params[i]
+        print(
+            f'  #{i}: float={floats[i]:.2f} centavos={cents[i] / 100:.2f} '
+            f'(dif {round(floats[i] * 100) - cents[i]:+d}c) | q={q.quantidade} largura={q.largura_cm} '
+            f'lateral={q.lateral_cm} custo_un={p.custo_un} margem={p.margem} comissao={p.comissao} icms={p.icms}'
+        )
+    if len(divergentes) > limite:
+        print(f'  ... mais {len(divergentes) - limite} (use --mostrar 0 para listar todas)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark do otimizador de corte de bobinas (app.utils.corte_bobinas).
+
+Corpus determinístico de pedidos com vários modelos de sacola na mesma
+gramatura: para cada instância compara o total de bobinas com o limite
+inferior (altura total / altura da bobina) e com o corte de um modelo por
+bobina, e mede o tempo. `--salvar` grava o corpus em JSON para reuso.
+
+Uso (a partir de Backend/):
+    python -m benchmarks.bench_corte_bobinas [--seed 7] [--tempo-limite 500] [--salvar corpus.json]
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.utils.corte_bobinas import altura_unitaria_cm, otimizar_corte  # noqa: E402
+
+
+# (nome, tipos de sacola, altura da bobina em cm, faixa de quantidade por item)
+CENARIOS = [
+    ('pequeno', 5, 5000.0, (100, 3000)),
+    ('medio', 20, 5000.0, (100, 5000)),
+    ('grande', 100, 5000.0, (50, 20000)),
+    ('grande-bobina-curta', 100, 3000.0, (50, 20000)),
+    ('muito-grande', 200, 5000.0, (50, 10000)),
+    ('demanda-baixa', 120, 5000.0, (1, 40)),
+]
+
+
+def gerar_corpus(seed: int):
+    rnd = random.Random(seed)
+    corpus = []
+    for nome, tipos, bobina, (qmin, qmax) in CENARIOS:
+        for rep in range(3):
+            itens = []
+            for _ in range(tipos):
+                altura = rnd.choice([25, 30, 33.5, 35, 38, 40, 42, 45, 48.5, 50, 55, 60])
+                fundo = rnd.choice([0, 0, 6, 8, 10, 12.5])
+                alca = rnd.random() < 0.6
+                itens.append({
+                    'altura_unitaria_cm': altura_unitaria_cm(altura, fundo, alca, 6.0),
+                    'quantidade': rnd.randint(qmin, qmax),
+                })
+            corpus.append({'nome': f'{nome}#{rep}', 'altura_bobina_cm': bobina, 'itens': itens})
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--tempo-limite', type=float, default=500, help='ms por instância')
+    parser.add_argument('--salvar', help='grava o corpus em JSON')
+    args = parser.parse_args()
+
+    corpus = gerar_corpus(args.seed)
+    if args.salvar:
+        Path(args.salvar).write_text(json.dumps(corpus, ensure_ascii=False, indent=1))
+
+    print(f'{"instância":24} {"tipos":>5} {"bobinas":>8} {"lim.inf":>8} {"gap":>6} {"1/bobina":>9} {"economia":>9} {"ms":>8} {"guloso":>6}')
+    tot = {'bobinas': 0, 'lb': 0, 'um': 0}
+    for inst in corpus:
+        t0 = time.perf_counter()
+        r = otimizar_corte(inst['itens'], inst['altura_bobina_cm'], args.tempo_limite)
+        ms = (time.perf_counter() - t0) * 1000
+        gap = r['total_bobinas'] - r['limite_inferior_bobinas']
+        print(
+            f'{inst["nome"]:24} {len(inst["itens"]):5d} {r["total_bobinas"]:8d} {r["limite_inferior_bobinas"]:8d} '
+            f'{gap:6d} {r["bobinas_um_modelo_por_bobina"]:9d} {r["economia_bobinas"]:9d} {ms:8.1f} '
+            f'{"sim" if r["metricas"]["completado_guloso"] else "não":>6}'
+        )
+        # Toda a demanda atendida, sem excesso
+        produzido = [0] * len(inst['itens'])
+        for padrao in r['padroes']:
+            for peca in padrao['pecas']:
+                for it in peca['itens']:
+                    produzido[it['indice']] += it['quantidade']
+            assert padrao['utilizado_cm'] <= inst['altura_bobina_cm']
+        assert produzido == [it['quantidade'] for it in inst['itens']], inst['nome']
+        tot['bobinas'] += r['total_bobinas']
+        tot['lb'] += r['limite_inferior_bobinas']
+        tot['um'] += r['bobinas_um_modelo_por_bobina']
+
+    print(f'\nTotal: {tot["bobinas"]} bobinas (limite inferior {tot["lb"]}, um modelo por bobina {tot["um"]}, '
+          f'economia {tot["um"] - tot["bobinas"]})')
+
+
+if __name__ == '__main__':
+    main()
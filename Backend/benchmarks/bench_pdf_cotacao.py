@@ -0,0 +1,104 @@
+"""
+Benchmark: CPU por cotação em PDF com estilos e página de termos pré-montados.
+
+Compara `gerar_pdf_cotacao` como está (folha de estilos em cache e página de
+termos renderizada uma vez e anexada com pypdf) com a diagramação completa a
+cada chamada (estilos refeitos e termos diagramados junto com o documento,
+como antes do cache). Mede tempo de CPU do processo, não tempo de parede, e
+confere que as duas versões produzem o mesmo texto em todas as páginas.
+
+Uso (a partir de Backend/):
+    python -m benchmarks.bench_pdf_cotacao [--itens 5,100,1000] [--repeticoes 20]
+"""
+
+import argparse
+import io
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.utils import pdf_cotacao  # noqa: E402
+
+
+CONTEXTO = {
+    'quantidade': 1000,
+    'estado': 'SP',
+    'cliente_tem_ie': True,
+    'servicos': [{'nome': 'Silk 1 cor', 'valor': 0.15, 'imposto_percentual': 5.0}],
+}
+
+
+def linhas(n: int):
+    return [
+        {
+            'nome': f'Sacola {i}', 'largura_cm': 20 + i % 15, 'altura_cm': 30 + i % 7, 'lateral_cm': 8,
+            'fundo_cm': 6 if i % 2 else None, 'quantidade': 1000, 'preco_final': 1200.0 + i,
+            'preco_final_produto': 1100.0 + i, 'preco_final_servicos': 100.0, 'icms_percentual': 18.0,
+            'ipi_percentual': 3.25,
+        }
+        for i in range(n)
+    ]
+
+
+@contextmanager
+def sem_cache():
+    """Diagramação completa a cada chamada: sem anexar termos prontos e com estilos refeitos."""
+    writer = pdf_cotacao.PdfWriter
+    pdf_cotacao.PdfWriter = None
+    try:
+        yield lambda: pdf_cotacao._estilos.cache_clear()
+    finally:
+        pdf_cotacao.PdfWriter = writer
+
+
+def medir(resultados, repeticoes: int, preparar) -> float:
+    agora = datetime(2026, 1, 1, 12, 0)
+    tempos = []
+    for _ in range(repeticoes):
+        preparar()
+        inicio = time.process_time()
+        pdf_cotacao.gerar_pdf_cotacao(resultados, CONTEXTO, agora=agora)
+        tempos.append((time.process_time() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+def texto(pdf: bytes) -> str:
+    return '\n'.join(p.extract_text() for p in pdf_cotacao.PdfReader(io.BytesIO(pdf)).pages)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--itens', default='5,100,1000', help='tamanhos de lote separados por vírgula')
+    parser.add_argument('--repeticoes', type=int, default=20)
+    args = parser.parse_args()
+
+    if pdf_cotacao.PdfWriter is None:
+        print('pypdf não instalado: a página de termos é diagramada em toda cotação (só os estilos ficam em cache).')
+        return
+
+    agora = datetime(2026, 1, 1, 12, 0)
+    amostra = linhas(20)
+    com = pdf_cotacao.gerar_pdf_cotacao(amostra, CONTEXTO, agora=agora)
+    with sem_cache():
+        sem = pdf_cotacao.gerar_pdf_cotacao(amostra, CONTEXTO, agora=agora)
+    print(f'mesmo texto nas duas versões: {texto(com) == texto(sem)}')
+
+    for n in [int(x) for x in args.itens.split(',') if x.strip()]:
+        resultados = linhas(n)
+        repeticoes = max(2, args.repeticoes // max(1, n // 100))
+        com_ms = medir(resultados, repeticoes, lambda: None)
+        with sem_cache() as limpar:
+            sem_ms = medir(resultados, repeticoes, limpar)
+        print(f'\n{n} itens ({repeticoes} repetições, CPU mediana)')
+        print(f'  diagramação completa:     {sem_ms:8.1f} ms')
+        print(f'  estilos + termos prontos: {com_ms:8.1f} ms')
+        print(f'  ganho: {sem_ms / com_ms:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
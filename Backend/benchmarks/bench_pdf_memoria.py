@@ -0,0 +1,134 @@
+"""
+Benchmark: memória e vazão da cotação em PDF para lotes muito grandes.
+
+Compara, para o mesmo lote, a geração em bloco único (todos os itens
+precificados numa lista, um `Table` com todas as linhas e o PDF montado num
+BytesIO, como antes) com a geração em streaming (`precificar_itens` sob
+demanda, `TabelaEmBlocos` uma página por vez e saída em `arquivo_saida()`).
+
+Para cada tamanho mede o pico de memória alocada pelo Python (tracemalloc,
+numa execução separada) e o tempo de parede/itens por segundo (sem
+tracemalloc, que deixa o reportlab mais lento). Confere também que as duas
+versões produzem o mesmo número de páginas.
+
+Uso (a partir de Backend/):
+    python -m benchmarks.bench_pdf_memoria [--itens 1000,5000,20000]
+"""
+
+import argparse
+import io
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from reportlab.platypus import Table  # noqa: E402
+
+from app.models.configuracoes import configuracoes_from_row  # noqa: E402
+from app.utils import pdf_cotacao  # noqa: E402
+from app.utils.pdf_tabela import arquivo_saida  # noqa: E402
+from app.utils.pricing_engine import ReferenceData  # noqa: E402
+
+
+CONTEXTO = {'gramatura_id': 2, 'quantidade': 1000, 'estado': 'SP', 'cliente_tem_ie': True}
+AGORA = datetime(2026, 1, 1, 12, 0)
+
+
+def referencia() -> ReferenceData:
+    cfg = configuracoes_from_row({
+        'id': 1, 'margem': 30.0, 'custo_cordao': 0.8, 'tema': 'Escuro', 'notificacoes': 0,
+        'perdas_calibracao_un': 5, 'valor_silk': 0.2, 'tamanho_alca': 6.0, 'ipi_percentual': 3.25,
+    })
+    return ReferenceData.from_rows(
+        cfg,
+        [{'id': 1, 'gramatura': '40g', 'preco': 1.37, 'altura_cm': 5000.0},
+         {'id': 2, 'gramatura': '60g', 'preco': 2.11, 'altura_cm': 3000.0}],
+        [{'id': 1, 'nome': 'PIS', 'valor': 0.65}, {'id': 2, 'nome': 'COFINS', 'valor': 3.0},
+         {'id': 3, 'nome': 'IRPJ', 'valor': 1.2}, {'id': 4, 'nome': 'ICMS', 'valor': 18.0}],
+        [{'id': 1, 'nome': 'Clichê', 'valor': 45.0, 'a_cada': 1000}],
+        [{'estado': 'SP', 'aliquota': 18.0}],
+    )
+
+
+def itens(n: int):
+    return [
+        {'nome': f'Sacola {i}', 'largura_cm': 20 + i % 15, 'altura_cm': 30 + i % 7, 'lateral_cm': 8,
+         'fundo_cm': 6 if i % 2 else None, 'incluir_alca': i % 3 == 0}
+        for i in range(n)
+    ]
+
+
+@contextmanager
+def tabela_unica():
+    """Troca a tabela em blocos por um Table com todas as linhas (comportamento anterior)."""
+    original = pdf_cotacao.TabelaEmBlocos
+    pdf_cotacao.TabelaEmBlocos = lambda cabecalho, linhas, col_widths, estilo, progresso=None: Table(
+        [cabecalho] + list(linhas), repeatRows=1, colWidths=col_widths, style=estilo,
+    )
+    try:
+        yield
+    finally:
+        pdf_cotacao.TabelaEmBlocos = original
+
+
+def bloco_unico(lote, ref) -> bytes:
+    resultados = list(pdf_cotacao.precificar_itens(lote, CONTEXTO, ref))
+    buffer = io.BytesIO()
+    with tabela_unica():
+        pdf_cotacao.escrever_pdf_cotacao(buffer, resultados, CONTEXTO, len(resultados), agora=AGORA)
+    return buffer.getvalue()
+
+
+def streaming(lote, ref, contar_paginas: bool = False) -> int:
+    arquivo = arquivo_saida()
+    try:
+        pdf_cotacao.escrever_pdf_cotacao(arquivo, pdf_cotacao.precificar_itens(lote, CONTEXTO, ref), CONTEXTO, len(lote), agora=AGORA)
+        if not contar_paginas:
+            return 0
+        arquivo.seek(0)
+        return len(pdf_cotacao.PdfReader(arquivo).pages)
+    finally:
+        arquivo.close()
+
+
+def pico_mb(fn, *args) -> float:
+    tracemalloc.start()
+    try:
+        fn(*args)
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+def tempo_s(fn, *args) -> float:
+    inicio = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - inicio
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--itens', default='1000,5000', help='tamanhos de lote separados por vírgula')
+    args = parser.parse_args()
+
+    ref = referencia()
+    if pdf_cotacao.PdfReader is not None:
+        amostra = itens(300)
+        paginas_bloco = len(pdf_cotacao.PdfReader(io.BytesIO(bloco_unico(amostra, ref))).pages)
+        print(f'mesmo número de páginas (300 itens): {paginas_bloco == streaming(amostra, ref, contar_paginas=True)} ({paginas_bloco})')
+
+    for n in [int(x) for x in args.itens.split(',') if x.strip()]:
+        lote = itens(n)
+        print(f'\n{n} itens')
+        for nome, fn in (('bloco único', bloco_unico), ('streaming', streaming)):
+            pico = pico_mb(fn, lote, ref)
+            duracao = tempo_s(fn, lote, ref)
+            print(f'  {nome:12s} pico {pico:8.1f} MB   {duracao:7.2f} s   {n / duracao:8.0f} itens/s')
+
+
+if __name__ == '__main__':
+    main()
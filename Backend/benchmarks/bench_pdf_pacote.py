@@ -0,0 +1,100 @@
+"""
+Benchmark: pacote de cotações (um PDF por cliente num ZIP), serial × pool de processos.
+
+Gera o mesmo pacote (o lote para N clientes em UFs diferentes, com e sem IE)
+no próprio processo (PDF_PACOTE_WORKERS=1, como N chamadas seguidas a
+/batch/pdf-precos) e no pool de processos com cada número de workers pedido.
+O cache de PDFs fica desligado e o pool é aquecido antes de medir (o `spawn`
+dos processos e os imports custam alguns segundos só na primeira chamada).
+Mede tempo de parede (mediana) e confere que os ZIPs têm os mesmos arquivos
+com o mesmo texto.
+
+O ganho depende dos núcleos livres: com 1 CPU o pool só acrescenta o custo de
+serializar o lote e o PDF entre processos.
+
+Uso (a partir de Backend/):
+    python -m benchmarks.bench_pdf_pacote [--clientes 8] [--itens 300] [--workers 2,4] [--repeticoes 3]
+"""
+
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+os.environ['PDF_CACHE'] = 'off'
+
+from app.utils import pdf_pacote  # noqa: E402
+from app.utils.pdf_cotacao import PdfReader  # noqa: E402
+from benchmarks.bench_pdf_memoria import itens, referencia  # noqa: E402
+
+
+CONTEXTO = {'gramatura_id': 2, 'quantidade': 1000}
+UFS = ('SP', 'RJ', 'MG', 'PR', 'SC', 'RS', 'BA', 'PE', 'GO', 'DF', 'ES', 'CE')
+AGORA = datetime(2026, 1, 1, 12, 0)
+
+
+def clientes(n: int):
+    return [{'nome': f'Cliente {i + 1}', 'estado': UFS[i % len(UFS)], 'cliente_tem_ie': i % 2 == 0} for i in range(n)]
+
+
+def gerar(lote, contextos, nomes, ref) -> bytes:
+    buffer = io.BytesIO()
+    pdf_pacote.escrever_pacote(buffer, lote, contextos, nomes, ref, AGORA)
+    return buffer.getvalue()
+
+
+def medir(repeticoes: int, *args) -> float:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        gerar(*args)
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+
+def conteudo(zip_bytes: bytes):
+    with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zf:
+        if PdfReader is None:
+            return zf.namelist()
+        return [(nome, [p.extract_text() for p in PdfReader(io.BytesIO(zf.read(nome))).pages]) for nome in zf.namelist()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clientes', type=int, default=8)
+    parser.add_argument('--itens', type=int, default=300, help='itens do lote (iguais para todos os clientes)')
+    parser.add_argument('--workers', default='2,4', help='tamanhos de pool separados por vírgula')
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    ref = referencia()
+    lote = itens(args.itens)
+    lista = clientes(args.clientes)
+    contextos = pdf_pacote.validar_pacote(lote, CONTEXTO, lista)
+    nomes = pdf_pacote.nomes_arquivos(lista, AGORA)
+    print(f'{args.clientes} clientes × {args.itens} itens, {os.cpu_count()} CPU(s), mediana de {args.repeticoes}')
+
+    os.environ['PDF_PACOTE_WORKERS'] = '1'
+    referencia_zip = gerar(lote, contextos, nomes, ref)
+    serial = medir(args.repeticoes, lote, contextos, nomes, ref)
+    print(f'  serial (1 processo): {serial:7.2f} s')
+
+    esperado = conteudo(referencia_zip)
+    for n in [int(x) for x in args.workers.split(',') if x.strip()]:
+        os.environ['PDF_PACOTE_WORKERS'] = str(n)
+        pdf_pacote.encerrar_pool()
+        iguais = conteudo(gerar(lote, contextos, nomes, ref)) == esperado  # também aquece o pool
+        duracao = medir(args.repeticoes, lote, contextos, nomes, ref)
+        print(f'  pool de {n:2d} processos: {duracao:7.2f} s   ganho {serial / duracao:5.2f}x   mesmo conteúdo: {iguais}')
+    pdf_pacote.encerrar_pool()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Benchmark: contexto de precificação em uma consulta x uma consulta por tabela.
+
+Monta um banco SQLite local (app.db) com dados sintéticos e compara o
+carregamento dos dados de referência por cinco SELECTs (um por tabela, como
+as leituras do PostgREST) com a consulta única `pricing_context`. As cinco
+consultas são medidas em sequência e em paralelo via `ler_em_paralelo`, como
+no fallback de produção quando a RPC não existe; o ganho é calculado sobre o
+fallback paralelo. A latência de rede é simulada somando `--rtt-ms` a cada ida
+e volta. Confere que os caminhos montam o mesmo snapshot (ReferenceData).
+
+Uso (a partir de Backend/):
+    python -m benchmarks.bench_pricing_context [--rtt-ms 25] [--repeticoes 50] [--gramaturas 40]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.db import conectar_sqlite, inserir_linhas, pricing_context  # noqa: E402
+from app.models.configuracoes import configuracoes_from_row  # noqa: E402
+from app.models.reference_data import referencia_de_contexto  # noqa: E402
+from app.utils.leituras_paralelas import ler_em_paralelo  # noqa: E402
+from app.utils.pricing_engine import ReferenceData  # noqa: E402
+
+
+def popular(conn, n_gramaturas: int, seed: int) -> None:
+    rnd = random.Random(seed)
+    inserir_linhas(conn, 'configuracoes', [{
+        'id': 1, 'margem': 30.0, 'custo_cordao': 0.8, 'tema': 'Escuro', 'notificacoes': 0,
+        'perdas_calibracao_un': 5, 'valor_silk': 0.2, 'tamanho_alca': 6.0, 'ipi_percentual': 3.25,
+    }])
+    inserir_linhas(conn, 'gramaturas', [
+        {'id': i, 'gramatura': f'{20 + i}g', 'preco': round(rnd.uniform(0.8, 4.0), 3),
+         'altura_cm': rnd.choice([None, 3000.0, 5000.0])}
+        for i in range(1, n_gramaturas + 1)
+    ])
+    inserir_linhas(conn, 'impostos', [
+        {'id': 1, 'nome': 'PIS', 'valor': 0.65}, {'id': 2, 'nome': 'COFINS', 'valor': 3.0},
+        {'id': 3, 'nome': 'IRPJ', 'valor': 1.2}, {'id': 4, 'nome': 'ICMS', 'valor': 18.0},
+    ])
+    inserir_linhas(conn, 'custos_adicionais', [
+        {'id': 1, 'nome': 'Clichê', 'valor': 45.0, 'a_cada': 1000},
+        {'id': 2, 'nome': 'Setup', 'valor': 80.0, 'a_cada': 5000},
+    ])
+    inserir_linhas(conn, 'icms_estados', [
+        {'estado': uf, 'aliquota': a} for uf, a in [('SP', 18.0), ('RJ', 20.0), ('MG', 18.0), ('BA', 20.5)]
+    ])
+
+
+CONSULTAS = {
+    'configuracoes': 'select * from configuracoes where id = 1',
+    'gramaturas': 'select id, gramatura, preco, altura_cm from gramaturas order by id',
+    'impostos': 'select id, nome, valor from impostos order by id',
+    'custos_adicionais': 'select id, nome, valor, a_cada from custos_adicionais order by id',
+    'icms_estados': 'select estado, aliquota from icms_estados order by estado',
+}
+
+# A conexão é compartilhada pelas threads do pool; a latência simulada fica fora do lock
+_lock_conn = threading.Lock()
+
+
+def _consulta(conn, rtt_s: float, sql: str):
+    time.sleep(rtt_s)
+    with _lock_conn:
+        return [dict(r) for r in conn.execute(sql)]
+
+
+def _montar(dados) -> ReferenceData:
+    cfg = dados['configuracoes']
+    return ReferenceData.from_rows(
+        configuracoes_from_row(cfg[0] if cfg else None),
+        dados['gramaturas'], dados['impostos'], dados['custos_adicionais'], dados['icms_estados'],
+    )
+
+
+def por_tabela(conn, rtt_s: float) -> ReferenceData:
+    """Cinco idas e voltas em sequência, como as leituras por tabela do PostgREST."""
+    return _montar({nome: _consulta(conn, rtt_s, sql) for nome, sql in CONSULTAS.items()})
+
+
+def por_tabela_paralelo(conn, rtt_s: float) -> ReferenceData:
+    """As cinco consultas ao mesmo tempo (`ler_em_paralelo`), como o fallback de `carregar_dados_referencia`."""
+    dados, _ = ler_em_paralelo(
+        {nome: (lambda sql=sql: _consulta(conn, rtt_s, sql)) for nome, sql in CONSULTAS.items()},
+        opcionais={'custos_adicionais': [], 'icms_estados': []},
+    )
+    return _montar(dados)
+
+
+def consulta_unica(conn, rtt_s: float) -> ReferenceData:
+    """Uma ida e volta: `pricing_context`."""
+    time.sleep(rtt_s)
+    return referencia_de_contexto(pricing_context(conn))
+
+
+def medir(fn, conn, rtt_s: float, repeticoes: int):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        fn(conn, rtt_s)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos), max(tempos)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rtt-ms', type=float, default=25.0, help='latência simulada por ida e volta')
+    parser.add_argument('--repeticoes', type=int, default=50)
+    parser.add_argument('--gramaturas', type=int, default=40)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    conn = conectar_sqlite()
+    popular(conn, args.gramaturas, args.seed)
+
+    a = por_tabela(conn, 0.0)
+    b = por_tabela_paralelo(conn, 0.0)
+    c = consulta_unica(conn, 0.0)
+    print(f'snapshots iguais: {a == b == c}')
+
+    for rtt in (0.0, args.rtt_ms):
+        rtt_s = rtt / 1000
+        med_seq, max_seq = medir(por_tabela, conn, rtt_s, args.repeticoes)
+        med_par, max_par = medir(por_tabela_paralelo, conn, rtt_s, args.repeticoes)
+        med_uni, max_uni = medir(consulta_unica, conn, rtt_s, args.repeticoes)
+        print(f'\nRTT simulado: {rtt:.1f} ms ({args.repeticoes} repetições, {args.gramaturas} gramaturas)')
+        print(f'  5 consultas em sequência:  mediana {med_seq:8.2f} ms  máx {max_seq:8.2f} ms')
+        print(f'  5 consultas em paralelo:   mediana {med_par:8.2f} ms  máx {max_par:8.2f} ms  (fallback atual)')
+        print(f'  pricing_context (1):       mediana {med_uni:8.2f} ms  máx {max_uni:8.2f} ms')
+        if med_uni > 0:
+            print(f'  ganho sobre o fallback paralelo: {med_par / med_uni:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
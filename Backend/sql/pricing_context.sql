@@ -0,0 +1,50 @@
+-- Contexto de precificação em uma única chamada (Supabase RPC: pricing_context).
+--
+-- Devolve em um só JSON tudo o que o motor de preços lê: a linha de
+-- configuracoes, as gramaturas (todas ou só a pedida), impostos,
+-- custos_adicionais e icms_estados. O backend chama via
+-- `client.rpc('pricing_context', {...})` e cai nas leituras por tabela se a
+-- função não existir. A versão SQLite equivalente está em app/db.py.
+--
+-- Aplicar no SQL Editor do Supabase (ou psql) e recarregar o schema do PostgREST:
+--   NOTIFY pgrst, 'reload schema';
+
+create or replace function public.pricing_context(
+    p_gramatura_id bigint default null,
+    p_gramatura_nome text default null
+)
+returns jsonb
+language sql
+stable
+security invoker
+as $$
+    select jsonb_build_object(
+        'configuracoes', (
+            select to_jsonb(c) from public.configuracoes c where c.id = 1
+        ),
+        'gramaturas', coalesce((
+            select jsonb_agg(jsonb_build_object(
+                       'id', g.id, 'gramatura', g.gramatura, 'preco', g.preco, 'altura_cm', g.altura_cm
+                   ) order by g.id)
+            from public.gramaturas g
+            where (p_gramatura_id is null or g.id = p_gramatura_id)
+              and (p_gramatura_nome is null or g.gramatura = p_gramatura_nome)
+        ), '[]'::jsonb),
+        'impostos', coalesce((
+            select jsonb_agg(jsonb_build_object('id', i.id, 'nome', i.nome, 'valor', i.valor) order by i.id)
+            from public.impostos i
+        ), '[]'::jsonb),
+        'custos_adicionais', coalesce((
+            select jsonb_agg(jsonb_build_object(
+                       'id', ca.id, 'nome', ca.nome, 'valor', ca.valor, 'a_cada', ca.a_cada
+                   ) order by ca.id)
+            from public.custos_adicionais ca
+        ), '[]'::jsonb),
+        'icms_estados', coalesce((
+            select jsonb_agg(jsonb_build_object('estado', e.estado, 'aliquota', e.aliquota) order by e.estado)
+            from public.icms_estados e
+        ), '[]'::jsonb)
+    );
+$$;
+
+grant execute on function public.pricing_context(bigint, text) to anon, authenticated, service_role;
@@ -0,0 +1,58 @@
+-- Colunas de atualização para a sincronização incremental do espelho local (app/db.py).
+--
+-- O espelho SQLite pede ao PostgREST só as linhas com `updated_at >= marca`
+-- (`atualizado_em` em icms_estados) e remove localmente os ids que sumiram.
+-- Sem estas colunas a consulta incremental falha e cada sincronização copia a
+-- tabela inteira (modo 'completo' em /api/status -> espelho_local.tabelas).
+--
+-- Os triggers preenchem a coluna em todo insert/update, inclusive nas escritas
+-- feitas fora da aplicação (SQL Editor, painel do Supabase). Idempotente:
+-- pode ser reaplicado.
+--
+-- Aplicar no SQL Editor do Supabase (ou psql) e recarregar o schema do PostgREST:
+--   NOTIFY pgrst, 'reload schema';
+
+create or replace function public.tocar_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at := now();
+    return new;
+end;
+$$;
+
+create or replace function public.tocar_atualizado_em()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.atualizado_em := now();
+    return new;
+end;
+$$;
+
+do $$
+declare
+    tabela text;
+begin
+    foreach tabela in array array['configuracoes', 'gramaturas', 'impostos', 'servicos', 'custos_adicionais', 'sacolas_lote']
+    loop
+        execute format('alter table public.%I add column if not exists updated_at timestamptz not null default now()', tabela);
+        execute format('create index if not exists %I on public.%I (updated_at)', tabela || '_updated_at_idx', tabela);
+        execute format('drop trigger if exists tocar_updated_at on public.%I', tabela);
+        execute format(
+            'create trigger tocar_updated_at before insert or update on public.%I '
+            'for each row execute function public.tocar_updated_at()',
+            tabela
+        );
+    end loop;
+end;
+$$;
+
+-- icms_estados já recebe `atualizado_em` (data) da aplicação; o trigger grava o instante da escrita
+alter table public.icms_estados add column if not exists atualizado_em timestamptz default now();
+create index if not exists icms_estados_atualizado_em_idx on public.icms_estados (atualizado_em);
+drop trigger if exists tocar_atualizado_em on public.icms_estados;
+create trigger tocar_atualizado_em before insert or update on public.icms_estados
+    for each row execute function public.tocar_atualizado_em();